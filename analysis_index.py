@@ -0,0 +1,166 @@
+"""
+فهرس نتائج تحليل الفيديو.
+يحفظ نتائج التحليل (منحنيات الطاقة، الخط الزمني للمشاهد، المقاطع المرشحة) على القرص
+مفهرسة بتجزئة سريعة لمحتوى الفيديو المصدر، بحيث لا تتم إعادة التحليل لنفس المحتوى.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# حجم الجزء المقروء من بداية الملف ونهايته لحساب التجزئة
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def content_hash(path):
+    """
+    حساب تجزئة سريعة لمحتوى ملف من حجمه وأول وآخر ميجابايت منه.
+    
+    المعلمات:
+        path (str): مسار الملف.
+    
+    العائد:
+        str: التجزئة بصيغة سداسية عشرية.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_BLOCK_SIZE))
+        if size > HASH_BLOCK_SIZE:
+            f.seek(max(HASH_BLOCK_SIZE, size - HASH_BLOCK_SIZE))
+            digest.update(f.read(HASH_BLOCK_SIZE))
+    
+    return digest.hexdigest()
+
+class AnalysisIndex:
+    """
+    فهرس دائم لنتائج تحليل الفيديو.
+    
+    لكل محتوى مجلد باسم تجزئته يحتوي على مصفوفات NumPy (تتم قراءتها كملفات
+    معينة في الذاكرة) وملفات JSON. ويحتفظ الفهرس بمؤشر من مسار كل فيديو إلى
+    تجزئة محتواه، فإذا تغير محتوى الملف يتم حذف النتائج القديمة تلقائيًا.
+    """
+    
+    def __init__(self, index_folder):
+        """
+        تهيئة فهرس التحليل.
+        
+        المعلمات:
+            index_folder (str): مجلد الفهرس.
+        """
+        self.index_folder = index_folder
+        self.paths_folder = os.path.join(index_folder, 'paths')
+        os.makedirs(self.paths_folder, exist_ok=True)
+    
+    def _entry_folder(self, key):
+        """الحصول على مجلد نتائج محتوى معين."""
+        return os.path.join(self.index_folder, key)
+    
+    def _pointer_path(self, video_path):
+        """الحصول على مسار ملف المؤشر الخاص بمسار فيديو."""
+        name = hashlib.blake2b(os.path.abspath(video_path).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.paths_folder, name)
+    
+    def _write_atomic(self, path, write):
+        """
+        الكتابة في ملف مؤقت ثم استبداله لتجنب قراءة ملف غير مكتمل.
+        
+        المعلمات:
+            path (str): مسار الملف النهائي.
+            write (callable): دالة تستقبل كائن الملف المفتوح وتكتب فيه.
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    
+    def get_key(self, video_path):
+        """
+        الحصول على مفتاح الفهرس لفيديو، مع حذف نتائج المحتوى السابق إذا تغير الملف.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+        
+        العائد:
+            str: مفتاح الفهرس (تجزئة المحتوى).
+        """
+        key = content_hash(video_path)
+        pointer_path = self._pointer_path(video_path)
+        
+        previous_key = None
+        if os.path.exists(pointer_path):
+            with open(pointer_path, 'r') as f:
+                previous_key = f.read().strip()
+        
+        if previous_key != key:
+            if previous_key:
+                # تغير محتوى الملف، فلم تعد النتائج السابقة صالحة
+                shutil.rmtree(self._entry_folder(previous_key), ignore_errors=True)
+                logger.info(f"تم إبطال نتائج التحليل السابقة للفيديو: {video_path}")
+            self._write_atomic(pointer_path, lambda f: f.write(key.encode()))
+        
+        os.makedirs(self._entry_folder(key), exist_ok=True)
+        return key
+    
+    def get_array(self, key, name):
+        """
+        قراءة مصفوفة محفوظة كملف معين في الذاكرة.
+        
+        المعلمات:
+            key (str): مفتاح الفهرس.
+            name (str): اسم المصفوفة.
+        
+        العائد:
+            numpy.ndarray: المصفوفة، أو None إذا لم تكن محفوظة.
+        """
+        path = os.path.join(self._entry_folder(key), f"{name}.npy")
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+    
+    def put_array(self, key, name, array):
+        """
+        حفظ مصفوفة في الفهرس.
+        
+        المعلمات:
+            key (str): مفتاح الفهرس.
+            name (str): اسم المصفوفة.
+            array (numpy.ndarray): المصفوفة.
+        """
+        path = os.path.join(self._entry_folder(key), f"{name}.npy")
+        self._write_atomic(path, lambda f: np.save(f, array))
+    
+    def get_json(self, key, name):
+        """
+        قراءة نتيجة JSON محفوظة.
+        
+        المعلمات:
+            key (str): مفتاح الفهرس.
+            name (str): اسم النتيجة.
+        
+        العائد:
+            object: النتيجة، أو None إذا لم تكن محفوظة.
+        """
+        path = os.path.join(self._entry_folder(key), f"{name}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def put_json(self, key, name, value):
+        """
+        حفظ نتيجة JSON في الفهرس.
+        
+        المعلمات:
+            key (str): مفتاح الفهرس.
+            name (str): اسم النتيجة.
+            value (object): النتيجة.
+        """
+        path = os.path.join(self._entry_folder(key), f"{name}.json")
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        self._write_atomic(path, lambda f: f.write(data))
@@ -12,6 +12,9 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 import concurrent.futures
 
 from .config.config import config
+from .utils.job_manager import JobManager
+from .utils.job_queue import JobQueue, DurableJobManager
+from .utils.redis_job_queue import RedisJobQueue
 
 def create_app(config_name=None):
     """
@@ -52,6 +55,9 @@ def create_app(config_name=None):
         max_workers=app.config['THREAD_POOL_SIZE']
     )
     
+    # إنشاء مدير المهام الخلفية مع قائمة انتظار محدودة
+    app.job_manager = create_job_manager(app)
+    
     # تسجيل نقاط النهاية
     register_blueprints(app)
     
@@ -74,6 +80,54 @@ def create_app(config_name=None):
     
     return app
 
+def create_job_manager(app):
+    """
+    إنشاء مدير المهام الخلفية حسب JOB_QUEUE_BACKEND.
+    
+    المعلمات:
+        app (Flask): تطبيق Flask.
+    
+    العائد:
+        JobManager: مدير ينفذ المهام داخل العملية ('memory')، أو مدير يرسلها إلى قائمة
+                    انتظار دائمة تنفذها العمليات العاملة على هذا الجهاز ('sqlite') أو على
+                    عدة أجهزة ('redis').
+    """
+    backend = app.config['JOB_QUEUE_BACKEND']
+    if backend in ('sqlite', 'redis'):
+        if backend == 'redis':
+            queue = RedisJobQueue.from_url(
+                app.config['JOB_REDIS_URL'],
+                prefix=app.config['JOB_REDIS_PREFIX'],
+                lease_duration=app.config['JOB_LEASE_DURATION'],
+                max_attempts=app.config['JOB_MAX_ATTEMPTS'],
+                affinity_wait=app.config['JOB_AFFINITY_WAIT']
+            )
+        else:
+            queue = JobQueue(
+                app.config['JOB_QUEUE_PATH'],
+                lease_duration=app.config['JOB_LEASE_DURATION'],
+                max_attempts=app.config['JOB_MAX_ATTEMPTS']
+            )
+        return DurableJobManager(
+            queue,
+            result_ttl=app.config['JOB_RESULT_TTL'],
+            max_pending=app.config['JOB_QUEUE_DEPTH'],
+            max_pending_per_client=app.config['JOB_CLIENT_QUEUE_DEPTH']
+        )
+    
+    # مجمع محدود لمهام المعالجة الخلفية، منفصل عن مجمع الطلبات المتزامنة
+    app.encode_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=app.config['ENCODE_WORKERS'],
+        thread_name_prefix='encode'
+    )
+    return JobManager(
+        app.encode_executor,
+        result_ttl=app.config['JOB_RESULT_TTL'],
+        workers=app.config['ENCODE_WORKERS'],
+        max_pending=app.config['JOB_QUEUE_DEPTH'],
+        max_pending_per_client=app.config['JOB_CLIENT_QUEUE_DEPTH']
+    )
+
 def setup_logging(app):
     """
     إعداد التسجيل للتطبيق.
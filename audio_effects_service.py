@@ -9,6 +9,7 @@ import subprocess
 from flask import current_app
 
 from ..utils.error_handler import VideoProcessingError
+from ..utils.media_probe import get_duration
 
 logger = logging.getLogger(__name__)
 
@@ -261,7 +262,7 @@ class AudioEffectsService:
                 raise VideoProcessingError(f"المؤثر الصوتي غير موجود: {effect_id}")
             
             # الحصول على مدة الفيديو
-            duration = self._get_video_duration(video_path)
+            duration = get_duration(video_path)
             
             # إنشاء ملف المؤثر الصوتي بنفس مدة الفيديو
             sound_effect_path = self.create_sound_effect(effect_id, duration)
@@ -303,45 +304,3 @@ class AudioEffectsService:
         except Exception as e:
             logger.error(f"خطأ في إضافة المؤثر الصوتي إلى الفيديو: {str(e)}")
             raise VideoProcessingError(f"خطأ في إضافة المؤثر الصوتي إلى الفيديو: {str(e)}")
-    
-    def _get_video_duration(self, video_path):
-        """
-        الحصول على مدة الفيديو.
-        
-        المعلمات:
-            video_path (str): مسار الفيديو.
-        
-        العائد:
-            float: مدة الفيديو بالثواني.
-        
-        يرفع:
-            VideoProcessingError: إذا حدث خطأ أثناء الحصول على مدة الفيديو.
-        """
-        try:
-            # استخدام FFprobe للحصول على مدة الفيديو
-            command = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                video_path
-            ]
-            
-            result = subprocess.run(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
-            
-            if result.returncode != 0:
-                logger.error(f"خطأ في الحصول على مدة الفيديو: {result.stderr}")
-                raise VideoProcessingError(f"خطأ في الحصول على مدة الفيديو: {result.stderr}")
-            
-            # تحويل الناتج إلى رقم عشري
-            duration = float(result.stdout.strip())
-            return duration
-        except Exception as e:
-            logger.error(f"خطأ في الحصول على مدة الفيديو: {str(e)}")
-            raise VideoProcessingError(f"خطأ في الحصول على مدة الفيديو: {str(e)}")
@@ -0,0 +1,68 @@
+"""
+قياس أداء مدير التخزين المؤقت.
+يقيس متوسط زمن عمليات الاسترجاع والتخزين (مع إزالة أقدم عنصر) عند أحجام
+مختلفة لذاكرة التخزين المؤقت، للتحقق من ثبات تكلفة العملية الواحدة.
+
+الاستخدام:
+    python benchmark_cache.py --sizes 100 10000 1000000 --operations 200000
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.cache_manager import CacheManager
+
+def measure(size, operations):
+    """
+    قياس زمن العمليات لذاكرة تخزين مؤقت ممتلئة بحجم معين.
+    
+    المعلمات:
+        size (int): الحد الأقصى لعدد العناصر.
+        operations (int): عدد العمليات المقاسة من كل نوع.
+    
+    العائد:
+        tuple: (زمن الاسترجاع، زمن التخزين مع الإزالة) لكل عملية بالنانوثانية.
+    """
+    cache = CacheManager(max_size=size, max_age=3600, enabled=True)
+    for i in range(size):
+        cache.set(f"key_{i}", i)
+    
+    # استرجاع عناصر موجودة
+    keys = [f"key_{i % size}" for i in range(operations)]
+    started = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    get_time = (time.perf_counter() - started) / operations * 1e9
+    
+    # تخزين عناصر جديدة، كل منها يتطلب إزالة أقدم عنصر
+    keys = [f"new_key_{i}" for i in range(operations)]
+    started = time.perf_counter()
+    for key in keys:
+        cache.set(key, key)
+    set_time = (time.perf_counter() - started) / operations * 1e9
+    
+    return get_time, set_time
+
+def main():
+    """تشغيل القياس وطباعة النتائج."""
+    parser = argparse.ArgumentParser(description="قياس أداء مدير التخزين المؤقت")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument("--operations", type=int, default=200000)
+    args = parser.parse_args()
+    
+    # تعطيل التسجيل حتى لا يؤثر على القياس
+    logging.disable(logging.CRITICAL)
+    
+    print(f"{'الحجم':>10} {'استرجاع (ن.ث/عملية)':>22} {'تخزين مع إزالة (ن.ث/عملية)':>28}")
+    for size in args.sizes:
+        get_time, set_time = measure(size, args.operations)
+        print(f"{size:>10} {get_time:>22.0f} {set_time:>28.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+قياس أداء إنهاء المقطع في معالجة الفيديو.
+يقارن عدد العمليات المشغلة والزمن الكلي لكل مقطع بين المسار المنفصل (ترميز ثم FFmpeg
+للصورة المصغرة ثم FFprobe للمدة) والمسار المدمج الذي ينتج المقطع وصورته المصغرة ومدته
+من تشغيل واحد لـ FFmpeg.
+
+الاستخدام:
+    python benchmark_finalize.py --clip-duration 15 --clips 5 --rounds 3
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from flask import Flask
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.video_service import VideoService
+from utils.media_probe import get_duration
+from config.config import config
+
+class SpawnCounter:
+    """عداد للعمليات التي تنشئها subprocess.Popen أثناء القياس."""
+    
+    def __init__(self):
+        self.count = 0
+        self.popen = subprocess.Popen
+    
+    def __enter__(self):
+        counter = self
+        
+        class CountingPopen(self.popen):
+            def __init__(self, *args, **kwargs):
+                counter.count += 1
+                super().__init__(*args, **kwargs)
+        
+        subprocess.Popen = CountingPopen
+        return self
+    
+    def __exit__(self, *exc_info):
+        subprocess.Popen = self.popen
+
+def create_source_video(path, duration):
+    """
+    إنشاء فيديو مصدر باستخدام FFmpeg.
+    
+    المعلمات:
+        path (str): مسار الفيديو.
+        duration (int): مدة الفيديو بالثواني.
+    """
+    command = [
+        "ffmpeg",
+        "-y",
+        "-f", "lavfi",
+        "-i", f"testsrc=duration={duration}:size=1280x720:rate=30",
+        "-f", "lavfi",
+        "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-g", "60",
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        path
+    ]
+    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+def probe_duration(path):
+    """
+    قراءة مدة الفيديو بتشغيل ffprobe كما كان يفعل المسار المنفصل.
+    
+    المعلمات:
+        path (str): مسار الفيديو.
+    
+    العائد:
+        float: المدة بالثواني.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    return float(result.stdout.strip())
+
+def finalize_separately(video_service, source_path, output_path, thumbnail_path, start_time, clip_duration):
+    """
+    اقتطاع مقطع ثم إنشاء صورته المصغرة وقراءة مدته بعمليات منفصلة.
+    
+    العائد:
+        float: مدة المقطع الناتج.
+    """
+    command = video_service._build_process_command(source_path, output_path, start_time, clip_duration)
+    video_service._run_ffmpeg(command, "خطأ في معالجة الفيديو")
+    video_service.create_thumbnail(output_path, thumbnail_path)
+    return probe_duration(output_path)
+
+def finalize_fused(video_service, source_path, output_path, thumbnail_path, start_time, clip_duration):
+    """
+    اقتطاع مقطع وإنشاء صورته المصغرة وقراءة مدته من تشغيل واحد لـ FFmpeg.
+    
+    العائد:
+        float: مدة المقطع الناتج.
+    """
+    command = video_service._build_process_command(
+        source_path, output_path, start_time, clip_duration, thumbnail_path=thumbnail_path
+    )
+    final = {}
+    video_service._run_ffmpeg(command, "خطأ في معالجة الفيديو", lambda **status: final.update(status), clip_duration)
+    if final.get("completed") == clip_duration:
+        return clip_duration
+    return get_duration(output_path)
+
+def measure(finalize, video_service, source_path, work_dir, offsets, clip_duration):
+    """
+    قياس متوسط عدد العمليات والزمن لكل مقطع.
+    
+    العائد:
+        tuple: متوسط عدد العمليات ومتوسط الزمن بالثواني وقائمة المدد الناتجة.
+    """
+    output_path = os.path.join(work_dir, "clip.mp4")
+    thumbnail_path = os.path.join(work_dir, "clip.jpg")
+    durations = []
+    
+    with SpawnCounter() as counter:
+        started = time.perf_counter()
+        for start_time in offsets:
+            durations.append(finalize(video_service, source_path, output_path, thumbnail_path,
+                                      start_time, clip_duration))
+        elapsed = time.perf_counter() - started
+    
+    return counter.count / len(offsets), elapsed / len(offsets), durations
+
+def main():
+    """تشغيل القياس وطباعة النتائج."""
+    parser = argparse.ArgumentParser(description="قياس أداء إنهاء المقطع")
+    parser.add_argument("--source-duration", type=int, default=120)
+    parser.add_argument("--clip-duration", type=float, default=15)
+    parser.add_argument("--clips", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    
+    work_dir = tempfile.mkdtemp()
+    try:
+        with app.app_context():
+            video_service = VideoService()
+            source_path = os.path.join(work_dir, "source.mp4")
+            
+            print(f"إنشاء فيديو مصدر مدته {args.source_duration} ثانية...")
+            create_source_video(source_path, args.source_duration)
+            
+            max_start = args.source_duration - args.clip_duration
+            offsets = [max_start * i / max(1, args.clips - 1) for i in range(args.clips)]
+            
+            # تبديل المسارين في كل جولة حتى لا يتأثر أحدهما وحده بتغير حمل الجهاز
+            paths = (("منفصل", finalize_separately), ("مدمج", finalize_fused))
+            results = {name: {"spawns": 0, "elapsed": 0.0, "durations": []} for name, _ in paths}
+            for _ in range(args.rounds):
+                for name, finalize in paths:
+                    spawns, elapsed, durations = measure(finalize, video_service, source_path, work_dir,
+                                                         offsets, args.clip_duration)
+                    results[name]["spawns"] += spawns / args.rounds
+                    results[name]["elapsed"] += elapsed / args.rounds
+                    results[name]["durations"] = durations
+            
+            print(f"{'المسار':>10} {'عمليات/مقطع':>12} {'الزمن/مقطع (ث)':>16}")
+            for name, _ in paths:
+                print(f"{name:>10} {results[name]['spawns']:>12.1f} {results[name]['elapsed']:>16.2f}")
+            
+            # التحقق من تطابق المدد بين المسارين
+            mismatches = [
+                (separate, fused)
+                for separate, fused in zip(results["منفصل"]["durations"], results["مدمج"]["durations"])
+                if abs(separate - fused) > 0.01
+            ]
+            if mismatches:
+                print(f"اختلاف في المدد: {mismatches}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+قياس أداء البحث السريع في معالجة الفيديو.
+يقارن زمن اقتطاع مقطع عند مواضع بداية مختلفة بين البحث على مستوى المخرج
+(فك ترميز الفيديو من البداية) والبحث السريع على مستوى المدخل.
+
+الاستخدام:
+    python benchmark_seek.py --source-duration 600 --clip-duration 15
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from flask import Flask
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.video_service import VideoService
+from config.config import config
+
+def create_source_video(path, duration):
+    """
+    إنشاء فيديو مصدر طويل باستخدام FFmpeg.
+    
+    المعلمات:
+        path (str): مسار الفيديو.
+        duration (int): مدة الفيديو بالثواني.
+    """
+    command = [
+        "ffmpeg",
+        "-y",
+        "-f", "lavfi",
+        "-i", f"testsrc=duration={duration}:size=640x360:rate=30",
+        "-f", "lavfi",
+        "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-g", "250",
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        path
+    ]
+    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+def time_clip(video_service, source_path, output_path, start_time, clip_duration, fast_seek):
+    """
+    قياس زمن اقتطاع مقطع واحد.
+    
+    العائد:
+        float: الزمن المستغرق بالثواني.
+    """
+    command = video_service._build_process_command(
+        source_path,
+        output_path,
+        start_time,
+        clip_duration,
+        fast_seek=fast_seek
+    )
+    command.insert(1, "-y")
+    
+    started = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return time.perf_counter() - started
+
+def main():
+    """تشغيل القياس وطباعة النتائج."""
+    parser = argparse.ArgumentParser(description="قياس أداء البحث السريع")
+    parser.add_argument("--source-duration", type=int, default=600)
+    parser.add_argument("--clip-duration", type=float, default=15)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+    
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    
+    work_dir = tempfile.mkdtemp()
+    try:
+        with app.app_context():
+            video_service = VideoService()
+            source_path = os.path.join(work_dir, "source.mp4")
+            output_path = os.path.join(work_dir, "clip.mp4")
+            
+            print(f"إنشاء فيديو مصدر مدته {args.source_duration} ثانية...")
+            create_source_video(source_path, args.source_duration)
+            
+            max_start = args.source_duration - args.clip_duration
+            offsets = [max_start * i / (args.steps - 1) for i in range(args.steps)]
+            
+            print(f"{'البداية (ث)':>12} {'بحث المخرج (ث)':>16} {'بحث سريع (ث)':>14}")
+            for start_time in offsets:
+                slow = time_clip(video_service, source_path, output_path,
+                                 start_time, args.clip_duration, fast_seek=False)
+                fast = time_clip(video_service, source_path, output_path,
+                                 start_time, args.clip_duration, fast_seek=True)
+                print(f"{start_time:>12.1f} {slow:>16.2f} {fast:>14.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -3,22 +3,152 @@
 يوفر واجهة بسيطة للتخزين المؤقت للبيانات.
 """
 
+import sys
 import time
+import heapq
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
 from flask import current_app
 
+from .shared_cache import SharedCache
+
 logger = logging.getLogger(__name__)
 
+def estimate_size(value, _seen=None):
+    """
+    تقدير الحجم التقريبي لقيمة في الذاكرة بالبايت.
+    
+    يتم جمع أحجام الحاويات (القواميس والقوائم والمجموعات) وعناصرها بشكل متكرر،
+    وتحسب المصفوفات (مثل مصفوفات NumPy) بحجم بياناتها.
+    
+    المعلمات:
+        value (أي): القيمة.
+    
+    العائد:
+        int: الحجم التقريبي بالبايت.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    
+    size = sys.getsizeof(value)
+    
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return size + nbytes
+    
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _seen) + estimate_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _seen)
+    return size
+
 class CacheManager:
     """
     مدير التخزين المؤقت للتطبيق.
     يستخدم لتخزين نتائج العمليات المكلفة مؤقتًا لتحسين الأداء.
+    
+    العناصر محفوظة في OrderedDict بترتيب آخر استخدام، فتتم عمليات الاسترجاع
+    والتخزين وإزالة أقدم عنصر في زمن ثابت. وتحفظ أوقات انتهاء الصلاحية في كومة
+    (heap) يتم تنظيفها تدريجيًا أثناء التخزين.
+    
+    جميع العمليات محمية بقفل لاستخدامها من عدة خيوط، وتضمن get_or_compute
+    تنفيذ حساب واحد فقط لكل مفتاح مهما تعدد الطالبون المتزامنون.
+    
+    يتم تقدير حجم كل عنصر بالبايت، وتتم الإزالة عند تجاوز الحجم الكلي المسموح
+    (CACHE_MAX_BYTES) أو ميزانية مساحة الأسماء التي ينتمي إليها المفتاح.
+    
+    عند تفعيل CACHE_SHARED_ENABLED تكون الذاكرة المحلية طبقة أولى أمام طبقة مشتركة
+    بين جميع العمليات (SharedCache)، فيتم البحث فيها عند عدم وجود العنصر محليًا
+    وتكتب فيها العناصر الجديدة ما لم تكن خاصة بالعملية الحالية.
     """
     
-    def __init__(self):
-        """تهيئة مدير التخزين المؤقت."""
-        self.cache = {}
-        self.timestamps = {}
+    def __init__(self, max_size=None, max_age=None, enabled=None, max_bytes=None, namespace_budgets=None, shared=None):
+        """
+        تهيئة مدير التخزين المؤقت.
+        
+        الإعدادات غير المحددة تتم قراءتها مرة واحدة من إعدادات التطبيق عند أول استخدام.
+        
+        المعلمات:
+            max_size (int, اختياري): الحد الأقصى لعدد العناصر.
+            max_age (int, اختياري): مدة صلاحية العنصر بالثواني.
+            enabled (bool, اختياري): هل التخزين المؤقت مفعل.
+            max_bytes (int, اختياري): الحد الأقصى للحجم التقريبي لجميع العناصر بالبايت.
+            namespace_budgets (dict, اختياري): الحد الأقصى للحجم بالبايت لكل مساحة أسماء،
+                                               وتحدد مساحة أسماء العنصر ببادئة مفتاحه.
+            shared (SharedCache, اختياري): طبقة التخزين المؤقت المشتركة بين العمليات.
+        """
+        self.cache = OrderedDict()
+        self.expiry_heap = []
+        self.max_size = max_size
+        self.max_age = max_age
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.namespace_budgets = namespace_budgets
+        self.shared = shared
+        self._configured = None not in (max_size, max_age, enabled)
+        if self._configured and namespace_budgets is None:
+            self.namespace_budgets = {}
+        self.total_bytes = 0
+        self.namespace_bytes = {}
+        self.namespace_keys = {}
+        self.lock = threading.RLock()
+        self.in_flight = {}
+    
+    def _configure(self):
+        """قراءة الإعدادات غير المحددة من إعدادات التطبيق."""
+        config = current_app.config
+        if self.max_size is None:
+            self.max_size = config.get('CACHE_MAX_SIZE', 100)
+        if self.max_age is None:
+            self.max_age = config.get('CACHE_MAX_AGE', 3600)  # الافتراضي: ساعة واحدة
+        if self.enabled is None:
+            self.enabled = config.get('CACHE_ENABLED', True)
+        if self.max_bytes is None:
+            self.max_bytes = config.get('CACHE_MAX_BYTES')
+        if self.namespace_budgets is None:
+            self.namespace_budgets = dict(config.get('CACHE_NAMESPACE_BUDGETS') or {})
+        if self.shared is None and config.get('CACHE_SHARED_ENABLED', False):
+            try:
+                self.shared = SharedCache(config['CACHE_SHARED_PATH'], config.get('CACHE_SHARED_MAX_BYTES'))
+            except (sqlite3.Error, OSError) as e:
+                # العمل بالذاكرة المحلية فقط إذا تعذر فتح الطبقة المشتركة
+                logger.warning(f"تعذر فتح ذاكرة التخزين المؤقت المشتركة: {str(e)}")
+        self._configured = True
+    
+    def _get_namespace(self, key):
+        """
+        تحديد مساحة الأسماء ذات الميزانية التي ينتمي إليها مفتاح.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+        
+        العائد:
+            str: اسم مساحة الأسماء، أو None إذا لم تكن لها ميزانية.
+        """
+        for namespace in self.namespace_budgets:
+            if key.startswith(f"{namespace}_"):
+                return namespace
+        return None
+    
+    def _remove(self, key):
+        """
+        حذف عنصر وتحديث حساب الأحجام دون أخذ القفل.
+        
+        المعلمات:
+            key (str): مفتاح العنصر (يجب أن يكون موجودًا).
+        """
+        _, _, size, namespace = self.cache.pop(key)
+        self.total_bytes -= size
+        if namespace is not None:
+            self.namespace_bytes[namespace] -= size
+            del self.namespace_keys[namespace][key]
     
     def get(self, key):
         """
@@ -30,55 +160,255 @@ class CacheManager:
         العائد:
             أي: القيمة المخزنة، أو None إذا لم يتم العثور على المفتاح أو انتهت صلاحيته.
         """
+        if not self._configured:
+            self._configure()
+        
         # التحقق مما إذا كان التخزين المؤقت معطلاً
-        if not current_app.config.get('CACHE_ENABLED', True):
+        if not self.enabled:
             return None
         
+        with self.lock:
+            value = self._get(key)
+        
+        if value is None and self.shared is not None:
+            value = self._get_shared(key)
+        return value
+    
+    def _get(self, key):
+        """
+        الحصول على قيمة من ذاكرة التخزين المؤقت دون أخذ القفل.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+        
+        العائد:
+            أي: القيمة المخزنة، أو None إذا لم يتم العثور على المفتاح أو انتهت صلاحيته.
+        """
         # التحقق من وجود المفتاح
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
             return None
         
         # التحقق من انتهاء الصلاحية
-        timestamp = self.timestamps.get(key, 0)
-        max_age = current_app.config.get('CACHE_MAX_AGE', 3600)  # الافتراضي: ساعة واحدة
-        
-        if time.time() - timestamp > max_age:
+        value, expires_at, _, namespace = entry
+        if expires_at <= time.time():
             # انتهت صلاحية العنصر، إزالته من ذاكرة التخزين المؤقت
             logger.debug(f"انتهت صلاحية العنصر في ذاكرة التخزين المؤقت: {key}")
-            del self.cache[key]
-            del self.timestamps[key]
+            self._remove(key)
             return None
         
+        # نقل العنصر إلى نهاية الترتيب كأحدث عنصر مستخدم
+        self.cache.move_to_end(key)
+        if namespace is not None:
+            self.namespace_keys[namespace].move_to_end(key)
         logger.debug(f"تم استرجاع العنصر من ذاكرة التخزين المؤقت: {key}")
-        return self.cache[key]
+        return value
     
-    def set(self, key, value):
+    def set(self, key, value, ttl=None, shared=True):
         """
         تخزين قيمة في ذاكرة التخزين المؤقت.
         
         المعلمات:
             key (str): مفتاح العنصر.
             value (أي): القيمة المراد تخزينها.
+            ttl (int, اختياري): مدة صلاحية العنصر بالثواني (الافتراضي: CACHE_MAX_AGE).
+            shared (bool, اختياري): تخزين القيمة في الطبقة المشتركة أيضًا. يجب تعطيله
+                                    للقيم الخاصة بالعملية الحالية (مثل معرفات المهام).
         """
+        if not self._configured:
+            self._configure()
+        
         # التحقق مما إذا كان التخزين المؤقت معطلاً
-        if not current_app.config.get('CACHE_ENABLED', True):
+        if not self.enabled:
             return
         
-        # التحقق من حجم ذاكرة التخزين المؤقت
-        max_size = current_app.config.get('CACHE_MAX_SIZE', 100)
+        with self.lock:
+            self._set(key, value, ttl)
+        
+        if shared and self.shared is not None:
+            self._set_shared(key, value, ttl)
+    
+    def _set(self, key, value, ttl=None):
+        """
+        تخزين قيمة في ذاكرة التخزين المؤقت دون أخذ القفل.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+            value (أي): القيمة المراد تخزينها.
+            ttl (int, اختياري): مدة صلاحية العنصر بالثواني.
+        """
+        current_time = time.time()
+        expires_at = current_time + (self.max_age if ttl is None else ttl)
+        size = estimate_size(key) + estimate_size(value)
+        namespace = self._get_namespace(key)
+        budget = self.namespace_budgets.get(namespace)
+        
+        # استبدال القيمة السابقة للمفتاح إن وجدت
+        if key in self.cache:
+            self._remove(key)
         
-        # إذا وصلت ذاكرة التخزين المؤقت إلى الحد الأقصى، إزالة أقدم عنصر
-        if len(self.cache) >= max_size and key not in self.cache:
-            oldest_key = min(self.timestamps, key=lambda k: self.timestamps[k])
+        # عدم تخزين عنصر أكبر من الحد المسموح به بمفرده
+        if (self.max_bytes is not None and size > self.max_bytes) or (budget is not None and size > budget):
+            logger.debug(f"العنصر أكبر من حد ذاكرة التخزين المؤقت، لن يتم تخزينه: {key} ({size} بايت)")
+            return
+        
+        # حذف العناصر منتهية الصلاحية المستحقة أولاً
+        self._expire(current_time)
+        
+        # إزالة أقدم عناصر مساحة الأسماء إذا تجاوزت ميزانيتها
+        if budget is not None:
+            namespace_keys = self.namespace_keys.setdefault(namespace, OrderedDict())
+            while self.namespace_bytes.get(namespace, 0) + size > budget:
+                oldest_key = next(iter(namespace_keys))
+                logger.debug(f"إزالة أقدم عنصر من مساحة الأسماء {namespace}: {oldest_key}")
+                self._remove(oldest_key)
+        
+        # إزالة أقدم العناصر استخدامًا إذا تجاوزت ذاكرة التخزين المؤقت عدد العناصر أو الحجم المسموح
+        while self.cache and (
+            len(self.cache) >= self.max_size or
+            (self.max_bytes is not None and self.total_bytes + size > self.max_bytes)
+        ):
+            oldest_key = next(iter(self.cache))
             logger.debug(f"إزالة أقدم عنصر من ذاكرة التخزين المؤقت: {oldest_key}")
-            del self.cache[oldest_key]
-            del self.timestamps[oldest_key]
+            self._remove(oldest_key)
+        
+        # تخزين القيمة ووقت انتهاء الصلاحية وحجمها
+        self.cache[key] = (value, expires_at, size, namespace)
+        self.total_bytes += size
+        if namespace is not None:
+            self.namespace_bytes[namespace] = self.namespace_bytes.get(namespace, 0) + size
+            self.namespace_keys[namespace][key] = None
+        heapq.heappush(self.expiry_heap, (expires_at, key))
+        
+        # إعادة بناء الكومة إذا تراكمت فيها إدخالات قديمة لعناصر محدثة أو محذوفة
+        if len(self.expiry_heap) > 2 * len(self.cache) + 64:
+            self.expiry_heap = [(entry[1], k) for k, entry in self.cache.items()]
+            heapq.heapify(self.expiry_heap)
         
-        # تخزين القيمة والطابع الزمني
-        self.cache[key] = value
-        self.timestamps[key] = time.time()
         logger.debug(f"تم تخزين العنصر في ذاكرة التخزين المؤقت: {key}")
     
+    def _get_shared(self, key):
+        """
+        البحث عن عنصر في الطبقة المشتركة وتخزينه محليًا للمدة المتبقية من صلاحيته.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+        
+        العائد:
+            أي: القيمة المخزنة، أو None إذا لم يتم العثور على المفتاح.
+        """
+        try:
+            entry = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"فشل الاسترجاع من ذاكرة التخزين المؤقت المشتركة: {key} - {str(e)}")
+            return None
+        
+        if entry is None:
+            return None
+        
+        value, expires_at = entry
+        with self.lock:
+            self._set(key, value, expires_at - time.time())
+        logger.debug(f"تم استرجاع العنصر من ذاكرة التخزين المؤقت المشتركة: {key}")
+        return value
+    
+    def _set_shared(self, key, value, ttl=None):
+        """
+        تخزين عنصر في الطبقة المشتركة، مع تجاهل الأخطاء لأن الطبقة المحلية تكفي.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+            value (أي): القيمة المراد تخزينها.
+            ttl (int, اختياري): مدة صلاحية العنصر بالثواني.
+        """
+        expires_at = time.time() + (self.max_age if ttl is None else ttl)
+        try:
+            self.shared.set(key, value, expires_at)
+        except Exception as e:
+            logger.warning(f"فشل التخزين في ذاكرة التخزين المؤقت المشتركة: {key} - {str(e)}")
+    
+    def get_or_compute(self, key, compute, ttl=None, shared=True):
+        """
+        الحصول على قيمة من ذاكرة التخزين المؤقت أو حسابها وتخزينها.
+        
+        إذا طلب عدة خيوط نفس المفتاح في نفس الوقت، ينفذ الحساب في الخيط الأول فقط
+        وتنتظر الخيوط الأخرى نتيجته بدلاً من تكرار العملية المكلفة. ويقتصر ذلك على
+        العملية الحالية، أما العمليات الأخرى فتستفيد من النتيجة بعد تخزينها في الطبقة المشتركة.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+            compute (callable): دالة بدون معاملات تعيد القيمة.
+            ttl (int, اختياري): مدة صلاحية العنصر بالثواني (الافتراضي: CACHE_MAX_AGE).
+            shared (bool, اختياري): استخدام الطبقة المشتركة لهذا المفتاح.
+        
+        العائد:
+            أي: القيمة المخزنة أو المحسوبة.
+        
+        يرفع:
+            Exception: الخطأ الذي رفعته دالة الحساب، لجميع الخيوط المنتظرة.
+        """
+        if not self._configured:
+            self._configure()
+        
+        with self.lock:
+            if self.enabled:
+                value = self._get(key)
+                if value is not None:
+                    return value
+            
+            flight = self.in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlight()
+                self.in_flight[key] = flight
+        
+        if not is_leader:
+            # انتظار الحساب الجاري لنفس المفتاح
+            logger.debug(f"انتظار حساب جارٍ لعنصر ذاكرة التخزين المؤقت: {key}")
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        try:
+            # قد تكون عملية أخرى قد حسبت القيمة بالفعل
+            if shared and self.enabled and self.shared is not None:
+                flight.value = self._get_shared(key)
+            if flight.value is None:
+                flight.value = compute()
+                if flight.value is not None:
+                    self.set(key, flight.value, ttl, shared=shared)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            flight.event.set()
+    
+    def _expire(self, current_time):
+        """
+        حذف العناصر التي انتهت صلاحيتها من أعلى كومة أوقات الانتهاء.
+        
+        المعلمات:
+            current_time (float): الوقت الحالي.
+        
+        العائد:
+            int: عدد العناصر المحذوفة.
+        """
+        removed = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= current_time:
+            expires_at, key = heapq.heappop(heap)
+            
+            # تجاهل الإدخالات القديمة لعناصر تم تحديثها أو حذفها
+            entry = self.cache.get(key)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                removed += 1
+        return removed
+    
     def delete(self, key):
         """
         حذف عنصر من ذاكرة التخزين المؤقت.
@@ -89,34 +419,68 @@ class CacheManager:
         العائد:
             bool: True إذا تم حذف العنصر، False إذا لم يتم العثور على المفتاح.
         """
-        if key in self.cache:
-            del self.cache[key]
-            del self.timestamps[key]
-            logger.debug(f"تم حذف العنصر من ذاكرة التخزين المؤقت: {key}")
-            return True
-        return False
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"فشل الحذف من ذاكرة التخزين المؤقت المشتركة: {key} - {str(e)}")
+        
+        with self.lock:
+            if key not in self.cache:
+                return False
+            self._remove(key)
+        logger.debug(f"تم حذف العنصر من ذاكرة التخزين المؤقت: {key}")
+        return True
     
     def clear(self):
         """حذف جميع العناصر من ذاكرة التخزين المؤقت."""
-        self.cache.clear()
-        self.timestamps.clear()
+        with self.lock:
+            self.cache.clear()
+            self.expiry_heap.clear()
+            self.total_bytes = 0
+            self.namespace_bytes.clear()
+            self.namespace_keys.clear()
+        if self.shared is not None:
+            self.shared.clear()
         logger.debug("تم مسح ذاكرة التخزين المؤقت")
     
     def cleanup_expired(self):
         """حذف جميع العناصر منتهية الصلاحية من ذاكرة التخزين المؤقت."""
-        current_time = time.time()
-        max_age = current_app.config.get('CACHE_MAX_AGE', 3600)
-        
-        # تحديد المفاتيح منتهية الصلاحية
-        expired_keys = [
-            key for key, timestamp in self.timestamps.items()
-            if current_time - timestamp > max_age
-        ]
+        with self.lock:
+            removed = self._expire(time.time())
+        if self.shared is not None:
+            removed += self.shared.cleanup_expired()
         
-        # حذف العناصر منتهية الصلاحية
-        for key in expired_keys:
-            del self.cache[key]
-            del self.timestamps[key]
+        if removed:
+            logger.debug(f"تم حذف {removed} عنصر منتهي الصلاحية من ذاكرة التخزين المؤقت")
+    
+    def get_stats(self):
+        """
+        الحصول على إحصائيات ذاكرة التخزين المؤقت.
         
-        if expired_keys:
-            logger.debug(f"تم حذف {len(expired_keys)} عنصر منتهي الصلاحية من ذاكرة التخزين المؤقت")
+        العائد:
+            dict: عدد العناصر والحجم التقريبي الكلي وحجم كل مساحة أسماء بالبايت.
+        """
+        with self.lock:
+            return {
+                "entries": len(self.cache),
+                "bytes": self.total_bytes,
+                "maxBytes": self.max_bytes,
+                "namespaces": {
+                    namespace: {"bytes": self.namespace_bytes.get(namespace, 0), "budget": budget}
+                    for namespace, budget in (self.namespace_budgets or {}).items()
+                }
+            }
+    
+    def __len__(self):
+        """عدد العناصر في ذاكرة التخزين المؤقت."""
+        return len(self.cache)
+
+class _InFlight:
+    """حساب جارٍ لمفتاح في ذاكرة التخزين المؤقت تنتظره الخيوط الأخرى."""
+    
+    def __init__(self):
+        """تهيئة الحساب الجاري."""
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
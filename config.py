@@ -34,6 +34,13 @@ class Config:
     YOUTUBE_DEFAULT_RESOLUTION = '720p'
     YOUTUBE_FALLBACK_RESOLUTION = '480p'
     YOUTUBE_CACHE_DURATION = 86400  # 24 ساعة بالثواني
+    YOUTUBE_CACHE_STALE_DURATION = 7 * 86400  # مدة إضافية تعاد فيها المعلومات القديمة مع تحديثها في الخلفية (بالثواني)
+    YOUTUBE_NEGATIVE_CACHE_DURATION = 300  # مدة حفظ نتيجة الفيديوهات غير المتاحة (بالثواني)
+    YOUTUBE_METADATA_PATH = os.path.join(CACHE_FOLDER, 'youtube_metadata.sqlite3')  # ملف مخزن معلومات الفيديوهات
+    YOUTUBE_SEGMENT_MARGIN = 2  # هامش زمني إضافي حول النطاق عند تنزيل جزء من الفيديو (بالثواني)
+    YOUTUBE_SEGMENT_TIMEOUT = 30  # مهلة كل طلب نطاق عند تنزيل جزء من الفيديو (بالثواني)
+    YOUTUBE_DOWNLOAD_CONNECTIONS = 4  # عدد الاتصالات المتزامنة عند تنزيل فيديو كامل
+    YOUTUBE_DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # حجم كل جزء عند تنزيل فيديو كامل (بالبايت)
     
     # إعدادات معالجة الفيديو
     VIDEO_MAX_DURATION = 60  # الحد الأقصى لمدة الفيديو المسموح بها (بالثواني)
@@ -41,11 +48,35 @@ class Config:
     VIDEO_ENCODING_PRESET = 'veryfast'  # إعداد ترميز الفيديو (للتوازن بين السرعة والجودة)
     VIDEO_CRF = 23  # عامل معدل الجودة الثابت (أقل = جودة أعلى، مدى: 0-51)
     VIDEO_AUDIO_BITRATE = '128k'  # معدل بت الصوت
+    VIDEO_FAST_SEEK = True  # البحث على مستوى المدخل بدلاً من فك ترميز الفيديو من البداية
+    VIDEO_SEEK_MARGIN = 3  # هامش الاقتطاع الدقيق بعد البحث السريع (بالثواني)
+    VIDEO_BATCH_MAX_CLIPS = 20  # الحد الأقصى لعدد المقاطع في طلب معالجة دفعي واحد
+    VIDEO_PROCESSING_MODE = 'encode'  # وضع المعالجة الافتراضي: 'encode' أو 'smart_cut' (نسخ مباشر مع ترميز الأطراف فقط) أو 'parallel' (ترميز أجزاء المقطع على عدة أنوية)
+    VIDEO_PARALLEL_SEGMENTS = os.cpu_count() or 2  # الحد الأقصى لعدد الأجزاء المرمزة بالتوازي في وضع 'parallel'
+    VIDEO_PARALLEL_MIN_SEGMENT = 5  # أقل مدة لكل جزء في الترميز المتوازي (بالثواني)
+    VIDEO_ADAPTIVE_ENCODING = False  # اختيار الإعداد المسبق والخيوط والدقة حسب عمق قائمة الانتظار وتشبع المعالج
+    HIGHLIGHT_SAMPLE_RATE = 8000  # معدل عينات الصوت المستخدم لتحليل اللحظات المثيرة
+    HIGHLIGHT_FRAME_SECONDS = 0.1  # طول الإطار التحليلي لطاقة الصوت (بالثواني)
+    HIGHLIGHT_CHUNK_SECONDS = 60  # طول دفعة الصوت المقروءة في كل مرة أثناء التحليل (بالثواني)
+    SCENE_ANALYSIS_ENABLED = True  # بناء خط زمني لتغير المشاهد والحركة أثناء تحليل الفيديو
+    SCENE_ANALYSIS_FPS = 2  # معدل الإطارات المستخدم لتحليل المشاهد
+    SCENE_CUT_THRESHOLD = 0.35  # الحد الأدنى لفرق المدرج التكراري لاعتباره تغيرًا للمشهد
     
     # إعدادات التخزين المؤقت
     CACHE_ENABLED = True
     CACHE_MAX_AGE = 86400  # 24 ساعة بالثواني
     CACHE_MAX_SIZE = 100  # الحد الأقصى لعدد العناصر في ذاكرة التخزين المؤقت
+    CACHE_MAX_BYTES = 64 * 1024 * 1024  # الحد الأقصى للحجم التقريبي لذاكرة التخزين المؤقت (بالبايت)
+    CACHE_NAMESPACE_BUDGETS = {  # الحد الأقصى لحجم كل مساحة أسماء حسب بادئة المفتاح (بالبايت)
+        'youtube_info': 8 * 1024 * 1024,
+        'youtube_search': 8 * 1024 * 1024,
+        'processed': 4 * 1024 * 1024,
+        'analysis': 32 * 1024 * 1024
+    }
+    CACHE_SHARED_ENABLED = True  # مشاركة ذاكرة التخزين المؤقت بين جميع عمليات الخادم
+    CACHE_SHARED_PATH = os.path.join(CACHE_FOLDER, 'shared_cache.sqlite3')  # ملف ذاكرة التخزين المؤقت المشتركة
+    CACHE_SHARED_MAX_BYTES = 256 * 1024 * 1024  # الحد الأقصى لحجم ذاكرة التخزين المؤقت المشتركة (بالبايت)
+    ANALYSIS_INDEX_FOLDER = os.path.join(CACHE_FOLDER, 'analysis')  # مجلد فهرس نتائج تحليل الفيديو
     
     # إعدادات التسجيل
     LOG_LEVEL = 'INFO'
@@ -54,6 +85,18 @@ class Config:
     
     # إعدادات الأداء
     THREAD_POOL_SIZE = 4  # حجم مجمع الخيوط للعمليات المتوازية
+    JOB_RESULT_TTL = 3600  # مدة الاحتفاظ بنتائج المهام المنتهية (بالثواني)
+    ENCODE_WORKERS = os.cpu_count() or 2  # عدد مهام المعالجة المتزامنة (مهمة لكل نواة)
+    JOB_QUEUE_DEPTH = 16  # الحد الأقصى للمهام المنتظرة قبل رفض الطلبات الجديدة بالرمز 429
+    JOB_CLIENT_QUEUE_DEPTH = 8  # الحد الأقصى للمهام المنتظرة لكل عميل (حتى لا يملأ عميل واحد القائمة)
+    JOB_QUEUE_BACKEND = 'memory'  # 'memory' (تنفيذ داخل عملية الخادم) أو 'sqlite' (قائمة دائمة ينفذها backend.worker) أو 'redis' (قائمة مشتركة بين عدة أجهزة)
+    JOB_QUEUE_PATH = os.path.join(CACHE_FOLDER, 'jobs.sqlite3')  # ملف قائمة الانتظار الدائمة
+    JOB_LEASE_DURATION = 30  # مدة حجز المهمة قبل إعادتها إلى القائمة إذا توقف العامل (بالثواني)
+    JOB_MAX_ATTEMPTS = 3  # الحد الأقصى لمحاولات تنفيذ المهمة بعد توقف العمال
+    JOB_REDIS_URL = os.environ.get('JOB_REDIS_URL', 'redis://localhost:6379/0')  # خادم قائمة الانتظار المشتركة
+    JOB_REDIS_PREFIX = 'viral_clip:jobs'  # بادئة مفاتيح قائمة الانتظار في Redis
+    JOB_AFFINITY_WAIT = 5  # مدة انتظار المهمة للجهاز الذي يحتفظ بملفها المصدر قبل أن ينفذها جهاز آخر (بالثواني)
+    WORKER_POLL_INTERVAL = 1.0  # فترة بحث العامل عن مهام جديدة عندما تكون القائمة فارغة (بالثواني)
     
     @staticmethod
     def init_app(app):
@@ -75,6 +118,10 @@ class TestingConfig(Config):
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'test_uploads')
     PROCESSED_FOLDER = os.path.join(BASE_DIR, 'test_processed')
     CACHE_FOLDER = os.path.join(BASE_DIR, 'test_cache')
+    ANALYSIS_INDEX_FOLDER = os.path.join(BASE_DIR, 'test_cache', 'analysis')
+    CACHE_SHARED_ENABLED = False  # عزل الاختبارات عن القيم المحفوظة من تشغيل سابق
+    YOUTUBE_METADATA_PATH = os.path.join(BASE_DIR, 'test_cache', 'youtube_metadata.sqlite3')
+    JOB_QUEUE_PATH = os.path.join(BASE_DIR, 'test_cache', 'jobs.sqlite3')
     
     @classmethod
     def init_app(cls, app):
@@ -95,6 +142,7 @@ class ProductionConfig(Config):
     
     # إعدادات أداء محسنة للإنتاج
     VIDEO_ENCODING_PRESET = 'medium'  # توازن أفضل بين الجودة والسرعة
+    VIDEO_ADAPTIVE_ENCODING = True  # الرجوع إلى ultrafast و480p أثناء ذروة الطلبات
     THREAD_POOL_SIZE = 8  # المزيد من الخيوط للإنتاج
     
     @classmethod
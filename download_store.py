@@ -0,0 +1,222 @@
+"""
+مخزن فيديوهات YouTube المنزلة.
+يحفظ كل فيديو منزل مرة واحدة حسب معرفه على YouTube والدقة المطلوبة، مع سجل على
+القرص يسمح لجميع عمليات الخادم بإعادة استخدام الملف بعد إعادة التشغيل.
+"""
+
+import os
+import json
+import uuid
+import time
+import fcntl
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# نطاق ثابت لتوليد المعرفات المحلية من معرف YouTube والدقة
+LOCAL_ID_NAMESPACE = uuid.UUID('6f1c2b7e-3d4a-5e8f-9a0b-1c2d3e4f5a6b')
+
+class DownloadStore:
+    """
+    مخزن دائم لفيديوهات YouTube المنزلة.
+    
+    المعرف المحلي لكل فيديو مشتق من (معرف YouTube، الدقة)، فيبقى ثابتًا في جميع
+    العمليات ويشير دائمًا إلى نفس الملف. ويحفظ السجل (manifest) بيانات كل ملف
+    وحجمه، فيكفي التحقق من حجم الملف على القرص لإعادة استخدامه دون تنزيله مجددًا.
+    """
+    
+    MANIFEST_NAME = 'youtube_manifest.json'
+    
+    def __init__(self, folder):
+        """
+        تهيئة مخزن التنزيلات.
+        
+        المعلمات:
+            folder (str): مجلد الفيديوهات المنزلة.
+        """
+        self.folder = folder
+        self.manifest_path = os.path.join(folder, self.MANIFEST_NAME)
+        self.lock_path = f"{self.manifest_path}.lock"
+        self.manifest = {}
+        self.manifest_stamp = None
+        os.makedirs(folder, exist_ok=True)
+    
+    def _entry_key(self, video_id, resolution):
+        """الحصول على مفتاح فيديو في السجل."""
+        return f"{video_id}:{resolution}"
+    
+    def get_local_id(self, video_id, resolution):
+        """
+        الحصول على المعرف المحلي الثابت لفيديو بدقة معينة.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            resolution (str): الدقة المطلوبة (مثل "720p").
+        
+        العائد:
+            str: المعرف المحلي.
+        """
+        return str(uuid.uuid5(LOCAL_ID_NAMESPACE, self._entry_key(video_id, resolution)))
+    
+    def get_path(self, local_id):
+        """الحصول على مسار ملف الفيديو من معرفه المحلي."""
+        return os.path.join(self.folder, f"{local_id}.mp4")
+    
+    def get_temp_path(self, video_id, resolution):
+        """
+        الحصول على المسار المؤقت للتنزيل.
+        
+        المسار ثابت لنفس الفيديو والدقة حتى يمكن استئناف تنزيل غير مكتمل، لذلك يجب
+        التنزيل إليه داخل lock فقط.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            resolution (str): الدقة المطلوبة.
+        
+        العائد:
+            str: المسار المؤقت.
+        """
+        local_id = self.get_local_id(video_id, resolution)
+        return os.path.join(self.folder, f"{local_id}.part")
+    
+    @contextmanager
+    def lock(self, video_id, resolution):
+        """
+        قفل تنزيل فيديو بدقة معينة بين جميع العمليات.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            resolution (str): الدقة المطلوبة.
+        """
+        local_id = self.get_local_id(video_id, resolution)
+        with open(os.path.join(self.folder, f"{local_id}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _load_manifest(self):
+        """
+        قراءة السجل من القرص إذا تغير منذ آخر قراءة.
+        
+        العائد:
+            dict: السجل.
+        """
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            self.manifest = {}
+            self.manifest_stamp = None
+            return self.manifest
+        
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self.manifest_stamp:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self.manifest = json.load(f)
+            except ValueError:
+                logger.warning(f"سجل التنزيلات تالف، سيتم تجاهله: {self.manifest_path}")
+                self.manifest = {}
+            self.manifest_stamp = stamp
+        return self.manifest
+    
+    def _update_manifest(self, update):
+        """
+        تعديل السجل تحت قفل ملف يمنع تعارض التعديلات بين العمليات.
+        
+        المعلمات:
+            update (callable): دالة تستقبل السجل وتعدله.
+        """
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                manifest = dict(self._load_manifest())
+                update(manifest)
+                
+                # الكتابة في ملف مؤقت ثم استبداله لتجنب قراءة سجل غير مكتمل
+                temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False)
+                os.replace(temp_path, self.manifest_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def lookup(self, video_id, resolution):
+        """
+        البحث عن فيديو منزل مسبقًا.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            resolution (str): الدقة المطلوبة.
+        
+        العائد:
+            dict: بيانات الفيديو المخزن مع مساره، أو None إذا لم يكن موجودًا.
+        """
+        key = self._entry_key(video_id, resolution)
+        entry = self._load_manifest().get(key)
+        if entry is None:
+            return None
+        
+        path = self.get_path(entry["localId"])
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        
+        if size != entry["size"]:
+            # تم حذف الملف أو لم يكتمل، فيجب تنزيله مجددًا
+            logger.warning(f"الفيديو المخزن غير صالح، سيتم حذفه من السجل: {key}")
+            self._update_manifest(lambda manifest: manifest.pop(key, None))
+            return None
+        
+        return dict(entry, path=path)
+    
+    def add(self, video_id, resolution, temp_path, **info):
+        """
+        نقل فيديو تم تنزيله إلى المخزن وتسجيله.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            resolution (str): الدقة المطلوبة.
+            temp_path (str): مسار الملف المنزل (انظر get_temp_path).
+            **info: بيانات إضافية تحفظ في السجل (مثل العنوان).
+        
+        العائد:
+            dict: بيانات الفيديو المخزن مع مساره.
+        """
+        key = self._entry_key(video_id, resolution)
+        local_id = self.get_local_id(video_id, resolution)
+        path = self.get_path(local_id)
+        
+        os.replace(temp_path, path)
+        entry = dict(
+            info,
+            localId=local_id,
+            originalId=video_id,
+            size=os.path.getsize(path),
+            created_at=time.time()
+        )
+        
+        def update(manifest):
+            manifest[key] = entry
+        
+        self._update_manifest(update)
+        logger.info(f"تم حفظ الفيديو في مخزن التنزيلات: {key} -> {local_id}")
+        return dict(entry, path=path)
+    
+    def remove(self, video_id, resolution):
+        """
+        حذف فيديو من المخزن والسجل.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            resolution (str): الدقة المطلوبة.
+        """
+        key = self._entry_key(video_id, resolution)
+        self._update_manifest(lambda manifest: manifest.pop(key, None))
+        
+        path = self.get_path(self.get_local_id(video_id, resolution))
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,80 @@
+"""
+اختيار إعدادات الترميز حسب الحمل.
+يختار الإعداد المسبق لـ x264 وعدد الخيوط وأقصى دقة للمخرج من عمق قائمة الانتظار
+وتشبع المعالج، فتستخدم إعدادات أبطأ وأعلى جودة عندما يكون الحمل خفيفًا، وإعدادات
+أسرع ودقة أقل أثناء ذروة الطلبات للحفاظ على زمن الاستجابة.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ملفات الترميز من الأعلى جودة إلى الأسرع، مع أقصى ضغط يسمح باستخدام كل منها
+# (preset = None يعني VIDEO_ENCODING_PRESET، وmaxHeight = None يعني دقة المصدر)
+ENCODING_PROFILES = (
+    {"name": "quality", "preset": "slow", "maxHeight": None, "maxPressure": 0.5},
+    {"name": "balanced", "preset": None, "maxHeight": None, "maxPressure": 1.0},
+    {"name": "fast", "preset": "veryfast", "maxHeight": 720, "maxPressure": 2.0},
+    {"name": "burst", "preset": "ultrafast", "maxHeight": 480, "maxPressure": None}
+)
+
+def get_cpu_pressure():
+    """
+    حساب تشبع المعالج من متوسط الحمل خلال الدقيقة الأخيرة.
+    
+    العائد:
+        float: متوسط الحمل لكل نواة (1 يعني أن جميع الأنوية مشغولة)، أو None إذا لم يكن متاحًا.
+    """
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        # os.getloadavg غير متاحة على Windows
+        return None
+
+def select_encoding_profile(load=None, cpu_pressure=None, default_preset='medium', cpu_count=None,
+                            profiles=ENCODING_PROFILES):
+    """
+    اختيار ملف الترميز المناسب للحمل الحالي.
+    
+    الضغط هو الأكبر بين عدد المهام المنتظرة لكل عامل وتشبع المعالج، ويختار أول ملف
+    لا يتجاوز الضغط حده. يقسم عدد الأنوية على المهام المتزامنة المتوقعة حتى لا تتنافس
+    خيوط المرمزات على نفس الأنوية.
+    
+    المعلمات:
+        load (dict, اختياري): حمل قائمة الانتظار كما يعيده JobManager.get_load
+                              (workers وrunning وpending).
+        cpu_pressure (float, اختياري): تشبع المعالج كما تعيده get_cpu_pressure.
+        default_preset (str, اختياري): الإعداد المسبق للملف المتوازن.
+        cpu_count (int, اختياري): عدد الأنوية (الافتراضي: os.cpu_count).
+        profiles (tuple, اختياري): ملفات الترميز مرتبة من الأعلى جودة إلى الأسرع.
+    
+    العائد:
+        dict: اسم الملف والإعداد المسبق وعدد الخيوط وأقصى ارتفاع للمخرج والضغط المحسوب.
+    """
+    load = load or {}
+    cpu_count = cpu_count or os.cpu_count() or 1
+    workers = max(1, load.get("workers") or 1)
+    running = load.get("running") or 0
+    pending = load.get("pending") or 0
+    
+    pressure = pending / workers
+    if cpu_pressure is not None:
+        pressure = max(pressure, cpu_pressure)
+    
+    profile = profiles[-1]
+    for candidate in profiles:
+        if candidate["maxPressure"] is None or pressure <= candidate["maxPressure"]:
+            profile = candidate
+            break
+    
+    # المهمة الحالية محسوبة ضمن المهام الجارية، والمهام المنتظرة ستشغل العمال الشاغرين
+    concurrent_jobs = max(1, min(workers, running + pending))
+    
+    return {
+        "name": profile["name"],
+        "preset": profile["preset"] or default_preset,
+        "threads": max(1, cpu_count // concurrent_jobs),
+        "maxHeight": profile["maxHeight"],
+        "pressure": round(pressure, 2)
+    }
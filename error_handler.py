@@ -37,6 +37,20 @@ class DeviceError(APIError):
     """خطأ في التعامل مع معلومات الجهاز."""
     pass
 
+class QueueFullError(APIError):
+    """رفض مهمة جديدة لامتلاء قائمة انتظار المهام."""
+    
+    def __init__(self, message, retry_after=None):
+        """
+        تهيئة خطأ امتلاء قائمة الانتظار.
+        
+        المعلمات:
+            message (str): رسالة الخطأ.
+            retry_after (int, اختياري): الوقت المقترح قبل إعادة المحاولة بالثواني.
+        """
+        super().__init__(message, status_code=429)
+        self.retry_after = retry_after
+
 def handle_errors(func):
     """
     مزخرف لمعالجة الأخطاء في نقاط نهاية API.
@@ -54,7 +68,13 @@ def handle_errors(func):
         except APIError as e:
             # معالجة أخطاء API المعروفة
             logger.warning(f"خطأ API: {str(e)}")
-            return jsonify({"error": str(e)}), e.status_code
+            response = jsonify({"error": str(e)})
+            
+            # إبلاغ العميل بموعد إعادة المحاولة عند رفض الطلب بسبب الضغط
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after is not None:
+                response.headers['Retry-After'] = str(retry_after)
+            return response, e.status_code
         except Exception as e:
             # معالجة الأخطاء غير المتوقعة
             error_id = log_exception(e)
@@ -0,0 +1,119 @@
+"""
+تشغيل FFmpeg مع متابعة تقدمه أثناء التنفيذ.
+يقرأ مخرج -progress كتدفق ويحوله إلى التقدم والسرعة ومعدل الإطارات، ويحتفظ بآخر
+أسطر من مخرج الأخطاء فقط، فتبقى الذاكرة المستخدمة محدودة مهما كان FFmpeg مسهبًا.
+"""
+
+import logging
+import threading
+import subprocess
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# عدد أسطر مخرج الأخطاء المحفوظة من نهاية المخرج (لرسائل الخطأ)
+STDERR_TAIL_LINES = 50
+
+# أقصى طول لكل سطر محفوظ من مخرج الأخطاء
+STDERR_LINE_LENGTH = 1000
+
+def _to_float(value):
+    """تحويل قيمة من مخرج -progress إلى رقم، أو None إذا لم تكن متاحة (N/A)."""
+    try:
+        return float(str(value).rstrip('x'))
+    except (TypeError, ValueError):
+        return None
+
+def parse_progress(fields, duration=None):
+    """
+    تحويل كتلة من مخرج -progress إلى حالة التقدم.
+    
+    المعلمات:
+        fields (dict): أزواج المفتاح والقيمة لكتلة واحدة (تنتهي بالمفتاح progress).
+        duration (float, اختياري): مدة المخرج المتوقعة بالثواني.
+    
+    العائد:
+        dict: الوقت المرمز completed والمدة total بالثواني، ومعدل الإطارات fps والسرعة
+              speed (مضاعف الوقت الحقيقي) وعدد الإطارات المرمزة frames، وNone لما ليس
+              متاحًا. completed هو توقيت آخر حزمة مرمزة كما يعيده FFmpeg، فيكون في الكتلة
+              الأخيرة أقل من مدة المخرج بمدة الحزمة الأخيرة على الأقل.
+    """
+    completed = None
+    # out_time_ms تقاس أيضًا بالميكروثانية في إصدارات FFmpeg القديمة
+    for key in ('out_time_us', 'out_time_ms'):
+        value = _to_float(fields.get(key))
+        if value is not None:
+            completed = max(0.0, value / 1000000)
+            break
+    
+    if completed is not None and duration:
+        completed = min(completed, duration)
+    
+    frames = _to_float(fields.get('frame'))
+    
+    return {
+        "completed": round(completed, 2) if completed is not None else None,
+        "total": duration,
+        "fps": _to_float(fields.get('fps')),
+        "speed": _to_float(fields.get('speed')),
+        "frames": int(frames) if frames is not None else None
+    }
+
+def _drain(stream, tail):
+    """قراءة مخرج الأخطاء حتى نهايته مع الاحتفاظ بآخر الأسطر فقط."""
+    for line in stream:
+        tail.append(line[:STDERR_LINE_LENGTH])
+
+def run_ffmpeg(command, progress=None, duration=None, tail_lines=STDERR_TAIL_LINES):
+    """
+    تنفيذ أمر FFmpeg أو FFprobe.
+    
+    عند تمرير progress يضاف -progress pipe:1 إلى أمر FFmpeg، ويقرأ مخرجه القياسي سطرًا
+    بسطر وتستدعى الدالة بعد كل كتلة (كل نصف ثانية تقريبًا). يقرأ مخرج الأخطاء في خيط
+    منفصل حتى لا يمتلئ الأنبوب ويتوقف FFmpeg.
+    
+    المعلمات:
+        command (list): الأمر المراد تنفيذه.
+        progress (callable, اختياري): دالة تستدعى بالحالة كما تعيدها parse_progress كمعاملات مسماة.
+        duration (float, اختياري): مدة المخرج المتوقعة بالثواني (لحساب النسبة المئوية).
+        tail_lines (int, اختياري): عدد أسطر مخرج الأخطاء المحفوظة.
+    
+    العائد:
+        subprocess.CompletedProcess: رمز الخروج والمخرج القياسي (فارغ عند متابعة التقدم)
+                                     وآخر أسطر مخرج الأخطاء.
+    """
+    if progress is not None:
+        command = [command[0], "-progress", "pipe:1", "-nostats"] + list(command[1:])
+    
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    tail = deque(maxlen=tail_lines)
+    reader = threading.Thread(target=_drain, args=(process.stderr, tail), daemon=True)
+    reader.start()
+    try:
+        if progress is None:
+            stdout = process.stdout.read()
+        else:
+            stdout = ""
+            fields = {}
+            for line in process.stdout:
+                key, separator, value = line.strip().partition('=')
+                if not separator:
+                    continue
+                fields[key] = value
+                if key == 'progress':
+                    try:
+                        progress(**parse_progress(fields, duration))
+                    except Exception as e:
+                        # فشل تسجيل التقدم لا يوقف الترميز
+                        logger.warning(f"خطأ في تسجيل تقدم FFmpeg: {str(e)}")
+                    fields = {}
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        reader.join()
+        process.stdout.close()
+        process.stderr.close()
+    
+    return subprocess.CompletedProcess(command, process.returncode, stdout, "".join(tail))
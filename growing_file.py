@@ -0,0 +1,255 @@
+"""
+قراءة ملف أثناء تنزيله.
+يتتبع نطاقات البايتات المكتوبة في ملف قيد التنزيل، ويقدمه عبر خادم HTTP محلي يدعم
+طلبات النطاق، فيمكن لـ FFmpeg البدء في قراءته قبل اكتمال التنزيل. تنتظر القراءة من
+نطاق لم يصل بعد حتى تتم كتابته، وبعد انتهاء التنزيل تقرأ النطاقات غير المنزلة كما هي
+في الملف المتفرق.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .error_handler import YouTubeError
+
+logger = logging.getLogger(__name__)
+
+class GrowingFile:
+    """
+    تتبع النطاقات المكتوبة في ملف قيد التنزيل.
+    
+    يستدعي الكاتب mark_written بعد كتابة كل نطاق (وتفريغه إلى الملف)، ثم finish عند
+    انتهاء التنزيل أو فشله، وينتظر القارئ النطاقات التي يحتاجها عبر wait_for.
+    """
+    
+    def __init__(self, path):
+        """
+        تهيئة متتبع الملف.
+        
+        المعلمات:
+            path (str): مسار الملف قيد التنزيل.
+        """
+        self.path = path
+        self.size = None
+        self.ranges = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+    
+    def mark_written(self, start, end):
+        """
+        تسجيل نطاق تمت كتابته في الملف.
+        
+        المعلمات:
+            start (int): أول بايت.
+            end (int): البايت التالي لآخر بايت.
+        """
+        with self.condition:
+            if self.size is None:
+                # الكاتب يحجز الملف بحجمه الكامل قبل كتابة أول نطاق
+                self.size = os.path.getsize(self.path)
+            
+            # دمج النطاق الجديد مع النطاقات المتداخلة أو المتجاورة
+            merged = []
+            for range_start, range_end in self.ranges:
+                if range_end < start or range_start > end:
+                    merged.append((range_start, range_end))
+                else:
+                    start = min(start, range_start)
+                    end = max(end, range_end)
+            merged.append((start, end))
+            self.ranges = sorted(merged)
+            self.condition.notify_all()
+    
+    def finish(self, error=None):
+        """
+        تسجيل انتهاء التنزيل.
+        
+        المعلمات:
+            error (Exception, اختياري): الخطأ إذا فشل التنزيل.
+        """
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+    
+    def _available_end(self, offset):
+        """نهاية النطاق المكتوب المتصل الذي يبدأ قبل موقع معين أو عنده."""
+        for range_start, range_end in self.ranges:
+            if range_start <= offset < range_end:
+                return range_end
+        return offset
+    
+    def _wait(self, predicate, timeout):
+        """
+        الانتظار حتى يتحقق شرط أو ينتهي التنزيل.
+        
+        يرفع:
+            YouTubeError: إذا فشل التنزيل أو انتهت مهلة الانتظار.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not predicate() and not self.done:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise YouTubeError("انتهت مهلة انتظار بيانات الفيديو")
+                self.condition.wait(remaining)
+            
+            if self.error is not None and not predicate():
+                raise YouTubeError(f"فشل تنزيل الفيديو: {str(self.error)}")
+    
+    def wait_started(self, timeout):
+        """
+        الانتظار حتى يعرف حجم الملف.
+        
+        المعلمات:
+            timeout (float): مهلة الانتظار بالثواني.
+        
+        العائد:
+            int: حجم الملف.
+        
+        يرفع:
+            YouTubeError: إذا فشل التنزيل قبل بدئه أو انتهت مهلة الانتظار.
+        """
+        self._wait(lambda: self.size is not None, timeout)
+        if self.size is None:
+            raise YouTubeError("انتهى التنزيل دون كتابة أي بيانات")
+        return self.size
+    
+    def wait_for(self, start, end, timeout):
+        """
+        الانتظار حتى يصبح جزء من نطاق متاحًا للقراءة.
+        
+        المعلمات:
+            start (int): أول بايت مطلوب.
+            end (int): البايت التالي لآخر بايت مطلوب.
+            timeout (float): مهلة الانتظار بالثواني.
+        
+        العائد:
+            int: نهاية الجزء المتاح من النطاق (أكبر من start). بعد انتهاء التنزيل يكون
+                 النطاق كله متاحًا، وتقرأ أجزاؤه غير المنزلة كأصفار.
+        
+        يرفع:
+            YouTubeError: إذا فشل التنزيل قبل وصول النطاق أو انتهت مهلة الانتظار.
+        """
+        self._wait(lambda: self._available_end(start) > start, timeout)
+        with self.condition:
+            available_end = self._available_end(start)
+            if available_end > start:
+                return min(available_end, end)
+            return end
+
+class GrowingFileServer:
+    """
+    خادم HTTP محلي يقدم ملفًا قيد التنزيل لـ FFmpeg.
+    
+    يستخدم كمدير سياق يعيد رابط الملف:
+        with GrowingFileServer(growing_file) as url:
+            ...
+    """
+    
+    # حجم كتلة القراءة من الملف
+    BLOCK_SIZE = 256 * 1024
+    
+    def __init__(self, growing_file, timeout=30):
+        """
+        تهيئة الخادم.
+        
+        المعلمات:
+            growing_file (GrowingFile): الملف قيد التنزيل (يجب أن يكون حجمه معروفًا).
+            timeout (float, اختياري): مهلة انتظار كل نطاق بالثواني.
+        """
+        self.growing_file = growing_file
+        self.timeout = timeout
+        self.server = None
+    
+    def _make_handler(self):
+        """إنشاء صنف معالج الطلبات المرتبط بهذا الملف."""
+        growing_file = self.growing_file
+        timeout = self.timeout
+        block_size = self.BLOCK_SIZE
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def _send_headers(self):
+                size = growing_file.size
+                match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or size - 1), size - 1) + 1
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f"bytes */{size}")
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return None
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end - 1}/{size}")
+                else:
+                    start, end = 0, size
+                    self.send_response(200)
+                
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Content-Length', str(end - start))
+                self.end_headers()
+                return start, end
+            
+            def do_HEAD(self):
+                self._send_headers()
+            
+            def do_GET(self):
+                byte_range = self._send_headers()
+                if byte_range is None:
+                    return
+                
+                offset, end = byte_range
+                fd = os.open(growing_file.path, os.O_RDONLY)
+                try:
+                    while offset < end:
+                        available_end = growing_file.wait_for(offset, min(offset + block_size, end), timeout)
+                        block = os.pread(fd, available_end - offset, offset)
+                        if not block:
+                            break
+                        self.wfile.write(block)
+                        offset += len(block)
+                except (BrokenPipeError, ConnectionResetError):
+                    # FFmpeg يغلق الاتصال عند البحث في موقع آخر من الملف
+                    pass
+                except YouTubeError as e:
+                    logger.warning(f"توقف تقديم الملف قيد التنزيل: {str(e)}")
+                finally:
+                    os.close(fd)
+        
+        return Handler
+    
+    def start(self):
+        """
+        تشغيل الخادم.
+        
+        العائد:
+            str: رابط الملف.
+        """
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        name = os.path.basename(self.growing_file.path)
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{name}"
+    
+    def stop(self):
+        """إيقاف الخادم."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,196 @@
+"""
+كاشف اللحظات المثيرة في الفيديو.
+يحلل طاقة الصوت لتحديد أكثر المقاطع حيوية في الفيديو، مع قراءة الصوت من FFmpeg
+على دفعات للحفاظ على استهلاك ذاكرة ثابت مهما كان طول الفيديو.
+"""
+
+import logging
+import subprocess
+import numpy as np
+
+from .error_handler import VideoProcessingError
+
+logger = logging.getLogger(__name__)
+
+class HighlightDetector:
+    """
+    كاشف اللحظات المثيرة بالاعتماد على طاقة الصوت.
+    
+    يستخرج مسار الصوت أحادي القناة بمعدل عينات منخفض، ويحسب لكل إطار قصير
+    جذر متوسط مربع الإشارة (RMS) وقوة البدايات (الزيادة في الطاقة اللوغاريتمية)،
+    ثم يختار أعلى النوافذ تقييمًا دون تداخل.
+    """
+    
+    def __init__(self, sample_rate=8000, frame_seconds=0.1, chunk_seconds=60, onset_weight=0.5):
+        """
+        تهيئة كاشف اللحظات المثيرة.
+        
+        المعلمات:
+            sample_rate (int): معدل العينات المستخدم لاستخراج الصوت.
+            frame_seconds (float): طول الإطار التحليلي بالثواني.
+            chunk_seconds (int): طول الدفعة المقروءة من FFmpeg بالثواني.
+            onset_weight (float): وزن قوة البدايات في التقييم النهائي.
+        """
+        self.sample_rate = sample_rate
+        self.frame_size = max(1, int(sample_rate * frame_seconds))
+        self.frame_seconds = self.frame_size / sample_rate
+        self.chunk_frames = max(1, int(chunk_seconds / self.frame_seconds))
+        self.onset_weight = onset_weight
+    
+    def _read_frame_energy(self, video_path):
+        """
+        قراءة الصوت من FFmpeg على دفعات وحساب طاقة كل إطار.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+        
+        العائد:
+            numpy.ndarray: قيم RMS لكل إطار.
+        
+        يرفع:
+            VideoProcessingError: إذا فشل استخراج الصوت.
+        """
+        command = [
+            "ffmpeg",
+            "-v", "error",
+            "-i", video_path,
+            "-vn",
+            "-ac", "1",
+            "-ar", str(self.sample_rate),
+            "-f", "s16le",
+            "-"
+        ]
+        
+        # كل دفعة عدد صحيح من الإطارات، بعينات من 16 بت
+        chunk_bytes = self.chunk_frames * self.frame_size * 2
+        energies = []
+        
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            while True:
+                data = process.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                
+                samples = np.frombuffer(data, dtype=np.int16)
+                usable = len(samples) - len(samples) % self.frame_size
+                if usable == 0:
+                    break
+                
+                # إعادة تشكيل الدفعة كمصفوفة (إطارات × عينات) لحساب الطاقة دفعة واحدة
+                frames = samples[:usable].reshape(-1, self.frame_size).astype(np.float32) / 32768.0
+                energies.append(np.sqrt(np.mean(frames * frames, axis=1)))
+            
+            stderr = process.stderr.read()
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        if process.returncode != 0:
+            raise VideoProcessingError(f"خطأ في استخراج الصوت: {stderr.decode(errors='replace').strip()}")
+        
+        if not energies:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(energies)
+    
+    def _frame_scores(self, energy):
+        """
+        حساب تقييم كل إطار من طاقته وقوة البدايات.
+        
+        المعلمات:
+            energy (numpy.ndarray): قيم RMS لكل إطار.
+        
+        العائد:
+            numpy.ndarray: تقييم كل إطار.
+        """
+        log_energy = np.log10(energy + 1e-6)
+        onset = np.maximum(np.diff(log_energy, prepend=log_energy[:1]), 0)
+        
+        def normalize(values):
+            spread = values.std()
+            return (values - values.mean()) / spread if spread > 0 else np.zeros_like(values)
+        
+        return normalize(log_energy) + self.onset_weight * normalize(onset)
+    
+    def get_frame_energy(self, video_path, index=None):
+        """
+        الحصول على منحنى طاقة الصوت للفيديو، من فهرس التحليل إذا كان محفوظًا.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+            index (AnalysisIndex, اختياري): فهرس التحليل المستخدم لحفظ المنحنى.
+        
+        العائد:
+            numpy.ndarray: قيم RMS لكل إطار.
+        
+        يرفع:
+            VideoProcessingError: إذا فشل استخراج الصوت.
+        """
+        if index is None:
+            return self._read_frame_energy(video_path)
+        
+        key = index.get_key(video_path)
+        name = f"energy_{self.sample_rate}_{self.frame_size}"
+        
+        energy = index.get_array(key, name)
+        if energy is None:
+            energy = self._read_frame_energy(video_path)
+            index.put_array(key, name, energy)
+        return energy
+    
+    def detect(self, video_path, clip_duration=15, top_n=1, index=None):
+        """
+        تحديد أفضل المقاطع في الفيديو.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+            clip_duration (float): مدة المقطع المطلوب بالثواني.
+            top_n (int): عدد المقاطع المطلوبة.
+            index (AnalysisIndex, اختياري): فهرس التحليل المستخدم لحفظ منحنى الطاقة.
+        
+        العائد:
+            list: المقاطع مرتبة حسب التقييم، كل منها قاموس يحتوي على
+                  start_time وduration وscore (بين 0 و1).
+                  تكون القائمة فارغة إذا لم يحتوِ الفيديو على صوت.
+        
+        يرفع:
+            VideoProcessingError: إذا فشل استخراج الصوت.
+        """
+        energy = self.get_frame_energy(video_path, index)
+        if len(energy) == 0:
+            return []
+        
+        scores = self._frame_scores(energy)
+        window = min(len(scores), max(1, int(round(clip_duration / self.frame_seconds))))
+        
+        # متوسط التقييم لكل نافذة منزلقة باستخدام المجموع التراكمي
+        cumulative = np.concatenate(([0.0], np.cumsum(scores, dtype=np.float64)))
+        window_scores = (cumulative[window:] - cumulative[:-window]) / window
+        
+        # تحويل التقييمات إلى المجال (0, 1)، حيث 0.5 تعني نافذة بمستوى متوسط الفيديو
+        normalized = 1.0 / (1.0 + np.exp(-window_scores))
+        
+        # اختيار أعلى النوافذ مع استبعاد ما يتداخل مع النوافذ المختارة
+        available = normalized.copy()
+        highlights = []
+        for _ in range(top_n):
+            best = int(np.argmax(available))
+            if available[best] == -np.inf:
+                break
+            
+            highlights.append({
+                "start_time": round(best * self.frame_seconds, 3),
+                "duration": round(window * self.frame_seconds, 3),
+                "score": round(float(normalized[best]), 4)
+            })
+            available[max(0, best - window + 1):best + window] = -np.inf
+        
+        logger.debug(f"تم تحديد {len(highlights)} مقطع مثير في الفيديو: {video_path}")
+        return highlights
@@ -0,0 +1,352 @@
+"""
+مدير المهام الخلفية للتطبيق.
+يوفر واجهة لتنفيذ العمليات الطويلة (مثل ترميز الفيديو) في الخلفية ومتابعة حالتها.
+"""
+
+import math
+import time
+import uuid
+import logging
+import threading
+from flask import current_app, has_app_context, has_request_context, request
+
+from .error_handler import QueueFullError
+from .job_scheduler import JobScheduler, PRIORITY_NORMAL
+
+logger = logging.getLogger(__name__)
+
+class JobManager:
+    """
+    مدير المهام الخلفية.
+    يرسل المهام إلى مجمع التنفيذ ويعيد معرف المهمة فورًا،
+    ويحتفظ بحالة كل مهمة ونتيجتها أو خطئها حتى يتم الاستعلام عنها.
+    ويمكن للمهمة الجارية تسجيل تقدمها ليظهر في حالتها.
+    
+    عند تحديد max_pending يتم رفض المهام الجديدة بـ QueueFullError إذا امتلأت قائمة
+    الانتظار، مع تقدير للوقت المناسب لإعادة المحاولة من متوسط مدة المهام، بدلاً من
+    تراكم عدد غير محدود من المهام في مجمع التنفيذ.
+    
+    لا تنفذ المهام بترتيب وصولها، بل يختار JobScheduler المهمة التالية عند توفر خيط
+    حسب نصيب كل عميل من الخيوط وفئة الأولوية والتكلفة المتوقعة.
+    """
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    
+    # المدة المفترضة للمهمة قبل انتهاء أي مهمة (بالثواني)
+    DEFAULT_JOB_DURATION = 30
+    
+    # وزن أحدث مهمة في المتوسط المتحرك لمدة المهام
+    DURATION_SMOOTHING = 0.2
+    
+    def __init__(self, executor, result_ttl=3600, workers=1, max_pending=None, max_pending_per_client=None):
+        """
+        تهيئة مدير المهام.
+        
+        المعلمات:
+            executor (Executor): مجمع التنفيذ المستخدم لتشغيل المهام.
+            result_ttl (int): مدة الاحتفاظ بالمهام المنتهية بالثواني.
+            workers (int, اختياري): عدد خيوط مجمع التنفيذ (لتقدير وقت الانتظار).
+            max_pending (int, اختياري): الحد الأقصى لعدد المهام المنتظرة (بدون حد إذا لم يحدد).
+            max_pending_per_client (int, اختياري): الحد الأقصى لعدد المهام المنتظرة لكل عميل،
+                                                   حتى لا يملأ عميل واحد قائمة الانتظار.
+        """
+        self.executor = executor
+        self.result_ttl = result_ttl
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_pending_per_client = max_pending_per_client
+        self.scheduler = JobScheduler()
+        self.pending = 0
+        self.average_duration = None
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+    
+    def submit(self, func, *args, job_type=None, priority=PRIORITY_NORMAL, cost=None, client_id=None,
+               affinity=None, **kwargs):
+        """
+        إرسال مهمة للتنفيذ في الخلفية.
+        
+        المعلمات:
+            func (callable): الدالة المراد تنفيذها.
+            *args: المعاملات الموضعية للدالة.
+            job_type (str, اختياري): نوع المهمة (للعرض فقط).
+            priority (int, اختياري): فئة أولوية المهمة من job_scheduler.
+            cost (float, اختياري): التكلفة المتوقعة من estimate_job_cost (تفترض DEFAULT_JOB_DURATION).
+            client_id (str, اختياري): معرف العميل (يؤخذ من الطلب الحالي إذا لم يحدد).
+            affinity (str, اختياري): مفتاح الملف المصدر (لا يستخدم، فجميع المهام على نفس الجهاز).
+            **kwargs: المعاملات المسماة للدالة.
+        
+        العائد:
+            str: معرف المهمة.
+        
+        يرفع:
+            QueueFullError: إذا امتلأت قائمة انتظار المهام.
+        """
+        job_id = str(uuid.uuid4())
+        
+        # الاحتفاظ بالتطبيق الحالي لتشغيل المهمة داخل سياقه
+        app = current_app._get_current_object() if has_app_context() else None
+        
+        if client_id is None:
+            client_id = self._get_client_id()
+        if cost is None:
+            cost = self.DEFAULT_JOB_DURATION
+        
+        with self.lock:
+            if self.max_pending is not None and self.pending >= self.max_pending:
+                retry_after = self._estimate_wait()
+                logger.warning(f"رفض مهمة جديدة لامتلاء قائمة الانتظار ({self.pending} مهمة منتظرة)")
+                raise QueueFullError(
+                    f"الخادم مشغول حاليًا، يرجى إعادة المحاولة بعد {retry_after} ثانية",
+                    retry_after=retry_after
+                )
+            if (self.max_pending_per_client is not None and
+                    self.scheduler.count_pending(client_id) >= self.max_pending_per_client):
+                retry_after = self._estimate_wait()
+                logger.warning(f"رفض مهمة جديدة لتجاوز العميل حد المهام المنتظرة: {client_id}")
+                raise QueueFullError(
+                    f"لديك عدد كبير من المهام المنتظرة، يرجى إعادة المحاولة بعد {retry_after} ثانية",
+                    retry_after=retry_after
+                )
+            self.pending += 1
+            self.jobs[job_id] = {
+                "jobId": job_id,
+                "type": job_type or func.__name__,
+                "status": self.STATUS_PENDING,
+                "result": None,
+                "error": None,
+                "progress": None,
+                "createdAt": time.time(),
+                "startedAt": None,
+                "finishedAt": None
+            }
+        
+        # تنظيف المهام المنتهية القديمة
+        self.cleanup_finished()
+        
+        # كل خيط يتوفر يأخذ المهمة التي يختارها المجدول وليس بالضرورة هذه المهمة
+        self.scheduler.push((app, job_id, func, args, kwargs), client_id=client_id, priority=priority, cost=cost)
+        self.executor.submit(self._run_next)
+        logger.info(f"تم إرسال المهمة: {job_id}")
+        return job_id
+    
+    def _get_client_id(self):
+        """
+        الحصول على معرف العميل من الطلب الحالي.
+        
+        العائد:
+            str: قيمة رأس X-Client-ID أو عنوان العميل، أو None خارج سياق الطلب.
+        """
+        if not has_request_context():
+            return None
+        return request.headers.get('X-Client-ID') or request.remote_addr
+    
+    def _estimate_wait(self):
+        """
+        تقدير الوقت اللازم لبدء مهمة جديدة دون أخذ القفل.
+        
+        العائد:
+            int: الوقت المقدر بالثواني (ثانية واحدة على الأقل).
+        """
+        duration = self.average_duration if self.average_duration is not None else self.DEFAULT_JOB_DURATION
+        return max(1, int(math.ceil(duration * self.pending / max(1, self.workers))))
+    
+    def get_load(self):
+        """
+        الحصول على حمل مدير المهام.
+        
+        العائد:
+            dict: عدد المهام المنتظرة والجارية والحد الأقصى للانتظار ومتوسط مدة المهام
+                  والنسب المئوية لوقت الانتظار في القائمة.
+        """
+        with self.lock:
+            running = sum(1 for job in self.jobs.values() if job["status"] == self.STATUS_RUNNING)
+            return {
+                "workers": self.workers,
+                "running": running,
+                "pending": self.pending,
+                "maxPending": self.max_pending,
+                "averageDuration": self.average_duration,
+                "queueWait": self.scheduler.get_wait_stats()
+            }
+    
+    def get(self, job_id):
+        """
+        الحصول على حالة مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+        
+        العائد:
+            dict: نسخة من سجل المهمة، أو None إذا لم يتم العثور على المهمة.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def get_or_submit(self, cache, key, submit):
+        """
+        مشاركة مهمة واحدة بين الطلبات المتطابقة، مع إرسال مهمة جديدة إذا فشلت السابقة.
+        
+        يحفظ معرف المهمة في ذاكرة التخزين المؤقت للعملية الحالية. قد تنفذ المهمة في عملية
+        عاملة منفصلة لا تستطيع حذفه منها عند الفشل، لذلك تقرأ حالة المهمة من هذا المدير.
+        
+        المعلمات:
+            cache (CacheManager): ذاكرة التخزين المؤقت التي يحفظ فيها معرف المهمة.
+            key (str): مفتاح معرف المهمة في ذاكرة التخزين المؤقت.
+            submit (callable): دالة بدون معاملات ترسل المهمة وتعيد قاموسًا يحتوي على jobId.
+        
+        العائد:
+            dict: سجل المهمة المشتركة كما أعادته submit.
+        """
+        # معرف المهمة محفوظ داخل هذه العملية فقط
+        job = cache.get_or_compute(key, submit, ttl=self.result_ttl, shared=False)
+        
+        # المهمة الفاشلة أو المحذوفة من قائمة المهام لا تشارك، فتعاد المحاولة بمهمة جديدة
+        status = self.get(job["jobId"])
+        if status is None or status["status"] == self.STATUS_FAILED:
+            cache.delete(key)
+            job = cache.get_or_compute(key, submit, ttl=self.result_ttl, shared=False)
+        
+        return job
+    
+    def _update(self, job_id, **fields):
+        """
+        تحديث حقول سجل مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            **fields: الحقول المراد تحديثها.
+        """
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+    
+    def get_current_job_id(self):
+        """
+        الحصول على معرف المهمة التي ينفذها الخيط الحالي.
+        
+        العائد:
+            str: معرف المهمة، أو None إذا لم يكن الخيط ينفذ مهمة.
+        """
+        return getattr(self.local, 'job_id', None)
+    
+    def set_progress(self, job_id, completed, total=None, **details):
+        """
+        تسجيل تقدم مهمة جارية. يمكن استدعاؤها من أي خيط.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            completed (int): مقدار العمل المكتمل (مثل عدد البايتات المنزلة).
+            total (int, اختياري): مقدار العمل الكلي إن كان معروفًا.
+            **details: تفاصيل إضافية تحفظ مع التقدم (مثل fps وspeed أثناء الترميز).
+        """
+        self._update(job_id, progress=self._progress_record(completed, total, details))
+    
+    def _progress_record(self, completed, total, details):
+        """
+        إنشاء سجل التقدم المحفوظ مع المهمة.
+        
+        المعلمات:
+            completed (int): مقدار العمل المكتمل.
+            total (int): مقدار العمل الكلي، أو None.
+            details (dict): تفاصيل إضافية (القيم None تهمل).
+        
+        العائد:
+            dict: المكتمل والكلي والنسبة المئوية والتفاصيل.
+        """
+        percent = round(100.0 * completed / total, 1) if total and completed is not None else None
+        record = {"completed": completed, "total": total, "percent": percent}
+        record.update((key, value) for key, value in details.items() if value is not None)
+        return record
+    
+    def get_progress_callback(self):
+        """
+        إنشاء دالة لتسجيل تقدم المهمة التي ينفذها الخيط الحالي.
+        
+        العائد:
+            callable: دالة تستقبل completed وtotal والتفاصيل الإضافية، أو None إذا لم
+                      يكن الخيط ينفذ مهمة.
+        """
+        job_id = self.get_current_job_id()
+        if job_id is None:
+            return None
+        return lambda completed, total=None, **details: self.set_progress(job_id, completed, total, **details)
+    
+    def _run_next(self):
+        """تنفيذ المهمة التالية التي يختارها المجدول."""
+        item, client_id = self.scheduler.pop()
+        if item is None:
+            return
+        try:
+            self._run(*item)
+        finally:
+            self.scheduler.finish(client_id)
+    
+    def _run(self, app, job_id, func, args, kwargs):
+        """
+        تنفيذ مهمة وتسجيل نتيجتها.
+        
+        المعلمات:
+            app (Flask): التطبيق المستخدم لإنشاء سياق التنفيذ، أو None.
+            job_id (str): معرف المهمة.
+            func (callable): الدالة المراد تنفيذها.
+            args (tuple): المعاملات الموضعية.
+            kwargs (dict): المعاملات المسماة.
+        """
+        started_at = time.time()
+        with self.lock:
+            self.pending -= 1
+            if job_id in self.jobs:
+                self.jobs[job_id].update(status=self.STATUS_RUNNING, startedAt=started_at)
+        self.local.job_id = job_id
+        try:
+            if app is not None:
+                with app.app_context():
+                    result = func(*args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            
+            self._update(
+                job_id,
+                status=self.STATUS_COMPLETED,
+                result=result,
+                finishedAt=time.time()
+            )
+            logger.info(f"اكتملت المهمة بنجاح: {job_id}")
+        except Exception as e:
+            logger.error(f"فشلت المهمة {job_id}: {str(e)}")
+            self._update(
+                job_id,
+                status=self.STATUS_FAILED,
+                error=str(e),
+                finishedAt=time.time()
+            )
+        finally:
+            self.local.job_id = None
+            
+            # تحديث متوسط مدة المهام لتقدير وقت الانتظار
+            duration = time.time() - started_at
+            with self.lock:
+                if self.average_duration is None:
+                    self.average_duration = duration
+                else:
+                    self.average_duration += self.DURATION_SMOOTHING * (duration - self.average_duration)
+    
+    def cleanup_finished(self):
+        """حذف المهام المنتهية التي تجاوزت مدة الاحتفاظ."""
+        current_time = time.time()
+        with self.lock:
+            expired_ids = [
+                job_id for job_id, job in self.jobs.items()
+                if job["finishedAt"] and current_time - job["finishedAt"] > self.result_ttl
+            ]
+            for job_id in expired_ids:
+                del self.jobs[job_id]
+        
+        if expired_ids:
+            logger.debug(f"تم حذف {len(expired_ids)} مهمة منتهية")
@@ -0,0 +1,625 @@
+"""
+قائمة انتظار دائمة للمهام الخلفية.
+تحفظ المهام في قاعدة بيانات SQLite محلية بدلاً من ذاكرة عملية الخادم، فتبقى بعد
+إعادة تشغيله أو نشر نسخة جديدة، وتنفذها عمليات عاملة مستقلة (backend.worker).
+كل مهمة يتم حجزها لعامل واحد لمدة محدودة يجددها بنبضات دورية، وإذا توقف العامل
+عن تجديدها (مثل انهياره) تعود المهمة إلى قائمة الانتظار ليعاد تنفيذها.
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import importlib
+import threading
+from flask import current_app, has_app_context
+
+from .error_handler import QueueFullError
+from .job_manager import JobManager
+from .job_scheduler import JobScheduler, PRIORITY_NORMAL, get_wait_stats
+
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    """
+    قائمة انتظار دائمة للمهام مبنية على SQLite.
+    
+    يستخدم وضع WAL ولكل خيط اتصال مستقل، فيمكن لعمليات الخادم والعمليات العاملة
+    على نفس الجهاز استخدام نفس الملف. يتم حجز المهام داخل معاملة كتابة حصرية،
+    فلا يحصل عاملان على نفس المهمة، وتختار المهمة التالية بنفس ترتيب JobScheduler:
+    نصيب العميل من المهام الجارية، ثم فئة الأولوية، ثم التكلفة بعد التقادم.
+    
+    هذه القائمة لجهاز واحد، أما لعدة أجهزة فتستخدم RedisJobQueue بنفس الواجهة.
+    """
+    
+    # الحالات نفسها المستخدمة في مدير المهام
+    STATUS_PENDING = JobManager.STATUS_PENDING
+    STATUS_RUNNING = JobManager.STATUS_RUNNING
+    STATUS_COMPLETED = JobManager.STATUS_COMPLETED
+    STATUS_FAILED = JobManager.STATUS_FAILED
+    
+    # عدد المهام الأخيرة المستخدمة لحساب متوسط المدة والنسب المئوية لوقت الانتظار
+    STATS_SAMPLES = 1000
+    
+    def __init__(self, path, lease_duration=30, max_attempts=3):
+        """
+        تهيئة قائمة الانتظار.
+        
+        المعلمات:
+            path (str): مسار ملف قاعدة البيانات.
+            lease_duration (float): مدة حجز المهمة بالثواني قبل اعتبار العامل متوقفًا.
+            max_attempts (int): الحد الأقصى لمحاولات تنفيذ المهمة بعد توقف العمال.
+        """
+        self.path = path
+        self.lease_duration = lease_duration
+        self.max_attempts = max_attempts
+        self.local = threading.local()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # إنشاء الجداول عند أول استخدام للملف
+        self._get_connection()
+    
+    def _get_connection(self):
+        """
+        الحصول على اتصال قاعدة البيانات الخاص بالخيط الحالي.
+        
+        العائد:
+            sqlite3.Connection: الاتصال.
+        """
+        # لا يجوز استخدام اتصال موروث من العملية الأم بعد fork
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, "
+                "type TEXT NOT NULL, "
+                "func TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "priority INTEGER NOT NULL, "
+                "cost REAL NOT NULL, "
+                "client_id TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, "
+                "error TEXT, "
+                "progress TEXT, "
+                "created_at REAL NOT NULL, "
+                "started_at REAL, "
+                "finished_at REAL, "
+                "lease_owner TEXT, "
+                "lease_expires REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS workers ("
+                "worker_id TEXT PRIMARY KEY, "
+                "host TEXT NOT NULL, "
+                "pid INTEGER NOT NULL, "
+                "busy INTEGER NOT NULL DEFAULT 0, "
+                "seen_at REAL NOT NULL)"
+            )
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+    
+    def enqueue(self, job_type, func, args=(), kwargs=None, priority=PRIORITY_NORMAL, cost=0.0, client_id=None,
+                affinity=None):
+        """
+        إضافة مهمة إلى قائمة الانتظار.
+        
+        المعلمات:
+            job_type (str): نوع المهمة (للعرض فقط).
+            func (str): مرجع الدالة بصيغة 'module:qualname'.
+            args (tuple): المعاملات الموضعية (يجب أن تكون قابلة للتحويل إلى JSON).
+            kwargs (dict, اختياري): المعاملات المسماة (يجب أن تكون قابلة للتحويل إلى JSON).
+            priority (int): فئة الأولوية.
+            cost (float): التكلفة المتوقعة.
+            client_id (str, اختياري): معرف العميل صاحب المهمة.
+            affinity (str, اختياري): مفتاح الملف المصدر للمهمة (لا يستخدم، فجميع العمال على نفس الجهاز).
+        
+        العائد:
+            str: معرف المهمة.
+        """
+        job_id = str(uuid.uuid4())
+        payload = json.dumps({"args": list(args), "kwargs": kwargs or {}}, ensure_ascii=False)
+        self._get_connection().execute(
+            "INSERT INTO jobs (job_id, type, func, payload, status, priority, cost, client_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, job_type, func, payload, self.STATUS_PENDING, priority, cost, client_id, time.time())
+        )
+        return job_id
+    
+    def lease(self, worker_id):
+        """
+        حجز المهمة التالية لعامل.
+        
+        تعاد أولاً المهام التي انتهت مدة حجزها إلى قائمة الانتظار، أو تسجل كفاشلة إذا
+        استنفدت محاولاتها.
+        
+        المعلمات:
+            worker_id (str): معرف العامل.
+        
+        العائد:
+            dict: المهمة (jobId وtype وfunc وargs وkwargs وattempts)، أو None إذا لم توجد مهام.
+        """
+        connection = self._get_connection()
+        current_time = time.time()
+        
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._reclaim_expired(connection, current_time)
+            
+            row = connection.execute(
+                "SELECT job_id, type, func, payload, attempts FROM jobs AS candidate "
+                "WHERE status = ? ORDER BY "
+                "(SELECT COUNT(*) FROM jobs AS active WHERE active.status = ? "
+                "AND active.client_id IS candidate.client_id), "
+                "priority, cost / (1.0 + (? - created_at) / ?), created_at "
+                "LIMIT 1",
+                (self.STATUS_PENDING, self.STATUS_RUNNING, current_time, JobScheduler.AGING_TIME)
+            ).fetchone()
+            
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            
+            job_id, job_type, func, payload, attempts = row
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, "
+                "lease_owner = ?, lease_expires = ? WHERE job_id = ?",
+                (self.STATUS_RUNNING, current_time, worker_id, current_time + self.lease_duration, job_id)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        
+        payload = json.loads(payload)
+        return {
+            "jobId": job_id,
+            "type": job_type,
+            "func": func,
+            "args": payload["args"],
+            "kwargs": payload["kwargs"],
+            "attempts": attempts + 1
+        }
+    
+    def _reclaim_expired(self, connection, current_time):
+        """
+        إعادة المهام التي توقف عمالها عن تجديد حجزها إلى قائمة الانتظار.
+        
+        المعلمات:
+            connection (sqlite3.Connection): الاتصال داخل معاملة الحجز.
+            current_time (float): الوقت الحالي.
+        """
+        expired = connection.execute(
+            "SELECT job_id, attempts, lease_owner FROM jobs WHERE status = ? AND lease_expires < ?",
+            (self.STATUS_RUNNING, current_time)
+        ).fetchall()
+        
+        for job_id, attempts, lease_owner in expired:
+            if attempts >= self.max_attempts:
+                logger.error(f"فشلت المهمة {job_id} بعد {attempts} محاولات توقف فيها العامل")
+                connection.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_owner = NULL, "
+                    "lease_expires = NULL WHERE job_id = ?",
+                    (self.STATUS_FAILED, "توقف العامل أثناء تنفيذ المهمة", current_time, job_id)
+                )
+            else:
+                logger.warning(f"إعادة المهمة {job_id} إلى قائمة الانتظار بعد توقف العامل {lease_owner}")
+                connection.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL, lease_owner = NULL, "
+                    "lease_expires = NULL WHERE job_id = ?",
+                    (self.STATUS_PENDING, job_id)
+                )
+    
+    def heartbeat(self, job_id, worker_id):
+        """
+        تجديد حجز مهمة جارية.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            worker_id (str): معرف العامل.
+        
+        العائد:
+            bool: هل ما زال العامل يملك المهمة.
+        """
+        cursor = self._get_connection().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_owner = ? AND status = ?",
+            (time.time() + self.lease_duration, job_id, worker_id, self.STATUS_RUNNING)
+        )
+        return cursor.rowcount > 0
+    
+    def set_progress(self, job_id, progress):
+        """
+        تسجيل تقدم مهمة جارية.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            progress (dict): التقدم.
+        """
+        self._get_connection().execute(
+            "UPDATE jobs SET progress = ? WHERE job_id = ?",
+            (json.dumps(progress), job_id)
+        )
+    
+    def _finish(self, job_id, worker_id, status, result=None, error=None):
+        """
+        تسجيل انتهاء مهمة إذا كان العامل ما زال يملكها.
+        
+        العائد:
+            bool: هل تم التسجيل.
+        """
+        cursor = self._get_connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_owner = NULL, "
+            "lease_expires = NULL WHERE job_id = ? AND lease_owner = ? AND status = ?",
+            (status, result, error, time.time(), job_id, worker_id, self.STATUS_RUNNING)
+        )
+        return cursor.rowcount > 0
+    
+    def complete(self, job_id, worker_id, result):
+        """
+        تسجيل اكتمال مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            worker_id (str): معرف العامل.
+            result (object): نتيجة المهمة (قابلة للتحويل إلى JSON).
+        
+        العائد:
+            bool: هل تم التسجيل (False إذا فقد العامل حجز المهمة).
+        """
+        return self._finish(
+            job_id, worker_id, self.STATUS_COMPLETED,
+            result=json.dumps(result, ensure_ascii=False, default=str)
+        )
+    
+    def fail(self, job_id, worker_id, error):
+        """
+        تسجيل فشل مهمة. الأخطاء التي ترفعها المهمة نفسها لا يعاد تنفيذها.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            worker_id (str): معرف العامل.
+            error (str): رسالة الخطأ.
+        
+        العائد:
+            bool: هل تم التسجيل (False إذا فقد العامل حجز المهمة).
+        """
+        return self._finish(job_id, worker_id, self.STATUS_FAILED, error=error)
+    
+    def get(self, job_id):
+        """
+        الحصول على حالة مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+        
+        العائد:
+            dict: سجل المهمة بنفس صيغة JobManager، أو None إذا لم يتم العثور عليها.
+        """
+        row = self._get_connection().execute(
+            "SELECT type, status, result, error, progress, attempts, created_at, started_at, finished_at "
+            "FROM jobs WHERE job_id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        job_type, status, result, error, progress, attempts, created_at, started_at, finished_at = row
+        return {
+            "jobId": job_id,
+            "type": job_type,
+            "status": status,
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+            "progress": json.loads(progress) if progress is not None else None,
+            "attempts": attempts,
+            "createdAt": created_at,
+            "startedAt": started_at,
+            "finishedAt": finished_at
+        }
+    
+    def count_pending(self, client_id=None):
+        """
+        عدد المهام المنتظرة.
+        
+        المعلمات:
+            client_id (str, اختياري): حساب مهام هذا العميل فقط.
+        
+        العائد:
+            int: عدد المهام.
+        """
+        if client_id is None:
+            query, params = "SELECT COUNT(*) FROM jobs WHERE status = ?", (self.STATUS_PENDING,)
+        else:
+            query = "SELECT COUNT(*) FROM jobs WHERE status = ? AND client_id IS ?"
+            params = (self.STATUS_PENDING, client_id)
+        return self._get_connection().execute(query, params).fetchone()[0]
+    
+    def register_worker(self, worker_id, busy=False):
+        """
+        تسجيل أن عاملاً ما زال يعمل.
+        
+        المعلمات:
+            worker_id (str): معرف العامل.
+            busy (bool, اختياري): هل ينفذ العامل مهمة حاليًا.
+        """
+        self._get_connection().execute(
+            "INSERT OR REPLACE INTO workers (worker_id, host, pid, busy, seen_at) VALUES (?, ?, ?, ?, ?)",
+            (worker_id, socket.gethostname(), os.getpid(), int(busy), time.time())
+        )
+    
+    def unregister_worker(self, worker_id):
+        """
+        حذف عامل متوقف.
+        
+        المعلمات:
+            worker_id (str): معرف العامل.
+        """
+        self._get_connection().execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+    
+    def get_stats(self):
+        """
+        الحصول على إحصائيات قائمة الانتظار.
+        
+        العائد:
+            dict: عدد العمال النشطين وسعة كل جهاز (عدد عماله والمشغول منهم)، وعدد المهام
+                  الجارية والمنتظرة، ومتوسط مدة المهام والنسب المئوية لوقت الانتظار بالثواني.
+        """
+        connection = self._get_connection()
+        current_time = time.time()
+        
+        nodes = {
+            host: {"workers": workers, "busy": busy}
+            for host, workers, busy in connection.execute(
+                "SELECT host, COUNT(*), SUM(busy) FROM workers WHERE seen_at >= ? GROUP BY host",
+                (current_time - self.lease_duration,)
+            ).fetchall()
+        }
+        counts = dict(connection.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY status",
+            (self.STATUS_PENDING, self.STATUS_RUNNING)
+        ).fetchall())
+        
+        average_duration = connection.execute(
+            "SELECT AVG(finished_at - started_at) FROM (SELECT finished_at, started_at FROM jobs "
+            "WHERE status = ? ORDER BY finished_at DESC LIMIT ?)",
+            (self.STATUS_COMPLETED, self.STATS_SAMPLES)
+        ).fetchone()[0]
+        
+        waits = [row[0] for row in connection.execute(
+            "SELECT started_at - created_at FROM jobs WHERE started_at IS NOT NULL "
+            "ORDER BY started_at DESC LIMIT ?",
+            (self.STATS_SAMPLES,)
+        ).fetchall()]
+        
+        return {
+            "workers": sum(node["workers"] for node in nodes.values()),
+            "nodes": nodes,
+            "running": counts.get(self.STATUS_RUNNING, 0),
+            "pending": counts.get(self.STATUS_PENDING, 0),
+            "averageDuration": average_duration,
+            "queueWait": get_wait_stats(waits)
+        }
+    
+    def cleanup(self, result_ttl):
+        """
+        حذف المهام المنتهية القديمة والعمال المتوقفين.
+        
+        المعلمات:
+            result_ttl (float): مدة الاحتفاظ بالمهام المنتهية بالثواني.
+        
+        العائد:
+            int: عدد المهام المحذوفة.
+        """
+        connection = self._get_connection()
+        current_time = time.time()
+        cursor = connection.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at <= ?",
+            (self.STATUS_COMPLETED, self.STATUS_FAILED, current_time - result_ttl)
+        )
+        connection.execute(
+            "DELETE FROM workers WHERE seen_at < ?",
+            (current_time - max(result_ttl, self.lease_duration),)
+        )
+        return cursor.rowcount
+
+class DurableJobManager(JobManager):
+    """
+    مدير مهام يرسل المهام إلى قائمة انتظار دائمة (JobQueue أو RedisJobQueue) بدلاً من
+    مجمع تنفيذ داخل العملية.
+    
+    له نفس واجهة JobManager، فتستخدمه نقاط النهاية دون تغيير، لكن المهام تنفذها
+    العمليات العاملة (backend.worker) التي تستدعي run_leased. لذلك يجب أن تكون دالة
+    المهمة معرفة على مستوى الوحدة، وأن تكون معاملاتها ونتيجتها قابلة للتحويل إلى JSON.
+    """
+    
+    def __init__(self, queue, result_ttl=3600, max_pending=None, max_pending_per_client=None):
+        """
+        تهيئة مدير المهام.
+        
+        المعلمات:
+            queue (JobQueue أو RedisJobQueue): قائمة الانتظار الدائمة.
+            result_ttl (int): مدة الاحتفاظ بالمهام المنتهية بالثواني.
+            max_pending (int, اختياري): الحد الأقصى لعدد المهام المنتظرة.
+            max_pending_per_client (int, اختياري): الحد الأقصى لعدد المهام المنتظرة لكل عميل.
+        """
+        self.queue = queue
+        self.result_ttl = result_ttl
+        self.max_pending = max_pending
+        self.max_pending_per_client = max_pending_per_client
+        self.local = threading.local()
+    
+    def _get_function_reference(self, func):
+        """
+        الحصول على مرجع الدالة الذي يمكن للعامل استيرادها به.
+        
+        يرفع:
+            ValueError: إذا لم تكن الدالة معرفة على مستوى الوحدة.
+        """
+        if '<' in func.__qualname__:
+            raise ValueError(f"لا يمكن إرسال الدالة {func.__qualname__} إلى العمال، يجب أن تكون معرفة على مستوى الوحدة")
+        return f"{func.__module__}:{func.__qualname__}"
+    
+    def _estimate_queue_wait(self, stats):
+        """
+        تقدير الوقت اللازم لبدء مهمة جديدة.
+        
+        المعلمات:
+            stats (dict): إحصائيات قائمة الانتظار.
+        
+        العائد:
+            int: الوقت المقدر بالثواني (ثانية واحدة على الأقل).
+        """
+        duration = stats["averageDuration"] or self.DEFAULT_JOB_DURATION
+        workers = max(1, stats["workers"])
+        return max(1, int(math.ceil(duration * stats["pending"] / workers)))
+    
+    def submit(self, func, *args, job_type=None, priority=PRIORITY_NORMAL, cost=None, client_id=None,
+               affinity=None, **kwargs):
+        """
+        إرسال مهمة إلى قائمة الانتظار الدائمة.
+        
+        المعلمات:
+            func (callable): الدالة المراد تنفيذها (معرفة على مستوى الوحدة).
+            *args: المعاملات الموضعية للدالة.
+            job_type (str, اختياري): نوع المهمة (للعرض فقط).
+            priority (int, اختياري): فئة أولوية المهمة من job_scheduler.
+            cost (float, اختياري): التكلفة المتوقعة (تفترض DEFAULT_JOB_DURATION).
+            client_id (str, اختياري): معرف العميل (يؤخذ من الطلب الحالي إذا لم يحدد).
+            affinity (str, اختياري): مفتاح الملف المصدر، لتفضيل الجهاز الذي يحتفظ به.
+            **kwargs: المعاملات المسماة للدالة.
+        
+        العائد:
+            str: معرف المهمة.
+        
+        يرفع:
+            QueueFullError: إذا امتلأت قائمة انتظار المهام.
+            ValueError: إذا لم يكن من الممكن إرسال الدالة إلى العمال.
+        """
+        func_reference = self._get_function_reference(func)
+        if client_id is None:
+            client_id = self._get_client_id()
+        if cost is None:
+            cost = self.DEFAULT_JOB_DURATION
+        
+        if self.max_pending is not None:
+            stats = self.queue.get_stats()
+            if stats["pending"] >= self.max_pending:
+                retry_after = self._estimate_queue_wait(stats)
+                logger.warning(f"رفض مهمة جديدة لامتلاء قائمة الانتظار ({stats['pending']} مهمة منتظرة)")
+                raise QueueFullError(
+                    f"الخادم مشغول حاليًا، يرجى إعادة المحاولة بعد {retry_after} ثانية",
+                    retry_after=retry_after
+                )
+        
+        if (self.max_pending_per_client is not None and
+                self.queue.count_pending(client_id) >= self.max_pending_per_client):
+            retry_after = self._estimate_queue_wait(self.queue.get_stats())
+            logger.warning(f"رفض مهمة جديدة لتجاوز العميل حد المهام المنتظرة: {client_id}")
+            raise QueueFullError(
+                f"لديك عدد كبير من المهام المنتظرة، يرجى إعادة المحاولة بعد {retry_after} ثانية",
+                retry_after=retry_after
+            )
+        
+        # تنظيف المهام المنتهية القديمة
+        self.cleanup_finished()
+        
+        job_id = self.queue.enqueue(
+            job_type or func.__name__,
+            func_reference,
+            args,
+            kwargs,
+            priority=priority,
+            cost=cost,
+            client_id=client_id,
+            affinity=affinity
+        )
+        logger.info(f"تم إرسال المهمة إلى قائمة الانتظار الدائمة: {job_id}")
+        return job_id
+    
+    def get(self, job_id):
+        """
+        الحصول على حالة مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+        
+        العائد:
+            dict: سجل المهمة، أو None إذا لم يتم العثور على المهمة.
+        """
+        return self.queue.get(job_id)
+    
+    def get_load(self):
+        """
+        الحصول على حمل قائمة الانتظار.
+        
+        العائد:
+            dict: عدد العمال النشطين والمهام الجارية والمنتظرة والحد الأقصى للانتظار ومتوسط
+                  مدة المهام والنسب المئوية لوقت الانتظار.
+        """
+        stats = self.queue.get_stats()
+        stats["maxPending"] = self.max_pending
+        return stats
+    
+    def set_progress(self, job_id, completed, total=None, **details):
+        """
+        تسجيل تقدم مهمة جارية. يمكن استدعاؤها من أي خيط.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            completed (int): مقدار العمل المكتمل.
+            total (int, اختياري): مقدار العمل الكلي إن كان معروفًا.
+            **details: تفاصيل إضافية تحفظ مع التقدم (مثل fps وspeed).
+        """
+        self.queue.set_progress(job_id, self._progress_record(completed, total, details))
+    
+    def run_leased(self, job, worker_id):
+        """
+        تنفيذ مهمة محجوزة وتسجيل نتيجتها. يستدعيها العامل.
+        
+        المعلمات:
+            job (dict): المهمة كما يعيدها JobQueue.lease.
+            worker_id (str): معرف العامل.
+        """
+        job_id = job["jobId"]
+        app = current_app._get_current_object() if has_app_context() else None
+        self.local.job_id = job_id
+        try:
+            module_name, qualname = job["func"].split(':', 1)
+            func = importlib.import_module(module_name)
+            for name in qualname.split('.'):
+                func = getattr(func, name)
+            
+            if app is not None:
+                with app.app_context():
+                    result = func(*job["args"], **job["kwargs"])
+            else:
+                result = func(*job["args"], **job["kwargs"])
+            
+            if self.queue.complete(job_id, worker_id, result):
+                logger.info(f"اكتملت المهمة بنجاح: {job_id}")
+            else:
+                logger.warning(f"تم تجاهل نتيجة المهمة {job_id} لأن حجزها انتقل إلى عامل آخر")
+        except Exception as e:
+            logger.error(f"فشلت المهمة {job_id}: {str(e)}")
+            self.queue.fail(job_id, worker_id, str(e))
+        finally:
+            self.local.job_id = None
+    
+    def cleanup_finished(self):
+        """حذف المهام المنتهية التي تجاوزت مدة الاحتفاظ."""
+        removed = self.queue.cleanup(self.result_ttl)
+        if removed:
+            logger.debug(f"تم حذف {removed} مهمة منتهية")
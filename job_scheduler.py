@@ -0,0 +1,223 @@
+"""
+جدولة المهام الخلفية حسب الأولوية والتكلفة.
+يختار المهمة التالية من قائمة الانتظار بحيث يحصل كل عميل على نصيب عادل من خيوط
+المعالجة، ثم حسب فئة الأولوية، ثم المهمة الأقصر تكلفة متوقعة، بدلاً من ترتيب الوصول.
+"""
+
+import time
+import logging
+import itertools
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# فئات الأولوية (الأصغر ينفذ أولاً)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITIES = {
+    'high': PRIORITY_HIGH,
+    'normal': PRIORITY_NORMAL,
+    'low': PRIORITY_LOW
+}
+
+# تكلفة الترميز النسبية لكل إعداد مسبق مقارنة بـ medium
+# (copy للمعالجة بدون إعادة ترميز مثل وضع smart_cut)
+PRESET_FACTORS = {
+    'copy': 0.1,
+    'ultrafast': 0.3,
+    'superfast': 0.4,
+    'veryfast': 0.6,
+    'faster': 0.8,
+    'fast': 0.9,
+    'medium': 1.0,
+    'slow': 1.6,
+    'slower': 2.5,
+    'veryslow': 4.0
+}
+
+# الدقة المرجعية للتكلفة (عدد أسطر الصورة)
+REFERENCE_HEIGHT = 720
+
+def estimate_job_cost(duration, resolution=None, preset=None):
+    """
+    تقدير تكلفة مهمة معالجة فيديو.
+    
+    التكلفة تتناسب مع المدة وعدد البكسلات (مربع الارتفاع) وبطء الإعداد المسبق،
+    وتقاس بثواني فيديو بدقة 720p وإعداد medium.
+    
+    المعلمات:
+        duration (float): مدة الفيديو بالثواني.
+        resolution (str, اختياري): الدقة مثل '720p' (تفترض 720p إذا لم تحدد).
+        preset (str, اختياري): إعداد الترميز المسبق (يفترض medium إذا لم يحدد).
+    
+    العائد:
+        float: التكلفة المقدرة.
+    """
+    height = REFERENCE_HEIGHT
+    if resolution:
+        try:
+            height = int(str(resolution).rstrip('p'))
+        except ValueError:
+            pass
+    
+    pixel_factor = (height / REFERENCE_HEIGHT) ** 2
+    preset_factor = PRESET_FACTORS.get(preset, 1.0)
+    return max(0.0, float(duration)) * pixel_factor * preset_factor
+
+def get_wait_stats(waits):
+    """
+    حساب إحصائيات أوقات الانتظار.
+    
+    المعلمات:
+        waits (list): أوقات الانتظار بالثواني.
+    
+    العائد:
+        dict: عدد العينات والنسب المئوية p50 وp99 بالثواني (None إذا لم توجد عينات).
+    """
+    waits = sorted(waits)
+    
+    def percentile(fraction):
+        if not waits:
+            return None
+        index = min(len(waits) - 1, int(round(fraction * (len(waits) - 1))))
+        return round(waits[index], 3)
+    
+    return {
+        "samples": len(waits),
+        "p50": percentile(0.5),
+        "p99": percentile(0.99)
+    }
+
+class JobScheduler:
+    """
+    قائمة انتظار المهام مرتبة حسب العدالة والأولوية والتكلفة.
+    
+    عند بدء مهمة يتم اختيار المهمة المنتظرة ذات المفتاح الأصغر:
+        (عدد المهام الجارية للعميل، فئة الأولوية، التكلفة بعد التقادم، ترتيب الوصول)
+    فلا يستطيع عميل يرسل مئات المهام شغل جميع الخيوط، وتسبق المهام القصيرة الطويلة
+    داخل نفس الفئة. تنخفض التكلفة الفعالة للمهمة كلما طال انتظارها، فلا تنتظر
+    المهام الطويلة إلى الأبد خلف تدفق مستمر من المهام القصيرة.
+    
+    يحتفظ المجدول أيضًا بأوقات الانتظار الأخيرة لحساب النسب المئوية p50 وp99.
+    قائمة الانتظار محدودة بـ max_pending في مدير المهام، فالاختيار بالمرور على
+    جميع المهام المنتظرة يبقى رخيصًا.
+    """
+    
+    # مدة الانتظار التي تنخفض بعدها التكلفة الفعالة إلى النصف (بالثواني)
+    AGING_TIME = 60
+    
+    # عدد أوقات الانتظار المحفوظة لحساب النسب المئوية
+    WAIT_SAMPLES = 1000
+    
+    def __init__(self):
+        """تهيئة المجدول."""
+        self.entries = []
+        self.running = {}
+        self.waits = deque(maxlen=self.WAIT_SAMPLES)
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+    
+    def push(self, item, client_id=None, priority=PRIORITY_NORMAL, cost=0.0):
+        """
+        إضافة مهمة إلى قائمة الانتظار.
+        
+        المعلمات:
+            item (object): المهمة.
+            client_id (str, اختياري): معرف العميل صاحب المهمة.
+            priority (int, اختياري): فئة الأولوية.
+            cost (float, اختياري): التكلفة المتوقعة للمهمة.
+        """
+        with self.lock:
+            self.entries.append({
+                "item": item,
+                "clientId": client_id,
+                "priority": priority,
+                "cost": cost,
+                "queuedAt": time.time(),
+                "sequence": next(self.counter)
+            })
+    
+    @classmethod
+    def aged_cost(cls, cost, waited):
+        """
+        التكلفة الفعالة لمهمة بعد انتظارها.
+        
+        المعلمات:
+            cost (float): التكلفة المتوقعة.
+            waited (float): مدة الانتظار بالثواني.
+        
+        العائد:
+            float: التكلفة بعد التقادم.
+        """
+        return cost / (1.0 + waited / cls.AGING_TIME)
+    
+    def _key(self, entry, current_time):
+        """مفتاح ترتيب مهمة منتظرة (الأصغر ينفذ أولاً)."""
+        return (
+            self.running.get(entry["clientId"], 0),
+            entry["priority"],
+            self.aged_cost(entry["cost"], current_time - entry["queuedAt"]),
+            entry["sequence"]
+        )
+    
+    def pop(self):
+        """
+        إخراج المهمة التالية وتسجيلها كمهمة جارية لعميلها.
+        
+        العائد:
+            tuple: (المهمة، معرف العميل)، أو (None, None) إذا كانت القائمة فارغة.
+        """
+        with self.lock:
+            if not self.entries:
+                return None, None
+            
+            current_time = time.time()
+            entry = min(self.entries, key=lambda candidate: self._key(candidate, current_time))
+            self.entries.remove(entry)
+            
+            client_id = entry["clientId"]
+            self.running[client_id] = self.running.get(client_id, 0) + 1
+            self.waits.append(current_time - entry["queuedAt"])
+            return entry["item"], client_id
+    
+    def finish(self, client_id):
+        """
+        تسجيل انتهاء مهمة جارية لعميل.
+        
+        المعلمات:
+            client_id (str): معرف العميل.
+        """
+        with self.lock:
+            count = self.running.get(client_id, 0) - 1
+            if count > 0:
+                self.running[client_id] = count
+            else:
+                self.running.pop(client_id, None)
+    
+    def count_pending(self, client_id):
+        """
+        عدد المهام المنتظرة لعميل.
+        
+        المعلمات:
+            client_id (str): معرف العميل.
+        
+        العائد:
+            int: عدد المهام.
+        """
+        with self.lock:
+            return sum(1 for entry in self.entries if entry["clientId"] == client_id)
+    
+    def get_wait_stats(self):
+        """
+        الحصول على إحصائيات وقت الانتظار في القائمة.
+        
+        العائد:
+            dict: عدد العينات والنسب المئوية p50 وp99 لوقت الانتظار بالثواني
+                  (None إذا لم تبدأ أي مهمة بعد).
+        """
+        with self.lock:
+            waits = list(self.waits)
+        return get_wait_stats(waits)
@@ -11,10 +11,16 @@ import cv2
 import numpy as np
 from werkzeug.utils import secure_filename
 
+# إضافة مسار الخادم الخلفي لاستخدام كاشف اللحظات المثيرة
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from utils.analysis_index import AnalysisIndex
+from utils.highlight_detector import HighlightDetector
+
 # إعداد التطبيق
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['PROCESSED_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'processed')
+app.config['ANALYSIS_INDEX_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analysis')
 app.config['ALLOWED_EXTENSIONS'] = {'mp4', 'avi', 'mov', 'webm'}
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500 ميجابايت كحد أقصى
 
@@ -61,20 +67,27 @@ def analyze_video(video_path):
         # فتح الفيديو
         video = VideoFileClip(video_path)
         duration = video.duration
-        
-        # في التطبيق الحقيقي، سنستخدم خوارزميات معالجة الفيديو والذكاء الاصطناعي
-        # لتحديد اللحظات المثيرة. هنا نستخدم محاكاة بسيطة.
-        
-        # تحديد مدة المقطع (بين 10 و 15 ثانية)
-        clip_duration = min(random.randint(10, 15), duration)
-        
-        # تحديد وقت البداية (مع ترك مساحة كافية للمقطع)
-        max_start_time = max(0, duration - clip_duration)
-        start_time = random.uniform(0, max_start_time)
+        has_audio = video.audio is not None
         
         # إغلاق الفيديو
         video.close()
         
+        # تحديد مدة المقطع (15 ثانية كحد أقصى)
+        clip_duration = min(15, duration)
+        
+        # اختيار المقطع الأعلى طاقة صوتية (يحفظ منحنى الطاقة في فهرس التحليل)
+        if has_audio:
+            index = AnalysisIndex(app.config['ANALYSIS_INDEX_FOLDER'])
+            highlights = HighlightDetector().detect(video_path, clip_duration, index=index)
+        else:
+            highlights = []
+        
+        if highlights:
+            start_time = highlights[0]["start_time"]
+        else:
+            # لا يوجد صوت للتحليل، يتم اختيار المقطع عند ثلث المدة
+            start_time = max(0, min(duration / 3, duration - clip_duration))
+        
         return {
             "start_time": start_time,
             "duration": clip_duration
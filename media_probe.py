@@ -0,0 +1,372 @@
+"""
+فحص ملفات الوسائط داخل العملية مع ذاكرة تخزين مؤقت للنتائج.
+يقرأ صندوق moov لملفات MP4/MOV مباشرة للحصول على المدة والمسارات وفهرس الإطارات
+المفتاحية دون تشغيل ffprobe، ويرجع إلى ffprobe للصيغ الأخرى. تحفظ النتائج حسب المسار
+والحجم ووقت التعديل، فلا يعاد فحص الملف نفسه ما لم يتغير.
+"""
+
+import os
+import json
+import struct
+import logging
+import numpy as np
+
+from .cache_manager import CacheManager
+from .error_handler import VideoProcessingError
+from .ffmpeg_progress import run_ffmpeg
+from .mp4_parser import parse_box_header, parse_moov
+
+logger = logging.getLogger(__name__)
+
+# الحد الأقصى لعدد الملفات المحفوظة نتائج فحصها
+PROBE_CACHE_SIZE = 256
+
+# مدة صلاحية نتيجة الفحص بالثواني (تتغير المفاتيح تلقائيًا عند تعديل الملف)
+PROBE_CACHE_AGE = 86400
+
+# أقصى حجم لصندوق moov يقرأ إلى الذاكرة (الملفات الأكبر تفحص بـ ffprobe)
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+# الصناديق التي يمكن أن تظهر في المستوى الأعلى لملف MP4/MOV
+TOP_LEVEL_BOXES = {
+    b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'uuid', b'pdin',
+    b'meta', b'styp', b'sidx', b'moof', b'mfra', b'pnot'
+}
+
+# أسماء الترميزات كما يعيدها ffprobe حسب رمز إدخال stsd
+CODEC_NAMES = {
+    'avc1': 'h264', 'avc3': 'h264', 'hvc1': 'hevc', 'hev1': 'hevc', 'av01': 'av1',
+    'vp09': 'vp9', 'mp4a': 'aac', 'Opus': 'opus', 'ac-3': 'ac3', 'ec-3': 'eac3', '.mp3': 'mp3'
+}
+
+# أنواع المسارات حسب معالج صندوق hdlr
+STREAM_TYPES = {'vide': 'video', 'soun': 'audio'}
+
+_cache = CacheManager(max_size=PROBE_CACHE_SIZE, max_age=PROBE_CACHE_AGE, enabled=True)
+
+def _cached(path, name, compute):
+    """
+    حساب نتيجة فحص لملف أو استرجاعها إذا لم يتغير الملف منذ حسابها.
+    
+    الروابط والمسارات غير الموجودة على القرص تحسب في كل مرة دون تخزين.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+        name (str): نوع النتيجة (جزء من مفتاح التخزين).
+        compute (callable): دالة بدون معاملات تعيد النتيجة.
+    
+    العائد:
+        أي: النتيجة.
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return compute()
+    
+    return _cache.get_or_compute(f"{name}_{path}_{stat.st_size}_{stat.st_mtime_ns}", compute, shared=False)
+
+def _parse_rate(value):
+    """
+    تحويل معدل إطارات بصيغة الكسر كما يعيده FFprobe (مثل 30000/1001) إلى رقم.
+    
+    المعلمات:
+        value (str): المعدل، أو None.
+    
+    العائد:
+        float: معدل الإطارات، أو None إذا لم يكن متاحًا.
+    """
+    numerator, _, denominator = str(value or "0/1").partition("/")
+    try:
+        rate = float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return rate or None
+
+def _read_moov(path):
+    """
+    قراءة صندوق moov من ملف MP4/MOV بالمرور على صناديق المستوى الأعلى.
+    
+    المعلمات:
+        path (str): مسار الملف.
+    
+    العائد:
+        bytes: صندوق moov كاملاً، أو None إذا لم يكن الملف MP4/MOV أو لم يحتوِ عليه.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            header = f.read(16)
+            try:
+                box_type, _, size = parse_box_header(header)
+            except VideoProcessingError:
+                return None
+            if box_type not in TOP_LEVEL_BOXES:
+                return None
+            if size == 0:
+                size = file_size - offset
+            
+            if box_type == b'moov':
+                if size > MAX_MOOV_SIZE or offset + size > file_size:
+                    return None
+                f.seek(offset)
+                return f.read(size)
+            offset += size
+    return None
+
+def _probe_mp4(path):
+    """
+    فحص ملف MP4/MOV من صندوق moov.
+    
+    المعلمات:
+        path (str): مسار الملف.
+    
+    العائد:
+        dict: نتيجة الفحص، أو None إذا لم يمكن فحص الملف بهذه الطريقة
+              (صيغة أخرى أو ملف مجزأ أو moov غير صالح).
+    """
+    moov = _read_moov(path)
+    if moov is None:
+        return None
+    
+    try:
+        movie = parse_moov(moov, sample_offsets=False)
+    except (VideoProcessingError, struct.error, IndexError, ValueError) as e:
+        logger.debug(f"تعذر تحليل صندوق moov، سيتم استخدام ffprobe: {path}: {str(e)}")
+        return None
+    
+    # الملفات المجزأة (moof) لا تحمل المدة وجداول العينات في moov
+    if not movie["duration"] or not movie["tracks"]:
+        return None
+    
+    streams = []
+    keyframes = None
+    for track in movie["tracks"]:
+        stream_type = STREAM_TYPES.get(track["handler"])
+        if stream_type is None:
+            continue
+        streams.append({
+            "type": stream_type,
+            "codec": CODEC_NAMES.get(track.get("fourcc"), track.get("fourcc")),
+            "width": track.get("width"),
+            "height": track.get("height"),
+            "duration": track["duration"],
+            # متوسط معدل الإطارات من عدد العينات ومدتها
+            "fps": len(track["presentation_times"]) / track["duration"]
+                   if stream_type == 'video' and track["duration"] else None
+        })
+        if stream_type == 'video' and keyframes is None:
+            keyframes = np.sort(track["presentation_times"][track["sync"]])
+    
+    return {"duration": movie["duration"], "streams": streams, "keyframes": keyframes, "source": "mp4"}
+
+def _probe_ffprobe(path):
+    """
+    فحص ملف وسائط باستخدام ffprobe (لا يتضمن فهرس الإطارات المفتاحية).
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+    
+    العائد:
+        dict: نتيجة الفحص.
+    
+    يرفع:
+        VideoProcessingError: إذا فشل ffprobe أو لم يعد المدة.
+    """
+    result = run_ffmpeg([
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration:stream=codec_type,codec_name,width,height,duration,avg_frame_rate",
+        "-of", "json",
+        path
+    ])
+    
+    if result.returncode != 0:
+        raise VideoProcessingError(f"خطأ في فحص ملف الوسائط: {result.stderr}")
+    
+    try:
+        info = json.loads(result.stdout or "{}")
+        duration = float(info["format"]["duration"])
+    except (ValueError, KeyError, TypeError):
+        raise VideoProcessingError(f"تعذر الحصول على مدة ملف الوسائط: {path}")
+    
+    streams = []
+    for stream in info.get("streams", []):
+        if stream.get("codec_type") not in ('video', 'audio'):
+            continue
+        try:
+            stream_duration = float(stream["duration"])
+        except (KeyError, TypeError, ValueError):
+            stream_duration = None
+        streams.append({
+            "type": stream["codec_type"],
+            "codec": stream.get("codec_name"),
+            "width": stream.get("width"),
+            "height": stream.get("height"),
+            "duration": stream_duration,
+            "fps": _parse_rate(stream.get("avg_frame_rate")) if stream["codec_type"] == 'video' else None
+        })
+    
+    return {"duration": duration, "streams": streams, "keyframes": None, "source": "ffprobe"}
+
+def probe_media(path):
+    """
+    فحص ملف وسائط، مع حفظ النتيجة حسب المسار والحجم ووقت التعديل.
+    
+    يقرأ صندوق moov لملفات MP4/MOV، ويستخدم ffprobe لغيرها. الروابط والمسارات غير
+    الموجودة على القرص تفحص في كل مرة دون تخزين.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+    
+    العائد:
+        dict: المدة بالثواني (duration) والمسارات (streams: النوع والترميز والأبعاد والمدة
+              ومتوسط معدل الإطارات للفيديو)
+              وأوقات الإطارات المفتاحية للفيديو (keyframes: مصفوفة مرتبة، أو None إذا لم
+              تكن متاحة) ومصدر النتيجة (source: mp4 أو ffprobe). النتيجة مشتركة ويجب عدم تعديلها.
+    
+    يرفع:
+        VideoProcessingError: إذا تعذر فحص الملف.
+    """
+    try:
+        return _cached(path, "probe", lambda: _probe_mp4(path) or _probe_ffprobe(path))
+    except OSError as e:
+        raise VideoProcessingError(f"خطأ في قراءة ملف الوسائط: {str(e)}")
+
+def get_duration(path):
+    """
+    الحصول على مدة ملف وسائط.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+    
+    العائد:
+        float: المدة بالثواني.
+    
+    يرفع:
+        VideoProcessingError: إذا تعذر فحص الملف.
+    """
+    return probe_media(path)["duration"]
+
+def get_video_stream_info(path):
+    """
+    الحصول على معلومات الترميز لمسار الفيديو الأول.
+    
+    تنسيق البكسل غير مخزن في الحاوية، فتستخدم ffprobe عند أول طلب لكل ملف فقط.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+    
+    العائد:
+        dict: الترميز (codec_name) والأبعاد وتنسيق البكسل (pix_fmt) ومعدل الإطارات (fps).
+    
+    يرفع:
+        VideoProcessingError: إذا فشل ffprobe.
+    """
+    def probe():
+        result = run_ffmpeg([
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=codec_name,width,height,pix_fmt,r_frame_rate",
+            "-of", "default=noprint_wrappers=1",
+            path
+        ])
+        
+        if result.returncode != 0:
+            raise VideoProcessingError(f"خطأ في الحصول على معلومات الفيديو: {result.stderr}")
+        
+        info = dict(line.split("=", 1) for line in result.stdout.splitlines() if "=" in line)
+        
+        return {
+            "codec_name": info.get("codec_name"),
+            "width": int(info.get("width", 0)),
+            "height": int(info.get("height", 0)),
+            "pix_fmt": info.get("pix_fmt"),
+            "fps": _parse_rate(info.get("r_frame_rate")) or 0
+        }
+    
+    return _cached(path, "stream", probe)
+
+def get_frame_rate(path):
+    """
+    الحصول على متوسط معدل الإطارات لمسار الفيديو الأول.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+    
+    العائد:
+        float: معدل الإطارات، أو None إذا لم يحتوِ الملف على فيديو أو لم يكن المعدل متاحًا.
+    
+    يرفع:
+        VideoProcessingError: إذا تعذر فحص الملف.
+    """
+    for stream in probe_media(path)["streams"]:
+        if stream["type"] == 'video':
+            return stream["fps"]
+    return None
+
+def has_audio_stream(path):
+    """
+    التحقق من وجود مسار صوتي في ملف وسائط.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+    
+    العائد:
+        bool: True إذا احتوى الملف على مسار صوتي.
+    
+    يرفع:
+        VideoProcessingError: إذا تعذر فحص الملف.
+    """
+    return any(stream["type"] == 'audio' for stream in probe_media(path)["streams"])
+
+def get_keyframe_times(path, start_time, end_time):
+    """
+    الحصول على أوقات الإطارات المفتاحية للفيديو ضمن نطاق زمني.
+    
+    تؤخذ من فهرس الملف المحفوظ إن كان متاحًا، وإلا تقرأ الحزم في النطاق فقط بـ ffprobe
+    دون فك ترميز.
+    
+    المعلمات:
+        path (str): مسار الملف أو رابطه.
+        start_time (float): بداية النطاق بالثواني.
+        end_time (float): نهاية النطاق بالثواني.
+    
+    العائد:
+        list: أوقات الإطارات المفتاحية مرتبة تصاعديًا (قد تتضمن إطارات قريبة خارج النطاق).
+    
+    يرفع:
+        VideoProcessingError: إذا تعذر فحص الملف.
+    """
+    keyframes = probe_media(path)["keyframes"]
+    if keyframes is not None:
+        # نفس النطاق الذي تقرؤه ffprobe: من البداية حتى ثانية بعد النهاية
+        selected = keyframes[(keyframes >= start_time) & (keyframes <= end_time + 1)]
+        return selected.tolist()
+    
+    result = run_ffmpeg([
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-read_intervals", f"{start_time}%{end_time + 1}",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        path
+    ])
+    
+    if result.returncode != 0:
+        raise VideoProcessingError(f"خطأ في الحصول على الإطارات المفتاحية: {result.stderr}")
+    
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    
+    return sorted(keyframes)
+
+def clear_cache():
+    """حذف جميع نتائج الفحص المحفوظة."""
+    _cache.clear()
@@ -0,0 +1,157 @@
+"""
+مخزن معلومات فيديوهات YouTube.
+يحفظ معلومات الفيديوهات ونتائج الطلبات الفاشلة (مثل الفيديوهات المحذوفة) في قاعدة
+بيانات SQLite مع وقت الحصول عليها، فتبقى بعد إعادة تشغيل الخادم ويحدد المستخدم
+مدى حداثتها المقبولة.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class MetadataStore:
+    """
+    مخزن دائم لمعلومات فيديوهات YouTube.
+    
+    لكل فيديو سجل واحد يحتوي على معلوماته بصيغة JSON أو رسالة الخطأ إذا فشل الحصول
+    عليها، مع وقت الحصول عليها. يستخدم وضع WAL ولكل خيط اتصال مستقل، فيمكن لعدة
+    عمليات استخدام نفس الملف.
+    """
+    
+    # عدد عمليات الحفظ بين كل حذف للسجلات القديمة
+    CLEANUP_INTERVAL = 64
+    
+    def __init__(self, path, max_age=None, error_max_age=None):
+        """
+        تهيئة مخزن المعلومات.
+        
+        المعلمات:
+            path (str): مسار ملف قاعدة البيانات.
+            max_age (float, اختياري): أقصى عمر لمعلومات الفيديو بالثواني، تحذف بعده.
+            error_max_age (float, اختياري): أقصى عمر للنتائج السلبية بالثواني، تحذف بعده.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.error_max_age = error_max_age
+        self.local = threading.local()
+        self.writes = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # إنشاء الجدول عند أول استخدام للملف
+        self._get_connection()
+    
+    def _get_connection(self):
+        """
+        الحصول على اتصال قاعدة البيانات الخاص بالخيط الحالي.
+        
+        العائد:
+            sqlite3.Connection: الاتصال.
+        """
+        # لا يجوز استخدام اتصال موروث من العملية الأم بعد fork
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS video_info ("
+                "video_id TEXT PRIMARY KEY, "
+                "info TEXT, "
+                "error TEXT, "
+                "fetched_at REAL NOT NULL)"
+            )
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+    
+    def get(self, video_id):
+        """
+        الحصول على سجل فيديو.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+        
+        العائد:
+            dict: المعلومات (info) أو رسالة الخطأ (error) ووقت الحصول عليها (fetchedAt)،
+                  أو None إذا لم يكن الفيديو في المخزن.
+        """
+        row = self._get_connection().execute(
+            "SELECT info, error, fetched_at FROM video_info WHERE video_id = ?",
+            (video_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        info, error, fetched_at = row
+        return {
+            "info": json.loads(info) if info is not None else None,
+            "error": error,
+            "fetchedAt": fetched_at
+        }
+    
+    def _write(self, video_id, info, error):
+        """
+        حفظ سجل فيديو وحذف السجلات القديمة بشكل دوري.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            info (str): معلومات الفيديو بصيغة JSON، أو None.
+            error (str): رسالة الخطأ، أو None.
+        """
+        connection = self._get_connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO video_info (video_id, info, error, fetched_at) VALUES (?, ?, ?, ?)",
+            (video_id, info, error, time.time())
+        )
+        
+        self.writes += 1
+        if self.max_age is not None and self.writes % self.CLEANUP_INTERVAL == 0:
+            removed = self.cleanup(self.max_age, self.error_max_age or self.max_age)
+            if removed:
+                logger.debug(f"تم حذف {removed} سجل قديم من مخزن معلومات YouTube")
+    
+    def put(self, video_id, info):
+        """
+        حفظ معلومات فيديو.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            info (dict): معلومات الفيديو (يجب أن تكون قابلة للتحويل إلى JSON).
+        """
+        self._write(video_id, json.dumps(info, ensure_ascii=False), None)
+    
+    def put_error(self, video_id, error):
+        """
+        حفظ نتيجة سلبية لفيديو (مثل فيديو محذوف أو خاص).
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            error (str): رسالة الخطأ.
+        """
+        self._write(video_id, None, error)
+    
+    def cleanup(self, max_age, error_max_age):
+        """
+        حذف السجلات الأقدم من أن تستخدم.
+        
+        المعلمات:
+            max_age (float): أقصى عمر لمعلومات الفيديو بالثواني.
+            error_max_age (float): أقصى عمر للنتائج السلبية بالثواني.
+        
+        العائد:
+            int: عدد السجلات المحذوفة.
+        """
+        current_time = time.time()
+        cursor = self._get_connection().execute(
+            "DELETE FROM video_info WHERE (error IS NULL AND fetched_at <= ?) OR (error IS NOT NULL AND fetched_at <= ?)",
+            (current_time - max_age, current_time - error_max_age)
+        )
+        return cursor.rowcount
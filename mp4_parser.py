@@ -0,0 +1,335 @@
+"""
+محلل حاويات MP4.
+يقرأ صناديق (boxes) ملف MP4 وجداول العينات في صندوق moov لتحديد مواقع بيانات
+كل مسار على القرص، دون الحاجة إلى فك ترميز الفيديو أو تشغيل ffprobe.
+"""
+
+import struct
+import logging
+import numpy as np
+
+from .error_handler import VideoProcessingError
+
+logger = logging.getLogger(__name__)
+
+def parse_box_header(data, offset=0):
+    """
+    قراءة ترويسة صندوق MP4.
+    
+    المعلمات:
+        data (bytes): البيانات.
+        offset (int, اختياري): موقع بداية الصندوق في البيانات.
+    
+    العائد:
+        tuple: (نوع الصندوق، حجم الترويسة، الحجم الكلي أو 0 إذا امتد إلى نهاية الملف).
+    
+    يرفع:
+        VideoProcessingError: إذا كانت البيانات غير كافية لقراءة الترويسة.
+    """
+    if len(data) - offset < 8:
+        raise VideoProcessingError("بيانات غير كافية لقراءة ترويسة الصندوق")
+    
+    size, box_type = struct.unpack_from('>I4s', data, offset)
+    header_size = 8
+    if size == 1:
+        if len(data) - offset < 16:
+            raise VideoProcessingError("بيانات غير كافية لقراءة ترويسة الصندوق")
+        size = struct.unpack_from('>Q', data, offset + 8)[0]
+        header_size = 16
+    elif size != 0 and size < 8:
+        raise VideoProcessingError(f"حجم صندوق غير صالح: {size}")
+    
+    return box_type, header_size, size
+
+def iter_boxes(data, start=0, end=None):
+    """
+    المرور على الصناديق المتتالية في جزء من البيانات.
+    
+    المعلمات:
+        data (bytes): البيانات.
+        start (int, اختياري): موقع أول صندوق.
+        end (int, اختياري): نهاية الجزء (الافتراضي: نهاية البيانات).
+    
+    العائد:
+        generator: (نوع الصندوق، بداية محتواه، نهاية الصندوق) لكل صندوق.
+    """
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        box_type, header_size, size = parse_box_header(data, offset)
+        box_end = end if size == 0 else offset + size
+        if box_end > end:
+            raise VideoProcessingError(f"الصندوق {box_type.decode('latin-1')} يتجاوز حدود البيانات")
+        yield box_type, offset + header_size, box_end
+        offset = box_end
+
+def _find_child(data, start, end, box_type):
+    """البحث عن أول صندوق فرعي من نوع معين وإرجاع (بداية محتواه، نهايته) أو None."""
+    for child_type, child_start, child_end in iter_boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+def _read_table(data, start, columns, dtype='>u4'):
+    """
+    قراءة جدول صندوق كامل (full box) يبدأ بعدد الإدخالات.
+    
+    المعلمات:
+        data (bytes): البيانات.
+        start (int): بداية محتوى الصندوق.
+        columns (int): عدد الأعمدة في كل إدخال.
+        dtype (str, اختياري): نوع القيم.
+    
+    العائد:
+        numpy.ndarray: مصفوفة (إدخالات × أعمدة).
+    """
+    count = struct.unpack_from('>I', data, start + 4)[0]
+    table = np.frombuffer(data, dtype=dtype, count=count * columns, offset=start + 8)
+    return table.reshape(count, columns).astype(np.int64)
+
+def _parse_edit_list(data, start, end, movie_timescale):
+    """
+    قراءة قائمة التعديلات (edts/elst) لمسار.
+    
+    المعلمات:
+        data (bytes): محتوى صندوق moov.
+        start (int): بداية محتوى صندوق trak.
+        end (int): نهاية صندوق trak.
+        movie_timescale (int): المقياس الزمني للفيلم من صندوق mvhd.
+    
+    العائد:
+        tuple: (بداية الوسائط بوحدات المسار، التأخير الأولي بالثواني) من التعديلات الفارغة
+               في البداية وأول تعديل غير فارغ.
+    """
+    edts = _find_child(data, start, end, b'edts')
+    elst = edts and _find_child(data, *edts, b'elst')
+    if not elst:
+        return 0, 0.0
+    
+    version = data[elst[0]]
+    count = struct.unpack_from('>I', data, elst[0] + 4)[0]
+    entry_format, entry_size = ('>Qq', 20) if version == 1 else ('>Ii', 12)
+    delay = 0
+    for index in range(count):
+        segment_duration, media_time = struct.unpack_from(entry_format, data, elst[0] + 8 + index * entry_size)
+        if media_time == -1:
+            # تعديل فارغ: يؤخر بداية المسار
+            delay += segment_duration
+            continue
+        return media_time, delay / float(movie_timescale) if movie_timescale else 0.0
+    return 0, 0.0
+
+def _sample_entry_info(data, start, end, handler):
+    """
+    قراءة نوع الترميز والأبعاد من أول إدخال في صندوق stsd.
+    
+    المعلمات:
+        data (bytes): محتوى صندوق moov.
+        start (int): بداية محتوى صندوق stsd.
+        end (int): نهاية صندوق stsd.
+        handler (str): نوع المسار من صندوق hdlr.
+    
+    العائد:
+        dict: رمز الترميز (fourcc) والعرض والارتفاع لمسارات الفيديو.
+    """
+    info = {"fourcc": None, "width": None, "height": None}
+    if end - start < 16:
+        return info
+    
+    entry_start = start + 8
+    info["fourcc"] = data[entry_start + 4:entry_start + 8].decode('latin-1')
+    if handler == 'vide' and end - entry_start >= 36:
+        # إدخال مرئي: 8 ترويسة + 8 محجوزة + 16 محجوزة ثم العرض والارتفاع
+        info["width"], info["height"] = struct.unpack_from('>HH', data, entry_start + 32)
+    return info
+
+def _parse_track(data, start, end, movie_timescale=None, sample_offsets=True):
+    """
+    تحليل صندوق trak واستخراج مواقع العينات وأوقاتها.
+    
+    المعلمات:
+        data (bytes): محتوى صندوق moov.
+        start (int): بداية محتوى صندوق trak.
+        end (int): نهاية صندوق trak.
+        movie_timescale (int, اختياري): المقياس الزمني للفيلم (لحساب تأخير قائمة التعديلات).
+        sample_offsets (bool, اختياري): حساب مواقع العينات وأحجامها (offsets وsizes تكون None
+                                        بدونها، وهي الجزء الأكثر كلفة للملفات الطويلة).
+    
+    العائد:
+        dict: بيانات المسار، أو None إذا لم يحتوِ على جداول عينات.
+    """
+    mdia = _find_child(data, start, end, b'mdia')
+    if mdia is None:
+        return None
+    
+    mdhd = _find_child(data, *mdia, b'mdhd')
+    hdlr = _find_child(data, *mdia, b'hdlr')
+    minf = _find_child(data, *mdia, b'minf')
+    stbl = minf and _find_child(data, *minf, b'stbl')
+    if not (mdhd and hdlr and stbl):
+        return None
+    
+    # المقياس الزمني للمسار: يختلف موقعه حسب إصدار الصندوق
+    version = data[mdhd[0]]
+    timescale = struct.unpack_from('>I', data, mdhd[0] + (20 if version == 1 else 12))[0]
+    handler = data[hdlr[0] + 8:hdlr[0] + 12].decode('latin-1')
+    
+    boxes = {box_type: (box_start, box_end) for box_type, box_start, box_end in iter_boxes(data, *stbl)}
+    if b'stts' not in boxes or b'stsc' not in boxes or b'stsz' not in boxes:
+        return None
+    
+    # أحجام العينات
+    stsz = boxes[b'stsz'][0]
+    sample_size, sample_count = struct.unpack_from('>II', data, stsz + 4)
+    if sample_count == 0:
+        return None
+    
+    offsets = sizes = None
+    if sample_offsets:
+        if sample_size:
+            sizes = np.full(sample_count, sample_size, dtype=np.int64)
+        else:
+            sizes = np.frombuffer(data, dtype='>u4', count=sample_count, offset=stsz + 12).astype(np.int64)
+        
+        # مواقع بداية الأجزاء (chunks)
+        if b'stco' in boxes:
+            chunk_offsets = _read_table(data, boxes[b'stco'][0], 1)[:, 0]
+        elif b'co64' in boxes:
+            chunk_offsets = _read_table(data, boxes[b'co64'][0], 1, dtype='>u8')[:, 0]
+        else:
+            return None
+        
+        # عدد العينات في كل جزء من جدول stsc
+        stsc = _read_table(data, boxes[b'stsc'][0], 3)
+        chunk_count = len(chunk_offsets)
+        run_lengths = np.diff(np.append(stsc[:, 0], chunk_count + 1))
+        samples_per_chunk = np.repeat(stsc[:, 1], np.maximum(run_lengths, 0))[:chunk_count]
+        
+        # موقع كل عينة = بداية جزئها + مجموع أحجام العينات السابقة في نفس الجزء
+        sample_chunks = np.repeat(np.arange(len(samples_per_chunk)), samples_per_chunk)[:sample_count]
+        if len(sample_chunks) < sample_count:
+            raise VideoProcessingError("جدول الأجزاء لا يغطي جميع العينات")
+        cumulative = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        chunk_first_sample = np.concatenate(([0], np.cumsum(samples_per_chunk)[:-1]))
+        offsets = chunk_offsets[sample_chunks] + cumulative - cumulative[chunk_first_sample[sample_chunks]]
+    
+    # وقت فك ترميز كل عينة من جدول stts
+    stts = _read_table(data, boxes[b'stts'][0], 2)
+    durations = np.repeat(stts[:, 1], stts[:, 0])[:sample_count]
+    decode_ticks = np.concatenate(([0], np.cumsum(durations)[:-1]))
+    times = decode_ticks / float(timescale)
+    
+    # العينات المفتاحية: جميع العينات إذا لم يوجد جدول stss
+    sync = np.ones(sample_count, dtype=bool)
+    if b'stss' in boxes:
+        sync[:] = False
+        sync[_read_table(data, boxes[b'stss'][0], 1)[:, 0] - 1] = True
+    
+    # وقت عرض كل عينة = وقت فك ترميزها + إزاحة ctts (إطارات B) مزاحًا بقائمة التعديلات
+    composition = np.zeros(sample_count, dtype=np.int64)
+    if b'ctts' in boxes:
+        ctts = _read_table(data, boxes[b'ctts'][0], 2, dtype='>i4')
+        offsets_run = np.repeat(ctts[:, 1], ctts[:, 0])[:sample_count]
+        composition[:len(offsets_run)] = offsets_run
+    media_start, delay = _parse_edit_list(data, start, end, movie_timescale)
+    presentation_times = (decode_ticks + composition - media_start) / float(timescale) + delay
+    
+    track = {
+        "handler": handler,
+        "timescale": timescale,
+        "duration": float(np.sum(durations)) / timescale,
+        "offsets": offsets,
+        "sizes": sizes,
+        "times": times,
+        "presentation_times": presentation_times,
+        "sync": sync
+    }
+    if b'stsd' in boxes:
+        track.update(_sample_entry_info(data, *boxes[b'stsd'], handler))
+    return track
+
+def parse_moov(data, sample_offsets=True):
+    """
+    تحليل محتوى صندوق moov.
+    
+    المعلمات:
+        data (bytes): صندوق moov كاملاً مع ترويسته.
+        sample_offsets (bool, اختياري): حساب مواقع العينات وأحجامها في الملف
+                                        (لا يلزم لقراءة المدة والأوقات فقط).
+    
+    العائد:
+        dict: المدة بالثواني وقائمة المسارات مع جداول عيناتها.
+    
+    يرفع:
+        VideoProcessingError: إذا لم يكن الصندوق moov صالحًا.
+    """
+    box_type, header_size, size = parse_box_header(data)
+    if box_type != b'moov':
+        raise VideoProcessingError("الصندوق ليس moov")
+    end = len(data) if size == 0 else size
+    
+    duration = None
+    timescale = None
+    tracks = []
+    try:
+        mvhd = _find_child(data, header_size, end, b'mvhd')
+        if mvhd is not None:
+            if data[mvhd[0]] == 1:
+                timescale, length = struct.unpack_from('>IQ', data, mvhd[0] + 20)
+            else:
+                timescale, length = struct.unpack_from('>II', data, mvhd[0] + 12)
+            duration = length / float(timescale) if timescale else None
+        
+        for child_type, child_start, child_end in iter_boxes(data, header_size, end):
+            if child_type == b'trak':
+                track = _parse_track(data, child_start, child_end, timescale, sample_offsets)
+                if track is not None:
+                    tracks.append(track)
+    except (struct.error, IndexError, ValueError) as e:
+        raise VideoProcessingError(f"صندوق moov غير صالح: {str(e)}")
+    
+    return {"duration": duration, "tracks": tracks}
+
+def get_segment_byte_range(movie, start_time, end_time, margin=1.0):
+    """
+    تحديد نطاق البايتات الذي يحتوي على بيانات جميع المسارات لنطاق زمني.
+    
+    يبدأ نطاق الفيديو من آخر إطار مفتاحي قبل بداية النطاق حتى يمكن فك ترميزه،
+    ويضاف هامش زمني من الجهتين لتغطية فروق التوقيت بين المسارات.
+    
+    المعلمات:
+        movie (dict): نتيجة parse_moov.
+        start_time (float): بداية النطاق بالثواني.
+        end_time (float): نهاية النطاق بالثواني.
+        margin (float, اختياري): الهامش الزمني بالثواني.
+    
+    العائد:
+        tuple: (أول بايت، البايت التالي لآخر بايت)، أو None إذا لم توجد عينات في النطاق.
+    """
+    # بداية النطاق الفعلية هي أول إطار مفتاحي للفيديو قبل البداية المطلوبة
+    range_start = max(start_time - margin, 0)
+    for track in movie["tracks"]:
+        if track["handler"] == 'vide' and len(track["times"]):
+            keyframe_times = track["times"][track["sync"] & (track["times"] <= range_start)]
+            if len(keyframe_times):
+                range_start = min(range_start, keyframe_times[-1])
+            else:
+                range_start = 0
+    
+    first_byte = None
+    last_byte = None
+    for track in movie["tracks"]:
+        selected = (track["times"] >= range_start - margin) & (track["times"] < end_time + margin)
+        if track["handler"] == 'vide':
+            selected &= track["times"] >= range_start
+        if not selected.any():
+            continue
+        
+        track_first = int(track["offsets"][selected].min())
+        track_last = int((track["offsets"][selected] + track["sizes"][selected]).max())
+        first_byte = track_first if first_byte is None else min(first_byte, track_first)
+        last_byte = track_last if last_byte is None else max(last_byte, track_last)
+    
+    if first_byte is None:
+        return None
+    return first_byte, last_byte
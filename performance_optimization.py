@@ -6,18 +6,32 @@
 import os
 import time
 import logging
+import importlib
 import functools
 import threading
-import multiprocessing
+import contextlib
+import concurrent.futures
 from flask import request, current_app, g
 import gzip
 import pickle
-from werkzeug.contrib.cache import SimpleCache
+
+from .cache_manager import CacheManager
 
 logger = logging.getLogger(__name__)
 
 # إنشاء ذاكرة تخزين مؤقت بسيطة
-cache = SimpleCache(threshold=1000, default_timeout=300)
+cache = CacheManager(max_size=1000, max_age=300, enabled=True)
+
+# عدد المهام الخلفية المتزامنة (مهمة لكل نواة)
+BACKGROUND_WORKERS = os.cpu_count() or 2
+
+# مجمعات التنفيذ المحدودة للمهام الخلفية، تنشأ عند أول استخدام
+_thread_pool = None
+_process_pool = None
+_pool_lock = threading.Lock()
+
+# فتحات استخدام وحدة المعالجة المركزية حسب النسبة المسموحة
+_cpu_slots = {}
 
 def setup_performance_optimization(app):
     """
@@ -78,7 +92,7 @@ def cache_result(timeout=300):
             
             # تنفيذ الدالة وتخزين النتيجة
             result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout=timeout)
+            cache.set(cache_key, result, ttl=timeout, shared=False)
             logger.debug(f"تم تخزين النتيجة في التخزين المؤقت: {cache_key}")
             return result
         return wrapper
@@ -131,40 +145,80 @@ def disk_cache(base_path, timeout=3600):
         return wrapper
     return decorator
 
+def _get_thread_pool():
+    """
+    الحصول على مجمع الخيوط المحدود للمهام الخلفية.
+    
+    العائد:
+        ThreadPoolExecutor: مجمع الخيوط.
+    """
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=BACKGROUND_WORKERS,
+                thread_name_prefix='background'
+            )
+        return _thread_pool
+
+def _get_process_pool():
+    """
+    الحصول على مجمع العمليات المحدود للمهام الخلفية.
+    
+    العائد:
+        ProcessPoolExecutor: مجمع العمليات.
+    """
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=BACKGROUND_WORKERS)
+        return _process_pool
+
+def _call_wrapped(module_name, qualname, args, kwargs):
+    """
+    استدعاء الدالة الأصلية لدالة مزخرفة داخل عملية المجمع.
+    
+    الدالة المزخرفة لا يمكن تمريرها إلى عملية أخرى مباشرة لأن اسمها يشير إلى الغلاف،
+    لذلك يتم البحث عنها بالاسم واستدعاء الدالة الأصلية.
+    """
+    target = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        target = getattr(target, name)
+    return target.__wrapped__(*args, **kwargs)
+
 def run_in_thread(func):
     """
-    مزخرف لتنفيذ الدالة في خيط منفصل.
+    مزخرف لتنفيذ الدالة في مجمع خيوط محدود.
+    
+    يتم تنفيذ BACKGROUND_WORKERS دالة على الأكثر في نفس الوقت، وتنتظر البقية دورها
+    بدلاً من إنشاء خيط جديد لكل استدعاء.
     
     المعلمات:
         func (function): الدالة المراد تنفيذها.
     
     العائد:
-        function: الدالة المزخرفة.
+        function: الدالة المزخرفة، وتعيد Future لنتيجة الدالة.
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        thread = threading.Thread(target=func, args=args, kwargs=kwargs)
-        thread.daemon = True
-        thread.start()
-        return thread
+        return _get_thread_pool().submit(func, *args, **kwargs)
     return wrapper
 
 def run_in_process(func):
     """
-    مزخرف لتنفيذ الدالة في عملية منفصلة.
+    مزخرف لتنفيذ الدالة في مجمع عمليات محدود.
+    
+    يجب أن تكون الدالة معرفة على مستوى الوحدة، وأن تكون معاملاتها ونتيجتها قابلة للتسلسل.
     
     المعلمات:
         func (function): الدالة المراد تنفيذها.
     
     العائد:
-        function: الدالة المزخرفة.
+        function: الدالة المزخرفة، وتعيد Future لنتيجة الدالة.
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        process = multiprocessing.Process(target=func, args=args, kwargs=kwargs)
-        process.daemon = True
-        process.start()
-        return process
+        return _get_process_pool().submit(_call_wrapped, func.__module__, func.__qualname__, args, kwargs)
     return wrapper
 
 def optimize_ffmpeg_command(command, preset=None, threads=None):
@@ -198,28 +252,25 @@ def optimize_ffmpeg_command(command, preset=None, threads=None):
     
     return optimized_command
 
+@contextlib.contextmanager
 def limit_cpu_usage(percent=80):
     """
-    تحديد استخدام وحدة المعالجة المركزية.
+    تحديد عدد العمليات الثقيلة المتزامنة حسب النسبة المسموحة من أنوية المعالج.
+    
+    يستخدم كمدير سياق حول العملية الثقيلة، وينتظر بدون استهلاك للمعالج حتى تتوفر
+    فتحة بدلاً من قياس استخدام المعالج بشكل متكرر:
+        with limit_cpu_usage(50):
+            ...
     
     المعلمات:
         percent (int): النسبة المئوية القصوى لاستخدام وحدة المعالجة المركزية.
     """
-    try:
-        import psutil
-        process = psutil.Process(os.getpid())
-        process.cpu_percent(interval=0.1)
-        
-        while True:
-            cpu_percent = process.cpu_percent(interval=0.1)
-            if cpu_percent > percent:
-                time.sleep(0.1)
-            else:
-                break
-    except ImportError:
-        logger.warning("لم يتم العثور على مكتبة psutil، لا يمكن تحديد استخدام وحدة المعالجة المركزية")
-    except Exception as e:
-        logger.warning(f"فشل تحديد استخدام وحدة المعالجة المركزية: {str(e)}")
+    slots = max(1, (os.cpu_count() or 1) * percent // 100)
+    with _pool_lock:
+        semaphore = _cpu_slots.setdefault(slots, threading.BoundedSemaphore(slots))
+    
+    with semaphore:
+        yield
 
 def cleanup_temp_files(directory, max_age=3600):
     """
@@ -244,16 +295,25 @@ def cleanup_temp_files(directory, max_age=3600):
     except Exception as e:
         logger.warning(f"فشل تنظيف الملفات المؤقتة: {str(e)}")
 
-@run_in_thread
 def schedule_cleanup(directory, interval=3600, max_age=86400):
     """
     جدولة تنظيف الملفات المؤقتة.
     
+    يعمل التنظيف في خيط مستقل دائم حتى لا يشغل أحد خيوط مجمع المهام الخلفية.
+    
     المعلمات:
         directory (str): مسار المجلد المؤقت.
         interval (int): الفاصل الزمني بين عمليات التنظيف بالثواني.
         max_age (int): العمر الأقصى للملفات بالثواني.
+    
+    العائد:
+        Thread: خيط التنظيف.
     """
-    while True:
-        cleanup_temp_files(directory, max_age)
-        time.sleep(interval)
+    def cleanup_loop():
+        while True:
+            cleanup_temp_files(directory, max_age)
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=cleanup_loop, name='temp-cleanup', daemon=True)
+    thread.start()
+    return thread
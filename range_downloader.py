@@ -0,0 +1,287 @@
+"""
+تنزيل الملفات الكبيرة عبر HTTP باتصالات متوازية.
+يقسم الملف إلى أجزاء تنزل بطلبات نطاق (HTTP Range) متزامنة، وتكتب مباشرة في
+مواقعها في ملف محجوز مسبقًا، مع ملف تقدم جانبي يسمح باستئناف التنزيل بعد فشله.
+"""
+
+import os
+import json
+import logging
+import threading
+import http.client
+import concurrent.futures
+from urllib.parse import urlsplit, urljoin
+
+from .error_handler import YouTubeError
+
+logger = logging.getLogger(__name__)
+
+class RangeDownloader:
+    """
+    تنزيل ملف بأجزاء متوازية.
+    
+    لكل خيط اتصال HTTP دائم يعاد استخدامه لجميع الأجزاء التي ينزلها، وتكتب
+    البيانات بـ os.pwrite فلا تحتاج الخيوط إلى مشاركة موقع الكتابة في الملف.
+    ويسجل ملف التقدم ({path}.progress) الأجزاء المكتملة، فيستأنف التنزيل التالي
+    لنفس المسار من حيث توقف.
+    """
+    
+    # حجم كتلة القراءة من الاستجابة
+    BLOCK_SIZE = 256 * 1024
+    
+    # الحد الأقصى لعدد إعادة التوجيه المتتالية
+    MAX_REDIRECTS = 5
+    
+    def __init__(self, url, connections=4, chunk_size=8 * 1024 * 1024, timeout=30, retries=3, progress=None):
+        """
+        تهيئة أداة التنزيل.
+        
+        المعلمات:
+            url (str): رابط الملف.
+            connections (int, اختياري): عدد الاتصالات المتزامنة.
+            chunk_size (int, اختياري): حجم كل جزء بالبايت.
+            timeout (int, اختياري): مهلة الاتصال والقراءة بالثواني.
+            retries (int, اختياري): عدد إعادة المحاولة لكل جزء.
+            progress (callable, اختياري): دالة تستدعى بـ (البايتات المكتملة، الحجم الكلي) عند تقدم التنزيل.
+        """
+        self.url = url
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.progress = progress
+        self.size = None
+        self.completed_bytes = 0
+        self.bytes_fetched = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.open_connections = []
+    
+    def _get_connection(self, reset=False):
+        """
+        الحصول على اتصال HTTP الخاص بالخيط الحالي.
+        
+        المعلمات:
+            reset (bool, اختياري): إغلاق الاتصال الحالي وفتح اتصال جديد.
+        
+        العائد:
+            http.client.HTTPConnection: الاتصال.
+        """
+        connection = getattr(self.local, 'connection', None)
+        target = urlsplit(self.url)
+        if connection is not None and (reset or self.local.netloc != target.netloc):
+            connection.close()
+            connection = None
+        
+        if connection is None:
+            if target.scheme == 'https':
+                connection = http.client.HTTPSConnection(target.netloc, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(target.netloc, timeout=self.timeout)
+            self.local.connection = connection
+            self.local.netloc = target.netloc
+            with self.lock:
+                self.open_connections.append(connection)
+        return connection
+    
+    def _request_range(self, start, end):
+        """
+        إرسال طلب نطاق باتصال الخيط الحالي مع اتباع إعادة التوجيه.
+        
+        المعلمات:
+            start (int): أول بايت.
+            end (int): البايت التالي لآخر بايت.
+        
+        العائد:
+            http.client.HTTPResponse: الاستجابة (يجب قراءتها بالكامل قبل الطلب التالي).
+        """
+        for _ in range(self.MAX_REDIRECTS + 1):
+            target = urlsplit(self.url)
+            path = target.path or '/'
+            if target.query:
+                path = f"{path}?{target.query}"
+            
+            connection = self._get_connection()
+            connection.request('GET', path, headers={"Range": f"bytes={start}-{end - 1}"})
+            response = connection.getresponse()
+            
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader('Location')
+                response.read()
+                self.url = urljoin(self.url, location)
+                continue
+            return response
+        
+        raise YouTubeError("عدد كبير من عمليات إعادة التوجيه")
+    
+    def get_size(self):
+        """
+        الحصول على حجم الملف والتحقق من دعم الخادم لطلبات النطاق.
+        
+        العائد:
+            int: حجم الملف بالبايت، أو None إذا لم يدعم الخادم طلبات النطاق.
+        """
+        if self.size is None:
+            response = self._request_range(0, 1)
+            if response.status != 206:
+                # عدم قراءة الملف كاملاً من خادم يتجاهل طلب النطاق
+                response.close()
+                self._get_connection(reset=True)
+                return None
+            
+            response.read()
+            total = response.getheader('Content-Range', '').rpartition('/')[2]
+            if total.isdigit():
+                self.size = int(total)
+        return self.size
+    
+    def _load_progress(self, progress_path):
+        """
+        قراءة الأجزاء المكتملة من ملف التقدم إذا كان يخص نفس الملف ونفس حجم الأجزاء.
+        
+        المعلمات:
+            progress_path (str): مسار ملف التقدم.
+        
+        العائد:
+            set: أرقام الأجزاء المكتملة.
+        """
+        try:
+            with open(progress_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        
+        if state.get("size") != self.size or state.get("chunk_size") != self.chunk_size:
+            return set()
+        return set(state.get("completed", []))
+    
+    def _save_progress(self, progress_path, completed):
+        """
+        حفظ الأجزاء المكتملة في ملف التقدم.
+        
+        المعلمات:
+            progress_path (str): مسار ملف التقدم.
+            completed (set): أرقام الأجزاء المكتملة.
+        """
+        temp_path = f"{progress_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"size": self.size, "chunk_size": self.chunk_size, "completed": sorted(completed)}, f)
+        os.replace(temp_path, progress_path)
+    
+    def _report_progress(self, length):
+        """إضافة بايتات مكتملة وإبلاغ دالة التقدم."""
+        with self.lock:
+            self.completed_bytes += length
+            completed_bytes = self.completed_bytes
+        if self.progress:
+            self.progress(completed_bytes, self.size)
+    
+    def _fetch_chunk(self, fd, start, end):
+        """
+        تنزيل جزء وكتابته في موقعه مع إعادة المحاولة عند الفشل.
+        
+        عند إعادة المحاولة يستأنف الجزء من آخر بايت تمت كتابته.
+        
+        المعلمات:
+            fd (int): واصف الملف الناتج.
+            start (int): أول بايت.
+            end (int): البايت التالي لآخر بايت.
+        
+        يرفع:
+            YouTubeError: إذا فشل تنزيل الجزء بعد جميع المحاولات.
+        """
+        offset = start
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._request_range(offset, end)
+                if response.status != 206:
+                    response.close()
+                    raise YouTubeError(f"استجابة غير متوقعة لطلب النطاق: {response.status}")
+                
+                while offset < end:
+                    block = response.read(min(self.BLOCK_SIZE, end - offset))
+                    if not block:
+                        raise YouTubeError("انقطع الاتصال قبل اكتمال الجزء")
+                    os.pwrite(fd, block, offset)
+                    offset += len(block)
+                    with self.lock:
+                        self.bytes_fetched += len(block)
+                    self._report_progress(len(block))
+                return
+            except (OSError, http.client.HTTPException, YouTubeError) as e:
+                if attempt == self.retries:
+                    raise YouTubeError(f"فشل تنزيل الجزء {start}-{end}: {str(e)}")
+                logger.warning(f"إعادة محاولة تنزيل الجزء {start}-{end} (المحاولة {attempt + 2}): {str(e)}")
+                self._get_connection(reset=True)
+    
+    def download(self, path):
+        """
+        تنزيل الملف إلى مسار معين، مع استئناف تنزيل سابق غير مكتمل لنفس المسار.
+        
+        المعلمات:
+            path (str): مسار الملف الناتج.
+        
+        العائد:
+            dict: حجم الملف والبايتات المنزلة في هذه المرة والبايتات المستأنفة من تنزيل سابق.
+        
+        يرفع:
+            YouTubeError: إذا لم يدعم الخادم طلبات النطاق أو فشل تنزيل أحد الأجزاء.
+        """
+        if self.get_size() is None:
+            raise YouTubeError("الخادم لا يدعم تنزيل الملف بأجزاء")
+        
+        progress_path = f"{path}.progress"
+        chunk_count = max(1, -(-self.size // self.chunk_size))
+        
+        # لا يمكن الاستئناف إلا إذا كان الملف الجزئي بنفس الحجم
+        completed = set()
+        if os.path.exists(path) and os.path.getsize(path) == self.size:
+            completed = self._load_progress(progress_path)
+        
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                # حجز مساحة الملف مسبقًا لتجنب تجزئته ونفاد المساحة أثناء التنزيل
+                os.ftruncate(fd, 0)
+                if hasattr(os, 'posix_fallocate') and self.size:
+                    os.posix_fallocate(fd, 0, self.size)
+                else:
+                    os.ftruncate(fd, self.size)
+            
+            pending = [index for index in range(chunk_count) if index not in completed]
+            resumed = sum(min(self.chunk_size, self.size - index * self.chunk_size) for index in completed)
+            if resumed:
+                logger.info(f"استئناف التنزيل من {resumed} من {self.size} بايت: {path}")
+            self.completed_bytes = 0
+            self._report_progress(resumed)
+            
+            def fetch(index):
+                start = index * self.chunk_size
+                self._fetch_chunk(fd, start, min(start + self.chunk_size, self.size))
+                with self.lock:
+                    completed.add(index)
+                    self._save_progress(progress_path, completed)
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.connections) as executor:
+                futures = [executor.submit(fetch, index) for index in pending]
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        future.result()
+                except Exception:
+                    # إيقاف الأجزاء التي لم تبدأ بعد، مع الاحتفاظ بالأجزاء المكتملة للاستئناف
+                    for future in futures:
+                        future.cancel()
+                    raise
+            
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+            with self.lock:
+                for connection in self.open_connections:
+                    connection.close()
+                self.open_connections = []
+        
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        
+        return {"size": self.size, "bytesFetched": self.bytes_fetched, "resumed": resumed}
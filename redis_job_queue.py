@@ -0,0 +1,501 @@
+"""
+قائمة انتظار المهام الخلفية على Redis.
+تشترك فيها عدة أجهزة معالجة في قائمة انتظار ونتائج واحدة، بنفس واجهة JobQueue،
+ويفضل كل جهاز المهام التي يحتفظ بملفها المصدر حتى لا يعاد تنزيله على جهاز آخر.
+تعمل مع أي خادم يدعم بروتوكول Redis (مثل Redis أو KeyDB أو fakeredis للاختبار).
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+
+from .job_manager import JobManager
+from .job_scheduler import JobScheduler, PRIORITY_NORMAL, get_wait_stats
+
+logger = logging.getLogger(__name__)
+
+class RedisJobQueue:
+    """
+    قائمة انتظار دائمة للمهام مشتركة بين الأجهزة عبر Redis.
+    
+    المفاتيح (جميعها تبدأ بالبادئة):
+        job:<id>       سجل المهمة (hash).
+        pending        المهام المنتظرة (sorted set حسب وقت الإنشاء).
+        running        المهام الجارية (sorted set حسب انتهاء الحجز).
+        finished       المهام المنتهية (sorted set حسب وقت الانتهاء، للتنظيف).
+        workers        العمال النشطون وأجهزتهم (hash بصيغة JSON).
+        affinity:<key> آخر جهاز نفذ مهمة لهذا الملف المصدر (مع مدة صلاحية).
+        durations/waits آخر مدد التنفيذ وأوقات الانتظار (للإحصائيات).
+    
+    يتم حجز المهمة بحذفها من pending، وZREM عملية ذرية، فلا يحصل عاملان على نفس
+    المهمة. تبقى المهمة التي يحتفظ جهاز نشط بملفها المصدر له لمدة affinity_wait
+    من إنشائها، ثم يمكن لأي جهاز تنفيذها.
+    """
+    
+    STATUS_PENDING = JobManager.STATUS_PENDING
+    STATUS_RUNNING = JobManager.STATUS_RUNNING
+    STATUS_COMPLETED = JobManager.STATUS_COMPLETED
+    STATUS_FAILED = JobManager.STATUS_FAILED
+    
+    # عدد المهام الأخيرة المستخدمة لحساب متوسط المدة والنسب المئوية لوقت الانتظار
+    STATS_SAMPLES = 1000
+    
+    # مدة تذكر الجهاز الذي يحتفظ بالملف المصدر (بالثواني)
+    AFFINITY_TTL = 3600
+    
+    def __init__(self, client, prefix='jobs', lease_duration=30, max_attempts=3, affinity_wait=5, node=None):
+        """
+        تهيئة قائمة الانتظار.
+        
+        المعلمات:
+            client (redis.Redis): اتصال Redis.
+            prefix (str): بادئة المفاتيح.
+            lease_duration (float): مدة حجز المهمة بالثواني قبل اعتبار العامل متوقفًا.
+            max_attempts (int): الحد الأقصى لمحاولات تنفيذ المهمة بعد توقف العمال.
+            affinity_wait (float): مدة احتفاظ جهاز الملف المصدر بأولوية تنفيذ المهمة بالثواني.
+            node (str, اختياري): اسم هذا الجهاز (الافتراضي: اسم المضيف).
+        """
+        self.client = client
+        self.prefix = prefix
+        self.lease_duration = lease_duration
+        self.max_attempts = max_attempts
+        self.affinity_wait = affinity_wait
+        self.node = node or socket.gethostname()
+    
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """
+        إنشاء قائمة انتظار من عنوان خادم Redis.
+        
+        المعلمات:
+            url (str): عنوان الخادم مثل redis://localhost:6379/0.
+            **kwargs: معاملات RedisJobQueue الأخرى.
+        
+        العائد:
+            RedisJobQueue: قائمة الانتظار.
+        
+        يرفع:
+            ImportError: إذا لم تكن مكتبة redis مثبتة.
+        """
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("مكتبة redis مطلوبة لاستخدام JOB_QUEUE_BACKEND = 'redis'")
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+    
+    def _key(self, *parts):
+        """بناء مفتاح Redis بالبادئة."""
+        return ':'.join((self.prefix,) + parts)
+    
+    def enqueue(self, job_type, func, args=(), kwargs=None, priority=PRIORITY_NORMAL, cost=0.0, client_id=None,
+                affinity=None):
+        """
+        إضافة مهمة إلى قائمة الانتظار.
+        
+        المعلمات:
+            job_type (str): نوع المهمة (للعرض فقط).
+            func (str): مرجع الدالة بصيغة 'module:qualname'.
+            args (tuple): المعاملات الموضعية (يجب أن تكون قابلة للتحويل إلى JSON).
+            kwargs (dict, اختياري): المعاملات المسماة (يجب أن تكون قابلة للتحويل إلى JSON).
+            priority (int): فئة الأولوية.
+            cost (float): التكلفة المتوقعة.
+            client_id (str, اختياري): معرف العميل صاحب المهمة.
+            affinity (str, اختياري): مفتاح الملف المصدر، لتفضيل الجهاز الذي يحتفظ به.
+        
+        العائد:
+            str: معرف المهمة.
+        """
+        job_id = str(uuid.uuid4())
+        created_at = time.time()
+        fields = {
+            "type": job_type,
+            "func": func,
+            "payload": json.dumps({"args": list(args), "kwargs": kwargs or {}}, ensure_ascii=False),
+            "status": self.STATUS_PENDING,
+            "priority": priority,
+            "cost": cost,
+            "attempts": 0,
+            "created_at": created_at
+        }
+        if client_id is not None:
+            fields["client_id"] = client_id
+        if affinity is not None:
+            fields["affinity"] = affinity
+        
+        pipeline = self.client.pipeline()
+        pipeline.hset(self._key('job', job_id), mapping=fields)
+        pipeline.zadd(self._key('pending'), {job_id: created_at})
+        pipeline.execute()
+        return job_id
+    
+    def _live_nodes(self, current_time):
+        """
+        الأجهزة التي لديها عمال نشطون.
+        
+        العائد:
+            dict: لكل جهاز قائمة سجلات عماله.
+        """
+        nodes = {}
+        for record in self.client.hvals(self._key('workers')):
+            record = json.loads(record)
+            if record["seenAt"] >= current_time - self.lease_duration:
+                nodes.setdefault(record["host"], []).append(record)
+        return nodes
+    
+    def lease(self, worker_id):
+        """
+        حجز المهمة التالية لعامل على هذا الجهاز.
+        
+        تعاد أولاً المهام التي انتهت مدة حجزها إلى قائمة الانتظار، أو تسجل كفاشلة إذا
+        استنفدت محاولاتها.
+        
+        المعلمات:
+            worker_id (str): معرف العامل.
+        
+        العائد:
+            dict: المهمة (jobId وtype وfunc وargs وkwargs وattempts)، أو None إذا لم توجد مهام.
+        """
+        current_time = time.time()
+        self._reclaim_expired(current_time)
+        
+        job_ids = self.client.zrange(self._key('pending'), 0, -1)
+        if not job_ids:
+            return None
+        
+        # عدد المهام الجارية لكل عميل
+        running_ids = self.client.zrange(self._key('running'), 0, -1)
+        running = {}
+        if running_ids:
+            pipeline = self.client.pipeline()
+            for running_id in running_ids:
+                pipeline.hget(self._key('job', running_id), 'client_id')
+            for client_id in pipeline.execute():
+                running[client_id] = running.get(client_id, 0) + 1
+        
+        pipeline = self.client.pipeline()
+        for job_id in job_ids:
+            pipeline.hmget(self._key('job', job_id), 'priority', 'cost', 'client_id', 'created_at', 'affinity')
+        records = pipeline.execute()
+        
+        # الجهاز الذي يحتفظ بالملف المصدر لكل مهمة
+        affinity_keys = sorted({record[4] for record in records if record[4]})
+        affinity_owners = {}
+        if affinity_keys:
+            values = self.client.mget([self._key('affinity', key) for key in affinity_keys])
+            affinity_owners = dict(zip(affinity_keys, values))
+        owners = [affinity_owners.get(record[4]) for record in records]
+        live_nodes = self._live_nodes(current_time)
+        
+        candidates = []
+        for job_id, record, owner in zip(job_ids, records, owners):
+            priority, cost, client_id, created_at, affinity = record
+            if priority is None:
+                continue
+            waited = current_time - float(created_at)
+            
+            # ترك المهمة لفترة قصيرة للجهاز النشط الذي يحتفظ بملفها المصدر
+            local = owner == self.node
+            if owner and not local and owner in live_nodes and waited < self.affinity_wait:
+                continue
+            
+            candidates.append((
+                (
+                    running.get(client_id, 0),
+                    int(priority),
+                    0 if local else 1,
+                    JobScheduler.aged_cost(float(cost), waited),
+                    float(created_at)
+                ),
+                job_id
+            ))
+        
+        for _, job_id in sorted(candidates):
+            # حذف المهمة من pending يحجزها لهذا العامل وحده
+            if not self.client.zrem(self._key('pending'), job_id):
+                continue
+            
+            job_key = self._key('job', job_id)
+            pipeline = self.client.pipeline()
+            pipeline.hset(job_key, mapping={
+                "status": self.STATUS_RUNNING,
+                "started_at": current_time,
+                "lease_owner": worker_id
+            })
+            pipeline.hincrby(job_key, 'attempts', 1)
+            pipeline.zadd(self._key('running'), {job_id: current_time + self.lease_duration})
+            pipeline.hmget(job_key, 'type', 'func', 'payload', 'created_at')
+            _, attempts, _, (job_type, func, payload, created_at) = pipeline.execute()
+            
+            self._record_sample('waits', current_time - float(created_at))
+            payload = json.loads(payload)
+            return {
+                "jobId": job_id,
+                "type": job_type,
+                "func": func,
+                "args": payload["args"],
+                "kwargs": payload["kwargs"],
+                "attempts": attempts
+            }
+        return None
+    
+    def _reclaim_expired(self, current_time):
+        """
+        إعادة المهام التي توقف عمالها عن تجديد حجزها إلى قائمة الانتظار.
+        
+        المعلمات:
+            current_time (float): الوقت الحالي.
+        """
+        for job_id in self.client.zrangebyscore(self._key('running'), '-inf', current_time):
+            # عامل واحد فقط يعالج كل مهمة منتهية الحجز
+            if not self.client.zrem(self._key('running'), job_id):
+                continue
+            
+            job_key = self._key('job', job_id)
+            attempts, lease_owner, created_at = self.client.hmget(job_key, 'attempts', 'lease_owner', 'created_at')
+            if created_at is None:
+                continue
+            
+            if int(attempts) >= self.max_attempts:
+                logger.error(f"فشلت المهمة {job_id} بعد {attempts} محاولات توقف فيها العامل")
+                pipeline = self.client.pipeline()
+                pipeline.hset(job_key, mapping={
+                    "status": self.STATUS_FAILED,
+                    "error": "توقف العامل أثناء تنفيذ المهمة",
+                    "finished_at": current_time
+                })
+                pipeline.hdel(job_key, 'lease_owner')
+                pipeline.zadd(self._key('finished'), {job_id: current_time})
+                pipeline.execute()
+            else:
+                logger.warning(f"إعادة المهمة {job_id} إلى قائمة الانتظار بعد توقف العامل {lease_owner}")
+                pipeline = self.client.pipeline()
+                pipeline.hset(job_key, 'status', self.STATUS_PENDING)
+                pipeline.hdel(job_key, 'lease_owner', 'started_at')
+                pipeline.zadd(self._key('pending'), {job_id: float(created_at)})
+                pipeline.execute()
+    
+    def heartbeat(self, job_id, worker_id):
+        """
+        تجديد حجز مهمة جارية.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            worker_id (str): معرف العامل.
+        
+        العائد:
+            bool: هل ما زال العامل يملك المهمة.
+        """
+        if self.client.hget(self._key('job', job_id), 'lease_owner') != worker_id:
+            return False
+        # XX: التجديد فقط إذا لم تتم إعادة المهمة إلى القائمة في هذه الأثناء
+        self.client.zadd(self._key('running'), {job_id: time.time() + self.lease_duration}, xx=True)
+        return self.client.zscore(self._key('running'), job_id) is not None
+    
+    def set_progress(self, job_id, progress):
+        """
+        تسجيل تقدم مهمة جارية.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            progress (dict): التقدم.
+        """
+        self.client.hset(self._key('job', job_id), 'progress', json.dumps(progress))
+    
+    def _record_sample(self, name, value):
+        """حفظ عينة لإحصائيات المدة أو الانتظار مع الاحتفاظ بآخر STATS_SAMPLES عينة فقط."""
+        pipeline = self.client.pipeline()
+        pipeline.lpush(self._key(name), value)
+        pipeline.ltrim(self._key(name), 0, self.STATS_SAMPLES - 1)
+        pipeline.execute()
+    
+    def _finish(self, job_id, worker_id, fields):
+        """
+        تسجيل انتهاء مهمة إذا كان العامل ما زال يملكها.
+        
+        العائد:
+            bool: هل تم التسجيل.
+        """
+        job_key = self._key('job', job_id)
+        if self.client.hget(job_key, 'lease_owner') != worker_id:
+            return False
+        if not self.client.zrem(self._key('running'), job_id):
+            return False
+        
+        current_time = time.time()
+        fields["finished_at"] = current_time
+        pipeline = self.client.pipeline()
+        pipeline.hset(job_key, mapping=fields)
+        pipeline.hdel(job_key, 'lease_owner')
+        pipeline.zadd(self._key('finished'), {job_id: current_time})
+        pipeline.hmget(job_key, 'started_at', 'affinity')
+        started_at, affinity = pipeline.execute()[-1]
+        
+        if fields["status"] == self.STATUS_COMPLETED:
+            self._record_sample('durations', current_time - float(started_at))
+            if affinity:
+                # هذا الجهاز يحتفظ الآن بالملف المصدر
+                self.client.set(self._key('affinity', affinity), self.node, ex=self.AFFINITY_TTL)
+        return True
+    
+    def complete(self, job_id, worker_id, result):
+        """
+        تسجيل اكتمال مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            worker_id (str): معرف العامل.
+            result (object): نتيجة المهمة (قابلة للتحويل إلى JSON).
+        
+        العائد:
+            bool: هل تم التسجيل (False إذا فقد العامل حجز المهمة).
+        """
+        return self._finish(job_id, worker_id, {
+            "status": self.STATUS_COMPLETED,
+            "result": json.dumps(result, ensure_ascii=False, default=str)
+        })
+    
+    def fail(self, job_id, worker_id, error):
+        """
+        تسجيل فشل مهمة. الأخطاء التي ترفعها المهمة نفسها لا يعاد تنفيذها.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+            worker_id (str): معرف العامل.
+            error (str): رسالة الخطأ.
+        
+        العائد:
+            bool: هل تم التسجيل (False إذا فقد العامل حجز المهمة).
+        """
+        return self._finish(job_id, worker_id, {"status": self.STATUS_FAILED, "error": error})
+    
+    def get(self, job_id):
+        """
+        الحصول على حالة مهمة.
+        
+        المعلمات:
+            job_id (str): معرف المهمة.
+        
+        العائد:
+            dict: سجل المهمة بنفس صيغة JobManager، أو None إذا لم يتم العثور عليها.
+        """
+        record = self.client.hgetall(self._key('job', job_id))
+        if not record:
+            return None
+        
+        def number(name):
+            value = record.get(name)
+            return float(value) if value is not None else None
+        
+        return {
+            "jobId": job_id,
+            "type": record["type"],
+            "status": record["status"],
+            "result": json.loads(record["result"]) if "result" in record else None,
+            "error": record.get("error"),
+            "progress": json.loads(record["progress"]) if "progress" in record else None,
+            "attempts": int(record["attempts"]),
+            "createdAt": number("created_at"),
+            "startedAt": number("started_at"),
+            "finishedAt": number("finished_at")
+        }
+    
+    def count_pending(self, client_id=None):
+        """
+        عدد المهام المنتظرة.
+        
+        المعلمات:
+            client_id (str, اختياري): حساب مهام هذا العميل فقط.
+        
+        العائد:
+            int: عدد المهام.
+        """
+        if client_id is None:
+            return self.client.zcard(self._key('pending'))
+        
+        pipeline = self.client.pipeline()
+        for job_id in self.client.zrange(self._key('pending'), 0, -1):
+            pipeline.hget(self._key('job', job_id), 'client_id')
+        return sum(1 for owner in pipeline.execute() if owner == client_id)
+    
+    def register_worker(self, worker_id, busy=False):
+        """
+        تسجيل أن عاملاً على هذا الجهاز ما زال يعمل.
+        
+        المعلمات:
+            worker_id (str): معرف العامل.
+            busy (bool, اختياري): هل ينفذ العامل مهمة حاليًا.
+        """
+        self.client.hset(self._key('workers'), worker_id, json.dumps({
+            "host": self.node,
+            "pid": os.getpid(),
+            "busy": bool(busy),
+            "seenAt": time.time()
+        }))
+    
+    def unregister_worker(self, worker_id):
+        """
+        حذف عامل متوقف.
+        
+        المعلمات:
+            worker_id (str): معرف العامل.
+        """
+        self.client.hdel(self._key('workers'), worker_id)
+    
+    def get_stats(self):
+        """
+        الحصول على إحصائيات قائمة الانتظار.
+        
+        العائد:
+            dict: عدد العمال النشطين وسعة كل جهاز (عدد عماله والمشغول منهم)، وعدد المهام
+                  الجارية والمنتظرة، ومتوسط مدة المهام والنسب المئوية لوقت الانتظار بالثواني.
+        """
+        nodes = {
+            host: {"workers": len(records), "busy": sum(1 for record in records if record["busy"])}
+            for host, records in self._live_nodes(time.time()).items()
+        }
+        
+        pipeline = self.client.pipeline()
+        pipeline.zcard(self._key('running'))
+        pipeline.zcard(self._key('pending'))
+        pipeline.lrange(self._key('durations'), 0, -1)
+        pipeline.lrange(self._key('waits'), 0, -1)
+        running, pending, durations, waits = pipeline.execute()
+        
+        return {
+            "workers": sum(node["workers"] for node in nodes.values()),
+            "nodes": nodes,
+            "running": running,
+            "pending": pending,
+            "averageDuration": sum(map(float, durations)) / len(durations) if durations else None,
+            "queueWait": get_wait_stats([float(wait) for wait in waits])
+        }
+    
+    def cleanup(self, result_ttl):
+        """
+        حذف المهام المنتهية القديمة والعمال المتوقفين.
+        
+        المعلمات:
+            result_ttl (float): مدة الاحتفاظ بالمهام المنتهية بالثواني.
+        
+        العائد:
+            int: عدد المهام المحذوفة.
+        """
+        current_time = time.time()
+        expired = self.client.zrangebyscore(self._key('finished'), '-inf', current_time - result_ttl)
+        if expired:
+            pipeline = self.client.pipeline()
+            for job_id in expired:
+                pipeline.delete(self._key('job', job_id))
+            pipeline.zrem(self._key('finished'), *expired)
+            pipeline.execute()
+        
+        stale = [
+            worker_id for worker_id, record in self.client.hgetall(self._key('workers')).items()
+            if json.loads(record)["seenAt"] < current_time - max(result_ttl, self.lease_duration)
+        ]
+        if stale:
+            self.client.hdel(self._key('workers'), *stale)
+        return len(expired)
@@ -0,0 +1,257 @@
+"""
+كاشف تغير المشاهد والحركة في الفيديو.
+يبني خطًا زمنيًا مضغوطًا لكل فيديو من إطارات رمادية مصغرة يتم قراءتها من FFmpeg،
+ويحفظه بجانب الفيديو المصدر ليتم الاستعلام عنه لاحقًا دون إعادة فك الترميز.
+"""
+
+import os
+import logging
+import subprocess
+import numpy as np
+
+from .error_handler import VideoProcessingError
+
+logger = logging.getLogger(__name__)
+
+# أعمدة الخط الزمني
+TIMELINE_TIME = 0
+TIMELINE_HISTOGRAM_DIFF = 1
+TIMELINE_MOTION = 2
+
+class SceneDetector:
+    """
+    كاشف تغير المشاهد وطاقة الحركة.
+    
+    يقرأ الإطارات بدقة منخفضة (مثل 64x36) وبمعدل إطارات منخفض من FFmpeg
+    كبيانات rawvideo إلى مخزن دائري محجوز مسبقًا، ويحسب لكل إطار فرق المدرج
+    التكراري وطاقة الحركة مقارنة بالإطار السابق.
+    """
+    
+    def __init__(self, width=64, height=36, fps=2, histogram_bins=32, buffer_frames=64):
+        """
+        تهيئة كاشف المشاهد.
+        
+        المعلمات:
+            width (int): عرض الإطار المصغر.
+            height (int): ارتفاع الإطار المصغر.
+            fps (float): معدل الإطارات المستخدم للتحليل.
+            histogram_bins (int): عدد فئات المدرج التكراري (يجب أن يقسم 256).
+            buffer_frames (int): عدد الإطارات في المخزن الدائري.
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.histogram_bins = histogram_bins
+        self.buffer_frames = buffer_frames
+    
+    def get_timeline_path(self, video_path):
+        """
+        الحصول على مسار ملف الخط الزمني بجانب الفيديو المصدر.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+        
+        العائد:
+            str: مسار ملف الخط الزمني.
+        """
+        return f"{os.path.splitext(video_path)[0]}.timeline.npy"
+    
+    def _compute_batch(self, frames, count):
+        """
+        حساب فرق المدرج التكراري وطاقة الحركة لدفعة من الإطارات.
+        
+        المعلمات:
+            frames (numpy.ndarray): المخزن الدائري، الخانة 0 تحتوي على الإطار السابق للدفعة.
+            count (int): عدد الإطارات الجديدة في الخانات 1..count.
+        
+        العائد:
+            tuple: (فروق المدرج التكراري، طاقة الحركة) لكل إطار جديد.
+        """
+        batch = frames[:count + 1]
+        pixels = self.width * self.height
+        
+        # مدرج تكراري لكل إطار باستدعاء bincount واحد على الدفعة كاملة
+        shift = 8 - int(np.log2(self.histogram_bins))
+        bins = (batch.reshape(count + 1, -1) >> shift).astype(np.intp)
+        bins += np.arange(count + 1, dtype=np.intp)[:, None] * self.histogram_bins
+        histograms = np.bincount(bins.ravel(), minlength=(count + 1) * self.histogram_bins)
+        histograms = histograms.reshape(count + 1, self.histogram_bins) / pixels
+        
+        # نصف مجموع الفروق المطلقة بين المدرجات (بين 0 و1)
+        histogram_diff = np.abs(np.diff(histograms, axis=0)).sum(axis=1) / 2
+        
+        # متوسط الفرق المطلق بين كل إطار والإطار السابق (بين 0 و1)
+        motion = np.abs(np.diff(batch.astype(np.int16), axis=0)).mean(axis=(1, 2)) / 255
+        
+        return histogram_diff, motion
+    
+    def build_timeline(self, video_path):
+        """
+        بناء الخط الزمني للفيديو من إطاراته المصغرة.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+        
+        العائد:
+            numpy.ndarray: مصفوفة (إطارات × 3) تحتوي على الوقت وفرق المدرج التكراري وطاقة الحركة.
+        
+        يرفع:
+            VideoProcessingError: إذا فشلت قراءة الإطارات.
+        """
+        command = [
+            "ffmpeg",
+            "-v", "error",
+            "-i", video_path,
+            "-an",
+            "-sn",
+            "-vf", f"fps={self.fps},scale={self.width}:{self.height},format=gray",
+            "-f", "rawvideo",
+            "-"
+        ]
+        
+        frame_size = self.width * self.height
+        
+        # المخزن الدائري: الخانة 0 للإطار الأخير من الدفعة السابقة، والباقي للدفعة الحالية
+        frames = np.zeros((self.buffer_frames + 1, self.height, self.width), dtype=np.uint8)
+        buffer = memoryview(frames.reshape(-1))
+        
+        histogram_diffs = []
+        motions = []
+        first_batch = True
+        
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            while True:
+                # القراءة مباشرة إلى المخزن دون إنشاء كائنات وسيطة
+                filled = 0
+                target = buffer[frame_size:]
+                while filled < len(target):
+                    read = process.stdout.readinto(target[filled:])
+                    if not read:
+                        break
+                    filled += read
+                
+                count = filled // frame_size
+                if count == 0:
+                    break
+                
+                if first_batch:
+                    # الإطار الأول لا يسبقه إطار، فيتم مقارنته بنفسه
+                    frames[0] = frames[1]
+                    first_batch = False
+                
+                histogram_diff, motion = self._compute_batch(frames, count)
+                histogram_diffs.append(histogram_diff)
+                motions.append(motion)
+                
+                frames[0] = frames[count]
+                if filled < len(target):
+                    break
+            
+            stderr = process.stderr.read()
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        if process.returncode != 0:
+            raise VideoProcessingError(f"خطأ في قراءة إطارات الفيديو: {stderr.decode(errors='replace').strip()}")
+        
+        if not histogram_diffs:
+            return np.zeros((0, 3), dtype=np.float32)
+        
+        histogram_diff = np.concatenate(histogram_diffs)
+        timeline = np.empty((len(histogram_diff), 3), dtype=np.float32)
+        timeline[:, TIMELINE_TIME] = np.arange(len(histogram_diff)) / self.fps
+        timeline[:, TIMELINE_HISTOGRAM_DIFF] = histogram_diff
+        timeline[:, TIMELINE_MOTION] = np.concatenate(motions)
+        
+        logger.debug(f"تم بناء الخط الزمني للفيديو: {video_path} ({len(timeline)} إطار)")
+        return timeline
+    
+    def get_timeline(self, video_path, index=None):
+        """
+        الحصول على الخط الزمني للفيديو، مع بنائه وحفظه إذا لم يكن محفوظًا.
+        
+        إذا تم تمرير فهرس التحليل يتم حفظ الخط الزمني فيه، وإلا يتم حفظه بجانب
+        الفيديو المصدر وإعادة بنائه إذا كان أقدم من الفيديو.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+            index (AnalysisIndex, اختياري): فهرس التحليل المستخدم لحفظ الخط الزمني.
+        
+        العائد:
+            numpy.ndarray: الخط الزمني للفيديو.
+        
+        يرفع:
+            VideoProcessingError: إذا فشلت قراءة الإطارات.
+        """
+        if index is not None:
+            key = index.get_key(video_path)
+            name = f"timeline_{self.width}x{self.height}_{self.fps}_{self.histogram_bins}"
+            
+            timeline = index.get_array(key, name)
+            if timeline is None:
+                timeline = self.build_timeline(video_path)
+                index.put_array(key, name, timeline)
+            return timeline
+        
+        timeline_path = self.get_timeline_path(video_path)
+        
+        if os.path.exists(timeline_path) and os.path.getmtime(timeline_path) >= os.path.getmtime(video_path):
+            return np.load(timeline_path, mmap_mode='r')
+        
+        timeline = self.build_timeline(video_path)
+        
+        # الحفظ في ملف مؤقت ثم استبداله لتجنب قراءة ملف غير مكتمل
+        temp_path = f"{timeline_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, timeline)
+        os.replace(temp_path, timeline_path)
+        
+        return timeline
+
+def find_scene_cuts(timeline, threshold=0.35, min_gap=1.0):
+    """
+    تحديد أوقات تغير المشاهد من الخط الزمني.
+    
+    المعلمات:
+        timeline (numpy.ndarray): الخط الزمني للفيديو.
+        threshold (float): الحد الأدنى لفرق المدرج التكراري لاعتباره تغيرًا للمشهد.
+        min_gap (float): أقل فاصل زمني بين تغيرين متتاليين بالثواني.
+    
+    العائد:
+        list: أوقات تغير المشاهد بالثواني.
+    """
+    candidates = np.flatnonzero(timeline[:, TIMELINE_HISTOGRAM_DIFF] >= threshold)
+    
+    cuts = []
+    for index in candidates:
+        time = float(timeline[index, TIMELINE_TIME])
+        if not cuts or time - cuts[-1] >= min_gap:
+            cuts.append(time)
+    return cuts
+
+def motion_energy(timeline, start_time, duration):
+    """
+    حساب متوسط طاقة الحركة في مقطع من الفيديو.
+    
+    المعلمات:
+        timeline (numpy.ndarray): الخط الزمني للفيديو.
+        start_time (float): وقت بداية المقطع بالثواني.
+        duration (float): مدة المقطع بالثواني.
+    
+    العائد:
+        float: متوسط طاقة الحركة (بين 0 و1)، أو 0 إذا لم يحتوِ المقطع على إطارات.
+    """
+    times = timeline[:, TIMELINE_TIME]
+    first, last = np.searchsorted(times, [start_time, start_time + duration])
+    if last <= first:
+        return 0.0
+    return float(timeline[first:last, TIMELINE_MOTION].mean())
@@ -0,0 +1,214 @@
+"""
+تنزيل جزء زمني من فيديو MP4 عبر HTTP.
+ينزل فهرس الحاوية (moov) ونطاق البايتات الذي يغطي النطاق الزمني المطلوب فقط،
+ويكتبها في مواقعها الأصلية داخل ملف متفرق (sparse) بنفس حجم الملف الكامل، فيمكن
+لـ ffmpeg قراءة النطاق المطلوب منه كأنه الملف الكامل.
+"""
+
+import re
+import logging
+import urllib.request
+
+from .error_handler import YouTubeError
+from .mp4_parser import parse_box_header, parse_moov, get_segment_byte_range
+
+logger = logging.getLogger(__name__)
+
+class SegmentFetcher:
+    """
+    تنزيل أجزاء زمنية من ملف MP4 على خادم يدعم طلبات النطاق (HTTP Range).
+    """
+    
+    # حجم الجزء الأول المقروء من الملف، ويكفي عادةً لصندوقي ftyp وmoov لفيديو قصير
+    HEAD_SIZE = 64 * 1024
+    
+    # حجم كتلة القراءة من الاستجابة عند نسخ البيانات إلى الملف، وهو أيضًا أصغر
+    # نطاق يبلغ عنه on_data، فيبقى صغيرًا ليبدأ القارئ دون انتظار طويل
+    BLOCK_SIZE = 256 * 1024
+    
+    def __init__(self, url, timeout=30):
+        """
+        تهيئة أداة التنزيل.
+        
+        المعلمات:
+            url (str): رابط ملف MP4.
+            timeout (int, اختياري): مهلة كل طلب بالثواني.
+        """
+        self.url = url
+        self.timeout = timeout
+        self.file_size = None
+        self.bytes_fetched = 0
+    
+    def _open_range(self, start, end):
+        """
+        إرسال طلب نطاق والتحقق من دعمه.
+        
+        المعلمات:
+            start (int): أول بايت.
+            end (int): البايت التالي لآخر بايت.
+        
+        العائد:
+            http.client.HTTPResponse: الاستجابة.
+        
+        يرفع:
+            YouTubeError: إذا لم يدعم الخادم طلبات النطاق.
+        """
+        request = urllib.request.Request(self.url, headers={"Range": f"bytes={start}-{end - 1}"})
+        response = urllib.request.urlopen(request, timeout=self.timeout)
+        if response.status != 206:
+            response.close()
+            raise YouTubeError("الخادم لا يدعم تنزيل جزء من الملف")
+        
+        # الحجم الكلي للملف من ترويسة Content-Range: bytes start-end/size
+        match = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+        if match:
+            self.file_size = int(match.group(1))
+        return response
+    
+    def _fetch_range(self, start, end):
+        """
+        تنزيل نطاق بايتات صغير إلى الذاكرة.
+        
+        المعلمات:
+            start (int): أول بايت.
+            end (int): البايت التالي لآخر بايت.
+        
+        العائد:
+            bytes: البيانات.
+        """
+        with self._open_range(start, end) as response:
+            data = response.read()
+        self.bytes_fetched += len(data)
+        return data
+    
+    def _write(self, output, offset, data, on_data=None):
+        """
+        كتابة بيانات في موقعها في الملف وإبلاغ دالة on_data بعد تفريغها إلى الملف.
+        
+        المعلمات:
+            output (file): الملف الناتج المفتوح للكتابة.
+            offset (int): موقع البيانات.
+            data (bytes): البيانات.
+            on_data (callable, اختياري): دالة تستدعى بـ (أول بايت، البايت التالي لآخر بايت).
+        """
+        output.seek(offset)
+        output.write(data)
+        if on_data:
+            output.flush()
+            on_data(offset, offset + len(data))
+    
+    def _copy_range(self, output, start, end, on_data=None):
+        """
+        تنزيل نطاق بايتات وكتابته في موقعه الأصلي في الملف على دفعات.
+        
+        المعلمات:
+            output (file): الملف الناتج المفتوح للكتابة.
+            start (int): أول بايت.
+            end (int): البايت التالي لآخر بايت.
+            on_data (callable, اختياري): دالة تستدعى بعد كتابة كل دفعة.
+        """
+        offset = start
+        with self._open_range(start, end) as response:
+            while True:
+                # read1 يعيد ما وصل من البيانات دون انتظار امتلاء الكتلة
+                block = response.read1(self.BLOCK_SIZE)
+                if not block:
+                    break
+                self._write(output, offset, block, on_data)
+                offset += len(block)
+                self.bytes_fetched += len(block)
+    
+    def _read_top_level_boxes(self, head):
+        """
+        قراءة ترويسات الصناديق الرئيسية في الملف.
+        
+        المعلمات:
+            head (bytes): بداية الملف.
+        
+        العائد:
+            list: (نوع الصندوق، موقعه، حجم ترويسته، حجمه الكلي) لكل صندوق.
+        """
+        boxes = []
+        offset = 0
+        while offset < self.file_size:
+            # قراءة الترويسة من بداية الملف المنزلة إن أمكن
+            if offset + 16 <= len(head):
+                header = head[offset:offset + 16]
+            else:
+                header = self._fetch_range(offset, min(offset + 16, self.file_size))
+            
+            box_type, header_size, size = parse_box_header(header)
+            if size == 0:
+                size = self.file_size - offset
+            boxes.append((box_type, offset, header_size, size))
+            offset += size
+        return boxes
+    
+    def fetch(self, output_path, start_time, duration, margin=1.0, on_data=None):
+        """
+        تنزيل فهرس الفيديو والبيانات التي تغطي نطاقًا زمنيًا.
+        
+        تسمح on_data بقراءة الملف أثناء تنزيله (انظر GrowingFile): يحجز الملف بحجمه
+        الكامل قبل أول استدعاء لها، ثم تستدعى بعد كتابة كل نطاق.
+        
+        المعلمات:
+            output_path (str): مسار الملف الناتج.
+            start_time (float): بداية النطاق بالثواني.
+            duration (float): مدة النطاق بالثواني.
+            margin (float, اختياري): هامش زمني إضافي من الجهتين بالثواني.
+            on_data (callable, اختياري): دالة تستدعى بـ (أول بايت، البايت التالي لآخر بايت)
+                                         بعد كتابة كل نطاق في الملف.
+        
+        العائد:
+            dict: معلومات الجزء المنزل (الحجم الكلي للملف، البايتات المنزلة، مدة الفيديو، نطاق البيانات).
+        
+        يرفع:
+            YouTubeError: إذا لم يدعم الخادم طلبات النطاق أو لم يحتوِ الملف على صندوق moov.
+            VideoProcessingError: إذا كان صندوق moov غير صالح.
+        """
+        head = self._fetch_range(0, self.HEAD_SIZE)
+        if self.file_size is None:
+            raise YouTubeError("تعذر تحديد حجم الملف")
+        
+        boxes = self._read_top_level_boxes(head)
+        
+        with open(output_path, 'wb') as output:
+            # ملف متفرق بنفس حجم الملف الكامل، لا يشغل على القرص إلا البيانات المكتوبة
+            output.truncate(self.file_size)
+            self._write(output, 0, head, on_data)
+            
+            moov = None
+            for box_type, offset, header_size, size in boxes:
+                if box_type == b'mdat':
+                    # ترويسة البيانات فقط، والبيانات نفسها تنزل حسب النطاق الزمني
+                    length = header_size
+                else:
+                    length = size
+                
+                if offset + length <= len(head):
+                    data = head[offset:offset + length]
+                else:
+                    data = self._fetch_range(offset, offset + length)
+                    self._write(output, offset, data, on_data)
+                
+                if box_type == b'moov':
+                    moov = data
+            
+            if moov is None:
+                raise YouTubeError("لم يتم العثور على فهرس الفيديو (moov)")
+            
+            movie = parse_moov(moov)
+            byte_range = get_segment_byte_range(movie, start_time, start_time + duration, margin)
+            if byte_range:
+                logger.info(
+                    f"تنزيل البايتات {byte_range[0]}-{byte_range[1]} من {self.file_size} "
+                    f"للنطاق الزمني {start_time}-{start_time + duration}"
+                )
+                self._copy_range(output, byte_range[0], byte_range[1], on_data)
+        
+        return {
+            "size": self.file_size,
+            "bytesFetched": self.bytes_fetched,
+            "duration": movie["duration"],
+            "byteRange": list(byte_range) if byte_range else None
+        }
@@ -0,0 +1,176 @@
+"""
+ذاكرة التخزين المؤقت المشتركة بين العمليات.
+توفر طبقة تخزين مؤقت مبنية على SQLite بوضع WAL تشترك فيها جميع عمليات الخادم
+على نفس الجهاز، وتبقى نتائجها بعد إعادة تشغيل العمليات أو النشر.
+"""
+
+import os
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class SharedCache:
+    """
+    ذاكرة تخزين مؤقت مشتركة بين العمليات مبنية على SQLite.
+    
+    يستخدم وضع WAL ليتمكن القراء من القراءة أثناء الكتابة دون انتظار، ولكل خيط
+    اتصال مستقل بقاعدة البيانات. تحفظ القيم بصيغة pickle مع وقت انتهاء صلاحيتها،
+    وتتم إزالة أقدم العناصر استخدامًا عند تجاوز الحجم المسموح.
+    """
+    
+    # أقل فترة بين تحديثين لوقت آخر استخدام نفس العنصر (بالثواني)
+    TOUCH_INTERVAL = 60
+    
+    # عدد عمليات التخزين بين كل تحقق من الحجم الكلي
+    SIZE_CHECK_INTERVAL = 32
+    
+    def __init__(self, path, max_bytes=None):
+        """
+        تهيئة ذاكرة التخزين المؤقت المشتركة.
+        
+        المعلمات:
+            path (str): مسار ملف قاعدة البيانات.
+            max_bytes (int, اختياري): الحد الأقصى لحجم القيم المخزنة بالبايت.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.writes = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # إنشاء الجدول عند أول استخدام للملف
+        self._get_connection()
+    
+    def _get_connection(self):
+        """
+        الحصول على اتصال قاعدة البيانات الخاص بالخيط الحالي.
+        
+        العائد:
+            sqlite3.Connection: الاتصال.
+        """
+        # لا يجوز استخدام اتصال موروث من العملية الأم بعد fork
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, "
+                "value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+    
+    def get(self, key):
+        """
+        الحصول على قيمة من ذاكرة التخزين المؤقت المشتركة.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+        
+        العائد:
+            tuple: (القيمة، وقت انتهاء الصلاحية)، أو None إذا لم يتم العثور على المفتاح أو انتهت صلاحيته.
+        """
+        connection = self._get_connection()
+        row = connection.execute(
+            "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        value, expires_at, accessed_at = row
+        current_time = time.time()
+        if expires_at <= current_time:
+            connection.execute("DELETE FROM cache WHERE key = ? AND expires_at = ?", (key, expires_at))
+            return None
+        
+        # تحديث وقت آخر استخدام بشكل متباعد لتقليل عمليات الكتابة
+        if current_time - accessed_at > self.TOUCH_INTERVAL:
+            connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (current_time, key))
+        
+        return pickle.loads(value), expires_at
+    
+    def set(self, key, value, expires_at):
+        """
+        تخزين قيمة في ذاكرة التخزين المؤقت المشتركة.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+            value (أي): القيمة (يجب أن تكون قابلة للتسلسل بـ pickle).
+            expires_at (float): وقت انتهاء الصلاحية.
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+        
+        connection = self._get_connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, sqlite3.Binary(data), len(data), expires_at, time.time())
+        )
+        
+        self.writes += 1
+        if self.max_bytes is not None and self.writes % self.SIZE_CHECK_INTERVAL == 0:
+            self._enforce_size(connection)
+    
+    def _enforce_size(self, connection):
+        """
+        حذف العناصر منتهية الصلاحية ثم أقدم العناصر استخدامًا حتى يصبح الحجم ضمن الحد المسموح.
+        
+        المعلمات:
+            connection (sqlite3.Connection): اتصال قاعدة البيانات.
+        """
+        connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        excess = total - self.max_bytes
+        removed = 0
+        keys = []
+        for key, size in connection.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            keys.append(key)
+            removed += size
+            if removed >= excess:
+                break
+        
+        connection.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+        logger.debug(f"تم حذف {len(keys)} عنصر من ذاكرة التخزين المؤقت المشتركة")
+    
+    def delete(self, key):
+        """
+        حذف عنصر من ذاكرة التخزين المؤقت المشتركة.
+        
+        المعلمات:
+            key (str): مفتاح العنصر.
+        """
+        self._get_connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+    
+    def clear(self):
+        """حذف جميع العناصر من ذاكرة التخزين المؤقت المشتركة."""
+        self._get_connection().execute("DELETE FROM cache")
+    
+    def cleanup_expired(self):
+        """
+        حذف جميع العناصر منتهية الصلاحية من ذاكرة التخزين المؤقت المشتركة.
+        
+        العائد:
+            int: عدد العناصر المحذوفة.
+        """
+        cursor = self._get_connection().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
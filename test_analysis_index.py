@@ -0,0 +1,96 @@
+"""
+اختبار فهرس نتائج التحليل.
+يوفر اختبارات لتجزئة المحتوى وحفظ النتائج وإبطالها عند تغير الملف المصدر.
+"""
+
+import os
+import sys
+import unittest
+import logging
+import tempfile
+import shutil
+import numpy as np
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.analysis_index import AnalysisIndex, content_hash, HASH_BLOCK_SIZE
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class AnalysisIndexTest(unittest.TestCase):
+    """اختبارات لفهرس نتائج التحليل."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = AnalysisIndex(os.path.join(self.temp_dir, "index"))
+        
+        # إنشاء ملف مصدر أكبر من ضعف حجم الجزء المقروء للتجزئة
+        self.source_path = os.path.join(self.temp_dir, "source.mp4")
+        self.write_source(b"a")
+    
+    def write_source(self, middle_byte, tail=b"end"):
+        """كتابة ملف مصدر اختباري."""
+        with open(self.source_path, 'wb') as f:
+            f.write(b"\0" * HASH_BLOCK_SIZE)
+            f.write(middle_byte * HASH_BLOCK_SIZE)
+            f.write(b"\0" * HASH_BLOCK_SIZE + tail)
+    
+    def test_content_hash(self):
+        """اختبار أن التجزئة تعتمد على الحجم وأطراف الملف فقط."""
+        original = content_hash(self.source_path)
+        
+        # تغيير منتصف الملف لا يغير التجزئة
+        self.write_source(b"b")
+        self.assertEqual(content_hash(self.source_path), original)
+        
+        # تغيير نهاية الملف أو حجمه يغير التجزئة
+        self.write_source(b"a", tail=b"END")
+        self.assertNotEqual(content_hash(self.source_path), original)
+        self.write_source(b"a", tail=b"end!")
+        self.assertNotEqual(content_hash(self.source_path), original)
+    
+    def test_array_served_from_memory_map(self):
+        """اختبار حفظ مصفوفة وقراءتها كملف معين في الذاكرة."""
+        key = self.index.get_key(self.source_path)
+        self.assertIsNone(self.index.get_array(key, "energy"))
+        
+        energy = np.arange(10, dtype=np.float32)
+        self.index.put_array(key, "energy", energy)
+        
+        cached = self.index.get_array(key, "energy")
+        self.assertIsInstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, energy)
+    
+    def test_json_result(self):
+        """اختبار حفظ نتيجة JSON وقراءتها."""
+        key = self.index.get_key(self.source_path)
+        self.assertIsNone(self.index.get_json(key, "analysis"))
+        
+        result = {"start_time": 1.5, "highlights": [{"score": 0.9}]}
+        self.index.put_json(key, "analysis", result)
+        self.assertEqual(self.index.get_json(key, "analysis"), result)
+    
+    def test_invalidated_when_source_changes(self):
+        """اختبار حذف النتائج السابقة عند تغير محتوى الملف المصدر."""
+        old_key = self.index.get_key(self.source_path)
+        self.index.put_json(old_key, "analysis", {"start_time": 1})
+        
+        # نفس المحتوى يعيد نفس المفتاح والنتائج
+        self.assertEqual(self.index.get_key(self.source_path), old_key)
+        self.assertIsNotNone(self.index.get_json(old_key, "analysis"))
+        
+        self.write_source(b"a", tail=b"changed")
+        new_key = self.index.get_key(self.source_path)
+        self.assertNotEqual(new_key, old_key)
+        self.assertIsNone(self.index.get_json(new_key, "analysis"))
+        self.assertIsNone(self.index.get_json(old_key, "analysis"))
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+اختبار مدير التخزين المؤقت.
+يوفر اختبارات لترتيب الإزالة حسب آخر استخدام وانتهاء الصلاحية وقراءة الإعدادات.
+"""
+
+import os
+import sys
+import time
+import unittest
+import logging
+import threading
+import concurrent.futures
+from flask import Flask
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.cache_manager import CacheManager, estimate_size
+from config.config import config
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class CacheManagerTest(unittest.TestCase):
+    """اختبارات لمدير التخزين المؤقت."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.cache = CacheManager(max_size=3, max_age=60, enabled=True)
+    
+    def test_get_and_set(self):
+        """اختبار تخزين قيمة واسترجاعها."""
+        self.assertIsNone(self.cache.get("missing"))
+        self.cache.set("key", {"value": 1})
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+    
+    def test_evicts_least_recently_used(self):
+        """اختبار إزالة العنصر الأقدم استخدامًا عند امتلاء ذاكرة التخزين المؤقت."""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.set("c", 3)
+        
+        # استخدام العنصر الأول يجعل الثاني هو الأقدم
+        self.cache.get("a")
+        self.cache.set("d", 4)
+        
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.get("d"), 4)
+    
+    def test_expiry(self):
+        """اختبار انتهاء صلاحية العناصر."""
+        self.cache.set("short", 1, ttl=0.01)
+        self.cache.set("long", 2)
+        time.sleep(0.02)
+        
+        self.assertIsNone(self.cache.get("short"))
+        self.assertEqual(self.cache.get("long"), 2)
+        
+        # حذف العناصر منتهية الصلاحية دون استرجاعها
+        self.cache.set("other", 3, ttl=0.01)
+        time.sleep(0.02)
+        self.cache.cleanup_expired()
+        self.assertEqual(len(self.cache), 1)
+    
+    def test_update_keeps_latest_expiry(self):
+        """اختبار أن تحديث عنصر يعتمد على أحدث وقت انتهاء صلاحية."""
+        self.cache.set("key", 1, ttl=0.01)
+        self.cache.set("key", 2, ttl=60)
+        time.sleep(0.02)
+        self.cache.cleanup_expired()
+        self.assertEqual(self.cache.get("key"), 2)
+    
+    def test_get_or_compute_single_flight(self):
+        """اختبار تنفيذ حساب واحد فقط للطلبات المتزامنة لنفس المفتاح."""
+        calls = []
+        started = threading.Event()
+        
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "result"
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            first = executor.submit(self.cache.get_or_compute, "key", compute)
+            started.wait()
+            others = [executor.submit(self.cache.get_or_compute, "key", compute) for _ in range(7)]
+            results = [first.result()] + [future.result() for future in others]
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["result"] * 8)
+        self.assertEqual(self.cache.get("key"), "result")
+    
+    def test_get_or_compute_error(self):
+        """اختبار وصول خطأ الحساب إلى جميع المنتظرين وعدم تخزينه."""
+        started = threading.Event()
+        
+        def compute():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError("خطأ اختباري")
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(self.cache.get_or_compute, "key", compute)
+            started.wait()
+            others = [executor.submit(self.cache.get_or_compute, "key", compute) for _ in range(3)]
+            for future in [first] + others:
+                with self.assertRaises(ValueError):
+                    future.result()
+        
+        # المحاولة التالية تعيد الحساب
+        self.assertEqual(self.cache.get_or_compute("key", lambda: "retry"), "retry")
+    
+    def test_estimate_size(self):
+        """اختبار تقدير حجم القيم المتداخلة."""
+        small = {"title": "a"}
+        large = {"title": "a" * 10000, "items": list(range(1000))}
+        self.assertLess(estimate_size(small), 1000)
+        self.assertGreater(estimate_size(large), 10000 + 1000 * sys.getsizeof(1000))
+    
+    def test_max_bytes(self):
+        """اختبار الإزالة عند تجاوز الحجم الكلي المسموح."""
+        cache = CacheManager(max_size=100, max_age=60, enabled=True, max_bytes=30000)
+        for i in range(5):
+            cache.set(f"key_{i}", "x" * 10000)
+        
+        self.assertLessEqual(cache.get_stats()["bytes"], 30000)
+        self.assertIsNone(cache.get("key_0"))
+        self.assertIsNotNone(cache.get("key_4"))
+        
+        # عنصر أكبر من الحد المسموح لا يتم تخزينه
+        cache.set("huge", "x" * 40000)
+        self.assertIsNone(cache.get("huge"))
+        self.assertIsNotNone(cache.get("key_4"))
+    
+    def test_namespace_budgets(self):
+        """اختبار ميزانية كل مساحة أسماء دون التأثير على المساحات الأخرى."""
+        cache = CacheManager(
+            max_size=100,
+            max_age=60,
+            enabled=True,
+            namespace_budgets={"youtube_search": 25000}
+        )
+        cache.set("youtube_info_1", "x" * 10000)
+        for i in range(4):
+            cache.set(f"youtube_search_{i}", "x" * 10000)
+        
+        stats = cache.get_stats()
+        self.assertLessEqual(stats["namespaces"]["youtube_search"]["bytes"], 25000)
+        self.assertIsNone(cache.get("youtube_search_0"))
+        self.assertIsNotNone(cache.get("youtube_search_3"))
+        self.assertIsNotNone(cache.get("youtube_info_1"))
+        
+        # الحذف يحدث حساب الأحجام
+        cache.delete("youtube_search_3")
+        cache.delete("youtube_info_1")
+        self.assertEqual(cache.get_stats()["bytes"], cache.get_stats()["namespaces"]["youtube_search"]["bytes"])
+    
+    def test_config_read_once(self):
+        """اختبار قراءة الإعدادات من التطبيق عند أول استخدام."""
+        app = Flask(__name__)
+        app.config.from_object(config['testing'])
+        app.config['CACHE_MAX_SIZE'] = 2
+        
+        cache = CacheManager()
+        with app.app_context():
+            cache.set("a", 1)
+        self.assertEqual(cache.max_size, 2)
+        
+        # لا حاجة لسياق التطبيق بعد قراءة الإعدادات
+        cache.set("b", 2)
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("a"))
+
+if __name__ == '__main__':
+    unittest.main()
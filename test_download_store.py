@@ -0,0 +1,92 @@
+"""
+اختبار مخزن فيديوهات YouTube المنزلة.
+يوفر اختبارات لثبات المعرفات المحلية وإعادة استخدام الملفات المخزنة والتحقق من صلاحيتها.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import logging
+from flask import Flask
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.download_store import DownloadStore
+from services.youtube_service import YouTubeService
+from config.config import config
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class DownloadStoreTest(unittest.TestCase):
+    """اختبارات لمخزن التنزيلات."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = DownloadStore(self.temp_dir)
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _download(self, store, video_id, resolution, data=b"video"):
+        """محاكاة تنزيل فيديو وإضافته إلى المخزن."""
+        temp_path = store.get_temp_path(video_id, resolution)
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        return store.add(video_id, resolution, temp_path, title="عنوان")
+    
+    def test_add_and_lookup(self):
+        """اختبار إعادة استخدام الفيديو المخزن من نسخة أخرى للمخزن."""
+        self.assertIsNone(self.store.lookup("dQw4w9WgXcQ", "360p"))
+        entry = self._download(self.store, "dQw4w9WgXcQ", "360p")
+        
+        # المعرف المحلي يشير إلى الملف المخزن بنفس صيغة مسارات التطبيق
+        self.assertEqual(entry["path"], os.path.join(self.temp_dir, f"{entry['localId']}.mp4"))
+        self.assertTrue(os.path.exists(entry["path"]))
+        
+        other = DownloadStore(self.temp_dir)
+        found = other.lookup("dQw4w9WgXcQ", "360p")
+        self.assertEqual(found["localId"], entry["localId"])
+        self.assertEqual(found["title"], "عنوان")
+        self.assertIsNone(other.lookup("dQw4w9WgXcQ", "720p"))
+    
+    def test_local_id_is_stable(self):
+        """اختبار اشتقاق نفس المعرف المحلي لنفس الفيديو والدقة."""
+        first = self.store.get_local_id("dQw4w9WgXcQ", "360p")
+        self.assertEqual(first, DownloadStore(self.temp_dir).get_local_id("dQw4w9WgXcQ", "360p"))
+        self.assertNotEqual(first, self.store.get_local_id("dQw4w9WgXcQ", "720p"))
+    
+    def test_invalid_file_is_dropped(self):
+        """اختبار حذف الإدخال من السجل إذا تغير الملف أو حذف."""
+        entry = self._download(self.store, "dQw4w9WgXcQ", "360p")
+        with open(entry["path"], 'ab') as f:
+            f.write(b"truncated-or-replaced")
+        self.assertIsNone(self.store.lookup("dQw4w9WgXcQ", "360p"))
+        
+        entry = self._download(self.store, "dQw4w9WgXcQ", "360p")
+        self.store.remove("dQw4w9WgXcQ", "360p")
+        self.assertFalse(os.path.exists(entry["path"]))
+        self.assertIsNone(DownloadStore(self.temp_dir).lookup("dQw4w9WgXcQ", "360p"))
+    
+    def test_service_uses_stored_download(self):
+        """اختبار إعادة خدمة YouTube للفيديو المخزن دون الاتصال بـ YouTube."""
+        app = Flask(__name__)
+        app.config.from_object(config['testing'])
+        app.config['CACHE_FOLDER'] = self.temp_dir
+        
+        entry = self._download(self.store, "dQw4w9WgXcQ", "360p")
+        with app.app_context():
+            result = YouTubeService().download_video("dQw4w9WgXcQ", "360p")
+        
+        self.assertTrue(result["success"])
+        self.assertEqual(result["videoId"], entry["localId"])
+        self.assertEqual(result["originalId"], "dQw4w9WgXcQ")
+        self.assertEqual(result["path"], entry["path"])
+
+if __name__ == '__main__':
+    unittest.main()
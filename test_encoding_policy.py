@@ -0,0 +1,65 @@
+"""
+اختبار اختيار إعدادات الترميز حسب الحمل.
+يوفر اختبارات لاختيار ملف الترميز من عمق قائمة الانتظار وتشبع المعالج، ولتقسيم الخيوط على المهام المتزامنة.
+"""
+
+import os
+import sys
+import unittest
+import logging
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.encoding_policy import select_encoding_profile, get_cpu_pressure
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class EncodingPolicyTest(unittest.TestCase):
+    """اختبارات لاختيار ملف الترميز."""
+    
+    def test_light_load(self):
+        """اختبار استخدام إعداد أبطأ وأعلى جودة عندما تكون القائمة فارغة."""
+        profile = select_encoding_profile(
+            {"workers": 4, "running": 1, "pending": 0}, cpu_pressure=0.2, cpu_count=8
+        )
+        self.assertEqual(profile["name"], "quality")
+        self.assertEqual(profile["preset"], "slow")
+        self.assertIsNone(profile["maxHeight"])
+        self.assertEqual(profile["threads"], 8)
+    
+    def test_balanced_uses_default_preset(self):
+        """اختبار أن الملف المتوازن يستخدم الإعداد المسبق من التكوين."""
+        profile = select_encoding_profile(
+            {"workers": 4, "running": 4, "pending": 2}, cpu_pressure=0.9, default_preset='medium', cpu_count=8
+        )
+        self.assertEqual(profile["name"], "balanced")
+        self.assertEqual(profile["preset"], "medium")
+        self.assertEqual(profile["threads"], 2)
+    
+    def test_spike(self):
+        """اختبار الرجوع إلى ultrafast و480p أثناء ذروة الطلبات أو تشبع المعالج."""
+        profile = select_encoding_profile({"workers": 2, "running": 2, "pending": 16}, cpu_count=8)
+        self.assertEqual(profile["name"], "burst")
+        self.assertEqual(profile["preset"], "ultrafast")
+        self.assertEqual(profile["maxHeight"], 480)
+        self.assertEqual(profile["pressure"], 8)
+        self.assertEqual(profile["threads"], 4)
+        
+        # القائمة فارغة لكن المعالج مشغول بعمليات أخرى
+        profile = select_encoding_profile({"workers": 2, "running": 1, "pending": 0}, cpu_pressure=1.5)
+        self.assertEqual(profile["name"], "fast")
+        self.assertEqual(profile["maxHeight"], 720)
+    
+    def test_without_load(self):
+        """اختبار الاختيار بدون معلومات الحمل."""
+        profile = select_encoding_profile(cpu_count=4)
+        self.assertEqual(profile["name"], "quality")
+        self.assertEqual(profile["threads"], 4)
+        
+        pressure = get_cpu_pressure()
+        self.assertTrue(pressure is None or pressure >= 0)
+
+if __name__ == '__main__':
+    unittest.main()
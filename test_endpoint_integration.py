@@ -7,6 +7,7 @@ import os
 import sys
 import unittest
 import json
+import time
 import logging
 import tempfile
 from flask import Flask
@@ -69,6 +70,17 @@ class EndpointIntegrationTest(unittest.TestCase):
         except Exception as e:
             self.skipTest(f"فشل إنشاء ملف فيديو اختباري: {str(e)}")
     
+    def wait_for_job(self, job_id, timeout=60):
+        """انتظار اكتمال مهمة خلفية وإرجاع سجلها."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            response = self.client.get(f'/api/video/jobs/{job_id}')
+            job = json.loads(response.data)
+            if job['status'] in ('completed', 'failed'):
+                return job
+            time.sleep(0.2)
+        self.fail(f"انتهت مهلة انتظار المهمة: {job_id}")
+    
     def test_health_check(self):
         """اختبار نقطة نهاية فحص الصحة."""
         response = self.client.get('/api/health')
@@ -130,6 +142,24 @@ class EndpointIntegrationTest(unittest.TestCase):
         except Exception as e:
             self.skipTest(f"فشل اختبار تنزيل فيديو YouTube: {str(e)}")
     
+    def test_youtube_download_segment_validation(self):
+        """اختبار التحقق من وقت البداية والمدة عند تنزيل جزء من الفيديو."""
+        for body in (
+            {'videoId': 'dQw4w9WgXcQ', 'startTime': 'abc', 'duration': 5},
+            {'videoId': 'dQw4w9WgXcQ', 'startTime': -1, 'duration': 5}
+        ):
+            response = self.client.post('/api/youtube/download', json=body)
+            self.assertEqual(response.status_code, 400)
+    
+    def test_youtube_clip_validation(self):
+        """اختبار أن اقتطاع مقطع YouTube يقرأ وقت البداية من startTime."""
+        for body in (
+            {'videoId': 'dQw4w9WgXcQ', 'start_time': 10, 'duration': 5},
+            {'videoId': 'dQw4w9WgXcQ', 'startTime': 'abc', 'duration': 5}
+        ):
+            response = self.client.post('/api/youtube/clip', json=body)
+            self.assertEqual(response.status_code, 400)
+    
     def test_video_upload(self):
         """اختبار نقطة نهاية رفع فيديو."""
         # التحقق من وجود ملف الفيديو الاختباري
@@ -192,10 +222,17 @@ class EndpointIntegrationTest(unittest.TestCase):
                 }
             )
             
-            self.assertEqual(response.status_code, 200)
-            data = json.loads(response.data)
+            self.assertEqual(response.status_code, 202)
+            job_data = json.loads(response.data)
+            self.assertTrue(job_data['success'])
+            self.assertIn('jobId', job_data)
+            
+            # انتظار اكتمال المهمة
+            job = self.wait_for_job(job_data['jobId'])
+            self.assertEqual(job['status'], 'completed')
+            data = job['result']
             self.assertTrue(data['success'])
-            self.assertIn('videoId', data)
+            self.assertEqual(data['videoId'], job_data['videoId'])
             self.assertIn('duration', data)
             self.assertIn('url', data)
             
@@ -211,6 +248,22 @@ class EndpointIntegrationTest(unittest.TestCase):
         except Exception as e:
             self.skipTest(f"فشل اختبار معالجة الفيديو: {str(e)}")
     
+    def test_failed_job_not_reused(self):
+        """اختبار إرسال مهمة جديدة لطلب مطابق لمهمة فشلت."""
+        body = {'videoId': 'missing-video', 'startTime': 0, 'duration': 3}
+        
+        response = self.client.post('/api/video/process', json=body)
+        self.assertEqual(response.status_code, 202)
+        first_job_id = json.loads(response.data)['jobId']
+        self.assertEqual(self.wait_for_job(first_job_id)['status'], 'failed')
+        
+        # الطلب المطابق بعد الفشل يعيد المحاولة بدلاً من إرجاع المهمة الفاشلة
+        response = self.client.post('/api/video/process', json=body)
+        self.assertEqual(response.status_code, 202)
+        second_job_id = json.loads(response.data)['jobId']
+        self.assertNotEqual(second_job_id, first_job_id)
+        self.assertEqual(self.wait_for_job(second_job_id)['status'], 'failed')
+    
     def test_video_analyze(self):
         """اختبار نقطة نهاية تحليل الفيديو."""
         # التحقق من وجود ملف الفيديو الاختباري
@@ -300,7 +353,8 @@ class EndpointIntegrationTest(unittest.TestCase):
                 }
             )
             
-            process_data = json.loads(response.data)
+            job_data = json.loads(response.data)
+            process_data = self.wait_for_job(job_data['jobId'])['result']
             processed_video_id = process_data['videoId']
             
             # 5. الحصول على الفيديو المعالج
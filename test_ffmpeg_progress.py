@@ -0,0 +1,83 @@
+"""
+اختبار تشغيل FFmpeg مع متابعة تقدمه.
+يوفر اختبارات لتحليل مخرج -progress ولتسجيل التقدم أثناء الترميز مع حفظ آخر أسطر مخرج الأخطاء فقط.
+"""
+
+import os
+import sys
+import shutil
+import unittest
+import logging
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg_progress import parse_progress, run_ffmpeg
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class FFmpegProgressTest(unittest.TestCase):
+    """اختبارات لمتابعة تقدم FFmpeg."""
+    
+    def test_parse_progress(self):
+        """اختبار تحويل كتلة -progress إلى التقدم والسرعة ومعدل الإطارات."""
+        status = parse_progress(
+            {"frame": "75", "fps": "150.5", "out_time_us": "2500000", "speed": "5.02x", "progress": "continue"},
+            duration=10
+        )
+        self.assertEqual(status, {"completed": 2.5, "total": 10, "fps": 150.5, "speed": 5.02, "frames": 75})
+        
+        # القيم غير المتاحة في بداية الترميز
+        status = parse_progress({"fps": "0.00", "out_time_us": "N/A", "speed": "N/A", "progress": "continue"})
+        self.assertIsNone(status["completed"])
+        self.assertIsNone(status["speed"])
+        
+        # الكتلة الأخيرة تعيد توقيت آخر حزمة كما هو دون تقريبه إلى المدة
+        status = parse_progress({"out_time_us": "9960000", "progress": "end"}, duration=10)
+        self.assertEqual(status["completed"], 9.96)
+        
+        # انتهاء المصدر قبل المدة المطلوبة
+        status = parse_progress({"out_time_us": "7000000", "progress": "end"}, duration=10)
+        self.assertEqual(status["completed"], 7.0)
+    
+    def test_run_ffmpeg_progress(self):
+        """اختبار تسجيل التقدم أثناء الترميز وحفظ آخر أسطر مخرج الأخطاء فقط."""
+        if shutil.which("ffmpeg") is None:
+            self.skipTest("FFmpeg غير متاح")
+        
+        updates = []
+        result = run_ffmpeg(
+            [
+                "ffmpeg",
+                "-v", "verbose",
+                "-f", "lavfi",
+                "-i", "testsrc=duration=3:size=320x240:rate=30",
+                "-c:v", "libx264",
+                "-preset", "ultrafast",
+                "-f", "null",
+                "-"
+            ],
+            progress=lambda **status: updates.append(status),
+            duration=3,
+            tail_lines=5
+        )
+        
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(updates)
+        self.assertAlmostEqual(updates[-1]["completed"], 3, delta=1 / 30)
+        self.assertEqual(updates[-1]["total"], 3)
+        self.assertEqual(updates[-1]["frames"], 90)
+        self.assertLessEqual(len(result.stderr.splitlines()), 5)
+    
+    def test_run_ffmpeg_failure(self):
+        """اختبار إعادة رمز الخروج ورسالة الخطأ عند فشل الأمر."""
+        if shutil.which("ffmpeg") is None:
+            self.skipTest("FFmpeg غير متاح")
+        
+        result = run_ffmpeg(["ffmpeg", "-i", "/nonexistent/input.mp4", "-f", "null", "-"], progress=lambda **status: None)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("No such file", result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
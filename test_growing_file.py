@@ -0,0 +1,171 @@
+"""
+اختبار قراءة ملف أثناء تنزيله.
+يوفر اختبارات لتتبع النطاقات المكتوبة ولقراءة FFmpeg لجزء من فيديو أثناء تنزيله من خادم HTTP محلي بطيء.
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+import logging
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.growing_file import GrowingFile, GrowingFileServer
+from utils.segment_fetcher import SegmentFetcher
+from utils.error_handler import YouTubeError
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class SlowRangeRequestHandler(BaseHTTPRequestHandler):
+    """خادم ملفات يدعم طلبات النطاق ويرسل البيانات ببطء لمحاكاة الشبكة."""
+    
+    path_on_disk = None
+    
+    def log_message(self, format, *args):
+        """تعطيل سجل الطلبات."""
+        pass
+    
+    def do_GET(self):
+        """إرسال جزء من الملف على دفعات صغيرة."""
+        size = os.path.getsize(self.path_on_disk)
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        start = int(match.group(1))
+        end = min(int(match.group(2) or size - 1), size - 1)
+        
+        self.send_response(206)
+        self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        
+        with open(self.path_on_disk, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                block = f.read(min(32 * 1024, remaining))
+                self.wfile.write(block)
+                remaining -= len(block)
+                time.sleep(0.02)
+
+class GrowingFileTest(unittest.TestCase):
+    """اختبارات لتتبع الملف قيد التنزيل."""
+    
+    def setUp(self):
+        """إنشاء ملف متفرق للاختبار."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'video.mp4.part')
+        with open(self.path, 'wb') as f:
+            f.truncate(1000)
+        self.growing_file = GrowingFile(self.path)
+    
+    def tearDown(self):
+        """حذف الملفات المؤقتة."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_wait_for_written_range(self):
+        """اختبار انتظار النطاقات حتى كتابتها ودمج النطاقات المتجاورة."""
+        self.growing_file.mark_written(0, 100)
+        self.assertEqual(self.growing_file.wait_started(1), 1000)
+        self.assertEqual(self.growing_file.wait_for(50, 500, 1), 100)
+        
+        timer = threading.Timer(0.1, self.growing_file.mark_written, (100, 300))
+        timer.start()
+        self.assertEqual(self.growing_file.wait_for(100, 500, 5), 300)
+        self.assertEqual(self.growing_file.ranges, [(0, 300)])
+        
+        with self.assertRaises(YouTubeError):
+            self.growing_file.wait_for(300, 500, 0.05)
+    
+    def test_finished_download(self):
+        """اختبار قراءة النطاقات غير المنزلة بعد الانتهاء، ورفع خطأ إذا فشل التنزيل."""
+        self.growing_file.mark_written(0, 100)
+        self.growing_file.finish()
+        self.assertEqual(self.growing_file.wait_for(500, 800, 1), 800)
+        
+        failed = GrowingFile(self.path)
+        failed.finish(YouTubeError("خطأ اختباري"))
+        with self.assertRaises(YouTubeError):
+            failed.wait_started(1)
+
+class PipelinedFetchTest(unittest.TestCase):
+    """اختبار قراءة FFmpeg لجزء من الفيديو أثناء تنزيله."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """إنشاء فيديو الاختبار وتشغيل الخادم البطيء."""
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.source_path = os.path.join(cls.temp_dir, 'source.mp4')
+        try:
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error",
+                "-f", "lavfi", "-i", "testsrc=size=320x180:rate=30,noise=alls=20:allf=t",
+                "-f", "lavfi", "-i", "sine=frequency=440",
+                "-t", "30",
+                "-c:v", "libx264", "-preset", "ultrafast", "-g", "60", "-c:a", "aac",
+                cls.source_path
+            ], check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            shutil.rmtree(cls.temp_dir, ignore_errors=True)
+            raise unittest.SkipTest(f"فشل إنشاء فيديو الاختبار: {str(e)}")
+        
+        SlowRangeRequestHandler.path_on_disk = cls.source_path
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowRangeRequestHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/source.mp4"
+    
+    @classmethod
+    def tearDownClass(cls):
+        """إيقاف الخادم وحذف الملفات المؤقتة."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+    
+    def _read_packets(self, input_path):
+        """قراءة تجزئات حزم المقطع من 20 إلى 25 ثانية دون إعادة ترميز."""
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-ss", "20", "-i", input_path, "-t", "5", "-c", "copy", "-f", "framemd5", "-"],
+            capture_output=True,
+            text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+    
+    def test_read_while_downloading(self):
+        """اختبار أن FFmpeg يبدأ القراءة قبل اكتمال التنزيل ويحصل على نفس البيانات."""
+        output_path = os.path.join(self.temp_dir, 'segment.mp4.part')
+        growing_file = GrowingFile(output_path)
+        finished = {}
+        
+        def fetch():
+            error = None
+            try:
+                SegmentFetcher(self.url).fetch(output_path, 20, 5, on_data=growing_file.mark_written)
+            except Exception as e:
+                error = e
+            finally:
+                finished["time"] = time.time()
+                growing_file.finish(error)
+        
+        fetch_thread = threading.Thread(target=fetch)
+        fetch_thread.start()
+        growing_file.wait_started(30)
+        started = time.time()
+        
+        with GrowingFileServer(growing_file) as url:
+            packets = self._read_packets(url)
+        fetch_thread.join()
+        
+        self.assertIsNone(growing_file.error)
+        self.assertLess(started, finished["time"])
+        self.assertEqual(packets, self._read_packets(self.source_path))
+
+if __name__ == '__main__':
+    unittest.main()
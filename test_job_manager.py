@@ -0,0 +1,229 @@
+"""
+اختبار مدير المهام الخلفية.
+يوفر اختبارات لإرسال المهام ومتابعة حالتها ونتائجها.
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+import logging
+import concurrent.futures
+from flask import Flask, current_app
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.job_manager import JobManager
+from utils.cache_manager import CacheManager
+from utils.error_handler import QueueFullError, handle_errors
+from utils.job_scheduler import PRIORITY_LOW
+from config.config import config
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class JobManagerTest(unittest.TestCase):
+    """اختبارات لمدير المهام الخلفية."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        # إنشاء تطبيق Flask للاختبار
+        self.app = Flask(__name__)
+        self.app.config.from_object(config['testing'])
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        
+        # إنشاء مدير المهام
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self.job_manager = JobManager(self.executor, result_ttl=60)
+    
+    def wait_for_job(self, job_id, timeout=5):
+        """انتظار انتهاء مهمة وإرجاع سجلها."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.job_manager.get(job_id)
+            if job['status'] in (JobManager.STATUS_COMPLETED, JobManager.STATUS_FAILED):
+                return job
+            time.sleep(0.01)
+        self.fail(f"انتهت مهلة انتظار المهمة: {job_id}")
+    
+    def test_submit_returns_immediately(self):
+        """اختبار أن الإرسال لا ينتظر انتهاء المهمة."""
+        started = time.time()
+        job_id = self.job_manager.submit(time.sleep, 0.5)
+        self.assertLess(time.time() - started, 0.2)
+        
+        job = self.job_manager.get(job_id)
+        self.assertIn(job['status'], (JobManager.STATUS_PENDING, JobManager.STATUS_RUNNING))
+        self.assertEqual(self.wait_for_job(job_id)['status'], JobManager.STATUS_COMPLETED)
+    
+    def test_job_result(self):
+        """اختبار تسجيل نتيجة المهمة."""
+        job_id = self.job_manager.submit(lambda a, b=0: a + b, 2, b=3, job_type='add')
+        job = self.wait_for_job(job_id)
+        
+        self.assertEqual(job['status'], JobManager.STATUS_COMPLETED)
+        self.assertEqual(job['type'], 'add')
+        self.assertEqual(job['result'], 5)
+        self.assertIsNone(job['error'])
+        self.assertIsNotNone(job['finishedAt'])
+    
+    def test_job_error(self):
+        """اختبار تسجيل خطأ المهمة."""
+        def failing_job():
+            raise ValueError("خطأ اختباري")
+        
+        job = self.wait_for_job(self.job_manager.submit(failing_job))
+        self.assertEqual(job['status'], JobManager.STATUS_FAILED)
+        self.assertEqual(job['error'], "خطأ اختباري")
+    
+    def test_job_runs_in_app_context(self):
+        """اختبار تشغيل المهمة داخل سياق التطبيق."""
+        job_id = self.job_manager.submit(lambda: current_app.config['TESTING'])
+        self.assertTrue(self.wait_for_job(job_id)['result'])
+    
+    def test_job_progress(self):
+        """اختبار تسجيل تقدم المهمة من داخلها."""
+        def reporting_job():
+            job_id = self.job_manager.get_current_job_id()
+            self.job_manager.set_progress(job_id, 25, 100)
+            return job_id
+        
+        job_id = self.job_manager.submit(reporting_job)
+        job = self.wait_for_job(job_id)
+        self.assertEqual(job['result'], job_id)
+        self.assertEqual(job['progress'], {"completed": 25, "total": 100, "percent": 25.0})
+        self.assertIsNone(self.job_manager.get_current_job_id())
+    
+    def test_job_progress_callback(self):
+        """اختبار دالة التقدم للمهمة الحالية مع تفاصيل الترميز."""
+        def encoding_job():
+            progress = self.job_manager.get_progress_callback()
+            progress(5.0, 20.0, fps=120.0, speed=4.0)
+            progress(10.0, 20.0, fps=None, speed=4.5)
+        
+        self.assertIsNone(self.job_manager.get_progress_callback())
+        job = self.wait_for_job(self.job_manager.submit(encoding_job))
+        self.assertEqual(job['progress'], {"completed": 10.0, "total": 20.0, "percent": 50.0, "speed": 4.5})
+    
+    def test_queue_full(self):
+        """اختبار رفض المهام عند امتلاء قائمة الانتظار وقبولها بعد بدء المنتظرة."""
+        job_manager = JobManager(self.executor, result_ttl=60, workers=2, max_pending=2)
+        release = threading.Event()
+        
+        # مهمتان تشغلان الخيطين، ومهمتان تنتظران في القائمة
+        jobs = [job_manager.submit(release.wait, 5) for _ in range(4)]
+        deadline = time.time() + 5
+        while job_manager.get_load()['running'] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(job_manager.get_load()['pending'], 2)
+        
+        with self.assertRaises(QueueFullError) as context:
+            job_manager.submit(lambda: None)
+        self.assertEqual(context.exception.status_code, 429)
+        self.assertEqual(context.exception.retry_after, JobManager.DEFAULT_JOB_DURATION)
+        
+        release.set()
+        self.job_manager = job_manager
+        for job_id in jobs:
+            self.assertEqual(self.wait_for_job(job_id)['status'], JobManager.STATUS_COMPLETED)
+        self.assertEqual(job_manager.get_load()['pending'], 0)
+        self.assertIsNotNone(job_manager.get_load()['averageDuration'])
+        job_manager.submit(lambda: None)
+    
+    def test_scheduling_order(self):
+        """اختبار تنفيذ المهام حسب الأولوية والتكلفة وليس ترتيب الوصول."""
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        job_manager = JobManager(executor, result_ttl=60)
+        release = threading.Event()
+        order = []
+        
+        # مهمة تشغل الخيط الوحيد حتى يتم إرسال بقية المهام
+        job_manager.submit(release.wait, 5)
+        job_manager.submit(order.append, 'batch', priority=PRIORITY_LOW, cost=1)
+        job_manager.submit(order.append, 'long', cost=60)
+        job_manager.submit(order.append, 'short', cost=5)
+        release.set()
+        executor.shutdown(wait=True)
+        
+        self.assertEqual(order, ['short', 'long', 'batch'])
+        self.assertEqual(job_manager.get_load()['queueWait']['samples'], 4)
+    
+    def test_client_queue_limit(self):
+        """اختبار رفض مهام العميل الذي تجاوز حد المهام المنتظرة دون التأثير على غيره."""
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        job_manager = JobManager(executor, result_ttl=60, max_pending=10, max_pending_per_client=2)
+        release = threading.Event()
+        
+        job_manager.submit(release.wait, 5, client_id='a')
+        while job_manager.get_load()['running'] < 1:
+            time.sleep(0.01)
+        
+        job_manager.submit(lambda: None, client_id='a')
+        job_manager.submit(lambda: None, client_id='a')
+        with self.assertRaises(QueueFullError):
+            job_manager.submit(lambda: None, client_id='a')
+        job_manager.submit(lambda: None, client_id='b')
+        
+        release.set()
+        executor.shutdown(wait=True)
+    
+    def test_queue_full_response(self):
+        """اختبار إرجاع الرمز 429 مع رأس Retry-After."""
+        @self.app.route('/busy')
+        @handle_errors
+        def busy():
+            raise QueueFullError("الخادم مشغول", retry_after=12)
+        
+        response = self.app.test_client().get('/busy')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '12')
+    
+    def test_get_or_submit(self):
+        """اختبار مشاركة مهمة واحدة بين الطلبات المتطابقة وإعادة الإرسال بعد الفشل."""
+        cache = CacheManager(enabled=True)
+        submitted = []
+        
+        def submit(func):
+            def submit_job():
+                job_id = self.job_manager.submit(func)
+                submitted.append(job_id)
+                return {"jobId": job_id}
+            return submit_job
+        
+        # المهمة الجارية أو المكتملة تشارك
+        job = self.job_manager.get_or_submit(cache, "job_a", submit(lambda: 1))
+        self.wait_for_job(job["jobId"])
+        self.assertEqual(self.job_manager.get_or_submit(cache, "job_a", submit(lambda: 1)), job)
+        self.assertEqual(len(submitted), 1)
+        
+        # المهمة الفاشلة تستبدل بمهمة جديدة دون أن تحذف المهمة معرفها بنفسها
+        failed = self.job_manager.get_or_submit(cache, "job_b", submit(lambda: 1 / 0))
+        self.assertEqual(self.wait_for_job(failed["jobId"])['status'], JobManager.STATUS_FAILED)
+        retried = self.job_manager.get_or_submit(cache, "job_b", submit(lambda: 2))
+        self.assertNotEqual(retried["jobId"], failed["jobId"])
+        self.assertEqual(self.wait_for_job(retried["jobId"])['result'], 2)
+    
+    def test_unknown_job(self):
+        """اختبار الاستعلام عن مهمة غير موجودة."""
+        self.assertIsNone(self.job_manager.get("not-a-job"))
+    
+    def test_cleanup_finished(self):
+        """اختبار حذف المهام المنتهية القديمة."""
+        job_id = self.job_manager.submit(lambda: None)
+        self.wait_for_job(job_id)
+        
+        self.job_manager.result_ttl = 0
+        time.sleep(0.01)
+        self.job_manager.cleanup_finished()
+        self.assertIsNone(self.job_manager.get(job_id))
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        self.executor.shutdown(wait=True)
+        self.app_context.pop()
+
+if __name__ == '__main__':
+    unittest.main()
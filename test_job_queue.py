@@ -0,0 +1,158 @@
+"""
+اختبار قائمة انتظار المهام الدائمة.
+يوفر اختبارات لحجز المهام وتجديد حجزها وإعادتها بعد توقف العامل، ولتنفيذ المهام عبر مدير المهام الدائم.
+"""
+
+import os
+import sys
+import time
+import shutil
+import operator
+import tempfile
+import unittest
+import logging
+from flask import Flask
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.job_queue import JobQueue, DurableJobManager
+from utils.job_scheduler import PRIORITY_HIGH, PRIORITY_LOW
+from utils.error_handler import QueueFullError
+from config.config import config
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class JobQueueTest(unittest.TestCase):
+    """اختبارات لقائمة انتظار المهام الدائمة."""
+    
+    def setUp(self):
+        """إنشاء قائمة انتظار في مجلد مؤقت."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'jobs.sqlite3')
+        self.queue = JobQueue(self.path, lease_duration=30, max_attempts=2)
+    
+    def tearDown(self):
+        """حذف الملفات المؤقتة."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_lease_and_complete(self):
+        """اختبار حجز مهمة وتسجيل نتيجتها من اتصال آخر بنفس الملف."""
+        job_id = self.queue.enqueue('add', '_operator:add', (2, 3))
+        self.assertEqual(self.queue.get(job_id)['status'], JobQueue.STATUS_PENDING)
+        
+        job = JobQueue(self.path).lease('worker-1')
+        self.assertEqual(job['jobId'], job_id)
+        self.assertEqual(job['args'], [2, 3])
+        self.assertEqual(job['attempts'], 1)
+        self.assertIsNone(self.queue.lease('worker-2'))
+        
+        self.assertTrue(self.queue.heartbeat(job_id, 'worker-1'))
+        self.assertFalse(self.queue.heartbeat(job_id, 'worker-2'))
+        self.assertTrue(self.queue.complete(job_id, 'worker-1', {"sum": 5}))
+        
+        record = self.queue.get(job_id)
+        self.assertEqual(record['status'], JobQueue.STATUS_COMPLETED)
+        self.assertEqual(record['result'], {"sum": 5})
+        self.assertIsNotNone(record['finishedAt'])
+    
+    def test_retry_after_worker_crash(self):
+        """اختبار إعادة المهمة بعد انتهاء حجزها، وفشلها بعد استنفاد المحاولات."""
+        job_id = self.queue.enqueue('work', '_operator:add', (1, 1))
+        self.queue.lease_duration = 0
+        self.queue.lease('crashed-1')
+        time.sleep(0.01)
+        
+        # العامل الأول توقف دون تجديد الحجز، فتنتقل المهمة إلى عامل آخر
+        job = self.queue.lease('crashed-2')
+        self.assertEqual(job['jobId'], job_id)
+        self.assertEqual(job['attempts'], 2)
+        self.assertFalse(self.queue.complete(job_id, 'crashed-1', None))
+        time.sleep(0.01)
+        
+        self.assertIsNone(self.queue.lease('worker-3'))
+        record = self.queue.get(job_id)
+        self.assertEqual(record['status'], JobQueue.STATUS_FAILED)
+        self.assertEqual(record['attempts'], 2)
+    
+    def test_lease_order(self):
+        """اختبار ترتيب الحجز حسب نصيب العميل والأولوية والتكلفة."""
+        self.queue.enqueue('a', '_operator:add', priority=PRIORITY_HIGH, cost=1, client_id='a')
+        self.queue.enqueue('a', '_operator:add', priority=PRIORITY_HIGH, cost=1, client_id='a')
+        self.queue.enqueue('b-long', '_operator:add', cost=60, client_id='b')
+        self.queue.enqueue('b-short', '_operator:add', cost=5, client_id='b')
+        self.queue.enqueue('b-batch', '_operator:add', priority=PRIORITY_LOW, cost=1, client_id='b')
+        
+        order = [self.queue.lease(f"worker-{index}")['type'] for index in range(5)]
+        self.assertEqual(order, ['a', 'b-short', 'a', 'b-long', 'b-batch'])
+    
+    def test_stats(self):
+        """اختبار إحصائيات العمال والمهام ووقت الانتظار."""
+        self.queue.register_worker('worker-1')
+        job_id = self.queue.enqueue('add', '_operator:add', (1, 2))
+        self.queue.enqueue('add', '_operator:add', (3, 4))
+        self.queue.lease('worker-1')
+        self.queue.complete(job_id, 'worker-1', 3)
+        
+        stats = self.queue.get_stats()
+        self.assertEqual(stats['workers'], 1)
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['running'], 0)
+        self.assertEqual(stats['queueWait']['samples'], 1)
+        self.assertIsNotNone(stats['averageDuration'])
+        
+        self.queue.unregister_worker('worker-1')
+        self.assertEqual(self.queue.get_stats()['workers'], 0)
+        self.assertEqual(self.queue.cleanup(0), 1)
+        self.assertIsNone(self.queue.get(job_id))
+
+class DurableJobManagerTest(unittest.TestCase):
+    """اختبارات لمدير المهام الدائم."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.app = Flask(__name__)
+        self.app.config.from_object(config['testing'])
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.temp_dir, 'jobs.sqlite3'))
+        self.job_manager = DurableJobManager(self.queue, result_ttl=60, max_pending=2, max_pending_per_client=1)
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        self.app_context.pop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_submit_and_run(self):
+        """اختبار إرسال مهمة وتنفيذها كما يفعل العامل."""
+        job_id = self.job_manager.submit(operator.add, 2, 3, job_type='add', client_id='a')
+        self.assertEqual(self.job_manager.get(job_id)['status'], DurableJobManager.STATUS_PENDING)
+        
+        self.job_manager.run_leased(self.queue.lease('worker-1'), 'worker-1')
+        job = self.job_manager.get(job_id)
+        self.assertEqual(job['status'], DurableJobManager.STATUS_COMPLETED)
+        self.assertEqual(job['type'], 'add')
+        self.assertEqual(job['result'], 5)
+        
+        failed_id = self.job_manager.submit(operator.truediv, 1, 0, client_id='a')
+        self.job_manager.run_leased(self.queue.lease('worker-1'), 'worker-1')
+        self.assertEqual(self.job_manager.get(failed_id)['status'], DurableJobManager.STATUS_FAILED)
+    
+    def test_admission(self):
+        """اختبار حدود قائمة الانتظار ورفض الدوال التي لا يمكن إرسالها إلى العمال."""
+        self.job_manager.submit(operator.add, 1, 1, client_id='a')
+        with self.assertRaises(QueueFullError):
+            self.job_manager.submit(operator.add, 1, 1, client_id='a')
+        self.job_manager.submit(operator.add, 1, 1, client_id='b')
+        with self.assertRaises(QueueFullError) as context:
+            self.job_manager.submit(operator.add, 1, 1, client_id='c')
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+        
+        with self.assertRaises(ValueError):
+            self.job_manager.submit(lambda: None)
+
+if __name__ == '__main__':
+    unittest.main()
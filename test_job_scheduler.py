@@ -0,0 +1,94 @@
+"""
+اختبار جدولة المهام الخلفية.
+يوفر اختبارات لتقدير تكلفة المهام وترتيبها حسب الأولوية والتكلفة والعدالة بين العملاء.
+"""
+
+import os
+import sys
+import unittest
+import logging
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.job_scheduler import (
+    JobScheduler, estimate_job_cost, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+)
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class JobSchedulerTest(unittest.TestCase):
+    """اختبارات لمجدول المهام."""
+    
+    def setUp(self):
+        """إنشاء مجدول جديد."""
+        self.scheduler = JobScheduler()
+    
+    def _pop_all(self):
+        """إخراج جميع المهام بالترتيب مع إنهائها فورًا."""
+        items = []
+        while True:
+            item, client_id = self.scheduler.pop()
+            if item is None:
+                return items
+            items.append(item)
+            self.scheduler.finish(client_id)
+    
+    def test_estimate_cost(self):
+        """اختبار تناسب التكلفة مع المدة والدقة والإعداد المسبق."""
+        self.assertEqual(estimate_job_cost(10), 10)
+        self.assertEqual(estimate_job_cost(10, '1440p', 'medium'), 40)
+        self.assertLess(estimate_job_cost(60, '720p', 'veryfast'), estimate_job_cost(60, '720p', 'medium'))
+        self.assertLess(estimate_job_cost(60, '720p', 'copy'), estimate_job_cost(10, '720p', 'medium'))
+        self.assertEqual(estimate_job_cost(10, 'best'), 10)
+    
+    def test_shortest_job_first(self):
+        """اختبار تقديم المهام الأقصر داخل نفس فئة الأولوية."""
+        self.scheduler.push('long', cost=60)
+        self.scheduler.push('short', cost=5)
+        self.scheduler.push('medium', cost=20)
+        self.assertEqual(self._pop_all(), ['short', 'medium', 'long'])
+    
+    def test_priority_classes(self):
+        """اختبار تقديم فئة الأولوية على التكلفة."""
+        self.scheduler.push('batch', priority=PRIORITY_LOW, cost=1)
+        self.scheduler.push('normal', priority=PRIORITY_NORMAL, cost=60)
+        self.scheduler.push('urgent', priority=PRIORITY_HIGH, cost=60)
+        self.assertEqual(self._pop_all(), ['urgent', 'normal', 'batch'])
+    
+    def test_fair_share(self):
+        """اختبار أن عميلاً يرسل مهام كثيرة لا يحجز جميع الخيوط."""
+        for index in range(10):
+            self.scheduler.push(f"a{index}", client_id='a', priority=PRIORITY_HIGH, cost=1)
+        self.scheduler.push('b0', client_id='b', priority=PRIORITY_LOW, cost=60)
+        
+        # خيطان: الأول يأخذ مهمة من a، والثاني يذهب إلى b التي ليس لها مهام جارية
+        self.assertEqual(self.scheduler.pop(), ('a0', 'a'))
+        self.assertEqual(self.scheduler.pop(), ('b0', 'b'))
+        self.assertEqual(self.scheduler.count_pending('a'), 9)
+        self.assertEqual(self.scheduler.count_pending('b'), 0)
+    
+    def test_aging(self):
+        """اختبار تقديم المهمة الطويلة بعد انتظار طويل على مهمة قصيرة جديدة."""
+        self.scheduler.push('long', cost=60)
+        self.scheduler.entries[0]["queuedAt"] -= 20 * JobScheduler.AGING_TIME
+        self.scheduler.push('short', cost=5)
+        self.assertEqual(self._pop_all(), ['long', 'short'])
+    
+    def test_wait_stats(self):
+        """اختبار حساب النسب المئوية لوقت الانتظار."""
+        self.assertEqual(self.scheduler.get_wait_stats(), {"samples": 0, "p50": None, "p99": None})
+        
+        for wait in range(1, 101):
+            self.scheduler.push(wait)
+            self.scheduler.entries[-1]["queuedAt"] -= wait
+        self._pop_all()
+        
+        stats = self.scheduler.get_wait_stats()
+        self.assertEqual(stats["samples"], 100)
+        self.assertAlmostEqual(stats["p50"], 51, delta=1)
+        self.assertAlmostEqual(stats["p99"], 99, delta=1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+اختبار فحص ملفات الوسائط.
+يوفر اختبارات لقراءة المدة والمسارات والإطارات المفتاحية من صندوق moov، وللرجوع إلى ffprobe، ولذاكرة التخزين المؤقت للنتائج.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import logging
+import subprocess
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.media_probe import (
+    probe_media, get_duration, get_frame_rate, has_audio_stream, get_keyframe_times, get_video_stream_info,
+    clear_cache
+)
+from utils.error_handler import VideoProcessingError
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class MediaProbeTest(unittest.TestCase):
+    """اختبارات لفحص ملفات الوسائط."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+            self.skipTest("FFmpeg غير متاح")
+        
+        self.temp_dir = tempfile.mkdtemp()
+        clear_cache()
+    
+    def create_video(self, name, audio=True, extra_args=()):
+        """إنشاء فيديو اختباري مدته 4 ثوانٍ بإطار مفتاحي كل ثانية."""
+        path = os.path.join(self.temp_dir, name)
+        command = ["ffmpeg", "-y", "-f", "lavfi", "-i", "testsrc=duration=4:size=320x240:rate=30"]
+        if audio:
+            command.extend(["-f", "lavfi", "-i", "sine=frequency=440:duration=4"])
+        command.extend([
+            "-c:v", "libx264",
+            "-bf", "2",
+            "-g", "30",
+            "-keyint_min", "30",
+            "-sc_threshold", "0",
+            "-pix_fmt", "yuv420p"
+        ])
+        command.extend(extra_args)
+        command.append(path)
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return path
+    
+    def ffprobe_duration(self, path):
+        """قراءة المدة بـ ffprobe للمقارنة."""
+        return float(subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True
+        ).stdout.strip())
+    
+    def test_probe_mp4(self):
+        """اختبار قراءة المدة والمسارات والإطارات المفتاحية من صندوق moov."""
+        path = self.create_video("video.mp4")
+        
+        info = probe_media(path)
+        self.assertEqual(info["source"], "mp4")
+        self.assertAlmostEqual(info["duration"], self.ffprobe_duration(path), delta=0.002)
+        self.assertEqual([stream["type"] for stream in info["streams"]], ["video", "audio"])
+        self.assertEqual(info["streams"][0]["codec"], "h264")
+        self.assertEqual((info["streams"][0]["width"], info["streams"][0]["height"]), (320, 240))
+        self.assertAlmostEqual(get_frame_rate(path), 30, delta=0.01)
+        self.assertTrue(has_audio_stream(path))
+        
+        # أوقات العرض للإطارات المفتاحية مع إزاحة إطارات B وقائمة التعديلات
+        keyframes = get_keyframe_times(path, 0.5, 2.5)
+        self.assertEqual([round(t, 3) for t in keyframes], [1.0, 2.0, 3.0])
+    
+    def test_probe_cache(self):
+        """اختبار استرجاع النتيجة المحفوظة وإعادة الفحص عند تغير الملف."""
+        path = self.create_video("video.mp4", audio=False)
+        
+        info = probe_media(path)
+        self.assertIs(probe_media(path), info)
+        self.assertFalse(has_audio_stream(path))
+        self.assertIs(get_video_stream_info(path), get_video_stream_info(path))
+        self.assertEqual(get_video_stream_info(path)["pix_fmt"], "yuv420p")
+        
+        # استبدال الملف بفيديو آخر بنفس المسار
+        self.create_video("video.mp4", audio=True)
+        self.assertIsNot(probe_media(path), info)
+        self.assertTrue(has_audio_stream(path))
+    
+    def test_ffprobe_fallback(self):
+        """اختبار الرجوع إلى ffprobe للصيغ غير MP4."""
+        path = self.create_video("video.mkv")
+        
+        info = probe_media(path)
+        self.assertEqual(info["source"], "ffprobe")
+        self.assertIsNone(info["keyframes"])
+        self.assertAlmostEqual(get_duration(path), self.ffprobe_duration(path), delta=0.002)
+        self.assertAlmostEqual(get_frame_rate(path), 30, delta=0.01)
+        self.assertTrue(has_audio_stream(path))
+        
+        # قد تبدأ أوقات Matroska بإزاحة صغيرة
+        keyframes = [t for t in get_keyframe_times(path, 0.5, 2.5) if t >= 0.5]
+        self.assertEqual(len(keyframes), 3)
+        for keyframe, expected in zip(keyframes, [1.0, 2.0, 3.0]):
+            self.assertAlmostEqual(keyframe, expected, delta=0.01)
+    
+    def test_invalid_file(self):
+        """اختبار رفع خطأ للملفات غير الصالحة أو غير الموجودة."""
+        path = os.path.join(self.temp_dir, "invalid.mp4")
+        with open(path, "w") as f:
+            f.write("not a video")
+        
+        with self.assertRaises(VideoProcessingError):
+            probe_media(path)
+        with self.assertRaises(VideoProcessingError):
+            get_duration(os.path.join(self.temp_dir, "missing.mp4"))
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+اختبار تنزيل الملفات بأجزاء متوازية.
+يوفر اختبارات للتنزيل المتوازي والاستئناف بعد الفشل وتسجيل التقدم باستخدام خادم HTTP محلي يدعم طلبات النطاق.
+"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.range_downloader import RangeDownloader
+from utils.error_handler import YouTubeError
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """خادم ملفات يدعم طلبات النطاق والاتصالات الدائمة، مع إمكانية محاكاة انقطاع الخدمة."""
+    
+    protocol_version = 'HTTP/1.1'
+    data = b""
+    support_range = True
+    failing = False
+    clients = set()
+    lock = threading.Lock()
+    
+    def log_message(self, format, *args):
+        """تعطيل سجل الطلبات."""
+        pass
+    
+    def do_GET(self):
+        """إرسال الملف أو جزء منه."""
+        with self.lock:
+            self.clients.add(self.client_address)
+        
+        size = len(self.data)
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match and self.support_range:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        else:
+            start, end = 0, size - 1
+            self.send_response(200)
+        
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        
+        try:
+            if self.failing and start > 0:
+                # إرسال جزء من البيانات ثم قطع الاتصال
+                self.wfile.write(self.data[start:start + (end - start + 1) // 2])
+                self.close_connection = True
+                return
+            self.wfile.write(self.data[start:end + 1])
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+class RangeDownloaderTest(unittest.TestCase):
+    """اختبارات لأداة التنزيل المتوازي."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """تشغيل الخادم المحلي."""
+        RangeRequestHandler.data = os.urandom(1024 * 1024 + 123)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/video.mp4"
+    
+    @classmethod
+    def tearDownClass(cls):
+        """إيقاف الخادم."""
+        cls.server.shutdown()
+        cls.server.server_close()
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'video.mp4.part')
+        RangeRequestHandler.support_range = True
+        RangeRequestHandler.failing = False
+        RangeRequestHandler.clients.clear()
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _read(self):
+        """قراءة الملف المنزل."""
+        with open(self.path, 'rb') as f:
+            return f.read()
+    
+    def test_parallel_download(self):
+        """اختبار التنزيل بعدة اتصالات دائمة وتسجيل التقدم."""
+        updates = []
+        downloader = RangeDownloader(
+            self.url,
+            connections=4,
+            chunk_size=64 * 1024,
+            progress=lambda completed, total: updates.append((completed, total))
+        )
+        result = downloader.download(self.path)
+        
+        self.assertEqual(self._read(), RangeRequestHandler.data)
+        self.assertEqual(result["size"], len(RangeRequestHandler.data))
+        self.assertEqual(result["bytesFetched"], len(RangeRequestHandler.data))
+        self.assertFalse(os.path.exists(f"{self.path}.progress"))
+        
+        # 17 جزءًا عبر 4 اتصالات على الأكثر إضافة إلى اتصال تحديد الحجم
+        self.assertGreater(len(RangeRequestHandler.clients), 1)
+        self.assertLessEqual(len(RangeRequestHandler.clients), 5)
+        
+        self.assertEqual(updates[-1], (len(RangeRequestHandler.data), len(RangeRequestHandler.data)))
+        self.assertEqual([completed for completed, _ in updates], sorted(completed for completed, _ in updates))
+    
+    def test_resume_after_failure(self):
+        """اختبار استئناف التنزيل من الأجزاء المكتملة بعد فشله."""
+        # الجزء الأول فقط ينجح، ثم تنقطع الخدمة
+        RangeRequestHandler.failing = True
+        downloader = RangeDownloader(self.url, connections=2, chunk_size=256 * 1024, retries=1)
+        with self.assertRaises(YouTubeError):
+            downloader.download(self.path)
+        self.assertTrue(os.path.exists(f"{self.path}.progress"))
+        
+        RangeRequestHandler.failing = False
+        result = RangeDownloader(self.url, connections=2, chunk_size=256 * 1024).download(self.path)
+        
+        self.assertEqual(self._read(), RangeRequestHandler.data)
+        self.assertGreater(result["resumed"], 0)
+        self.assertEqual(result["bytesFetched"] + result["resumed"], len(RangeRequestHandler.data))
+    
+    def test_range_not_supported(self):
+        """اختبار اكتشاف عدم دعم الخادم لطلبات النطاق."""
+        RangeRequestHandler.support_range = False
+        downloader = RangeDownloader(self.url)
+        self.assertIsNone(downloader.get_size())
+        with self.assertRaises(YouTubeError):
+            downloader.download(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
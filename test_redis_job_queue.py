@@ -0,0 +1,179 @@
+"""
+اختبار قائمة انتظار المهام المشتركة بين الأجهزة على Redis.
+يوفر اختبارات لحجز المهام من عدة أجهزة وإعادتها بعد توقف العامل، ولتفضيل الجهاز الذي يحتفظ بالملف المصدر.
+تستخدم fakeredis بدلاً من خادم Redis حقيقي.
+"""
+
+import os
+import sys
+import time
+import operator
+import unittest
+import logging
+from flask import Flask
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.redis_job_queue import RedisJobQueue
+from utils.job_queue import DurableJobManager
+from utils.job_scheduler import PRIORITY_HIGH, PRIORITY_LOW
+from config.config import config
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class RedisJobQueueTest(unittest.TestCase):
+    """اختبارات لقائمة انتظار المهام المشتركة."""
+    
+    def setUp(self):
+        """إنشاء جهازين يتصلان بنفس خادم Redis."""
+        if fakeredis is None:
+            self.skipTest("fakeredis غير مثبتة")
+        self.server = fakeredis.FakeServer()
+        self.node_a = self._create_queue('node-a')
+        self.node_b = self._create_queue('node-b')
+    
+    def _create_queue(self, node, **kwargs):
+        """إنشاء قائمة انتظار لجهاز باتصال مستقل."""
+        client = fakeredis.FakeRedis(server=self.server, decode_responses=True)
+        kwargs.setdefault('max_attempts', 2)
+        return RedisJobQueue(client, prefix='test:jobs', node=node, **kwargs)
+    
+    def test_lease_and_complete(self):
+        """اختبار حجز مهمة على جهاز وتسجيل نتيجتها وقراءتها من جهاز آخر."""
+        job_id = self.node_a.enqueue('add', '_operator:add', (2, 3))
+        self.assertEqual(self.node_b.get(job_id)['status'], RedisJobQueue.STATUS_PENDING)
+        
+        job = self.node_b.lease('worker-b')
+        self.assertEqual(job['jobId'], job_id)
+        self.assertEqual(job['args'], [2, 3])
+        self.assertEqual(job['attempts'], 1)
+        self.assertIsNone(self.node_a.lease('worker-a'))
+        
+        self.assertTrue(self.node_b.heartbeat(job_id, 'worker-b'))
+        self.assertFalse(self.node_a.heartbeat(job_id, 'worker-a'))
+        self.assertTrue(self.node_b.complete(job_id, 'worker-b', {"sum": 5}))
+        
+        record = self.node_a.get(job_id)
+        self.assertEqual(record['status'], RedisJobQueue.STATUS_COMPLETED)
+        self.assertEqual(record['result'], {"sum": 5})
+        self.assertIsNotNone(record['finishedAt'])
+    
+    def test_retry_after_worker_crash(self):
+        """اختبار انتقال المهمة إلى جهاز آخر بعد توقف العامل، وفشلها بعد استنفاد المحاولات."""
+        job_id = self.node_a.enqueue('work', '_operator:add', (1, 1))
+        self.node_a.lease_duration = 0
+        self.node_b.lease_duration = 0
+        self.node_a.lease('crashed-a')
+        time.sleep(0.01)
+        
+        job = self.node_b.lease('crashed-b')
+        self.assertEqual(job['jobId'], job_id)
+        self.assertEqual(job['attempts'], 2)
+        self.assertFalse(self.node_a.complete(job_id, 'crashed-a', None))
+        time.sleep(0.01)
+        
+        self.assertIsNone(self.node_a.lease('worker-a'))
+        record = self.node_a.get(job_id)
+        self.assertEqual(record['status'], RedisJobQueue.STATUS_FAILED)
+        self.assertEqual(record['attempts'], 2)
+    
+    def test_lease_order(self):
+        """اختبار ترتيب الحجز حسب نصيب العميل والأولوية والتكلفة."""
+        self.node_a.enqueue('a', '_operator:add', priority=PRIORITY_HIGH, cost=1, client_id='a')
+        self.node_a.enqueue('a', '_operator:add', priority=PRIORITY_HIGH, cost=1, client_id='a')
+        self.node_a.enqueue('b-long', '_operator:add', cost=60, client_id='b')
+        self.node_a.enqueue('b-short', '_operator:add', cost=5, client_id='b')
+        self.node_a.enqueue('b-batch', '_operator:add', priority=PRIORITY_LOW, cost=1, client_id='b')
+        
+        queues = [self.node_a, self.node_b]
+        order = [queues[index % 2].lease(f"worker-{index}")['type'] for index in range(5)]
+        self.assertEqual(order, ['a', 'b-short', 'a', 'b-long', 'b-batch'])
+    
+    def test_affinity(self):
+        """اختبار تفضيل الجهاز الذي يحتفظ بالملف المصدر، ثم تنفيذ المهمة على جهاز آخر بعد الانتظار."""
+        self.node_a.register_worker('worker-a')
+        first_id = self.node_a.enqueue('clip', '_operator:add', affinity='video:1')
+        self.node_a.lease('worker-a')
+        self.node_a.complete(first_id, 'worker-a', None)
+        
+        # الجهاز الآخر يترك المهمة للجهاز الذي يحتفظ بالملف ويأخذ غيرها
+        cached_id = self.node_b.enqueue('clip', '_operator:add', cost=1, affinity='video:1')
+        other_id = self.node_b.enqueue('clip', '_operator:add', cost=60, affinity='video:2')
+        self.assertEqual(self.node_b.lease('worker-b')['jobId'], other_id)
+        self.assertIsNone(self.node_b.lease('worker-b'))
+        
+        # بعد انتهاء مدة الانتظار ينفذها أي جهاز
+        self.node_b.affinity_wait = 0
+        self.assertEqual(self.node_b.lease('worker-b')['jobId'], cached_id)
+        
+        # إذا توقفت جميع عمال الجهاز لا تنتظره المهمة
+        self.node_a.unregister_worker('worker-a')
+        self.node_b.affinity_wait = 60
+        next_id = self.node_b.enqueue('clip', '_operator:add', affinity='video:1')
+        self.assertEqual(self.node_b.lease('worker-b')['jobId'], next_id)
+    
+    def test_stats(self):
+        """اختبار سعة كل جهاز وإحصائيات المهام ووقت الانتظار."""
+        self.node_a.register_worker('worker-a1', busy=True)
+        self.node_a.register_worker('worker-a2')
+        self.node_b.register_worker('worker-b1')
+        job_id = self.node_a.enqueue('add', '_operator:add', (1, 2))
+        self.node_a.enqueue('add', '_operator:add', (3, 4))
+        self.node_b.lease('worker-b1')
+        self.node_b.complete(job_id, 'worker-b1', 3)
+        
+        stats = self.node_a.get_stats()
+        self.assertEqual(stats['workers'], 3)
+        self.assertEqual(stats['nodes']['node-a'], {"workers": 2, "busy": 1})
+        self.assertEqual(stats['nodes']['node-b'], {"workers": 1, "busy": 0})
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['running'], 0)
+        self.assertEqual(stats['queueWait']['samples'], 1)
+        self.assertIsNotNone(stats['averageDuration'])
+        
+        self.node_b.unregister_worker('worker-b1')
+        self.assertNotIn('node-b', self.node_a.get_stats()['nodes'])
+        self.assertEqual(self.node_a.cleanup(0), 1)
+        self.assertIsNone(self.node_a.get(job_id))
+
+class RedisDurableJobManagerTest(unittest.TestCase):
+    """اختبارات لمدير المهام الدائم مع قائمة الانتظار المشتركة."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        if fakeredis is None:
+            self.skipTest("fakeredis غير مثبتة")
+        self.app = Flask(__name__)
+        self.app.config.from_object(config['testing'])
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        
+        server = fakeredis.FakeServer()
+        self.web = RedisJobQueue(fakeredis.FakeRedis(server=server, decode_responses=True), node='web')
+        self.encoder = RedisJobQueue(fakeredis.FakeRedis(server=server, decode_responses=True), node='encoder')
+        self.job_manager = DurableJobManager(self.web, result_ttl=60)
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        self.app_context.pop()
+    
+    def test_submit_and_run(self):
+        """اختبار إرسال مهمة من خادم الويب وتنفيذها على جهاز معالجة آخر."""
+        job_id = self.job_manager.submit(operator.add, 2, 3, job_type='add', affinity='video:1')
+        self.assertEqual(self.job_manager.get(job_id)['status'], DurableJobManager.STATUS_PENDING)
+        
+        DurableJobManager(self.encoder).run_leased(self.encoder.lease('worker-1'), 'worker-1')
+        job = self.job_manager.get(job_id)
+        self.assertEqual(job['status'], DurableJobManager.STATUS_COMPLETED)
+        self.assertEqual(job['result'], 5)
+        self.assertEqual(self.job_manager.get_load()['pending'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
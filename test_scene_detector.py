@@ -0,0 +1,90 @@
+"""
+اختبار كاشف تغير المشاهد والحركة.
+يوفر اختبارات لبناء الخط الزمني وحفظه والاستعلام عنه.
+"""
+
+import os
+import sys
+import unittest
+import logging
+import tempfile
+import shutil
+import subprocess
+import numpy as np
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.scene_detector import SceneDetector, find_scene_cuts, motion_energy
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class SceneDetectorTest(unittest.TestCase):
+    """اختبارات لكاشف تغير المشاهد والحركة."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.temp_dir = tempfile.mkdtemp()
+        
+        # إنشاء فيديو من ثلاثة مشاهد: لون ثابت، لون ثابت آخر، ثم مشهد متحرك
+        self.test_video_path = os.path.join(self.temp_dir, "test_video.mp4")
+        try:
+            subprocess.run(
+                [
+                    "ffmpeg",
+                    "-f", "lavfi",
+                    "-i", "color=red:size=320x180:rate=25:duration=4",
+                    "-f", "lavfi",
+                    "-i", "color=blue:size=320x180:rate=25:duration=4",
+                    "-f", "lavfi",
+                    "-i", "testsrc2=size=320x180:rate=25:duration=4",
+                    "-filter_complex", "[0:v][1:v][2:v]concat=n=3:v=1:a=0[v]",
+                    "-map", "[v]",
+                    "-c:v", "libx264",
+                    "-pix_fmt", "yuv420p",
+                    self.test_video_path
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=True
+            )
+        except Exception as e:
+            self.skipTest(f"فشل إنشاء ملف فيديو اختباري: {str(e)}")
+        
+        self.detector = SceneDetector(fps=4, buffer_frames=5)
+    
+    def test_build_timeline(self):
+        """اختبار بناء الخط الزمني وتحديد تغير المشاهد."""
+        timeline = self.detector.build_timeline(self.test_video_path)
+        
+        self.assertEqual(timeline.shape, (48, 3))
+        self.assertEqual(find_scene_cuts(timeline), [4.0, 8.0])
+        
+        # المشهد المتحرك أعلى حركة من المشهد الثابت
+        self.assertEqual(motion_energy(timeline, 0.5, 3), 0)
+        self.assertGreater(motion_energy(timeline, 8.5, 3), 0)
+    
+    def test_buffer_size_does_not_change_result(self):
+        """اختبار أن حجم المخزن الدائري لا يؤثر على النتيجة."""
+        small_buffer = SceneDetector(fps=4, buffer_frames=1).build_timeline(self.test_video_path)
+        large_buffer = SceneDetector(fps=4, buffer_frames=100).build_timeline(self.test_video_path)
+        np.testing.assert_allclose(small_buffer, large_buffer)
+    
+    def test_timeline_saved_next_to_source(self):
+        """اختبار حفظ الخط الزمني بجانب الفيديو وقراءته دون إعادة البناء."""
+        timeline = self.detector.get_timeline(self.test_video_path)
+        timeline_path = self.detector.get_timeline_path(self.test_video_path)
+        self.assertTrue(os.path.exists(timeline_path))
+        
+        # القراءة الثانية من الملف المحفوظ
+        cached = self.detector.get_timeline(self.test_video_path)
+        self.assertIsInstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, timeline)
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
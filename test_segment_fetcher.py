@@ -0,0 +1,169 @@
+"""
+اختبار تنزيل جزء زمني من فيديو MP4.
+يوفر اختبارات لتحليل صندوق moov وتنزيل النطاق المطلوب فقط من خادم HTTP محلي يدعم طلبات النطاق.
+"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import logging
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.segment_fetcher import SegmentFetcher
+from utils.mp4_parser import parse_box_header, parse_moov
+from utils.error_handler import YouTubeError
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """خادم ملفات بسيط يدعم طلبات النطاق، أو يتجاهلها إذا كان support_range غير مفعل."""
+    
+    folder = None
+    support_range = True
+    
+    def log_message(self, format, *args):
+        """تعطيل سجل الطلبات."""
+        pass
+    
+    def do_GET(self):
+        """إرسال الملف المطلوب أو جزء منه."""
+        path = os.path.join(self.folder, os.path.basename(self.path))
+        size = os.path.getsize(path)
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        
+        if match and self.support_range:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        else:
+            start, end = 0, size - 1
+            self.send_response(200)
+        
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            f.seek(start)
+            try:
+                self.wfile.write(f.read(end - start + 1))
+            except (BrokenPipeError, ConnectionResetError):
+                # العميل يغلق الاتصال بعد رفض استجابة لا تدعم النطاق
+                pass
+
+class SegmentFetcherTest(unittest.TestCase):
+    """اختبارات لتنزيل جزء زمني من الفيديو."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """إنشاء فيديوهات الاختبار وتشغيل الخادم المحلي."""
+        cls.temp_dir = tempfile.mkdtemp()
+        
+        # فيديو مع الفهرس في البداية، ونسخة منه مع الفهرس في النهاية
+        cls.fast_path = os.path.join(cls.temp_dir, 'fast.mp4')
+        cls.end_path = os.path.join(cls.temp_dir, 'end.mp4')
+        try:
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error",
+                "-f", "lavfi", "-i", "testsrc=size=320x180:rate=30,noise=alls=20:allf=t",
+                "-f", "lavfi", "-i", "sine=frequency=440",
+                "-t", "60",
+                "-c:v", "libx264", "-preset", "ultrafast", "-g", "60", "-c:a", "aac",
+                "-movflags", "+faststart",
+                cls.fast_path
+            ], check=True, capture_output=True)
+            subprocess.run(
+                ["ffmpeg", "-y", "-v", "error", "-i", cls.fast_path, "-c", "copy", cls.end_path],
+                check=True,
+                capture_output=True
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            shutil.rmtree(cls.temp_dir, ignore_errors=True)
+            raise unittest.SkipTest(f"فشل إنشاء فيديو الاختبار: {str(e)}")
+        
+        RangeRequestHandler.folder = cls.temp_dir
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+    
+    @classmethod
+    def tearDownClass(cls):
+        """إيقاف الخادم وحذف الملفات المؤقتة."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+    
+    def tearDown(self):
+        """إعادة الخادم إلى دعم طلبات النطاق."""
+        RangeRequestHandler.support_range = True
+    
+    def _frame_md5(self, path, time):
+        """حساب تجزئة الإطار المفكوك عند وقت معين."""
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-ss", str(time), "-i", path, "-frames:v", "1", "-f", "md5", "-"],
+            capture_output=True,
+            text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip()
+    
+    def test_parse_moov(self):
+        """اختبار قراءة جداول العينات من صندوق moov."""
+        with open(self.fast_path, 'rb') as f:
+            data = f.read()
+        
+        # البحث عن صندوق moov في المستوى الأعلى
+        offset = 0
+        while True:
+            box_type, _, size = parse_box_header(data, offset)
+            if box_type == b'moov':
+                break
+            offset += size
+        
+        movie = parse_moov(data[offset:offset + size])
+        self.assertAlmostEqual(movie["duration"], 60, delta=0.1)
+        
+        video = next(track for track in movie["tracks"] if track["handler"] == 'vide')
+        self.assertEqual(len(video["times"]), 60 * 30)
+        self.assertEqual(int(video["sync"].sum()), 60 * 30 // 60)
+        
+        # مواقع العينات تقع داخل الملف ولا تتداخل
+        order = video["offsets"].argsort()
+        ends = video["offsets"][order] + video["sizes"][order]
+        self.assertTrue((ends[:-1] <= video["offsets"][order][1:]).all())
+        self.assertLessEqual(int(ends[-1]), len(data))
+    
+    def test_fetch_segment(self):
+        """اختبار تنزيل جزء يطابق الفيديو الكامل في النطاق المطلوب."""
+        for name, source_path in (('fast.mp4', self.fast_path), ('end.mp4', self.end_path)):
+            with self.subTest(name=name):
+                output_path = os.path.join(self.temp_dir, f"part_{name}")
+                fetcher = SegmentFetcher(f"{self.base_url}/{name}")
+                segment = fetcher.fetch(output_path, 40, 5)
+                
+                # تنزيل جزء صغير فقط من الملف مع الحفاظ على حجمه الكامل
+                self.assertEqual(segment["size"], os.path.getsize(source_path))
+                self.assertEqual(os.path.getsize(output_path), segment["size"])
+                self.assertLess(segment["bytesFetched"], segment["size"] / 4)
+                
+                # الإطارات في النطاق المطلوب مطابقة للفيديو الكامل
+                for time in (40, 42.5, 44.9):
+                    self.assertEqual(self._frame_md5(output_path, time), self._frame_md5(source_path, time))
+    
+    def test_range_not_supported(self):
+        """اختبار رفع خطأ إذا لم يدعم الخادم طلبات النطاق."""
+        RangeRequestHandler.support_range = False
+        fetcher = SegmentFetcher(f"{self.base_url}/fast.mp4")
+        with self.assertRaises(YouTubeError):
+            fetcher.fetch(os.path.join(self.temp_dir, 'unsupported.mp4'), 40, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+اختبار ذاكرة التخزين المؤقت المشتركة بين العمليات.
+يوفر اختبارات لمشاركة العناصر بين النسخ والعمليات وانتهاء الصلاحية والحد الأقصى للحجم.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import logging
+import multiprocessing
+
+# إضافة المسار الرئيسي للمشروع
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.shared_cache import SharedCache
+from utils.cache_manager import CacheManager
+
+# تعطيل التسجيل أثناء الاختبار
+logging.disable(logging.CRITICAL)
+
+def _write_from_process(path, key, value):
+    """تخزين قيمة من عملية أخرى."""
+    cache = CacheManager(max_size=10, max_age=60, enabled=True, shared=SharedCache(path))
+    cache.set(key, value)
+
+class SharedCacheTest(unittest.TestCase):
+    """اختبارات لذاكرة التخزين المؤقت المشتركة."""
+    
+    def setUp(self):
+        """إعداد بيئة الاختبار."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'shared_cache.sqlite3')
+    
+    def tearDown(self):
+        """تنظيف بيئة الاختبار."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _create_cache(self):
+        """إنشاء مدير تخزين مؤقت بطبقة مشتركة مستقلة."""
+        return CacheManager(max_size=10, max_age=60, enabled=True, shared=SharedCache(self.path))
+    
+    def test_shared_between_instances(self):
+        """اختبار رؤية نسخة لقيمة خزنتها نسخة أخرى وبقائها بعد إعادة الإنشاء."""
+        first = self._create_cache()
+        first.set("youtube_info_abc", {"title": "فيديو"})
+        
+        second = self._create_cache()
+        self.assertEqual(second.get("youtube_info_abc"), {"title": "فيديو"})
+        
+        # القيمة أصبحت في الطبقة المحلية للنسخة الثانية
+        self.assertEqual(len(second), 1)
+        
+        # الحذف يشمل الطبقة المشتركة
+        first.delete("youtube_info_abc")
+        self.assertIsNone(self._create_cache().get("youtube_info_abc"))
+    
+    def test_local_only_keys(self):
+        """اختبار عدم مشاركة القيم الخاصة بالعملية الحالية."""
+        first = self._create_cache()
+        first.set("job_key", {"jobId": "1"}, shared=False)
+        first.get_or_compute("job_other", lambda: {"jobId": "2"}, shared=False)
+        
+        second = self._create_cache()
+        self.assertIsNone(second.get("job_key"))
+        self.assertIsNone(second.get("job_other"))
+    
+    def test_get_or_compute_uses_shared_result(self):
+        """اختبار عدم إعادة الحساب إذا كانت القيمة محسوبة في نسخة أخرى."""
+        first = self._create_cache()
+        first.get_or_compute("processed_abc", lambda: "result")
+        
+        second = self._create_cache()
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            return "recomputed"
+        
+        self.assertEqual(second.get_or_compute("processed_abc", compute), "result")
+        self.assertEqual(calls, [])
+    
+    def test_expiry(self):
+        """اختبار انتهاء صلاحية العناصر في الطبقة المشتركة والمحلية."""
+        first = self._create_cache()
+        first.set("short", 1, ttl=0.05)
+        
+        # المدة المتبقية تنتقل مع القيمة إلى الطبقة المحلية
+        second = self._create_cache()
+        self.assertEqual(second.get("short"), 1)
+        time.sleep(0.1)
+        self.assertIsNone(second.get("short"))
+        self.assertIsNone(self._create_cache().get("short"))
+    
+    def test_max_bytes(self):
+        """اختبار حذف أقدم العناصر عند تجاوز الحجم المسموح."""
+        shared = SharedCache(self.path, max_bytes=50000)
+        for i in range(SharedCache.SIZE_CHECK_INTERVAL):
+            shared.set(f"key_{i}", "x" * 10000, time.time() + 60)
+        
+        self.assertIsNone(shared.get("key_0"))
+        self.assertIsNotNone(shared.get(f"key_{SharedCache.SIZE_CHECK_INTERVAL - 1}"))
+    
+    def test_shared_between_processes(self):
+        """اختبار رؤية قيمة خزنتها عملية أخرى."""
+        cache = self._create_cache()
+        self.assertIsNone(cache.get("youtube_search_abc"))
+        
+        process = multiprocessing.get_context('spawn').Process(
+            target=_write_from_process,
+            args=(self.path, "youtube_search_abc", {"results": [1, 2, 3]})
+        )
+        process.start()
+        process.join(30)
+        self.assertEqual(process.exitcode, 0)
+        
+        self.assertEqual(cache.get("youtube_search_abc"), {"results": [1, 2, 3]})
+
+if __name__ == '__main__':
+    unittest.main()
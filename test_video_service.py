@@ -9,6 +9,7 @@ import unittest
 import logging
 import tempfile
 import shutil
+import subprocess
 from flask import Flask
 
 # إضافة المسار الرئيسي للمشروع
@@ -36,6 +37,7 @@ class VideoServiceTest(unittest.TestCase):
         os.makedirs(self.app.config['UPLOAD_FOLDER'], exist_ok=True)
         os.makedirs(self.app.config['PROCESSED_FOLDER'], exist_ok=True)
         os.makedirs(self.app.config['AUDIO_FOLDER'], exist_ok=True)
+        os.makedirs(self.app.config['CACHE_FOLDER'], exist_ok=True)
         
         # إنشاء ملف فيديو اختباري
         self.test_video_path = os.path.join(self.app.config['UPLOAD_FOLDER'], "test_video.mp4")
@@ -45,20 +47,31 @@ class VideoServiceTest(unittest.TestCase):
         self.test_audio_path = os.path.join(self.app.config['AUDIO_FOLDER'], "test_sound.mp3")
         self.create_test_audio()
     
-    def create_test_video(self):
-        """إنشاء ملف فيديو اختباري باستخدام FFmpeg."""
+    def create_test_video(self, path=None, audio=False, gop=None):
+        """
+        إنشاء ملف فيديو اختباري مدته 10 ثوانٍ باستخدام FFmpeg.
+        
+        Args:
+            path (str, اختياري): مسار الملف، الافتراضي ملف الفيديو الاختباري.
+            audio (bool): إضافة مسار صوتي بنفس المدة.
+            gop (int, اختياري): عدد الإطارات بين الإطارات المفتاحية.
+        """
         try:
-            # إنشاء فيديو اختباري مدته 10 ثوانٍ
             command = [
                 "ffmpeg",
                 "-f", "lavfi",
-                "-i", "testsrc=duration=10:size=640x360:rate=30",
-                "-c:v", "libx264",
-                "-pix_fmt", "yuv420p",
-                self.test_video_path
+                "-i", "testsrc=duration=10:size=640x360:rate=30"
             ]
+            if audio:
+                command += ["-f", "lavfi", "-i", "sine=frequency=440:duration=10"]
+            command += ["-c:v", "libx264"]
+            if gop:
+                command += ["-g", str(gop)]
+            command += ["-pix_fmt", "yuv420p"]
+            if audio:
+                command += ["-c:a", "aac"]
+            command += ["-y", path or self.test_video_path]
             
-            import subprocess
             subprocess.run(
                 command,
                 stdout=subprocess.PIPE,
@@ -80,7 +93,6 @@ class VideoServiceTest(unittest.TestCase):
                 self.test_audio_path
             ]
             
-            import subprocess
             subprocess.run(
                 command,
                 stdout=subprocess.PIPE,
@@ -199,6 +211,277 @@ class VideoServiceTest(unittest.TestCase):
             if os.path.exists(input_path):
                 os.remove(input_path)
     
+    def test_source_resolution_cost(self):
+        """اختبار تقدير تكلفة المعالجة حسب دقة الفيديو المصدر."""
+        with self.app.app_context():
+            resolution = self.video_service.get_source_resolution("test_video")
+            self.assertEqual(resolution, "360p")
+            self.assertIsNone(self.video_service.get_source_resolution("missing_video"))
+            
+            # تكلفة مصدر 360p أقل من تكلفة الدقة الافتراضية لنفس المدة
+            self.assertLess(
+                self.video_service.estimate_cost(10, 'encode', resolution),
+                self.video_service.estimate_cost(10, 'encode')
+            )
+    
+    def test_process_video_smart_cut(self):
+        """اختبار معالجة الفيديو بوضع الاقتطاع الذكي."""
+        # إنشاء فيديو بصوت وبإطار مفتاحي كل ثانية ليحتوي المقطع على جزء قابل للنسخ
+        video_id = "test_smart_cut_id"
+        input_path = os.path.join(self.app.config['UPLOAD_FOLDER'], f"{video_id}.mp4")
+        self.create_test_video(input_path, audio=True, gop=30)
+        
+        # مؤثر صوتي أقصر من المقطع للتحقق من طول الصوت بعد المزج
+        sound_effect_path = os.path.join(self.app.config['AUDIO_FOLDER'], "dramatic.mp3")
+        shutil.copy(self.test_audio_path, sound_effect_path)
+        
+        # تسجيل مدة الأجزاء المعاد ترميزها
+        encoded = []
+        encode_segment = self.video_service._encode_video_segment
+        
+        def record(input_path, output_path, start_time, duration, pix_fmt):
+            encoded.append(duration)
+            return encode_segment(input_path, output_path, start_time, duration, pix_fmt)
+        
+        self.video_service._encode_video_segment = record
+        
+        output_id = "test_smart_cut_output_id"
+        output_path = os.path.join(self.app.config['PROCESSED_FOLDER'], f"{output_id}.mp4")
+        thumbnail_path = os.path.join(self.app.config['PROCESSED_FOLDER'], f"{output_id}.jpg")
+        try:
+            with self.app.app_context():
+                result = self.video_service.process_video(
+                    video_id=video_id,
+                    output_id=output_id,
+                    start_time=1.5,
+                    duration=7,
+                    sound_effect="dramatic",
+                    mode='smart_cut'
+                )
+            
+            # التحقق من نجاح المعالجة بالنسخ المباشر وبالمدة المطلوبة
+            self.assertTrue(result['success'])
+            self.assertEqual(result['mode'], 'smart_cut')
+            self.assertAlmostEqual(result['duration'], 7, delta=0.01)
+            
+            # إعادة ترميز نصف ثانية في كل طرف فقط، ونسخ الثواني الست بينهما
+            self.assertEqual(len(encoded), 2)
+            self.assertAlmostEqual(sum(encoded), 1, delta=0.01)
+            
+            # التحقق من أن الأجزاء المدمجة لا تكرر ولا تفقد إطارات وأن الصوت بطول الفيديو
+            streams = {}
+            for selector in ("v:0", "a:0"):
+                output = subprocess.run(
+                    [
+                        "ffprobe", "-v", "error",
+                        "-select_streams", selector,
+                        "-count_packets",
+                        "-show_entries", "stream=nb_read_packets,duration",
+                        "-of", "default=noprint_wrappers=1",
+                        output_path
+                    ],
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    check=True
+                ).stdout
+                streams[selector] = dict(line.split("=", 1) for line in output.splitlines())
+            self.assertEqual(int(streams["v:0"]["nb_read_packets"]), 210)
+            self.assertAlmostEqual(float(streams["v:0"]["duration"]), 7, delta=0.001)
+            self.assertAlmostEqual(float(streams["a:0"]["duration"]), 7, delta=0.001)
+        finally:
+            for path in (input_path, output_path, thumbnail_path, sound_effect_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def test_process_video_parallel(self):
+        """اختبار معالجة الفيديو بوضع الترميز المتوازي."""
+        video_id = "test_parallel_id"
+        input_path = os.path.join(self.app.config['UPLOAD_FOLDER'], f"{video_id}.mp4")
+        self.create_test_video(input_path, audio=True, gop=30)
+        
+        # تقسيم المقطع إلى أجزاء قصيرة حتى يكفي فيديو الاختبار للترميز المتوازي
+        self.app.config['VIDEO_PARALLEL_SEGMENTS'] = 4
+        self.app.config['VIDEO_PARALLEL_MIN_SEGMENT'] = 2
+        
+        output_id = "test_parallel_output_id"
+        output_path = os.path.join(self.app.config['PROCESSED_FOLDER'], f"{output_id}.mp4")
+        thumbnail_path = os.path.join(self.app.config['PROCESSED_FOLDER'], f"{output_id}.jpg")
+        updates = []
+        try:
+            with self.app.app_context():
+                result = self.video_service.process_video(
+                    video_id=video_id,
+                    output_id=output_id,
+                    start_time=1.5,
+                    duration=8,
+                    mode='parallel',
+                    progress=lambda completed, total=None, **details: updates.append((completed, total))
+                )
+            
+            # التحقق من أن الأجزاء المدمجة لا تكرر ولا تفقد إطارات
+            self.assertTrue(result['success'])
+            self.assertEqual(result['mode'], 'parallel')
+            self.assertEqual(result['encoding']['name'], 'fixed')
+            self.assertAlmostEqual(result['duration'], 8, delta=0.1)
+            
+            # التحقق من تسجيل التقدم المجمع للأجزاء ومدة كل مرحلة
+            self.assertTrue(updates)
+            self.assertEqual(updates[-1][1], 8)
+            self.assertLessEqual(max(completed for completed, _ in updates), 8)
+            self.assertEqual(set(result['timings']), {'probe', 'encode', 'thumbnail', 'duration'})
+            
+            frames = subprocess.run(
+                [
+                    "ffprobe", "-v", "error",
+                    "-select_streams", "v:0",
+                    "-count_packets",
+                    "-show_entries", "stream=nb_read_packets",
+                    "-of", "csv=p=0",
+                    output_path
+                ],
+                stdout=subprocess.PIPE,
+                text=True,
+                check=True
+            ).stdout.strip()
+            self.assertEqual(int(frames), 240)
+        finally:
+            for path in (input_path, output_path, thumbnail_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def test_encoding_profile_command(self):
+        """اختبار تطبيق ملف الترميز على أمر FFmpeg."""
+        profile = {"name": "burst", "preset": "ultrafast", "threads": 2, "maxHeight": 480, "pressure": 4.0}
+        with self.app.app_context():
+            command = self.video_service._build_process_command(
+                "input.mp4", "output.mp4", 10, 5, profile=profile
+            )
+            default_command = self.video_service._build_process_command("input.mp4", "output.mp4", 10, 5)
+            
+            self.app.config['VIDEO_ADAPTIVE_ENCODING'] = True
+            self.assertIn(self.video_service._get_encoding_profile()["name"], ("quality", "balanced", "fast", "burst"))
+        
+        self.assertEqual(command[command.index("-preset") + 1], "ultrafast")
+        self.assertEqual(command[command.index("-threads") + 1], "2")
+        self.assertEqual(command[command.index("-vf") + 1], "scale=-2:'min(ih,480)'")
+        self.assertEqual(default_command[default_command.index("-preset") + 1], self.app.config['VIDEO_ENCODING_PRESET'])
+        self.assertNotIn("-vf", default_command)
+    
+    def test_process_video_single_pass(self):
+        """اختبار إنتاج المقطع وصورته المصغرة ومدته من تشغيل واحد لـ FFmpeg."""
+        profile = {"name": "burst", "preset": "ultrafast", "threads": 2, "maxHeight": 480, "pressure": 4.0}
+        video_id = "test_single_pass_id"
+        output_id = "test_single_pass_output_id"
+        input_path = os.path.join(self.app.config['UPLOAD_FOLDER'], f"{video_id}.mp4")
+        output_path = os.path.join(self.app.config['PROCESSED_FOLDER'], f"{output_id}.mp4")
+        thumbnail_path = os.path.join(self.app.config['PROCESSED_FOLDER'], f"{output_id}.jpg")
+        
+        # فيديو بصوت، فتنتهي آخر حزمة مرمزة ضمن إطار واحد من نهاية المقطع
+        self.create_test_video(input_path, audio=True)
+        
+        try:
+            with self.app.app_context():
+                # الصورة المصغرة فرع من مخطط المرشحات بعد تغيير الدقة
+                command = self.video_service._build_process_command(
+                    "input.mp4", "output.mp4", 10, 5, profile=profile, thumbnail_path="thumbnail.jpg"
+                )
+                self.assertNotIn("-vf", command)
+                self.assertIn("scale=-2:'min(ih,480)',split", command[command.index("-filter_complex") + 1])
+                self.assertEqual(command[-1], "thumbnail.jpg")
+                
+                # بعض إصدارات FFmpeg تنهي التقدم بتوقيت مخرج الصورة المصغرة، فتضاف حالة
+                # أخيرة بهذا التوقيت حتى لا تعتمد النتيجة على ترتيب حالات الإصدار المثبت
+                run_ffmpeg = self.video_service._run_ffmpeg
+                
+                def run_with_thumbnail_status(command, error_message, progress=None, duration=None):
+                    final = {}
+                    
+                    def track(**status):
+                        final.update(status)
+                        progress(**status)
+                    
+                    output = run_ffmpeg(command, error_message, track if progress else None, duration)
+                    if progress is not None:
+                        progress(**dict(final, completed=0.03))
+                    return output
+                
+                self.video_service._run_ffmpeg = run_with_thumbnail_status
+                updates = []
+                result = self.video_service.process_video(
+                    video_id=video_id,
+                    output_id=output_id,
+                    start_time=2,
+                    duration=4,
+                    mode='encode',
+                    progress=lambda completed, total=None, **details: updates.append(completed)
+                )
+            
+            # المدة من عدد إطارات المقطع دون FFprobe أو FFmpeg إضافي
+            self.assertEqual(result['duration'], 4)
+            self.assertNotIn('duration', result['timings'])
+            self.assertNotIn('thumbnail', result['timings'])
+            self.assertTrue(os.path.exists(output_path))
+            self.assertTrue(os.path.exists(thumbnail_path))
+            
+            # التقدم المعلن لا يتراجع وينتهي عند المدة كاملة
+            self.assertEqual(updates, sorted(updates))
+            self.assertEqual(updates[-1], 4)
+            
+            # انتهاء المصدر قبل نهاية المقطع ولو بأقل من ربع ثانية يعطي المدة الفعلية من الملف الناتج
+            with self.app.app_context():
+                result = self.video_service.process_video(
+                    video_id=video_id,
+                    output_id=output_id,
+                    start_time=6.15,
+                    duration=4,
+                    mode='encode'
+                )
+            self.assertAlmostEqual(result['duration'], 3.85, delta=0.03)
+            self.assertIn('duration', result['timings'])
+        finally:
+            for path in (input_path, output_path, thumbnail_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def test_process_batch(self):
+        """اختبار معالجة عدة مقاطع بفك ترميز واحد."""
+        # التحقق من وجود ملف الفيديو الاختباري
+        if not os.path.exists(self.test_video_path):
+            self.skipTest("ملف الفيديو الاختباري غير موجود")
+        
+        # نسخ ملف الفيديو الاختباري إلى مجلد التحميل
+        video_id = "test_batch_id"
+        input_path = os.path.join(self.app.config['UPLOAD_FOLDER'], f"{video_id}.mp4")
+        shutil.copy(self.test_video_path, input_path)
+        
+        with self.app.app_context():
+            clips = [
+                {"output_id": "test_batch_output_1", "start_time": 1, "duration": 2},
+                {"output_id": "test_batch_output_2", "start_time": 6, "duration": 3}
+            ]
+            try:
+                result = self.video_service.process_batch(video_id, clips)
+                
+                # التحقق من نتيجة كل مقطع
+                self.assertTrue(result['success'])
+                self.assertEqual(len(result['clips']), 2)
+                for clip, clip_result in zip(clips, result['clips']):
+                    self.assertEqual(clip_result['videoId'], clip['output_id'])
+                    self.assertAlmostEqual(clip_result['duration'], clip['duration'], delta=0.1)
+                    self.assertTrue(os.path.exists(self.video_service.get_video_path(clip['output_id'])))
+                    self.assertTrue(os.path.exists(self.video_service.get_thumbnail_path(clip['output_id'])))
+            except Exception as e:
+                self.skipTest(f"فشل معالجة المقاطع: {str(e)}")
+            finally:
+                # حذف الملفات بعد الاختبار
+                for clip in clips:
+                    for path in (self.video_service.get_video_path(clip['output_id']),
+                                 self.video_service.get_thumbnail_path(clip['output_id'])):
+                        if os.path.exists(path):
+                            os.remove(path)
+                if os.path.exists(input_path):
+                    os.remove(input_path)
+    
     def test_analyze_video(self):
         """اختبار تحليل الفيديو."""
         # التحقق من وجود ملف الفيديو الاختباري
@@ -8,11 +8,13 @@ import sys
 import unittest
 import logging
 from flask import Flask
+from pytube.exceptions import VideoUnavailable
 
 # إضافة المسار الرئيسي للمشروع
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from services.youtube_service import YouTubeService
+from utils.error_handler import YouTubeError
 from config.config import config
 
 # تعطيل التسجيل أثناء الاختبار
@@ -26,6 +28,8 @@ class YouTubeServiceTest(unittest.TestCase):
         # إنشاء تطبيق Flask للاختبار
         self.app = Flask(__name__)
         self.app.config.from_object(config['testing'])
+        self.app_context = self.app.app_context()
+        self.app_context.push()
         
         # إنشاء خدمة YouTube
         self.youtube_service = YouTubeService()
@@ -77,6 +81,82 @@ class YouTubeServiceTest(unittest.TestCase):
             # تخطي الاختبار إذا كان هناك مشكلة في الاتصال
             self.skipTest(f"فشل الاختبار بسبب مشكلة في الاتصال: {str(e)}")
     
+    def _fake_fetch(self, calls, error=None):
+        """إنشاء دالة بديلة للحصول على معلومات الفيديو تسجل استدعاءاتها."""
+        def fetch(video_id):
+            calls.append(video_id)
+            if error is not None:
+                raise error
+            return {"videoId": video_id, "title": f"title {len(calls)}"}
+        return fetch
+    
+    def _age_entry(self, video_id, seconds):
+        """تقديم وقت الحصول على معلومات فيديو في المخزن."""
+        store = self.youtube_service._get_metadata_store()
+        store._get_connection().execute(
+            "UPDATE video_info SET fetched_at = fetched_at - ? WHERE video_id = ?",
+            (seconds, video_id)
+        )
+    
+    def test_video_info_stale_while_revalidate(self):
+        """اختبار إعادة المعلومات المحفوظة وتحديث القديمة منها في الخلفية."""
+        calls = []
+        self.youtube_service._fetch_video_info = self._fake_fetch(calls)
+        video_id = "aaaaaaaaaaa"
+        
+        self.assertEqual(self.youtube_service.get_video_info(video_id)["title"], "title 1")
+        
+        # المعلومات الحديثة تعاد من المخزن، حتى من خدمة جديدة بعد إعادة التشغيل
+        restarted = YouTubeService()
+        restarted._fetch_video_info = self._fake_fetch(calls)
+        self.assertEqual(restarted.get_video_info(video_id)["title"], "title 1")
+        self.assertEqual(len(calls), 1)
+        
+        # المعلومات القديمة تعاد فورًا ويتم تحديثها في الخلفية
+        self._age_entry(video_id, self.app.config['YOUTUBE_CACHE_DURATION'] + 1)
+        self.assertEqual(self.youtube_service.get_video_info(video_id)["title"], "title 1")
+        self.youtube_service.refresh_executor.shutdown(wait=True)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.youtube_service.get_video_info(video_id)["title"], "title 2")
+        
+        # المعلومات الأقدم من مدة الصلاحية الإضافية يتم تحديثها قبل إعادتها
+        self._age_entry(
+            video_id,
+            self.app.config['YOUTUBE_CACHE_DURATION'] + self.app.config['YOUTUBE_CACHE_STALE_DURATION'] + 1
+        )
+        self.assertEqual(self.youtube_service.get_video_info(video_id)["title"], "title 3")
+    
+    def test_video_info_negative_cache(self):
+        """اختبار حفظ نتيجة الفيديوهات غير المتاحة ورفض المعرفات غير الصالحة دون اتصال."""
+        calls = []
+        self.youtube_service._fetch_video_info = self._fake_fetch(calls, VideoUnavailable("bbbbbbbbbbb"))
+        video_id = "bbbbbbbbbbb"
+        
+        for _ in range(3):
+            with self.assertRaises(YouTubeError):
+                self.youtube_service.get_video_info(video_id)
+        self.assertEqual(len(calls), 1)
+        
+        # إعادة المحاولة بعد انتهاء مدة حفظ النتيجة السلبية
+        self._age_entry(video_id, self.app.config['YOUTUBE_NEGATIVE_CACHE_DURATION'] + 1)
+        with self.assertRaises(YouTubeError):
+            self.youtube_service.get_video_info(video_id)
+        self.assertEqual(len(calls), 2)
+        
+        with self.assertRaises(YouTubeError):
+            self.youtube_service.get_video_info("not a video id")
+        self.assertEqual(len(calls), 2)
+    
+    def test_video_info_network_error_not_cached(self):
+        """اختبار عدم حفظ أخطاء الشبكة المؤقتة."""
+        calls = []
+        self.youtube_service._fetch_video_info = self._fake_fetch(calls, OSError("خطأ شبكة اختباري"))
+        
+        for _ in range(2):
+            with self.assertRaises(YouTubeError):
+                self.youtube_service.get_video_info("ccccccccccc")
+        self.assertEqual(len(calls), 2)
+    
     def test_download_video(self):
         """اختبار تنزيل فيديو YouTube."""
         # ملاحظة: هذا الاختبار يتطلب اتصالاً بالإنترنت
@@ -137,6 +217,8 @@ class YouTubeServiceTest(unittest.TestCase):
             file_path = os.path.join(self.app.config['CACHE_FOLDER'], filename)
             if os.path.isfile(file_path):
                 os.remove(file_path)
+        
+        self.app_context.pop()
 
 if __name__ == '__main__':
     unittest.main()
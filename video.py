@@ -12,6 +12,7 @@ from werkzeug.utils import secure_filename
 from ..services.video_service import VideoService
 from ..utils.cache_manager import CacheManager
 from ..utils.error_handler import handle_errors, VideoProcessingError
+from ..utils.job_scheduler import PRIORITIES, PRIORITY_LOW
 
 # إنشاء مخطط API للفيديو
 video_bp = Blueprint('video', __name__)
@@ -23,26 +24,52 @@ cache = CacheManager()
 # إنشاء خدمة معالجة الفيديو
 video_service = VideoService()
 
+def _process_video_job(cache_key, **kwargs):
+    """
+    تنفيذ معالجة الفيديو كمهمة خلفية وتخزين النتيجة مؤقتًا.
+    
+    المعلمات:
+        cache_key (str): مفتاح التخزين المؤقت للنتيجة.
+        **kwargs: معاملات VideoService.process_video.
+    
+    العائد:
+        dict: معلومات الفيديو المعالج.
+    """
+    # تسجيل تقدم الترميز في المهمة أثناء التنفيذ
+    progress = current_app.job_manager.get_progress_callback()
+    
+    result = cache.get_or_compute(cache_key, lambda: video_service.process_video(progress=progress, **kwargs))
+    
+    logger.info(f"تمت معالجة الفيديو بنجاح: {kwargs.get('video_id')} -> {kwargs.get('output_id')}")
+    return result
+
 @video_bp.route('/process', methods=['POST'])
 @handle_errors
 def process_video():
     """
     معالجة الفيديو وإضافة المؤثرات الصوتية.
     
+    تتم المعالجة في الخلفية، ويعاد معرف المهمة فورًا لمتابعة حالتها
+    عبر /api/video/jobs/<job_id>. إذا كانت النتيجة مخزنة مؤقتًا، تعاد مباشرة،
+    وإذا كان نفس المقطع قيد المعالجة يعاد معرف المهمة الجارية.
+    
     طلب JSON:
         {
             "videoId": "معرف الفيديو (من YouTube أو ملف محمل)",
             "startTime": "وقت البداية (اختياري، بالثواني)",
             "duration": "المدة (اختياري، بالثواني)",
-            "soundEffect": "نوع المؤثر الصوتي (اختياري)"
+            "soundEffect": "نوع المؤثر الصوتي (اختياري)",
+            "mode": "وضع المعالجة (اختياري): encode أو smart_cut أو parallel",
+            "priority": "أولوية المهمة (اختياري): high أو normal أو low"
         }
     
-    الاستجابة:
+    الاستجابة (202):
         {
             "success": true,
-            "videoId": "معرف الفيديو المعالج",
-            "duration": "مدة الفيديو المعالج",
-            "url": "عنوان URL للفيديو المعالج"
+            "jobId": "معرف المهمة",
+            "status": "pending",
+            "videoId": "معرف الفيديو المعالج (متاح بعد اكتمال المهمة)",
+            "statusUrl": "عنوان URL لحالة المهمة"
         }
     """
     # التحقق من البيانات المستلمة
@@ -54,35 +81,197 @@ def process_video():
     start_time = data.get('startTime')
     duration = data.get('duration')
     sound_effect = data.get('soundEffect')
+    mode = data.get('mode')
+    
+    if mode is not None and mode not in video_service.PROCESSING_MODES:
+        return jsonify({"error": f"وضع المعالجة غير صالح: {mode}"}), 400
+    
+    priority = PRIORITIES.get(data.get('priority', 'normal'))
+    if priority is None:
+        return jsonify({"error": f"أولوية المهمة غير صالحة: {data.get('priority')}"}), 400
     
     # التحقق من وجود النتيجة في ذاكرة التخزين المؤقت
-    cache_key = f"processed_{video_id}_{start_time}_{duration}_{sound_effect}"
+    cache_key = f"processed_{video_id}_{start_time}_{duration}_{sound_effect}_{mode}"
     cached_result = cache.get(cache_key)
     if cached_result:
         logger.info(f"تم استرجاع نتيجة معالجة الفيديو من ذاكرة التخزين المؤقت: {video_id}")
         return jsonify(cached_result)
     
-    # تنفيذ معالجة الفيديو في خيط منفصل
-    logger.info(f"بدء معالجة الفيديو: {video_id}")
+    def submit_job():
+        logger.info(f"بدء معالجة الفيديو: {video_id}")
+        
+        # إنشاء معرف فريد للفيديو المعالج
+        output_id = str(uuid.uuid4())
+        
+        # إرسال معالجة الفيديو كمهمة خلفية
+        job_id = current_app.job_manager.submit(
+            _process_video_job,
+            cache_key,
+            job_type='process_video',
+            priority=priority,
+            cost=video_service.estimate_cost(duration, mode, video_service.get_source_resolution(video_id)),
+            affinity=f"video:{video_id}",
+            video_id=video_id,
+            output_id=output_id,
+            start_time=start_time,
+            duration=duration,
+            sound_effect=sound_effect,
+            mode=mode
+        )
+        return {"jobId": job_id, "videoId": output_id}
     
-    # إنشاء معرف فريد للفيديو المعالج
-    output_id = str(uuid.uuid4())
+    # الطلبات المتزامنة لنفس المقطع تشترك في مهمة واحدة بدلاً من تكرار المعالجة
+    job = current_app.job_manager.get_or_submit(cache, f"job_{cache_key}", submit_job)
     
-    # معالجة الفيديو
-    result = current_app.executor.submit(
-        video_service.process_video,
-        video_id=video_id,
-        output_id=output_id,
-        start_time=start_time,
-        duration=duration,
-        sound_effect=sound_effect
-    ).result()
+    return jsonify({
+        "success": True,
+        "jobId": job["jobId"],
+        "status": "pending",
+        "videoId": job["videoId"],
+        "statusUrl": f"/api/video/jobs/{job['jobId']}"
+    }), 202
+
+def _process_batch_job(video_id, clips):
+    """
+    تنفيذ معالجة دفعة مقاطع كمهمة خلفية وتخزين نتيجة كل مقطع مؤقتًا.
+    
+    المعلمات:
+        video_id (str): معرف الفيديو المصدر.
+        clips (list): قائمة المقاطع (انظر VideoService.process_batch).
     
-    # تخزين النتيجة في ذاكرة التخزين المؤقت
-    cache.set(cache_key, result)
+    العائد:
+        dict: معلومات المقاطع المعالجة.
+    """
+    result = video_service.process_batch(video_id, clips)
+    
+    # تخزين نتيجة كل مقطع بنفس مفتاح طلب المعالجة الفردي
+    for clip, clip_result in zip(clips, result["clips"]):
+        cache_key = f"processed_{video_id}_{clip['start_time']}_{clip['duration']}_{clip['sound_effect']}_None"
+        cache.set(cache_key, clip_result)
+    
+    return result
+
+@video_bp.route('/process-batch', methods=['POST'])
+@handle_errors
+def process_batch():
+    """
+    معالجة عدة مقاطع من نفس الفيديو بفك ترميز واحد للمصدر.
+    
+    تتم المعالجة في الخلفية، ويعاد معرف المهمة فورًا مع معرفات المقاطع الناتجة.
+    
+    طلب JSON:
+        {
+            "videoId": "معرف الفيديو المصدر",
+            "clips": [
+                {
+                    "startTime": "وقت البداية (بالثواني)",
+                    "duration": "المدة (اختياري، بالثواني)",
+                    "soundEffect": "نوع المؤثر الصوتي (اختياري)"
+                },
+                ...
+            ]
+        }
+    
+    الاستجابة (202):
+        {
+            "success": true,
+            "jobId": "معرف المهمة",
+            "status": "pending",
+            "videoIds": ["معرفات المقاطع الناتجة بنفس ترتيب الطلب"],
+            "statusUrl": "عنوان URL لحالة المهمة"
+        }
+    """
+    # التحقق من البيانات المستلمة
+    data = request.json
+    if not data or 'videoId' not in data:
+        return jsonify({"error": "معرف الفيديو مطلوب"}), 400
+    
+    requested_clips = data.get('clips')
+    max_clips = current_app.config['VIDEO_BATCH_MAX_CLIPS']
+    if (not isinstance(requested_clips, list) or not 0 < len(requested_clips) <= max_clips
+            or not all(isinstance(clip, dict) for clip in requested_clips)):
+        return jsonify({"error": f"قائمة المقاطع مطلوبة (من 1 إلى {max_clips} مقطع)"}), 400
+    
+    video_id = data.get('videoId')
+    
+    # إنشاء معرف فريد لكل مقطع ناتج
+    clips = [
+        {
+            "output_id": str(uuid.uuid4()),
+            "start_time": clip.get('startTime'),
+            "duration": clip.get('duration'),
+            "sound_effect": clip.get('soundEffect')
+        }
+        for clip in requested_clips
+    ]
+    
+    logger.info(f"بدء معالجة {len(clips)} مقطع من الفيديو: {video_id}")
+    resolution = video_service.get_source_resolution(video_id)
+    
+    # إرسال المعالجة الدفعية كمهمة خلفية
+    job_id = current_app.job_manager.submit(
+        _process_batch_job,
+        video_id,
+        clips,
+        job_type='process_batch',
+        priority=PRIORITY_LOW,  # المعالجة الدفعية لا تسبق طلبات المقاطع المفردة
+        cost=sum(video_service.estimate_cost(clip["duration"], resolution=resolution) for clip in clips),
+        affinity=f"video:{video_id}"
+    )
+    
+    return jsonify({
+        "success": True,
+        "jobId": job_id,
+        "status": "pending",
+        "videoIds": [clip["output_id"] for clip in clips],
+        "statusUrl": f"/api/video/jobs/{job_id}"
+    }), 202
+
+@video_bp.route('/jobs', methods=['GET'])
+@handle_errors
+def get_jobs_load():
+    """
+    الحصول على حمل قائمة انتظار المهام.
+    
+    الاستجابة:
+        {
+            "workers": "عدد خيوط المعالجة",
+            "running": "عدد المهام الجارية",
+            "pending": "عدد المهام المنتظرة",
+            "maxPending": "الحد الأقصى للمهام المنتظرة",
+            "averageDuration": "متوسط مدة المهام بالثواني",
+            "queueWait": "وقت الانتظار في القائمة بالثواني: {samples, p50, p99}"
+        }
+    """
+    return jsonify(current_app.job_manager.get_load())
+
+@video_bp.route('/jobs/<job_id>', methods=['GET'])
+@handle_errors
+def get_job(job_id):
+    """
+    الحصول على حالة مهمة معالجة.
+    
+    المعلمات:
+        job_id (str): معرف المهمة.
+    
+    الاستجابة:
+        {
+            "jobId": "معرف المهمة",
+            "type": "نوع المهمة",
+            "status": "pending | running | completed | failed",
+            "result": "نتيجة المهمة (عند الاكتمال)، مع مدة كل مرحلة بالثواني في timings لمهام المعالجة",
+            "error": "رسالة الخطأ (عند الفشل)",
+            "progress": "تقدم المهمة إن كانت تسجله: {completed, total, percent} مع fps وspeed وframes أثناء الترميز",
+            "createdAt": "وقت الإنشاء",
+            "startedAt": "وقت البدء",
+            "finishedAt": "وقت الانتهاء"
+        }
+    """
+    job = current_app.job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "المهمة غير موجودة"}), 404
     
-    logger.info(f"تمت معالجة الفيديو بنجاح: {video_id} -> {output_id}")
-    return jsonify(result)
+    return jsonify(job)
 
 @video_bp.route('/<video_id>', methods=['GET'])
 @handle_errors
@@ -5,12 +5,28 @@
 
 import os
 import re
+import math
+import time
 import uuid
+import shutil
 import logging
+import tempfile
 import subprocess
+import threading
+import concurrent.futures
+from contextlib import contextmanager
 from flask import current_app
 
 from ..utils.error_handler import VideoProcessingError
+from ..utils.analysis_index import AnalysisIndex
+from ..utils.highlight_detector import HighlightDetector
+from ..utils.job_scheduler import estimate_job_cost
+from ..utils.encoding_policy import get_cpu_pressure, select_encoding_profile
+from ..utils.ffmpeg_progress import run_ffmpeg
+from ..utils.media_probe import (
+    probe_media, get_duration, get_frame_rate, get_keyframe_times, get_video_stream_info, has_audio_stream
+)
+from ..utils.scene_detector import SceneDetector, find_scene_cuts, motion_energy
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +36,9 @@ class VideoService:
     توفر وظائف لاقتطاع المقاطع وإضافة المؤثرات الصوتية.
     """
     
+    # أوضاع المعالجة المتاحة
+    PROCESSING_MODES = ('encode', 'smart_cut', 'parallel')
+    
     def __init__(self):
         """تهيئة خدمة معالجة الفيديو."""
         # التحقق من وجود FFmpeg
@@ -168,7 +187,7 @@ class VideoService:
             
             # إنشاء الصورة المصغرة باستخدام FFmpeg
             command = [
-                "ffmpeg",
+                "ffmpeg", "-y",
                 "-i", video_path,
                 "-ss", "00:00:01",  # لقطة من الثانية الأولى
                 "-vframes", "1",
@@ -177,13 +196,7 @@ class VideoService:
             ]
             
             logger.info(f"إنشاء صورة مصغرة للفيديو: {video_path}")
-            result = subprocess.run(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
+            result = run_ffmpeg(command)
             
             if result.returncode != 0:
                 logger.error(f"خطأ في إنشاء الصورة المصغرة: {result.stderr}")
@@ -194,7 +207,617 @@ class VideoService:
             logger.error(f"خطأ في إنشاء الصورة المصغرة: {str(e)}")
             raise VideoProcessingError(f"خطأ في إنشاء الصورة المصغرة: {str(e)}")
     
-    def process_video(self, video_id, output_id, start_time=None, duration=None, sound_effect=None):
+    def _get_input_path(self, video_id):
+        """
+        الحصول على مسار الفيديو المصدر من مجلد التخزين المؤقت أو مجلد التحميل.
+        
+        المعلمات:
+            video_id (str): معرف الفيديو المصدر.
+        
+        العائد:
+            str: مسار الفيديو المصدر.
+        
+        يرفع:
+            VideoProcessingError: إذا لم يتم العثور على الفيديو المصدر.
+        """
+        input_path = os.path.join(current_app.config['CACHE_FOLDER'], f"{video_id}.mp4")
+        if not os.path.exists(input_path):
+            input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{video_id}.mp4")
+        
+        # التحقق من وجود الفيديو المصدر
+        if not os.path.exists(input_path):
+            raise VideoProcessingError(f"الفيديو المصدر غير موجود: {input_path}")
+        
+        return input_path
+    
+    def _resolve_sound_effect(self, sound_effect):
+        """
+        تحديد مسار ملف المؤثر الصوتي إذا كان موجودًا.
+        
+        المعلمات:
+            sound_effect (str): معرف المؤثر الصوتي، أو None.
+        
+        العائد:
+            str: مسار ملف المؤثر الصوتي، أو None إذا لم يتم تحديده أو لم يكن موجودًا.
+        """
+        if not sound_effect:
+            return None
+        
+        sound_effect_path = self.get_sound_effect_path(sound_effect)
+        if not sound_effect_path or not os.path.exists(sound_effect_path):
+            logger.warning(f"المؤثر الصوتي غير موجود: {sound_effect}")
+            return None
+        
+        return sound_effect_path
+    
+    def _get_encoding_profile(self):
+        """
+        اختيار ملف الترميز للمهمة الحالية.
+        
+        إذا كان VIDEO_ADAPTIVE_ENCODING مفعلاً يتم الاختيار حسب حمل مدير المهام وتشبع
+        المعالج، وإلا تستخدم إعدادات التكوين الثابتة.
+        
+        العائد:
+            dict: اسم الملف والإعداد المسبق وعدد الخيوط وأقصى ارتفاع للمخرج والضغط.
+        """
+        if not current_app.config['VIDEO_ADAPTIVE_ENCODING']:
+            return {
+                "name": "fixed",
+                "preset": current_app.config['VIDEO_ENCODING_PRESET'],
+                "threads": None,
+                "maxHeight": None,
+                "pressure": None
+            }
+        
+        job_manager = getattr(current_app, 'job_manager', None)
+        load = job_manager.get_load() if job_manager is not None else None
+        profile = select_encoding_profile(load, get_cpu_pressure(), current_app.config['VIDEO_ENCODING_PRESET'])
+        logger.info(f"ملف الترميز: {profile['name']} ({profile['preset']}، الضغط {profile['pressure']})")
+        return profile
+    
+    def _encoding_options(self, profile=None, threads=None):
+        """
+        خيارات ترميز الفيديو حسب ملف الترميز.
+        
+        المعلمات:
+            profile (dict, اختياري): ملف الترميز (الافتراضي: إعدادات التكوين).
+            threads (int, اختياري): عدد خيوط المرمز بدلاً من عدد خيوط الملف.
+        
+        العائد:
+            list: خيارات FFmpeg.
+        """
+        profile = profile or {}
+        options = [
+            "-c:v", "libx264",
+            "-preset", profile.get("preset") or current_app.config['VIDEO_ENCODING_PRESET'],
+            "-crf", str(current_app.config['VIDEO_CRF'])
+        ]
+        threads = threads or profile.get("threads")
+        if threads:
+            options.extend(["-threads", str(threads)])
+        return options
+    
+    def _scale_filter(self, profile=None):
+        """
+        مرشح تصغير الفيديو إلى أقصى ارتفاع في ملف الترميز (دون تكبير المصادر الأصغر).
+        
+        المعلمات:
+            profile (dict, اختياري): ملف الترميز.
+        
+        العائد:
+            str: المرشح، أو None إذا لم يحدد الملف أقصى ارتفاع.
+        """
+        max_height = (profile or {}).get("maxHeight")
+        if not max_height:
+            return None
+        return f"scale=-2:'min(ih,{max_height})'"
+    
+    def _build_process_command(self, input_path, output_path, start_time, duration,
+                               sound_effect_path=None, fast_seek=True, profile=None, thumbnail_path=None):
+        """
+        إعداد أمر FFmpeg لاقتطاع المقطع وترميزه.
+        
+        في وضع البحث السريع يتم البحث على مستوى المدخل (قبل -i) إلى نقطة تسبق
+        وقت البداية بهامش VIDEO_SEEK_MARGIN، فيقفز FFmpeg إلى الإطار المفتاحي
+        دون فك ترميز ما قبله، ثم يتم الاقتطاع الدقيق على مستوى المخرج.
+        بذلك تبقى كلفة فك الترميز محدودة بالهامش مهما كان موضع المقطع.
+        
+        عند تحديد thumbnail_path تضاف الصورة المصغرة كمخرج ثانٍ يأخذ إطارًا من نفس
+        الإطارات المفكوكة، فلا يلزم تشغيل FFmpeg آخر لقراءة المقطع الناتج.
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            output_path (str): مسار الفيديو الناتج.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            sound_effect_path (str, اختياري): مسار ملف المؤثر الصوتي.
+            fast_seek (bool): استخدام البحث السريع على مستوى المدخل.
+            profile (dict, اختياري): ملف الترميز (الافتراضي: إعدادات التكوين).
+            thumbnail_path (str, اختياري): مسار الصورة المصغرة المراد إنشاؤها مع المقطع.
+        
+        العائد:
+            list: أمر FFmpeg.
+        """
+        # تحديد نقطة البحث على مستوى المدخل والجزء المتبقي للاقتطاع الدقيق
+        if fast_seek:
+            input_seek = max(0, start_time - current_app.config['VIDEO_SEEK_MARGIN'])
+        else:
+            input_seek = 0
+        output_seek = start_time - input_seek
+        
+        command = ["ffmpeg", "-y"]
+        if input_seek > 0:
+            command.extend(["-ss", str(input_seek)])
+        command.extend(["-i", input_path])
+        
+        filters = []
+        video_map, audio_map = "0:v", "0:a?"
+        
+        # إضافة المؤثر الصوتي إذا كان متاحًا
+        if sound_effect_path:
+            # تأخير المؤثر بمقدار الاقتطاع الدقيق ليبدأ مع بداية المقطع
+            delay_ms = int(round(output_seek * 1000))
+            if delay_ms > 0:
+                filters.append(
+                    f"[1:a]adelay=delays={delay_ms}:all=1[sfx];"
+                    "[0:a][sfx]amix=inputs=2:duration=first[a]"
+                )
+            else:
+                filters.append("[0:a][1:a]amix=inputs=2:duration=first[a]")
+            
+            command.extend(["-i", sound_effect_path])
+            audio_map = "[a]"
+        
+        scale_filter = self._scale_filter(profile)
+        
+        # لقطة من الثانية الأولى للمقطع (أو من منتصفه إذا كان أقصر من ثانيتين) في فرع
+        # ينتهي بعد إطار واحد؛ القص قبل تحويل تنسيق JPEG حتى لا تحول بقية الإطارات
+        if thumbnail_path:
+            thumbnail_seek = output_seek + min(1.0, duration / 2)
+            video_chain = f"{scale_filter}," if scale_filter else ""
+            filters.append(
+                f"[0:v]{video_chain}split[v][thumb_src];"
+                f"[thumb_src]trim=start={thumbnail_seek},trim=end_frame=1[thumb]"
+            )
+            video_map = "[v]"
+        
+        if filters:
+            command.extend([
+                "-filter_complex", ";".join(filters),
+                "-map", video_map,
+                "-map", audio_map
+            ])
+        
+        # الاقتطاع الدقيق على مستوى المخرج
+        if output_seek > 0:
+            command.extend(["-ss", str(output_seek)])
+        command.extend(["-t", str(duration)])
+        
+        # إضافة معلمات الترميز
+        if scale_filter and not thumbnail_path:
+            command.extend(["-vf", scale_filter])
+        command.extend(self._encoding_options(profile))
+        command.extend([
+            "-c:a", "aac",
+            "-b:a", current_app.config['VIDEO_AUDIO_BITRATE'],
+            "-movflags", "+faststart",  # لتحسين التشغيل عبر الإنترنت
+            output_path
+        ])
+        
+        if thumbnail_path:
+            command.extend(["-map", "[thumb]", "-frames:v", "1", "-q:v", "2", thumbnail_path])
+        
+        return command
+    
+    def _run_ffmpeg(self, command, error_message, progress=None, duration=None):
+        """
+        تنفيذ أمر FFmpeg أو FFprobe.
+        
+        المعلمات:
+            command (list): الأمر المراد تنفيذه.
+            error_message (str): رسالة الخطأ في حالة الفشل.
+            progress (callable, اختياري): دالة تستدعى بتقدم FFmpeg أثناء التنفيذ
+                                          (completed وtotal وfps وspeed وframes كمعاملات مسماة).
+            duration (float, اختياري): مدة المخرج المتوقعة بالثواني.
+        
+        العائد:
+            str: المخرج القياسي للأمر.
+        
+        يرفع:
+            VideoProcessingError: إذا فشل تنفيذ الأمر (مع آخر أسطر مخرج الأخطاء).
+        """
+        result = run_ffmpeg(command, progress=progress, duration=duration)
+        
+        if result.returncode != 0:
+            logger.error(f"{error_message}: {result.stderr}")
+            raise VideoProcessingError(f"{error_message}: {result.stderr}")
+        
+        return result.stdout
+    
+    @contextmanager
+    def _timed(self, timings, stage):
+        """
+        قياس مدة مرحلة من مراحل المعالجة وإضافتها إلى سجل التوقيتات.
+        
+        المعلمات:
+            timings (dict): سجل التوقيتات بالثواني لكل مرحلة، أو None لعدم القياس.
+            stage (str): اسم المرحلة (probe أو encode أو thumbnail أو duration).
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            if timings is not None:
+                timings[stage] = round(timings.get(stage, 0) + time.perf_counter() - started_at, 3)
+    
+    def _combine_progress(self, progress, count, duration):
+        """
+        تجميع تقدم عدة عمليات FFmpeg متوازية في تقدم واحد للمقطع.
+        
+        المعلمات:
+            progress (callable): دالة تقدم المقطع.
+            count (int): عدد العمليات.
+            duration (float): مدة المقطع بالثواني.
+        
+        العائد:
+            list: دالة تقدم لكل عملية، أو None لكل منها إذا لم تحدد progress.
+        """
+        if progress is None:
+            return [None] * count
+        
+        lock = threading.Lock()
+        states = [{"completed": 0.0, "fps": None, "speed": None, "frames": None} for _ in range(count)]
+        
+        def reporter(index):
+            def report(completed=None, total=None, fps=None, speed=None, frames=None):
+                with lock:
+                    states[index] = {"completed": completed or 0.0, "fps": fps, "speed": speed, "frames": frames}
+                    # معدل الإطارات والسرعة وعدد الإطارات الإجمالية هي مجموع العمليات المتوازية
+                    fps_values = [state["fps"] for state in states if state["fps"] is not None]
+                    speed_values = [state["speed"] for state in states if state["speed"] is not None]
+                    frame_values = [state["frames"] for state in states if state["frames"] is not None]
+                    status = {
+                        "completed": min(round(sum(state["completed"] for state in states), 2), duration),
+                        "total": duration,
+                        "fps": round(sum(fps_values), 2) if fps_values else None,
+                        "speed": round(sum(speed_values), 2) if speed_values else None,
+                        "frames": sum(frame_values) if frame_values else None
+                    }
+                    progress(**status)
+            return report
+        
+        return [reporter(index) for index in range(count)]
+    
+    def _build_segment_command(self, input_path, output_path, start_time, duration, pix_fmt=None, threads=None,
+                               profile=None):
+        """
+        إعداد أمر FFmpeg لإعادة ترميز جزء من مسار الفيديو فقط (بدون صوت).
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            output_path (str): مسار الجزء الناتج.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            pix_fmt (str, اختياري): تنسيق البكسل المطلوب (لمطابقة المصدر).
+            threads (int, اختياري): عدد خيوط المرمز (الافتراضي: يحدده FFmpeg حسب عدد الأنوية).
+            profile (dict, اختياري): ملف الترميز (الافتراضي: إعدادات التكوين).
+        
+        العائد:
+            list: أمر FFmpeg.
+        """
+        input_seek = max(0, start_time - current_app.config['VIDEO_SEEK_MARGIN'])
+        
+        command = ["ffmpeg", "-y"]
+        if threads:
+            # تحديد خيوط فك الترميز أيضًا حتى لا تتنافس العمليات المتوازية على الأنوية
+            command.extend(["-threads", str(threads)])
+        if input_seek > 0:
+            command.extend(["-ss", str(input_seek)])
+        command.extend([
+            "-i", input_path,
+            "-ss", str(start_time - input_seek),
+            "-t", str(duration),
+            "-an"
+        ])
+        scale_filter = self._scale_filter(profile)
+        if scale_filter:
+            command.extend(["-vf", scale_filter])
+        command.extend(self._encoding_options(profile, threads))
+        if pix_fmt:
+            command.extend(["-pix_fmt", pix_fmt])
+        command.append(output_path)
+        
+        return command
+    
+    def _encode_video_segment(self, input_path, output_path, start_time, duration, pix_fmt):
+        """
+        إعادة ترميز جزء من مسار الفيديو فقط (بدون صوت).
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            output_path (str): مسار الجزء الناتج.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            pix_fmt (str): تنسيق البكسل المطلوب (لمطابقة المصدر).
+        """
+        command = self._build_segment_command(input_path, output_path, start_time, duration, pix_fmt)
+        self._run_ffmpeg(command, "خطأ في ترميز جزء الفيديو")
+    
+    def _concat_segments(self, segments, work_dir, input_path, output_path, start_time, duration,
+                         sound_effect_path=None, progress=None):
+        """
+        دمج أجزاء الفيديو بالنسخ المباشر وترميز الصوت مرة واحدة من المصدر.
+        
+        المعلمات:
+            segments (list): مسارات أجزاء الفيديو بالترتيب.
+            work_dir (str): مجلد العمل المؤقت (لقائمة الدمج).
+            input_path (str): مسار الفيديو المصدر (لمسار الصوت).
+            output_path (str): مسار الفيديو الناتج.
+            start_time (float): وقت بداية المقطع في المصدر بالثواني.
+            duration (float): مدة المقطع بالثواني.
+            sound_effect_path (str, اختياري): مسار ملف المؤثر الصوتي.
+            progress (callable, اختياري): دالة تستدعى بتقدم الدمج.
+        """
+        # إعداد قائمة الدمج
+        list_path = os.path.join(work_dir, "segments.txt")
+        with open(list_path, "w") as f:
+            for segment in segments:
+                f.write(f"file '{segment}'\n")
+        
+        # دمج الفيديو وترميز الصوت من المصدر مباشرة
+        command = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", list_path,
+            "-ss", str(start_time),
+            "-t", str(duration),
+            "-i", input_path
+        ]
+        
+        if sound_effect_path:
+            command.extend([
+                "-i", sound_effect_path,
+                "-filter_complex", "[1:a][2:a]amix=inputs=2:duration=first[a]",
+                "-map", "0:v",
+                "-map", "[a]"
+            ])
+        else:
+            command.extend(["-map", "0:v", "-map", "1:a?"])
+        
+        command.extend([
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-b:a", current_app.config['VIDEO_AUDIO_BITRATE'],
+            "-movflags", "+faststart",
+            output_path
+        ])
+        
+        self._run_ffmpeg(command, "خطأ في دمج أجزاء الفيديو", progress, duration)
+    
+    def _smart_cut(self, input_path, output_path, start_time, duration, sound_effect_path=None,
+                   progress=None, timings=None):
+        """
+        اقتطاع المقطع بالنسخ المباشر مع إعادة ترميز أطرافه فقط.
+        
+        ينسخ الجزء الأوسط المحاذي للإطارات المفتاحية دون إعادة ترميز، ويعيد ترميز
+        مجموعتي الإطارات الجزئيتين في البداية والنهاية فقط، ثم يدمج الأجزاء
+        بواسطة concat ويرمز الصوت (مع المؤثر الصوتي) بشكل منفصل.
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            output_path (str): مسار الفيديو الناتج.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            sound_effect_path (str, اختياري): مسار ملف المؤثر الصوتي.
+            progress (callable, اختياري): دالة تستدعى بتقدم الدمج.
+            timings (dict, اختياري): سجل توقيتات المراحل.
+        
+        العائد:
+            bool: True إذا تم الاقتطاع الذكي، False إذا لم يكن ممكنًا لهذا المقطع.
+        """
+        end_time = start_time + duration
+        
+        # يتطلب النسخ المباشر أن تكون الأجزاء المعاد ترميزها بنفس ترميز المصدر
+        with self._timed(timings, 'probe'):
+            stream = get_video_stream_info(input_path)
+        if stream["codec_name"] != "h264" or not stream["fps"]:
+            logger.info(f"الاقتطاع الذكي غير متاح لترميز {stream['codec_name']}")
+            return False
+        
+        # تحديد أول وآخر إطار مفتاحي داخل المقطع
+        with self._timed(timings, 'probe'):
+            keyframes = [
+                t for t in get_keyframe_times(input_path, start_time, end_time)
+                if start_time <= t <= end_time
+            ]
+        if len(keyframes) < 2:
+            logger.info("لا يوجد جزء محاذٍ للإطارات المفتاحية داخل المقطع")
+            return False
+        
+        copy_start = keyframes[0]
+        copy_end = keyframes[-1]
+        half_frame = 0.5 / stream["fps"]
+        
+        # توقيت أول إطار في المقطع وأول إطار بعده، فتقطع الأجزاء المعاد ترميزها قبل
+        # الإطارات بنصف إطار ولا تغير أخطاء التقريب عدد الإطارات
+        first_frame = math.ceil(round(start_time * stream["fps"], 6)) / stream["fps"]
+        end_frame = math.ceil(round(end_time * stream["fps"], 6)) / stream["fps"]
+        
+        with self._timed(timings, 'encode'):
+            work_dir = tempfile.mkdtemp(dir=current_app.config['CACHE_FOLDER'])
+            try:
+                segments = []
+                
+                # إعادة ترميز البداية حتى الإطار السابق لأول إطار مفتاحي
+                if copy_start - first_frame > half_frame:
+                    head_path = os.path.join(work_dir, "head.mp4")
+                    self._encode_video_segment(
+                        input_path, head_path, first_frame - half_frame, copy_start - first_frame, stream["pix_fmt"]
+                    )
+                    segments.append(head_path)
+                
+                # نسخ الجزء الأوسط مباشرة من أول إطار مفتاحي حتى آخر إطار مفتاحي دون تضمينه.
+                # يقطع ناقل التقسيم عند حزمة الإطار المفتاحي نفسها، بينما يقطع -t بتوقيت فك
+                # الترميز فيضيف إطارات B بعد نهاية الجزء. يضاف نصف إطار للبحث حتى يصل إلى
+                # copy_start نفسه رغم أخطاء التقريب، وثانية للقراءة حتى تصل حزمة copy_end.
+                middle_pattern = os.path.join(work_dir, "middle%03d.mp4")
+                self._run_ffmpeg([
+                    "ffmpeg", "-y",
+                    "-ss", str(copy_start + half_frame),
+                    "-i", input_path,
+                    "-t", str(copy_end - copy_start + 1),
+                    "-an",
+                    "-c:v", "copy",
+                    "-f", "segment",
+                    "-segment_times", str(copy_end - copy_start - half_frame),
+                    "-reset_timestamps", "1",
+                    middle_pattern
+                ], "خطأ في نسخ جزء الفيديو")
+                segments.append(middle_pattern % 0)
+                
+                # إعادة ترميز النهاية من آخر إطار مفتاحي حتى نهاية المقطع
+                if end_frame - copy_end > half_frame:
+                    tail_path = os.path.join(work_dir, "tail.mp4")
+                    self._encode_video_segment(
+                        input_path, tail_path, copy_end - half_frame, end_frame - copy_end, stream["pix_fmt"]
+                    )
+                    segments.append(tail_path)
+                
+                self._concat_segments(
+                    segments, work_dir, input_path, output_path, start_time, duration, sound_effect_path, progress
+                )
+                
+                logger.info(f"تم الاقتطاع الذكي: نسخ {copy_end - copy_start:.2f} من {duration:.2f} ثانية")
+                return True
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def _get_parallel_boundaries(self, input_path, start_time, duration):
+        """
+        تحديد حدود أجزاء الترميز المتوازي.
+        
+        يقسم المقطع إلى أجزاء متساوية تقريبًا، وينقل كل حد إلى أقرب إطار مفتاحي في
+        المصدر إن وجد ضمن نصف طول الجزء، فيبدأ فك ترميز كل جزء من إطار مفتاحي.
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+        
+        العائد:
+            list: أوقات الحدود من البداية إلى النهاية، أو None إذا كان المقطع أقصر من أن يقسم.
+        """
+        count = min(
+            current_app.config['VIDEO_PARALLEL_SEGMENTS'],
+            int(duration // current_app.config['VIDEO_PARALLEL_MIN_SEGMENT'])
+        )
+        if count < 2:
+            return None
+        
+        stream = get_video_stream_info(input_path)
+        if not stream["fps"]:
+            return None
+        
+        end_time = start_time + duration
+        half_frame = 0.5 / stream["fps"]
+        segment_length = duration / count
+        keyframes = [
+            t for t in get_keyframe_times(input_path, start_time, end_time)
+            if start_time + half_frame < t < end_time - half_frame
+        ]
+        
+        boundaries = [start_time]
+        for index in range(1, count):
+            target = start_time + index * segment_length
+            nearest = min(keyframes, key=lambda t: abs(t - target)) if keyframes else None
+            if nearest is not None and abs(nearest - target) <= segment_length / 2:
+                target = nearest
+            else:
+                # القطع على توقيت إطار بالضبط حتى لا يتكرر أو يضيع إطار عند الدمج
+                target = round(target * stream["fps"]) / stream["fps"]
+            
+            if target - boundaries[-1] > half_frame:
+                boundaries.append(target)
+        boundaries.append(end_time)
+        
+        return boundaries if len(boundaries) > 2 else None
+    
+    def _parallel_encode(self, input_path, output_path, start_time, duration, sound_effect_path=None,
+                         profile=None, progress=None, timings=None):
+        """
+        ترميز المقطع على عدة أنوية بتقسيمه إلى أجزاء عند الإطارات المفتاحية.
+        
+        عملية libx264 واحدة لا تستفيد من جميع الأنوية في الإعدادات البطيئة، لذلك يرمز
+        كل جزء في عملية FFmpeg مستقلة بحصة محدودة من الخيوط، ثم تدمج الأجزاء بالنسخ
+        المباشر ويرمز الصوت مرة واحدة.
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            output_path (str): مسار الفيديو الناتج.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            sound_effect_path (str, اختياري): مسار ملف المؤثر الصوتي.
+            profile (dict, اختياري): ملف الترميز (تقسم خيوطه على الأجزاء).
+            progress (callable, اختياري): دالة تستدعى بتقدم ترميز الأجزاء مجتمعة.
+            timings (dict, اختياري): سجل توقيتات المراحل.
+        
+        العائد:
+            bool: True إذا تم الترميز المتوازي، False إذا كان المقطع أقصر من أن يقسم.
+        """
+        with self._timed(timings, 'probe'):
+            boundaries = self._get_parallel_boundaries(input_path, start_time, duration)
+        if boundaries is None:
+            logger.info(f"المقطع أقصر من أن يقسم للترميز المتوازي: {duration:.2f} ثانية")
+            return False
+        
+        count = len(boundaries) - 1
+        threads = max(1, ((profile or {}).get("threads") or os.cpu_count() or 2) // count)
+        
+        with self._timed(timings, 'encode'):
+            work_dir = tempfile.mkdtemp(dir=current_app.config['CACHE_FOLDER'])
+            try:
+                # إعداد الأوامر في هذا الخيط لأنها تقرأ إعدادات التطبيق
+                segments = []
+                commands = []
+                for index in range(count):
+                    segment_path = os.path.join(work_dir, f"part{index:03d}.mp4")
+                    segments.append(segment_path)
+                    commands.append(self._build_segment_command(
+                        input_path,
+                        segment_path,
+                        boundaries[index],
+                        boundaries[index + 1] - boundaries[index],
+                        threads=threads,
+                        profile=profile
+                    ))
+                
+                reporters = self._combine_progress(progress, count, duration)
+                with concurrent.futures.ThreadPoolExecutor(max_workers=count) as executor:
+                    futures = [
+                        executor.submit(
+                            self._run_ffmpeg,
+                            command,
+                            "خطأ في ترميز جزء الفيديو",
+                            reporter,
+                            boundaries[index + 1] - boundaries[index]
+                        )
+                        for index, (command, reporter) in enumerate(zip(commands, reporters))
+                    ]
+                    for future in futures:
+                        future.result()
+                
+                self._concat_segments(
+                    segments, work_dir, input_path, output_path, start_time, duration, sound_effect_path
+                )
+                
+                logger.info(f"تم الترميز المتوازي: {count} أجزاء بـ {threads} خيوط لكل جزء")
+                return True
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def process_video(self, video_id, output_id, start_time=None, duration=None, sound_effect=None,
+                      fast_seek=None, mode=None, input_path=None, progress=None):
         """
         معالجة الفيديو وإضافة المؤثرات الصوتية.
         
@@ -204,25 +827,27 @@ class VideoService:
             start_time (float, اختياري): وقت البداية بالثواني.
             duration (float, اختياري): المدة بالثواني.
             sound_effect (str, اختياري): معرف المؤثر الصوتي.
+            fast_seek (bool, اختياري): استخدام البحث السريع على مستوى المدخل
+                                       (الافتراضي: VIDEO_FAST_SEEK).
+            mode (str, اختياري): وضع المعالجة، أحد PROCESSING_MODES
+                                 (الافتراضي: VIDEO_PROCESSING_MODE).
+            input_path (str, اختياري): مسار أو رابط الفيديو المصدر بدلاً من البحث عنه
+                                       بالمعرف (مثل رابط ملف قيد التنزيل).
+            progress (callable, اختياري): دالة تستدعى بتقدم الترميز أثناء التنفيذ
+                                          (completed وtotal بالثواني وfps وspeed وframes كمعاملات مسماة).
         
         العائد:
-            dict: معلومات الفيديو المعالج.
+            dict: معلومات الفيديو المعالج، مع مدة كل مرحلة بالثواني في timings.
         
         يرفع:
             VideoProcessingError: إذا حدث خطأ أثناء معالجة الفيديو.
         """
         try:
             # تحديد مسارات الملفات
-            input_path = os.path.join(current_app.config['CACHE_FOLDER'], f"{video_id}.mp4")
-            if not os.path.exists(input_path):
-                input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{video_id}.mp4")
-            
+            if input_path is None:
+                input_path = self._get_input_path(video_id)
             output_path = os.path.join(current_app.config['PROCESSED_FOLDER'], f"{output_id}.mp4")
             
-            # التحقق من وجود الفيديو المصدر
-            if not os.path.exists(input_path):
-                raise VideoProcessingError(f"الفيديو المصدر غير موجود: {input_path}")
-            
             # تحديد وقت البداية والمدة
             if start_time is None:
                 # إذا لم يتم تحديد وقت البداية، استخدام الثانية 0
@@ -240,61 +865,90 @@ class VideoService:
                 raise VideoProcessingError(f"المدة غير صالحة: {duration}")
             
             # تحديد مسار المؤثر الصوتي
-            sound_effect_path = None
-            if sound_effect:
-                sound_effect_path = self.get_sound_effect_path(sound_effect)
-                if not sound_effect_path or not os.path.exists(sound_effect_path):
-                    logger.warning(f"المؤثر الصوتي غير موجود: {sound_effect}")
-                    sound_effect_path = None
-            
-            # إعداد أمر FFmpeg
-            command = [
-                "ffmpeg",
-                "-i", input_path,
-                "-ss", str(start_time),
-                "-t", str(duration)
-            ]
+            sound_effect_path = self._resolve_sound_effect(sound_effect)
             
-            # إضافة المؤثر الصوتي إذا كان متاحًا
-            if sound_effect_path:
-                command.extend([
-                    "-i", sound_effect_path,
-                    "-filter_complex", "[0:a][1:a]amix=inputs=2:duration=shortest[a]",
-                    "-map", "0:v",
-                    "-map", "[a]"
-                ])
+            if fast_seek is None:
+                fast_seek = current_app.config['VIDEO_FAST_SEEK']
             
-            # إضافة معلمات الترميز
-            command.extend([
-                "-c:v", "libx264",
-                "-preset", current_app.config['VIDEO_ENCODING_PRESET'],
-                "-crf", str(current_app.config['VIDEO_CRF']),
-                "-c:a", "aac",
-                "-b:a", current_app.config['VIDEO_AUDIO_BITRATE'],
-                "-movflags", "+faststart",  # لتحسين التشغيل عبر الإنترنت
-                output_path
-            ])
+            # تحديد وضع المعالجة
+            if mode is None:
+                mode = current_app.config['VIDEO_PROCESSING_MODE']
             
-            # تنفيذ أمر FFmpeg
-            logger.info(f"معالجة الفيديو: {input_path} -> {output_path}")
-            result = subprocess.run(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
+            if mode not in self.PROCESSING_MODES:
+                raise VideoProcessingError(f"وضع المعالجة غير صالح: {mode}")
             
-            if result.returncode != 0:
-                logger.error(f"خطأ في معالجة الفيديو: {result.stderr}")
-                raise VideoProcessingError(f"خطأ في معالجة الفيديو: {result.stderr}")
+            logger.info(f"معالجة الفيديو: {input_path} -> {output_path} (الوضع: {mode})")
+            timings = {}
+            
+            # الاقتطاع الذكي، مع الرجوع إلى إعادة الترميز الكاملة إذا لم يكن ممكنًا
+            if mode == 'smart_cut' and not self._smart_cut(
+                input_path, output_path, start_time, duration, sound_effect_path, progress, timings
+            ):
+                mode = 'encode'
+            
+            # اختيار ملف الترميز حسب الحمل عند إعادة ترميز المقطع كاملاً
+            encoding = self._get_encoding_profile() if mode in ('encode', 'parallel') else None
+            
+            # الترميز المتوازي، مع الرجوع إلى الترميز في عملية واحدة للمقاطع القصيرة
+            if mode == 'parallel' and not self._parallel_encode(
+                input_path, output_path, start_time, duration, sound_effect_path, encoding, progress, timings
+            ):
+                mode = 'encode'
             
-            # إنشاء صورة مصغرة للفيديو المعالج
             thumbnail_path = self.get_thumbnail_path(output_id)
-            self.create_thumbnail(output_path, thumbnail_path)
+            actual_duration = None
             
-            # الحصول على مدة الفيديو الناتج
-            actual_duration = self._get_video_duration(output_path)
+            if mode == 'encode':
+                # إعداد أمر FFmpeg ينتج المقطع وصورته المصغرة معًا
+                command = self._build_process_command(
+                    input_path,
+                    output_path,
+                    start_time,
+                    duration,
+                    sound_effect_path=sound_effect_path,
+                    fast_seek=fast_seek,
+                    profile=encoding,
+                    thumbnail_path=thumbnail_path
+                )
+                
+                # معدل إطارات المصدر من نتيجة الفحص المحفوظة (يتعذر فحص الروابط دون FFprobe)
+                with self._timed(timings, 'probe'):
+                    try:
+                        fps = get_frame_rate(input_path)
+                    except VideoProcessingError:
+                        fps = None
+                
+                # قد تحمل حالات التقدم توقيت مخرج الصورة المصغرة بدلاً من المقطع (حسب إصدار
+                # FFmpeg)، فلا يسمح بتراجع الوقت المكتمل المعلن
+                final = {}
+                
+                def track(**status):
+                    if final.get("completed") is not None:
+                        status["completed"] = max(status["completed"] or 0.0, final["completed"])
+                    final.update(status)
+                    if progress is not None:
+                        progress(**status)
+                
+                # تنفيذ أمر FFmpeg
+                with self._timed(timings, 'encode'):
+                    self._run_ffmpeg(command, "خطأ في معالجة الفيديو", track, duration)
+                
+                # عدد إطارات المقطع يحدد مدته، فإذا كانت ضمن إطار واحد من المدة المطلوبة فقد
+                # اقتطع المقطع عندها، ولا يلزم FFprobe إلا إذا انتهى المصدر قبلها
+                frames = final.get("frames")
+                if fps and frames and abs(frames / fps - duration) < 1 / fps:
+                    actual_duration = duration
+                    if progress is not None:
+                        progress(**dict(final, completed=duration))
+            else:
+                # إنشاء صورة مصغرة للفيديو المعالج
+                with self._timed(timings, 'thumbnail'):
+                    self.create_thumbnail(output_path, thumbnail_path)
+            
+            # الحصول على مدة الفيديو الناتج إذا لم تكن معروفة
+            if actual_duration is None:
+                with self._timed(timings, 'duration'):
+                    actual_duration = get_duration(output_path)
             
             logger.info(f"تمت معالجة الفيديو بنجاح: {output_path}")
             
@@ -303,87 +957,349 @@ class VideoService:
                 "success": True,
                 "videoId": output_id,
                 "duration": actual_duration,
-                "url": f"/api/video/{output_id}"
+                "url": f"/api/video/{output_id}",
+                "mode": mode,
+                "encoding": encoding,
+                "timings": timings
             }
         except Exception as e:
             logger.error(f"خطأ في معالجة الفيديو: {str(e)}")
             raise VideoProcessingError(f"خطأ في معالجة الفيديو: {str(e)}")
     
-    def _get_video_duration(self, video_path):
+    def estimate_cost(self, duration=None, mode=None, resolution=None):
         """
-        الحصول على مدة الفيديو.
+        تقدير تكلفة معالجة مقطع لترتيب المهام في قائمة الانتظار.
         
         المعلمات:
-            video_path (str): مسار الفيديو.
+            duration (float, اختياري): مدة المقطع بالثواني (الافتراضي: VIDEO_DEFAULT_CLIP_DURATION).
+            mode (str, اختياري): وضع المعالجة (الافتراضي: VIDEO_PROCESSING_MODE).
+            resolution (str, اختياري): دقة الفيديو المصدر إن كانت معروفة.
+        
+        العائد:
+            float: التكلفة المقدرة.
+        """
+        if not isinstance(duration, (int, float)) or duration <= 0:
+            duration = current_app.config['VIDEO_DEFAULT_CLIP_DURATION']
+        
+        if mode is None:
+            mode = current_app.config['VIDEO_PROCESSING_MODE']
+        
+        # الاقتطاع الذكي ينسخ معظم المقطع دون إعادة ترميز
+        preset = 'copy' if mode == 'smart_cut' else current_app.config['VIDEO_ENCODING_PRESET']
+        return estimate_job_cost(duration, resolution, preset)
+    
+    def get_source_resolution(self, video_id):
+        """
+        الحصول على دقة الفيديو المصدر لتقدير تكلفة معالجته.
+        
+        تقرأ الأبعاد من نتيجة فحص الملف المحفوظة (من صندوق moov لملفات MP4 دون FFprobe)،
+        وهي نفس النتيجة التي تستخدمها المعالجة لاحقًا.
+        
+        المعلمات:
+            video_id (str): معرف الفيديو المصدر.
+        
+        العائد:
+            str: الدقة مثل '1080p'، أو None إذا لم يوجد المصدر أو تعذر فحصه.
+        """
+        try:
+            streams = probe_media(self._get_input_path(video_id))["streams"]
+        except VideoProcessingError:
+            return None
+        
+        for stream in streams:
+            if stream["type"] == 'video' and stream["height"]:
+                return f"{stream['height']}p"
+        return None
+    
+    def _escape_filter_path(self, path):
+        """
+        تهريب مسار ملف لاستخدامه كقيمة خيار داخل مخطط مرشحات FFmpeg.
+        
+        يتم التهريب على مستويين: مستوى قيمة الخيار ثم مستوى وصف المخطط.
+        
+        المعلمات:
+            path (str): مسار الملف.
+        
+        العائد:
+            str: المسار بعد التهريب.
+        """
+        escaped = re.sub(r"([\\':])", r"\\\1", path)
+        return re.sub(r"([\\'\[\],;])", r"\\\1", escaped)
+    
+    def _build_batch_command(self, input_path, clips, has_audio, profile=None):
+        """
+        إعداد أمر FFmpeg واحد ينتج عدة مقاطع من المصدر بفك ترميز واحد.
+        
+        يتم البحث على مستوى المدخل إلى ما قبل أول مقطع، ثم يقسم مخطط المرشحات
+        الإطارات المفكوكة (split/asplit) على فروع trim/atrim لكل مقطع، ولكل فرع
+        مخرج مستقل.
+        
+        المعلمات:
+            input_path (str): مسار الفيديو المصدر.
+            clips (list): المقاطع، كل منها يحتوي على start_time وduration
+                          وsound_effect_path وoutput_path.
+            has_audio (bool): هل يحتوي المصدر على مسار صوتي.
+            profile (dict, اختياري): ملف الترميز (الافتراضي: إعدادات التكوين).
         
         العائد:
-            float: مدة الفيديو بالثواني.
+            list: أمر FFmpeg.
+        """
+        count = len(clips)
+        input_seek = max(0, min(clip["start_time"] for clip in clips) - current_app.config['VIDEO_SEEK_MARGIN'])
+        
+        command = ["ffmpeg", "-y"]
+        if input_seek > 0:
+            command.extend(["-ss", str(input_seek)])
+        command.extend(["-i", input_path])
+        
+        # تقسيم الفيديو والصوت على فروع المقاطع
+        filters = ["[0:v]split=" + str(count) + "".join(f"[v{i}]" for i in range(count))]
+        if has_audio:
+            filters.append("[0:a]asplit=" + str(count) + "".join(f"[a{i}]" for i in range(count)))
+        
+        # قراءة المؤثر الصوتي داخل مخطط المرشحات لكل مقطع يستخدمه،
+        # لأن إضافة المؤثرات كمدخلات مستقلة تعلّق FFmpeg عند تعدد المخرجات
+        effect_labels = {}
+        for i, clip in enumerate(clips):
+            effect_path = clip["sound_effect_path"]
+            if effect_path:
+                filters.append(f"amovie={self._escape_filter_path(effect_path)}[sfx{i}]")
+                effect_labels[i] = f"[sfx{i}]"
+        
+        scale_filter = self._scale_filter(profile)
+        for i, clip in enumerate(clips):
+            start = clip["start_time"] - input_seek
+            end = start + clip["duration"]
+            video_filter = f"[v{i}]trim=start={start}:end={end},setpts=PTS-STARTPTS"
+            if scale_filter:
+                video_filter += "," + scale_filter
+            filters.append(f"{video_filter}[vout{i}]")
+            
+            if has_audio:
+                filters.append(f"[a{i}]atrim=start={start}:end={end},asetpts=PTS-STARTPTS[at{i}]")
+                if i in effect_labels:
+                    filters.append(f"[at{i}]{effect_labels[i]}amix=inputs=2:duration=first[aout{i}]")
+                else:
+                    filters.append(f"[at{i}]anull[aout{i}]")
+            elif i in effect_labels:
+                filters.append(f"{effect_labels[i]}atrim=duration={clip['duration']}[aout{i}]")
+        
+        command.extend(["-filter_complex", ";".join(filters)])
+        
+        # مخرج مستقل لكل مقطع
+        for i, clip in enumerate(clips):
+            command.extend(["-map", f"[vout{i}]"])
+            if has_audio or i in effect_labels:
+                command.extend(["-map", f"[aout{i}]"])
+            command.extend(self._encoding_options(profile))
+            command.extend([
+                "-c:a", "aac",
+                "-b:a", current_app.config['VIDEO_AUDIO_BITRATE'],
+                "-movflags", "+faststart",
+                clip["output_path"]
+            ])
+        
+        return command
+    
+    def process_batch(self, video_id, clips):
+        """
+        معالجة عدة مقاطع من نفس الفيديو المصدر بفك ترميز واحد.
+        
+        المعلمات:
+            video_id (str): معرف الفيديو المصدر.
+            clips (list): قائمة المقاطع، كل منها قاموس يحتوي على:
+                output_id (str): معرف الفيديو الناتج.
+                start_time (float): وقت البداية بالثواني.
+                duration (float, اختياري): المدة بالثواني.
+                sound_effect (str, اختياري): معرف المؤثر الصوتي.
+        
+        العائد:
+            dict: معلومات المقاطع المعالجة.
         
         يرفع:
-            VideoProcessingError: إذا حدث خطأ أثناء الحصول على مدة الفيديو.
+            VideoProcessingError: إذا حدث خطأ أثناء معالجة المقاطع.
         """
         try:
-            # استخدام FFprobe للحصول على مدة الفيديو
-            command = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                video_path
-            ]
+            input_path = self._get_input_path(video_id)
             
-            result = subprocess.run(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
+            # التحقق من عدد المقاطع
+            max_clips = current_app.config['VIDEO_BATCH_MAX_CLIPS']
+            if not clips or len(clips) > max_clips:
+                raise VideoProcessingError(f"عدد المقاطع يجب أن يكون بين 1 و{max_clips}")
+            
+            # التحقق من صحة المقاطع وتحديد مساراتها
+            prepared_clips = []
+            for clip in clips:
+                start_time = clip.get("start_time")
+                duration = clip.get("duration")
+                
+                if start_time is None:
+                    start_time = 0
+                if duration is None:
+                    duration = current_app.config['VIDEO_DEFAULT_CLIP_DURATION']
+                
+                if not isinstance(start_time, (int, float)) or start_time < 0:
+                    raise VideoProcessingError(f"وقت البداية غير صالح: {start_time}")
+                
+                if not isinstance(duration, (int, float)) or duration <= 0:
+                    raise VideoProcessingError(f"المدة غير صالحة: {duration}")
+                
+                prepared_clips.append({
+                    "output_id": clip["output_id"],
+                    "start_time": start_time,
+                    "duration": duration,
+                    "sound_effect_path": self._resolve_sound_effect(clip.get("sound_effect")),
+                    "output_path": os.path.join(
+                        current_app.config['PROCESSED_FOLDER'], f"{clip['output_id']}.mp4"
+                    )
+                })
+            
+            # إنتاج جميع المقاطع بأمر FFmpeg واحد
+            encoding = self._get_encoding_profile()
+            command = self._build_batch_command(
+                input_path,
+                prepared_clips,
+                has_audio_stream(input_path),
+                profile=encoding
             )
             
-            if result.returncode != 0:
-                logger.error(f"خطأ في الحصول على مدة الفيديو: {result.stderr}")
-                raise VideoProcessingError(f"خطأ في الحصول على مدة الفيديو: {result.stderr}")
+            logger.info(f"معالجة {len(prepared_clips)} مقطع من الفيديو: {input_path}")
+            self._run_ffmpeg(command, "خطأ في معالجة المقاطع")
+            
+            # إنشاء الصور المصغرة والحصول على مدد المقاطع الناتجة
+            results = []
+            for clip in prepared_clips:
+                output_id = clip["output_id"]
+                self.create_thumbnail(clip["output_path"], self.get_thumbnail_path(output_id))
+                
+                results.append({
+                    "success": True,
+                    "videoId": output_id,
+                    "duration": get_duration(clip["output_path"]),
+                    "url": f"/api/video/{output_id}",
+                    "thumbnailUrl": f"/api/video/thumbnail/{output_id}",
+                    "startTime": clip["start_time"]
+                })
             
-            # تحويل الناتج إلى رقم عشري
-            duration = float(result.stdout.strip())
-            return duration
+            logger.info(f"تمت معالجة {len(results)} مقطع بنجاح من الفيديو: {video_id}")
+            
+            return {
+                "success": True,
+                "sourceId": video_id,
+                "clips": results,
+                "encoding": encoding
+            }
         except Exception as e:
-            logger.error(f"خطأ في الحصول على مدة الفيديو: {str(e)}")
-            raise VideoProcessingError(f"خطأ في الحصول على مدة الفيديو: {str(e)}")
+            logger.error(f"خطأ في معالجة المقاطع: {str(e)}")
+            raise VideoProcessingError(f"خطأ في معالجة المقاطع: {str(e)}")
+    
+    def _get_analysis_index(self):
+        """
+        الحصول على فهرس نتائج التحليل.
+        
+        العائد:
+            AnalysisIndex: فهرس التحليل.
+        """
+        return AnalysisIndex(current_app.config['ANALYSIS_INDEX_FOLDER'])
+    
+    def get_visual_timeline(self, video_path):
+        """
+        الحصول على الخط الزمني لتغير المشاهد وطاقة الحركة في الفيديو.
+        
+        يتم بناء الخط الزمني من إطارات رمادية مصغرة عند أول طلب، ويحفظ في فهرس
+        التحليل لتتم قراءته في الطلبات اللاحقة دون فك ترميز الفيديو.
+        
+        المعلمات:
+            video_path (str): مسار الفيديو.
+        
+        العائد:
+            numpy.ndarray: مصفوفة (إطارات × 3) تحتوي على الوقت وفرق المدرج التكراري وطاقة الحركة.
+        
+        يرفع:
+            VideoProcessingError: إذا فشلت قراءة إطارات الفيديو.
+        """
+        detector = SceneDetector(fps=current_app.config['SCENE_ANALYSIS_FPS'])
+        return detector.get_timeline(video_path, self._get_analysis_index())
     
-    def analyze_video(self, video_path):
+    def analyze_video(self, video_path, clip_duration=None, top_n=1):
         """
         تحليل الفيديو لتحديد اللحظات المثيرة.
         
+        يتم تقييم المقاطع حسب طاقة الصوت وقوة البدايات فيه، وإذا لم يحتوِ الفيديو
+        على صوت يتم اختيار المقطع عند ثلث المدة بمستوى ثقة منخفض. تحفظ النتائج في
+        فهرس التحليل بتجزئة محتوى الفيديو، فلا يعاد تحليل نفس المحتوى.
+        
         المعلمات:
             video_path (str): مسار الفيديو.
+            clip_duration (float, اختياري): مدة المقطع بالثواني.
+            top_n (int): عدد المقاطع المطلوبة.
         
         العائد:
-            dict: نتائج التحليل.
+            dict: نتائج التحليل لأفضل مقطع، مع قائمة المقاطع في highlights.
         
         يرفع:
             VideoProcessingError: إذا حدث خطأ أثناء تحليل الفيديو.
         """
         try:
-            # في التطبيق الحقيقي، يمكن استخدام خوارزميات معالجة الصور والفيديو
-            # لتحديد اللحظات المثيرة في الفيديو
-            # هنا نستخدم تحليل بسيط للتوضيح
+            # إرجاع نتائج التحليل المحفوظة لنفس المحتوى إن وجدت
+            index = self._get_analysis_index()
+            key = index.get_key(video_path)
+            scene_analysis = current_app.config['SCENE_ANALYSIS_ENABLED']
+            result_name = f"analysis_{clip_duration}_{top_n}"
+            if scene_analysis:
+                result_name += f"_scenes_{current_app.config['SCENE_CUT_THRESHOLD']}"
+            
+            cached_result = index.get_json(key, result_name)
+            if cached_result is not None:
+                logger.debug(f"تم استخدام نتائج التحليل المحفوظة للفيديو: {video_path}")
+                return cached_result
             
             # الحصول على مدة الفيديو
-            duration = self._get_video_duration(video_path)
+            duration = get_duration(video_path)
+            
+            # تحديد مدة المقطع (المدة الافتراضية أو ثلث المدة، أيهما أقل)
+            if clip_duration is None:
+                clip_duration = min(current_app.config['VIDEO_DEFAULT_CLIP_DURATION'], duration / 3)
+            clip_duration = min(clip_duration, duration)
             
-            # تحديد وقت البداية (ثلث المدة)
-            start_time = duration / 3
+            highlights = []
+            if has_audio_stream(video_path):
+                detector = HighlightDetector(
+                    sample_rate=current_app.config['HIGHLIGHT_SAMPLE_RATE'],
+                    frame_seconds=current_app.config['HIGHLIGHT_FRAME_SECONDS'],
+                    chunk_seconds=current_app.config['HIGHLIGHT_CHUNK_SECONDS']
+                )
+                highlights = detector.detect(video_path, clip_duration, top_n, index)
             
-            # تحديد مدة المقطع (15 ثانية أو ثلث المدة، أيهما أقل)
-            clip_duration = min(15, duration / 3)
+            if not highlights:
+                # لا يوجد صوت للتحليل، يتم اختيار المقطع عند ثلث المدة
+                highlights = [{
+                    "start_time": duration / 3 if duration / 3 + clip_duration <= duration else 0,
+                    "duration": clip_duration,
+                    "score": 0.0
+                }]
+            
+            best = highlights[0]
             
             # إرجاع نتائج التحليل
-            return {
-                "start_time": start_time,
-                "duration": clip_duration,
-                "confidence": 0.8  # مستوى الثقة في التحليل
+            result = {
+                "start_time": best["start_time"],
+                "duration": best["duration"],
+                "confidence": best["score"],  # مستوى الثقة في التحليل
+                "highlights": highlights
             }
+            
+            # إضافة تغيرات المشاهد وطاقة الحركة لكل مقطع
+            if scene_analysis:
+                timeline = self.get_visual_timeline(video_path)
+                result["scene_cuts"] = find_scene_cuts(timeline, current_app.config['SCENE_CUT_THRESHOLD'])
+                for highlight in highlights:
+                    highlight["motion"] = round(
+                        motion_energy(timeline, highlight["start_time"], highlight["duration"]), 4
+                    )
+            
+            index.put_json(key, result_name, result)
+            return result
         except Exception as e:
             logger.error(f"خطأ في تحليل الفيديو: {str(e)}")
             raise VideoProcessingError(f"خطأ في تحليل الفيديو: {str(e)}")
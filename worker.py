@@ -0,0 +1,164 @@
+"""
+نقطة بداية العمليات العاملة لتنفيذ المهام الخلفية.
+تشغل عدة عمليات تسحب المهام من قائمة الانتظار الدائمة (JOB_QUEUE_BACKEND = 'sqlite'
+على جهاز واحد، أو 'redis' لقائمة مشتركة بين عدة أجهزة) وتنفذها، مستقلة عن عمليات
+خادم الويب، فيمكن توسيع كل منهما بشكل منفصل ولا تضيع المهام الجارية عند إعادة
+تشغيل الخادم.
+
+الاستخدام:
+    python -m backend.worker --processes 4 --config production
+"""
+
+import os
+import sys
+import signal
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+
+from .app import create_app
+from .config.config import config
+from .utils.job_queue import DurableJobManager
+
+logger = logging.getLogger(__name__)
+
+class Worker:
+    """
+    عامل يسحب المهام من قائمة الانتظار الدائمة وينفذها واحدة تلو الأخرى.
+    
+    أثناء تنفيذ المهمة يجدد خيط منفصل حجزها كل ثلث مدة الحجز، فإذا توقفت العملية
+    انتهى الحجز وأعيدت المهمة إلى قائمة الانتظار لعامل آخر.
+    """
+    
+    def __init__(self, app, worker_id=None, poll_interval=1.0):
+        """
+        تهيئة العامل.
+        
+        المعلمات:
+            app (Flask): التطبيق الذي تنفذ المهام داخل سياقه (مديره من نوع DurableJobManager).
+            worker_id (str, اختياري): معرف العامل (الافتراضي: اسم الجهاز ورقم العملية).
+            poll_interval (float, اختياري): فترة الانتظار بين عمليات البحث عن مهام بالثواني.
+        """
+        self.app = app
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.job_manager = app.job_manager
+        self.queue = app.job_manager.queue
+    
+    def run(self, stop_event):
+        """
+        تنفيذ المهام حتى طلب الإيقاف. المهمة الجارية تكتمل قبل التوقف.
+        
+        المعلمات:
+            stop_event (threading.Event): حدث طلب الإيقاف.
+        """
+        logger.info(f"بدء العامل: {self.worker_id}")
+        with self.app.app_context():
+            try:
+                while not stop_event.is_set():
+                    # تسجيل العامل كمتاح حتى تعرف الأجهزة الأخرى سعة هذا الجهاز
+                    self.queue.register_worker(self.worker_id)
+                    job = self.queue.lease(self.worker_id)
+                    if job is None:
+                        stop_event.wait(self.poll_interval)
+                        continue
+                    self._run_job(job)
+            finally:
+                self.queue.unregister_worker(self.worker_id)
+        logger.info(f"توقف العامل: {self.worker_id}")
+    
+    def _run_job(self, job):
+        """
+        تنفيذ مهمة محجوزة مع تجديد حجزها.
+        
+        المعلمات:
+            job (dict): المهمة كما يعيدها JobQueue.lease.
+        """
+        job_id = job["jobId"]
+        logger.info(f"بدء المهمة {job_id} ({job['type']}، المحاولة {job['attempts']})")
+        done = threading.Event()
+        
+        def heartbeat():
+            while not done.wait(self.queue.lease_duration / 3):
+                if not self.queue.heartbeat(job_id, self.worker_id):
+                    logger.warning(f"فقد العامل {self.worker_id} حجز المهمة {job_id}")
+                    return
+                self.queue.register_worker(self.worker_id, busy=True)
+        
+        self.queue.register_worker(self.worker_id, busy=True)
+        heartbeat_thread = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id}", daemon=True)
+        heartbeat_thread.start()
+        try:
+            self.job_manager.run_leased(job, self.worker_id)
+        finally:
+            done.set()
+            heartbeat_thread.join()
+
+def _run_worker_process(config_name):
+    """
+    تشغيل عامل في عملية فرعية حتى استلام SIGTERM.
+    
+    المعلمات:
+        config_name (str): اسم التكوين.
+    """
+    app = create_app(config_name)
+    if not isinstance(app.job_manager, DurableJobManager):
+        logger.error("العمال يتطلبون JOB_QUEUE_BACKEND = 'sqlite' أو 'redis'")
+        sys.exit(1)
+    
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    
+    Worker(app, poll_interval=app.config['WORKER_POLL_INTERVAL']).run(stop_event)
+
+def main(argv=None):
+    """
+    تشغيل العمليات العاملة ومراقبتها، وإعادة تشغيل أي عملية تتوقف بشكل غير متوقع.
+    
+    المعلمات:
+        argv (list, اختياري): معاملات سطر الأوامر.
+    """
+    parser = argparse.ArgumentParser(description="تشغيل عمال المهام الخلفية")
+    parser.add_argument('--config', default=os.environ.get('FLASK_CONFIG', 'default'),
+                        help="اسم التكوين (development أو testing أو production)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="عدد العمليات العاملة (الافتراضي: ENCODE_WORKERS)")
+    args = parser.parse_args(argv)
+    
+    app_config = config[args.config]
+    if app_config.JOB_QUEUE_BACKEND not in ('sqlite', 'redis'):
+        parser.error("العمال يتطلبون JOB_QUEUE_BACKEND = 'sqlite' أو 'redis'")
+    
+    logging.basicConfig(level=getattr(logging, app_config.LOG_LEVEL), format=app_config.LOG_FORMAT)
+    processes = args.processes or app_config.ENCODE_WORKERS
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    
+    logger.info(f"تشغيل {processes} عملية عاملة")
+    children = {}
+    while not stop_event.is_set():
+        for index in range(processes):
+            child = children.get(index)
+            if child is not None and child.is_alive():
+                continue
+            if child is not None:
+                logger.warning(f"توقفت العملية العاملة {child.pid} برمز {child.exitcode}، إعادة تشغيلها")
+            child = multiprocessing.Process(target=_run_worker_process, args=(args.config,), daemon=False)
+            child.start()
+            children[index] = child
+        stop_event.wait(1)
+    
+    # إيقاف العمليات بعد انتهاء المهام الجارية
+    logger.info("إيقاف العمليات العاملة")
+    for child in children.values():
+        if child.is_alive():
+            child.terminate()
+    for child in children.values():
+        child.join()
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,16 @@
 """
 
 import os
+import uuid
 import logging
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 
 from ..services.youtube_service import YouTubeService
+from ..services.video_service import VideoService
 from ..utils.cache_manager import CacheManager
-from ..utils.error_handler import handle_errors, YouTubeError
+from ..utils.error_handler import handle_errors, YouTubeError, QueueFullError
+from ..utils.job_scheduler import PRIORITIES, estimate_job_cost
 
 # إنشاء مخطط API لـ YouTube
 youtube_bp = Blueprint('youtube', __name__)
@@ -22,6 +25,9 @@ cache = CacheManager()
 # إنشاء خدمة YouTube
 youtube_service = YouTubeService()
 
+# إنشاء خدمة معالجة الفيديو
+video_service = VideoService()
+
 @youtube_bp.route('/info', methods=['GET'])
 @handle_errors
 def get_video_info():
@@ -46,26 +52,15 @@ def get_video_info():
     if not video_id_or_url:
         return jsonify({"error": "معرف الفيديو أو الرابط مطلوب"}), 400
     
-    # التحقق من وجود النتيجة في ذاكرة التخزين المؤقت
-    cache_key = f"youtube_info_{video_id_or_url}"
-    cached_result = cache.get(cache_key)
-    if cached_result:
-        logger.info(f"تم استرجاع معلومات فيديو YouTube من ذاكرة التخزين المؤقت: {video_id_or_url}")
-        return jsonify(cached_result)
-    
     try:
         # استخراج معرف الفيديو إذا كان رابطًا
         video_id = youtube_service.extract_video_id(video_id_or_url)
         if not video_id:
             return jsonify({"error": "معرف فيديو YouTube غير صالح"}), 400
         
-        # الحصول على معلومات الفيديو
-        logger.info(f"جاري الحصول على معلومات فيديو YouTube: {video_id}")
+        # الحصول على معلومات الفيديو (من المخزن الدائم إن أمكن، انظر YouTubeService.get_video_info)
         video_info = youtube_service.get_video_info(video_id)
         
-        # تخزين النتيجة في ذاكرة التخزين المؤقت
-        cache.set(cache_key, video_info)
-        
         return jsonify(video_info)
     except YouTubeError as e:
         logger.error(f"خطأ في الحصول على معلومات فيديو YouTube: {str(e)}")
@@ -74,6 +69,29 @@ def get_video_info():
         logger.error(f"خطأ غير متوقع: {str(e)}")
         return jsonify({"error": "حدث خطأ أثناء معالجة الطلب"}), 500
 
+def _download_video_job(cache_key, video_id, resolution, start_time=None, duration=None):
+    """
+    تنفيذ تنزيل فيديو YouTube كمهمة خلفية مع تسجيل تقدمه وتخزين النتيجة مؤقتًا.
+    
+    المعلمات:
+        cache_key (str): مفتاح التخزين المؤقت للنتيجة.
+        video_id (str): معرف فيديو YouTube.
+        resolution (str): الدقة المطلوبة.
+        start_time (float, اختياري): وقت بداية المقطع عند تنزيل جزء فقط.
+        duration (float, اختياري): مدة المقطع عند تنزيل جزء فقط.
+    
+    العائد:
+        dict: معلومات الفيديو المنزل.
+    """
+    progress = current_app.job_manager.get_progress_callback()
+    
+    def download():
+        if start_time is not None:
+            return youtube_service.download_segment(video_id, start_time, duration, resolution)
+        return youtube_service.download_video(video_id, resolution, progress=progress)
+    
+    return cache.get_or_compute(cache_key, download)
+
 @youtube_bp.route('/download', methods=['POST'])
 @handle_errors
 def download_video():
@@ -83,9 +101,18 @@ def download_video():
     طلب JSON:
         {
             "videoId": "معرف فيديو YouTube أو رابط",
-            "resolution": "الدقة المطلوبة (اختياري، الافتراضي: 720p)"
+            "resolution": "الدقة المطلوبة (اختياري، الافتراضي: 720p)",
+            "startTime": "وقت بداية المقطع المطلوب بالثواني (اختياري)",
+            "duration": "مدة المقطع المطلوب بالثواني (اختياري)",
+            "async": "تنفيذ التنزيل كمهمة خلفية (اختياري، الافتراضي: false)"
         }
     
+    عند تحديد startTime وduration يتم تنزيل الجزء الذي يغطي المقطع فقط، ويمكن
+    تمرير معرف الفيديو الناتج إلى /api/video/process بنفس وقت البداية والمدة.
+    
+    عند تحديد async تعاد الاستجابة فورًا (202) مع معرف مهمة، ويمكن متابعة تقدم
+    التنزيل ونتيجته عبر /api/video/jobs/<job_id>.
+    
     الاستجابة:
         {
             "success": true,
@@ -102,6 +129,18 @@ def download_video():
     
     video_id_or_url = data.get('videoId')
     resolution = data.get('resolution', current_app.config['YOUTUBE_DEFAULT_RESOLUTION'])
+    start_time = data.get('startTime')
+    duration = data.get('duration')
+    
+    segment = start_time is not None and duration is not None
+    if segment:
+        try:
+            start_time = float(start_time)
+            duration = float(duration)
+        except (TypeError, ValueError):
+            return jsonify({"error": "وقت البداية والمدة يجب أن يكونا أرقامًا"}), 400
+        if start_time < 0 or duration <= 0:
+            return jsonify({"error": "وقت البداية أو المدة غير صالحة"}), 400
     
     try:
         # استخراج معرف الفيديو إذا كان رابطًا
@@ -111,25 +150,68 @@ def download_video():
         
         # التحقق من وجود النتيجة في ذاكرة التخزين المؤقت
         cache_key = f"youtube_download_{video_id}_{resolution}"
+        if segment:
+            cache_key = f"{cache_key}_{start_time}_{duration}"
         cached_result = cache.get(cache_key)
         if cached_result:
             logger.info(f"تم استرجاع نتيجة تنزيل فيديو YouTube من ذاكرة التخزين المؤقت: {video_id}")
             return jsonify(cached_result)
         
-        # تنزيل الفيديو في خيط منفصل
-        logger.info(f"بدء تنزيل فيديو YouTube: {video_id} بدقة {resolution}")
+        if data.get('async'):
+            def submit_job():
+                job_id = current_app.job_manager.submit(
+                    _download_video_job,
+                    cache_key,
+                    job_type='youtube_download',
+                    # تنزيل مقطع لا يعيد الترميز، وتكلفة تنزيل الفيديو كاملاً غير معروفة
+                    cost=estimate_job_cost(duration, resolution, 'copy') if segment else None,
+                    affinity=f"youtube:{video_id}:{resolution}",
+                    video_id=video_id,
+                    resolution=resolution,
+                    start_time=start_time if segment else None,
+                    duration=duration if segment else None
+                )
+                return {"jobId": job_id}
+            
+            # الطلبات المتزامنة لنفس الفيديو تشترك في مهمة واحدة
+            job = current_app.job_manager.get_or_submit(cache, f"job_{cache_key}", submit_job)
+            
+            return jsonify({
+                "success": True,
+                "jobId": job["jobId"],
+                "status": "pending",
+                "statusUrl": f"/api/video/jobs/{job['jobId']}"
+            }), 202
         
-        result = current_app.executor.submit(
-            youtube_service.download_video,
-            video_id=video_id,
-            resolution=resolution
-        ).result()
+        def download():
+            # تنزيل الفيديو في خيط منفصل
+            logger.info(f"بدء تنزيل فيديو YouTube: {video_id} بدقة {resolution}")
+            
+            if segment:
+                result = current_app.executor.submit(
+                    youtube_service.download_segment,
+                    video_id=video_id,
+                    start_time=start_time,
+                    duration=duration,
+                    resolution=resolution
+                ).result()
+            else:
+                result = current_app.executor.submit(
+                    youtube_service.download_video,
+                    video_id=video_id,
+                    resolution=resolution
+                ).result()
+            
+            logger.info(f"تم تنزيل فيديو YouTube بنجاح: {video_id}")
+            return result
         
-        # تخزين النتيجة في ذاكرة التخزين المؤقت
-        cache.set(cache_key, result)
+        # الطلبات المتزامنة لنفس الفيديو تنتظر تنزيلاً واحدًا، وتخزن النتيجة مؤقتًا
+        result = cache.get_or_compute(cache_key, download)
         
-        logger.info(f"تم تنزيل فيديو YouTube بنجاح: {video_id}")
         return jsonify(result)
+    except QueueFullError:
+        # يعالجه handle_errors بالرمز 429 ورأس Retry-After
+        raise
     except YouTubeError as e:
         logger.error(f"خطأ في تنزيل فيديو YouTube: {str(e)}")
         return jsonify({"error": str(e)}), 400
@@ -137,6 +219,143 @@ def download_video():
         logger.error(f"خطأ غير متوقع: {str(e)}")
         return jsonify({"error": "حدث خطأ أثناء معالجة الطلب"}), 500
 
+def _clip_video_job(cache_key, video_id, resolution, start_time, duration, output_id,
+                    sound_effect=None, mode=None):
+    """
+    تنزيل مقطع من فيديو YouTube ومعالجته أثناء تنزيله كمهمة خلفية، وتخزين النتيجة مؤقتًا.
+    
+    المعلمات:
+        cache_key (str): مفتاح التخزين المؤقت للنتيجة.
+        video_id (str): معرف فيديو YouTube.
+        resolution (str): الدقة المطلوبة.
+        start_time (float): وقت بداية المقطع بالثواني.
+        duration (float): مدة المقطع بالثواني.
+        output_id (str): معرف الفيديو الناتج.
+        sound_effect (str, اختياري): معرف المؤثر الصوتي.
+        mode (str, اختياري): وضع المعالجة.
+    
+    العائد:
+        dict: معلومات الفيديو المنزل والمقطع الناتج.
+    """
+    progress = current_app.job_manager.get_progress_callback()
+    
+    def process(input_path):
+        return video_service.process_video(
+            None,
+            output_id,
+            start_time=start_time,
+            duration=duration,
+            sound_effect=sound_effect,
+            mode=mode,
+            input_path=input_path,
+            progress=progress
+        )
+    
+    def clip():
+        return youtube_service.process_segment(video_id, start_time, duration, process, resolution)
+    
+    return cache.get_or_compute(cache_key, clip)
+
+@youtube_bp.route('/clip', methods=['POST'])
+@handle_errors
+def clip_video():
+    """
+    اقتطاع مقطع من فيديو YouTube مباشرة.
+    
+    ينزل الجزء الذي يغطي المقطع فقط، وتبدأ المعالجة أثناء التنزيل بدلاً من انتظار
+    اكتماله. تتم العملية في الخلفية، ويعاد معرف المهمة فورًا لمتابعة حالتها
+    عبر /api/video/jobs/<job_id>.
+    
+    طلب JSON:
+        {
+            "videoId": "معرف فيديو YouTube أو رابط",
+            "startTime": "وقت بداية المقطع بالثواني",
+            "duration": "مدة المقطع بالثواني",
+            "resolution": "الدقة المطلوبة (اختياري، الافتراضي: 720p)",
+            "soundEffect": "نوع المؤثر الصوتي (اختياري)",
+            "mode": "وضع المعالجة (اختياري): encode أو smart_cut أو parallel",
+            "priority": "أولوية المهمة (اختياري): high أو normal أو low"
+        }
+    
+    الاستجابة (202):
+        {
+            "success": true,
+            "jobId": "معرف المهمة",
+            "status": "pending",
+            "videoId": "معرف الفيديو المعالج (متاح بعد اكتمال المهمة)",
+            "statusUrl": "عنوان URL لحالة المهمة"
+        }
+    """
+    # التحقق من البيانات المستلمة
+    data = request.json
+    if not data or 'videoId' not in data:
+        return jsonify({"error": "معرف الفيديو أو الرابط مطلوب"}), 400
+    
+    resolution = data.get('resolution', current_app.config['YOUTUBE_DEFAULT_RESOLUTION'])
+    sound_effect = data.get('soundEffect')
+    mode = data.get('mode')
+    
+    try:
+        start_time = float(data.get('startTime'))
+        duration = float(data.get('duration'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "وقت البداية والمدة مطلوبان ويجب أن يكونا أرقامًا"}), 400
+    if start_time < 0 or duration <= 0:
+        return jsonify({"error": "وقت البداية أو المدة غير صالحة"}), 400
+    
+    if mode is not None and mode not in video_service.PROCESSING_MODES:
+        return jsonify({"error": f"وضع المعالجة غير صالح: {mode}"}), 400
+    
+    priority = PRIORITIES.get(data.get('priority', 'normal'))
+    if priority is None:
+        return jsonify({"error": f"أولوية المهمة غير صالحة: {data.get('priority')}"}), 400
+    
+    # استخراج معرف الفيديو إذا كان رابطًا
+    video_id = youtube_service.extract_video_id(data.get('videoId'))
+    if not video_id:
+        return jsonify({"error": "معرف فيديو YouTube غير صالح"}), 400
+    
+    # التحقق من وجود النتيجة في ذاكرة التخزين المؤقت
+    cache_key = f"youtube_clip_{video_id}_{resolution}_{start_time}_{duration}_{sound_effect}_{mode}"
+    cached_result = cache.get(cache_key)
+    if cached_result:
+        logger.info(f"تم استرجاع نتيجة اقتطاع مقطع YouTube من ذاكرة التخزين المؤقت: {video_id}")
+        return jsonify(cached_result)
+    
+    def submit_job():
+        logger.info(f"بدء اقتطاع مقطع من فيديو YouTube: {video_id} ({start_time}+{duration} ثانية)")
+        
+        # إنشاء معرف فريد للفيديو المعالج
+        output_id = str(uuid.uuid4())
+        
+        job_id = current_app.job_manager.submit(
+            _clip_video_job,
+            cache_key,
+            job_type='youtube_clip',
+            priority=priority,
+            cost=video_service.estimate_cost(duration, mode, resolution),
+            affinity=f"youtube:{video_id}:{resolution}",
+            video_id=video_id,
+            resolution=resolution,
+            start_time=start_time,
+            duration=duration,
+            output_id=output_id,
+            sound_effect=sound_effect,
+            mode=mode
+        )
+        return {"jobId": job_id, "videoId": output_id}
+    
+    # الطلبات المتزامنة لنفس المقطع تشترك في مهمة واحدة
+    job = current_app.job_manager.get_or_submit(cache, f"job_{cache_key}", submit_job)
+    
+    return jsonify({
+        "success": True,
+        "jobId": job["jobId"],
+        "status": "pending",
+        "videoId": job["videoId"],
+        "statusUrl": f"/api/video/jobs/{job['jobId']}"
+    }), 202
+
 @youtube_bp.route('/search', methods=['GET'])
 @handle_errors
 def search_videos():
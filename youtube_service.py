@@ -5,25 +5,74 @@
 
 import os
 import re
+import time
 import uuid
+import sqlite3
 import logging
+import threading
+import concurrent.futures
 from flask import current_app
 from pytube import YouTube, Search
+from pytube.exceptions import VideoUnavailable
 from urllib.parse import urlparse, parse_qs
 
-from ..utils.error_handler import YouTubeError
+from ..utils.error_handler import YouTubeError, VideoProcessingError
+from ..utils.download_store import DownloadStore
+from ..utils.segment_fetcher import SegmentFetcher
+from ..utils.range_downloader import RangeDownloader
+from ..utils.growing_file import GrowingFile, GrowingFileServer
+from ..utils.metadata_store import MetadataStore
 
 logger = logging.getLogger(__name__)
 
+# صيغة معرف فيديو YouTube
+VIDEO_ID_PATTERN = re.compile(r'^[a-zA-Z0-9_-]{11}$')
+
 class YouTubeService:
     """
     خدمة للتعامل مع فيديوهات YouTube.
     توفر وظائف للبحث وتنزيل الفيديوهات.
     """
     
+    # عدد الخيوط المخصصة لتحديث معلومات الفيديوهات في الخلفية
+    REFRESH_WORKERS = 2
+    
     def __init__(self):
         """تهيئة خدمة YouTube."""
-        pass
+        self.download_store = None
+        self.metadata_store = None
+        self.refresh_executor = None
+        self.refreshing = set()
+        self.lock = threading.Lock()
+    
+    def _get_download_store(self):
+        """
+        الحصول على مخزن الفيديوهات المنزلة.
+        
+        العائد:
+            DownloadStore: مخزن التنزيلات.
+        """
+        folder = current_app.config['CACHE_FOLDER']
+        if self.download_store is None or self.download_store.folder != folder:
+            self.download_store = DownloadStore(folder)
+        return self.download_store
+    
+    def _get_metadata_store(self):
+        """
+        الحصول على مخزن معلومات الفيديوهات.
+        
+        العائد:
+            MetadataStore: مخزن المعلومات.
+        """
+        config = current_app.config
+        path = config['YOUTUBE_METADATA_PATH']
+        if self.metadata_store is None or self.metadata_store.path != path:
+            self.metadata_store = MetadataStore(
+                path,
+                max_age=config['YOUTUBE_CACHE_DURATION'] + config['YOUTUBE_CACHE_STALE_DURATION'],
+                error_max_age=config['YOUTUBE_NEGATIVE_CACHE_DURATION']
+            )
+        return self.metadata_store
     
     def extract_video_id(self, video_id_or_url):
         """
@@ -36,7 +85,7 @@ class YouTubeService:
             str: معرف فيديو YouTube، أو None إذا لم يتم العثور على معرف صالح.
         """
         # التحقق مما إذا كان المدخل هو معرف فيديو مباشر
-        if re.match(r'^[a-zA-Z0-9_-]{11}$', video_id_or_url):
+        if VIDEO_ID_PATTERN.match(video_id_or_url):
             return video_id_or_url
         
         # محاولة استخراج معرف الفيديو من الرابط
@@ -60,11 +109,52 @@ class YouTubeService:
             logger.error(f"خطأ في استخراج معرف فيديو YouTube: {str(e)}")
             return None
     
-    def get_video_info(self, video_id):
+    def _fetch_video_info(self, video_id):
         """
-        الحصول على معلومات فيديو YouTube.
+        الحصول على معلومات فيديو YouTube من الشبكة.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+        
+        العائد:
+            dict: معلومات الفيديو.
+        """
+        # إنشاء كائن YouTube
+        yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+        
+        # الحصول على معلومات الفيديو
+        video_info = {
+            "videoId": video_id,
+            "title": yt.title,
+            "author": yt.author,
+            "length": yt.length,
+            "thumbnail_url": yt.thumbnail_url,
+            "available_resolutions": []
+        }
+        
+        # الحصول على الدقة المتاحة
+        for stream in yt.streams.filter(progressive=True):
+            if stream.resolution:
+                video_info["available_resolutions"].append(stream.resolution)
+        
+        # إزالة التكرارات وترتيب الدقة
+        video_info["available_resolutions"] = sorted(
+            list(set(video_info["available_resolutions"])),
+            key=lambda x: int(x.replace('p', '')),
+            reverse=True
+        )
+        
+        return video_info
+    
+    def _refresh_video_info(self, store, video_id):
+        """
+        الحصول على معلومات فيديو من الشبكة وحفظها في المخزن.
+        
+        إذا كان الفيديو غير متاح (محذوف أو خاص مثلاً) يتم حفظ النتيجة السلبية أيضًا،
+        أما أخطاء الشبكة المؤقتة فلا يتم حفظها.
         
         المعلمات:
+            store (MetadataStore): مخزن المعلومات.
             video_id (str): معرف فيديو YouTube.
         
         العائد:
@@ -74,43 +164,178 @@ class YouTubeService:
             YouTubeError: إذا حدث خطأ أثناء الحصول على معلومات الفيديو.
         """
         try:
-            # إنشاء كائن YouTube
-            yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
-            
-            # الحصول على معلومات الفيديو
-            video_info = {
-                "videoId": video_id,
-                "title": yt.title,
-                "author": yt.author,
-                "length": yt.length,
-                "thumbnail_url": yt.thumbnail_url,
-                "available_resolutions": []
-            }
-            
-            # الحصول على الدقة المتاحة
-            for stream in yt.streams.filter(progressive=True):
-                if stream.resolution:
-                    video_info["available_resolutions"].append(stream.resolution)
-            
-            # إزالة التكرارات وترتيب الدقة
-            video_info["available_resolutions"] = sorted(
-                list(set(video_info["available_resolutions"])),
-                key=lambda x: int(x.replace('p', '')),
-                reverse=True
-            )
-            
-            return video_info
+            video_info = self._fetch_video_info(video_id)
+        except VideoUnavailable as e:
+            message = f"الفيديو غير متاح: {str(e)}"
+            logger.warning(f"فيديو YouTube غير متاح: {video_id} - {str(e)}")
+            try:
+                store.put_error(video_id, message)
+            except sqlite3.Error as store_error:
+                logger.warning(f"فشل حفظ نتيجة فيديو YouTube: {video_id} - {str(store_error)}")
+            raise YouTubeError(message)
         except Exception as e:
             logger.error(f"خطأ في الحصول على معلومات فيديو YouTube: {str(e)}")
             raise YouTubeError(f"خطأ في الحصول على معلومات الفيديو: {str(e)}")
+        
+        try:
+            store.put(video_id, video_info)
+        except sqlite3.Error as e:
+            logger.warning(f"فشل حفظ معلومات فيديو YouTube: {video_id} - {str(e)}")
+        return video_info
+    
+    def _refresh_in_background(self, store, video_id):
+        """
+        تحديث معلومات فيديو في الخلفية، مع تحديث واحد فقط لكل فيديو في نفس الوقت.
+        
+        المعلمات:
+            store (MetadataStore): مخزن المعلومات.
+            video_id (str): معرف فيديو YouTube.
+        """
+        with self.lock:
+            if video_id in self.refreshing:
+                return
+            self.refreshing.add(video_id)
+            if self.refresh_executor is None:
+                self.refresh_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.REFRESH_WORKERS,
+                    thread_name_prefix='youtube-info'
+                )
+        
+        def refresh():
+            try:
+                self._refresh_video_info(store, video_id)
+                logger.info(f"تم تحديث معلومات فيديو YouTube في الخلفية: {video_id}")
+            except YouTubeError as e:
+                # الاحتفاظ بالمعلومات القديمة إذا فشل التحديث بسبب خطأ مؤقت
+                logger.warning(f"فشل تحديث معلومات فيديو YouTube في الخلفية: {video_id} - {str(e)}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(video_id)
+        
+        self.refresh_executor.submit(refresh)
+    
+    def get_video_info(self, video_id):
+        """
+        الحصول على معلومات فيديو YouTube.
+        
+        تحفظ المعلومات في مخزن دائم وتعاد منه خلال YOUTUBE_CACHE_DURATION. بعدها،
+        وحتى YOUTUBE_CACHE_STALE_DURATION إضافية، تعاد المعلومات المحفوظة فورًا ويتم
+        تحديثها في الخلفية. وتحفظ نتيجة الفيديوهات غير المتاحة لمدة
+        YOUTUBE_NEGATIVE_CACHE_DURATION، وترفض المعرفات غير الصالحة دون الاتصال بالشبكة.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+        
+        العائد:
+            dict: معلومات الفيديو.
+        
+        يرفع:
+            YouTubeError: إذا كان المعرف غير صالح أو الفيديو غير متاح أو حدث خطأ أثناء الحصول على معلومات الفيديو.
+        """
+        if not video_id or not VIDEO_ID_PATTERN.match(video_id):
+            raise YouTubeError(f"معرف فيديو YouTube غير صالح: {video_id}")
+        
+        config = current_app.config
+        store = self._get_metadata_store()
+        try:
+            entry = store.get(video_id)
+        except sqlite3.Error as e:
+            logger.warning(f"فشل قراءة مخزن معلومات YouTube: {video_id} - {str(e)}")
+            entry = None
+        
+        if entry is not None:
+            age = time.time() - entry["fetchedAt"]
+            if entry["error"] is not None:
+                if age < config['YOUTUBE_NEGATIVE_CACHE_DURATION']:
+                    raise YouTubeError(entry["error"])
+            elif age < config['YOUTUBE_CACHE_DURATION']:
+                return entry["info"]
+            elif age < config['YOUTUBE_CACHE_DURATION'] + config['YOUTUBE_CACHE_STALE_DURATION']:
+                # إعادة المعلومات القديمة فورًا وتحديثها للطلبات التالية
+                self._refresh_in_background(store, video_id)
+                return entry["info"]
+        
+        return self._refresh_video_info(store, video_id)
+    
+    def _select_stream(self, yt, resolution):
+        """
+        اختيار تدفق الفيديو المناسب للدقة المطلوبة.
+        
+        المعلمات:
+            yt (YouTube): كائن فيديو YouTube.
+            resolution (str): الدقة المطلوبة.
+        
+        العائد:
+            Stream: التدفق المختار.
+        
+        يرفع:
+            YouTubeError: إذا لم يتم العثور على أي تدفق مناسب.
+        """
+        stream = yt.streams.filter(progressive=True, resolution=resolution).first()
+        
+        # إذا لم يتم العثور على التدفق المطلوب، استخدام دقة بديلة
+        if not stream:
+            fallback_resolution = current_app.config['YOUTUBE_FALLBACK_RESOLUTION']
+            logger.warning(f"لم يتم العثور على دقة {resolution}، استخدام {fallback_resolution} بدلاً من ذلك")
+            stream = yt.streams.filter(progressive=True, resolution=fallback_resolution).first()
+        
+        # إذا لم يتم العثور على أي تدفق، استخدام أعلى دقة متاحة
+        if not stream:
+            logger.warning(f"لم يتم العثور على دقة محددة، استخدام أعلى دقة متاحة")
+            stream = yt.streams.filter(progressive=True).order_by('resolution').desc().first()
+        
+        # إذا لم يتم العثور على أي تدفق، رفع خطأ
+        if not stream:
+            raise YouTubeError("لم يتم العثور على تدفق فيديو مناسب")
+        
+        return stream
+    
+    def _download_stream(self, stream, output_path, progress=None):
+        """
+        تنزيل تدفق فيديو بأجزاء متوازية، مع استئناف التنزيل السابق غير المكتمل لنفس المسار.
+        
+        إذا لم يدعم الخادم طلبات النطاق يتم التنزيل باتصال واحد.
+        
+        المعلمات:
+            stream (Stream): تدفق الفيديو.
+            output_path (str): مسار الملف الناتج.
+            progress (callable, اختياري): دالة تستدعى بـ (البايتات المكتملة، الحجم الكلي).
+        """
+        downloader = RangeDownloader(
+            stream.url,
+            connections=current_app.config['YOUTUBE_DOWNLOAD_CONNECTIONS'],
+            chunk_size=current_app.config['YOUTUBE_DOWNLOAD_CHUNK_SIZE'],
+            progress=progress
+        )
+        
+        if downloader.get_size() is None:
+            logger.warning("الخادم لا يدعم طلبات النطاق، سيتم التنزيل باتصال واحد")
+            try:
+                stream.download(output_path=os.path.dirname(output_path), filename=os.path.basename(output_path))
+            except Exception:
+                # عدم ترك ملف غير مكتمل في المخزن
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                raise
+            return
+        
+        result = downloader.download(output_path)
+        logger.info(
+            f"تم تنزيل {result['bytesFetched']} بايت واستئناف {result['resumed']} بايت "
+            f"باستخدام {downloader.connections} اتصالات"
+        )
     
-    def download_video(self, video_id, resolution=None):
+    def download_video(self, video_id, resolution=None, progress=None):
         """
         تنزيل فيديو YouTube.
         
+        يتم حفظ كل فيديو مرة واحدة لكل دقة مطلوبة، وتعيد الطلبات اللاحقة الملف
+        المحفوظ مباشرة دون الاتصال بـ YouTube.
+        
         المعلمات:
             video_id (str): معرف فيديو YouTube.
             resolution (str, اختياري): الدقة المطلوبة (مثل "720p").
+            progress (callable, اختياري): دالة تستدعى بـ (البايتات المكتملة، الحجم الكلي) أثناء التنزيل.
         
         العائد:
             dict: معلومات الفيديو المنزل.
@@ -119,57 +344,246 @@ class YouTubeService:
             YouTubeError: إذا حدث خطأ أثناء تنزيل الفيديو.
         """
         try:
-            # إنشاء كائن YouTube
-            yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
-            
             # تحديد الدقة المطلوبة
             if not resolution:
                 resolution = current_app.config['YOUTUBE_DEFAULT_RESOLUTION']
             
-            # البحث عن التدفق المناسب
-            stream = yt.streams.filter(progressive=True, resolution=resolution).first()
-            
-            # إذا لم يتم العثور على التدفق المطلوب، استخدام دقة بديلة
-            if not stream:
-                fallback_resolution = current_app.config['YOUTUBE_FALLBACK_RESOLUTION']
-                logger.warning(f"لم يتم العثور على دقة {resolution}، استخدام {fallback_resolution} بدلاً من ذلك")
-                stream = yt.streams.filter(progressive=True, resolution=fallback_resolution).first()
+            # التحقق من وجود الفيديو في مخزن التنزيلات
+            store = self._get_download_store()
+            entry = store.lookup(video_id, resolution)
+            if entry:
+                logger.info(f"تم العثور على فيديو YouTube في مخزن التنزيلات: {video_id} بدقة {resolution}")
+                return {
+                    "success": True,
+                    "videoId": entry["localId"],
+                    "originalId": video_id,
+                    "title": entry["title"],
+                    "path": entry["path"]
+                }
             
-            # إذا لم يتم العثور على أي تدفق، استخدام أعلى دقة متاحة
-            if not stream:
-                logger.warning(f"لم يتم العثور على دقة محددة، استخدام أعلى دقة متاحة")
-                stream = yt.streams.filter(progressive=True).order_by('resolution').desc().first()
+            # عملية واحدة فقط تنزل نفس الفيديو، والعمليات الأخرى تنتظر نتيجتها
+            with store.lock(video_id, resolution):
+                entry = store.lookup(video_id, resolution)
+                if not entry:
+                    # إنشاء كائن YouTube
+                    yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+                    
+                    # البحث عن التدفق المناسب
+                    stream = self._select_stream(yt, resolution)
+                    
+                    # التنزيل إلى ملف مؤقت ثم نقله إلى المخزن عند اكتماله
+                    temp_path = store.get_temp_path(video_id, resolution)
+                    logger.info(f"جاري تنزيل فيديو YouTube: {video_id} بدقة {stream.resolution}")
+                    self._download_stream(stream, temp_path, progress)
+                    
+                    # التحقق من وجود الملف
+                    if not os.path.exists(temp_path):
+                        raise YouTubeError("فشل تنزيل الفيديو")
+                    
+                    entry = store.add(
+                        video_id,
+                        resolution,
+                        temp_path,
+                        title=yt.title,
+                        stream_resolution=stream.resolution
+                    )
             
-            # إذا لم يتم العثور على أي تدفق، رفع خطأ
-            if not stream:
-                raise YouTubeError("لم يتم العثور على تدفق فيديو مناسب")
+            # إرجاع معلومات الفيديو المنزل
+            return {
+                "success": True,
+                "videoId": entry["localId"],
+                "originalId": video_id,
+                "title": entry["title"],
+                "path": entry["path"]
+            }
+        except Exception as e:
+            logger.error(f"خطأ في تنزيل فيديو YouTube: {str(e)}")
+            raise YouTubeError(f"خطأ في تنزيل الفيديو: {str(e)}")
+    
+    def download_segment(self, video_id, start_time, duration, resolution=None):
+        """
+        تنزيل الجزء الذي يغطي نطاقًا زمنيًا فقط من فيديو YouTube.
+        
+        ينزل فهرس الحاوية والبيانات التي تغطي النطاق المطلوب فقط، ويحفظها في ملف
+        يمكن تمرير معرفه مباشرة إلى VideoService.process_video بنفس وقت البداية والمدة.
+        إذا كان الفيديو الكامل في مخزن التنزيلات، أو لم يدعم الخادم طلبات النطاق،
+        يتم استخدام الفيديو الكامل.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            resolution (str, اختياري): الدقة المطلوبة (مثل "720p").
+        
+        العائد:
+            dict: معلومات الفيديو المنزل.
+        
+        يرفع:
+            YouTubeError: إذا حدث خطأ أثناء تنزيل الفيديو.
+        """
+        if not resolution:
+            resolution = current_app.config['YOUTUBE_DEFAULT_RESOLUTION']
+        
+        # لا حاجة لتنزيل جزء إذا كان الفيديو الكامل موجودًا
+        if self._get_download_store().lookup(video_id, resolution):
+            return self.download_video(video_id, resolution)
+        
+        try:
+            yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+            stream = self._select_stream(yt, resolution)
             
-            # إنشاء معرف فريد للفيديو المنزل
             local_id = str(uuid.uuid4())
+            output_path = os.path.join(current_app.config['CACHE_FOLDER'], f"{local_id}.mp4")
+            temp_path = f"{output_path}.part"
             
-            # تحديد مسار الحفظ
-            filename = f"{local_id}.mp4"
-            output_path = os.path.join(current_app.config['CACHE_FOLDER'], filename)
-            
-            # تنزيل الفيديو
-            logger.info(f"جاري تنزيل فيديو YouTube: {video_id} بدقة {stream.resolution}")
-            stream.download(output_path=os.path.dirname(output_path), filename=filename)
-            
-            # التحقق من وجود الملف
-            if not os.path.exists(output_path):
-                raise YouTubeError("فشل تنزيل الفيديو")
+            logger.info(f"جاري تنزيل جزء من فيديو YouTube: {video_id} ({start_time}+{duration} ثانية) بدقة {stream.resolution}")
+            fetcher = SegmentFetcher(stream.url, timeout=current_app.config['YOUTUBE_SEGMENT_TIMEOUT'])
+            try:
+                segment = fetcher.fetch(
+                    temp_path,
+                    start_time,
+                    duration,
+                    margin=current_app.config['YOUTUBE_SEGMENT_MARGIN']
+                )
+            except (YouTubeError, VideoProcessingError) as e:
+                # الخادم لا يدعم طلبات النطاق أو الحاوية غير مدعومة
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                logger.warning(f"تعذر تنزيل جزء من الفيديو، سيتم تنزيل الفيديو الكامل: {str(e)}")
+                return self.download_video(video_id, resolution)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            os.replace(temp_path, output_path)
             
-            # إرجاع معلومات الفيديو المنزل
+            logger.info(f"تم تنزيل {segment['bytesFetched']} من {segment['size']} بايت من فيديو YouTube: {video_id}")
             return {
                 "success": True,
                 "videoId": local_id,
                 "originalId": video_id,
                 "title": yt.title,
-                "path": output_path
+                "path": output_path,
+                "partial": True,
+                "segment": {"start_time": start_time, "duration": duration},
+                "bytesFetched": segment["bytesFetched"],
+                "size": segment["size"]
             }
+        except YouTubeError:
+            raise
         except Exception as e:
-            logger.error(f"خطأ في تنزيل فيديو YouTube: {str(e)}")
-            raise YouTubeError(f"خطأ في تنزيل الفيديو: {str(e)}")
+            logger.error(f"خطأ في تنزيل جزء من فيديو YouTube: {str(e)}")
+            raise YouTubeError(f"خطأ في تنزيل جزء من الفيديو: {str(e)}")
+    
+    def process_segment(self, video_id, start_time, duration, process, resolution=None):
+        """
+        تنزيل الجزء الذي يغطي نطاقًا زمنيًا من فيديو YouTube ومعالجته أثناء تنزيله.
+        
+        تبدأ المعالجة بمجرد حجز الملف، وتقرأ الملف عبر خادم HTTP محلي ينتظر وصول
+        كل نطاق قبل تقديمه، فيتداخل التنزيل مع الترميز ويقترب الزمن الكلي من أطولهما
+        بدلاً من مجموعهما. إذا كان الفيديو الكامل في مخزن التنزيلات تتم معالجته مباشرة،
+        وإذا لم يدعم الخادم طلبات النطاق يتم تنزيل الفيديو الكامل ثم معالجته.
+        
+        المعلمات:
+            video_id (str): معرف فيديو YouTube.
+            start_time (float): وقت البداية بالثواني.
+            duration (float): المدة بالثواني.
+            process (callable): دالة تستدعى بمسار أو رابط الفيديو المصدر وتعيد نتيجة المعالجة.
+            resolution (str, اختياري): الدقة المطلوبة (مثل "720p").
+        
+        العائد:
+            dict: معلومات الفيديو المنزل (download) ونتيجة المعالجة (clip) وما إذا تداخلا (pipelined).
+        
+        يرفع:
+            YouTubeError: إذا حدث خطأ أثناء تنزيل الفيديو.
+        """
+        if not resolution:
+            resolution = current_app.config['YOUTUBE_DEFAULT_RESOLUTION']
+        
+        # لا حاجة للتنزيل إذا كان الفيديو الكامل موجودًا
+        if self._get_download_store().lookup(video_id, resolution):
+            download = self.download_video(video_id, resolution)
+            return {"download": download, "clip": process(download["path"]), "pipelined": False}
+        
+        try:
+            yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+            stream = self._select_stream(yt, resolution)
+            title = yt.title
+        except YouTubeError:
+            raise
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على تدفق فيديو YouTube: {str(e)}")
+            raise YouTubeError(f"خطأ في الحصول على تدفق الفيديو: {str(e)}")
+        
+        local_id = str(uuid.uuid4())
+        output_path = os.path.join(current_app.config['CACHE_FOLDER'], f"{local_id}.mp4")
+        temp_path = f"{output_path}.part"
+        timeout = current_app.config['YOUTUBE_SEGMENT_TIMEOUT']
+        margin = current_app.config['YOUTUBE_SEGMENT_MARGIN']
+        
+        growing_file = GrowingFile(temp_path)
+        fetcher = SegmentFetcher(stream.url, timeout=timeout)
+        segment = {}
+        
+        def fetch():
+            error = None
+            try:
+                segment.update(fetcher.fetch(
+                    temp_path,
+                    start_time,
+                    duration,
+                    margin=margin,
+                    on_data=growing_file.mark_written
+                ))
+            except Exception as e:
+                error = e
+            finally:
+                growing_file.finish(error)
+        
+        logger.info(f"جاري تنزيل ومعالجة جزء من فيديو YouTube: {video_id} ({start_time}+{duration} ثانية) بدقة {stream.resolution}")
+        fetch_thread = threading.Thread(target=fetch, daemon=True)
+        fetch_thread.start()
+        
+        clip = None
+        process_error = None
+        try:
+            growing_file.wait_started(timeout)
+            with GrowingFileServer(growing_file, timeout) as url:
+                clip = process(url)
+        except Exception as e:
+            process_error = e
+        fetch_thread.join()
+        
+        if growing_file.error is not None or clip is None:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            
+            if isinstance(growing_file.error, (YouTubeError, VideoProcessingError)):
+                # الخادم لا يدعم طلبات النطاق أو الحاوية غير مدعومة
+                logger.warning(f"تعذر تنزيل جزء من الفيديو، سيتم تنزيل الفيديو الكامل: {str(growing_file.error)}")
+                download = self.download_video(video_id, resolution)
+                return {"download": download, "clip": process(download["path"]), "pipelined": False}
+            
+            if growing_file.error is not None:
+                logger.error(f"خطأ في تنزيل جزء من فيديو YouTube: {str(growing_file.error)}")
+                raise YouTubeError(f"خطأ في تنزيل جزء من الفيديو: {str(growing_file.error)}")
+            raise process_error
+        
+        os.replace(temp_path, output_path)
+        
+        logger.info(f"تم تنزيل {segment['bytesFetched']} من {segment['size']} بايت ومعالجتها أثناء التنزيل: {video_id}")
+        download = {
+            "success": True,
+            "videoId": local_id,
+            "originalId": video_id,
+            "title": title,
+            "path": output_path,
+            "partial": True,
+            "segment": {"start_time": start_time, "duration": duration},
+            "bytesFetched": segment["bytesFetched"],
+            "size": segment["size"]
+        }
+        return {"download": download, "clip": clip, "pipelined": True}
     
     def search_videos(self, query, max_results=10):
         """